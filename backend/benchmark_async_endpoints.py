@@ -0,0 +1,102 @@
+"""
+Load test: sync (threadpool) vs async read endpoints
+
+Serves the stock overview, billing list and dashboard overview twice
+in-process - once as sync `def` routes on get_tenant_db (the pre-async
+setup) and once through the real async routes on get_tenant_async_db - and
+reports requests/sec and p99.
+Run against a local MySQL: python benchmark_async_endpoints.py [requests] [concurrency]
+"""
+
+import sys
+import time
+import asyncio
+import statistics
+from typing import List
+
+import httpx
+from fastapi import FastAPI, Depends
+from sqlalchemy.orm import Session
+
+from database import get_tenant_db
+from models.tenant_models import Billing
+from schemas.tenant_schemas import BillingResponse
+from routers.dashboard import router as dashboard_router
+from routers.stocks.stock_overview import router as stock_overview_router, _build_stock_overview
+from routers.billingSystem.billing import router as billing_router
+
+ENDPOINTS = ["/stock-overview/", "/billing/", "/api/dashboard/overview"]
+
+
+def build_sync_app():
+    app = FastAPI()
+
+    @app.get("/stock-overview/")
+    def stock_overview(db: Session = Depends(get_tenant_db)):
+        return _build_stock_overview(db)
+
+    @app.get("/billing/", response_model=List[BillingResponse])
+    def billing(db: Session = Depends(get_tenant_db)):
+        # Same full list the async route serves without ?limit= / ?cursor=
+        return db.query(Billing).all()
+
+    @app.get("/api/dashboard/overview")
+    def dashboard(db: Session = Depends(get_tenant_db)):
+        # Same statistics the overview used to compute with sync COUNT queries
+        from models.tenant_models import Item, StockOverview, Vendor
+        return {
+            "total_items": db.query(Item).filter(Item.is_active == True).count(),
+            "stock_rows": db.query(StockOverview).count(),
+            "total_vendors": db.query(Vendor).count(),
+        }
+
+    return app
+
+
+def build_async_app():
+    app = FastAPI()
+    app.include_router(stock_overview_router)
+    app.include_router(billing_router)
+    app.include_router(dashboard_router)
+    return app
+
+
+async def drive(app, path, total, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    return total / elapsed, statistics.median(latencies), p99
+
+
+async def run_load_test(total=500, concurrency=100):
+    print(f"🔍 {total} requests per endpoint, {concurrency} concurrent clients")
+    apps = {"sync": build_sync_app(), "async": build_async_app()}
+
+    for path in ENDPOINTS:
+        for label, app in apps.items():
+            rps, p50, p99 = await drive(app, path, total, concurrency)
+            print(f"{path:<28} {label:<6} {rps:8.1f} req/s  p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+
+if __name__ == "__main__":
+    requests_per_endpoint = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    asyncio.run(run_load_test(requests_per_endpoint, clients))
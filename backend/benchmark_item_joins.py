@@ -0,0 +1,114 @@
+"""
+Benchmark: item master lookups by item_name string vs integer item_id join
+
+Seeds a scratch tenant database with N items and a return / GRN with L lines,
+then times the per-line `Item.name == item_name` lookups the billing and
+return handlers used to run against the single item_id join they run now.
+Run against a local MySQL: python benchmark_item_joins.py [items] [lines] [tenant_db]
+"""
+
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import event, text
+
+from database import bootstrap_tenant_db, get_tenant_engine, get_tenant_sessionmaker
+from models.tenant_models import (
+    Item, GRN, GRNItem, GRNStatus, ReturnHeader, ReturnItem, ReturnTypeEnum
+)
+from utils.item_refs import backfill_item_ids
+
+
+def seed(db, item_count, line_count):
+    print(f"Seeding {item_count} items, {line_count} GRN lines and {line_count} return lines...")
+    for table in ("return_items", "return_headers", "batches", "grn_items", "grns", "items"):
+        db.execute(text(f"DELETE FROM {table}"))
+    db.commit()
+
+    db.bulk_insert_mappings(Item, [
+        {"name": f"Bench Item {i:06d}", "item_code": f"BENCH-{i}", "tax": 2, "mrp": 10, "is_active": True}
+        for i in range(item_count)
+    ])
+
+    grn = GRN(grn_number="BENCH-GRN", grn_date=date.today(), store="Main Store", status=GRNStatus.approved)
+    header = ReturnHeader(return_no="BENCH-RET", return_type=ReturnTypeEnum.TO_VENDOR, return_date=date.today())
+    db.add_all([grn, header])
+    db.flush()
+
+    step = max(item_count // line_count, 1)
+    # bulk_insert_mappings bypasses the flush hook, like rows written before item_id existed
+    db.bulk_insert_mappings(GRNItem, [
+        {"grn_id": grn.id, "item_name": f"Bench Item {(i * step) % item_count:06d}", "received_qty": 5, "rate": 10}
+        for i in range(line_count)
+    ])
+    db.bulk_insert_mappings(ReturnItem, [
+        {"return_id": header.id, "item_name": f"Bench Item {(i * step) % item_count:06d}", "qty": 2, "rate": 4}
+        for i in range(line_count)
+    ])
+    db.commit()
+    return grn.id, header.id
+
+
+def by_name(db, grn_id, return_id):
+    """Pre-item_id shape: one Item.name lookup per line."""
+    tax = 0
+    for line in db.query(GRNItem).filter(GRNItem.grn_id == grn_id).all():
+        item = db.query(Item).filter(Item.name == line.item_name).first()
+        tax += (item.tax or 0) * line.received_qty if item else 0
+    for line in db.query(ReturnItem).filter(ReturnItem.return_id == return_id).all():
+        item = db.query(Item).filter(Item.name == line.item_name).first()
+        tax += (item.tax or 0) * line.qty if item else 0
+    return tax
+
+
+def by_item_id(db, grn_id, return_id):
+    """Current shape: one integer join per document."""
+    tax = 0
+    for line, item in db.query(GRNItem, Item).outerjoin(
+        Item, GRNItem.item_id == Item.id
+    ).filter(GRNItem.grn_id == grn_id).all():
+        tax += (item.tax or 0) * line.received_qty if item else 0
+    for line, item in db.query(ReturnItem, Item).outerjoin(
+        Item, ReturnItem.item_id == Item.id
+    ).filter(ReturnItem.return_id == return_id).all():
+        tax += (item.tax or 0) * line.qty if item else 0
+    return tax
+
+
+def measure(engine, label, fn):
+    counter = {"queries": 0}
+
+    def count(*args):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms  {counter['queries']:7d} queries  result={result}")
+
+
+def run_benchmark(item_count=20000, line_count=500, db_name="ims_benchmark"):
+    bootstrap_tenant_db(db_name)
+    engine = get_tenant_engine(db_name)
+    db = get_tenant_sessionmaker(db_name)()
+
+    try:
+        grn_id, return_id = seed(db, item_count, line_count)
+
+        measure(engine, "backfill item_id", lambda: backfill_item_ids(engine))
+        measure(engine, "before: lookup by item_name", lambda: by_name(db, grn_id, return_id))
+        db.expire_all()
+        measure(engine, "after:  join on item_id", lambda: by_item_id(db, grn_id, return_id))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    tenant = sys.argv[3] if len(sys.argv) > 3 else "ims_benchmark"
+    run_benchmark(items, lines, tenant)
@@ -0,0 +1,149 @@
+"""
+Benchmark: return-invoice listing, per-invoice lookups vs one joined page query
+
+Seeds a scratch tenant database with N return invoices (each with a return
+header, a linked or vendor-text customer and 0-3 payments), then times the
+old listing shape - a SUM, a header lookup and a customer lookup per invoice -
+against the current _list_return_billing() (on the async session the route
+uses) on the first and a deep page.
+Run against a local MySQL: python benchmark_return_invoices.py [invoices] [page_size] [tenant_db]
+"""
+
+import sys
+import time
+import asyncio
+import inspect
+from datetime import date
+
+from sqlalchemy import event, func, text
+
+from database import (
+    bootstrap_tenant_db, get_tenant_engine, get_tenant_sessionmaker,
+    get_tenant_async_engine, get_tenant_async_sessionmaker
+)
+from models.tenant_models import (
+    Customer, ReturnHeader, ReturnBilling, ReturnBillingPayment, ReturnTypeEnum, BillingStatus
+)
+from routers.billingSystem.billing import _list_return_billing
+from utils.pagination import PageParams, ListFilters, encode_cursor
+
+
+def seed(db, invoice_count):
+    print(f"Seeding {invoice_count} return invoices...")
+    for table in ("return_billing_payments", "return_billing", "return_items", "return_headers", "customers"):
+        db.execute(text(f"DELETE FROM {table}"))
+    db.commit()
+
+    db.bulk_insert_mappings(Customer, [
+        {"customer_type": "self", "name": f"Bench Customer {i}", "mobile": "999", "status": "approved"}
+        for i in range(500)
+    ])
+    db.commit()
+    customer_ids = [row.id for row in db.query(Customer.id).order_by(Customer.id)]
+
+    # Every other return names its customer only in the vendor text (legacy rows)
+    db.bulk_insert_mappings(ReturnHeader, [
+        {
+            "return_no": f"BENCH-RET-{i}",
+            "return_type": ReturnTypeEnum.TO_CUSTOMER,
+            "return_date": date.today(),
+            "customer_id": customer_ids[i % 500] if i % 2 else None,
+            "vendor": None if i % 2 else f"Customer: Bench Customer {i % 500}",
+            "status": "APPROVED"
+        }
+        for i in range(invoice_count)
+    ])
+    db.commit()
+    header_ids = [row.id for row in db.query(ReturnHeader.id).order_by(ReturnHeader.id)]
+
+    db.bulk_insert_mappings(ReturnBilling, [
+        {
+            "return_id": header_id, "gross_amount": 100, "tax_amount": 5, "net_amount": 105,
+            "paid_amount": 0, "balance_amount": 105, "status": BillingStatus.PARTIAL
+        }
+        for header_id in header_ids
+    ])
+    db.commit()
+    billing_ids = [row.id for row in db.query(ReturnBilling.id).order_by(ReturnBilling.id)]
+
+    db.bulk_insert_mappings(ReturnBillingPayment, [
+        {"billing_id": billing_id, "amount": 10}
+        for i, billing_id in enumerate(billing_ids)
+        for _ in range(i % 4)
+    ])
+    db.commit()
+    return billing_ids
+
+
+def per_invoice_lookups(db, billings):
+    """Pre-batching shape: SUM + header + customer query for every invoice."""
+    customer_map = {}
+    for customer in db.query(Customer).filter(Customer.status == "approved").all():
+        name = customer.org_name if customer.customer_type == 'organization' else customer.name
+        customer_map[name.lower()] = customer
+
+    total = 0
+    for billing in billings:
+        total_paid = db.query(func.sum(ReturnBillingPayment.amount)).filter(
+            ReturnBillingPayment.billing_id == billing.id
+        ).scalar() or 0
+        return_header = db.query(ReturnHeader).filter(ReturnHeader.id == billing.return_id).first()
+        customer = None
+        if return_header.customer_id:
+            customer = db.query(Customer).filter(Customer.id == return_header.customer_id).first()
+        if not customer and return_header.vendor:
+            customer = customer_map.get(return_header.vendor.lower().replace("customer:", "").strip())
+        total += float(total_paid) + (1 if customer else 0)
+    return total
+
+
+async def joined_page(db, page):
+    rows, _ = await _list_return_billing(db, page, ListFilters())
+    return sum(row["paid_amount"] + (row["customer_id"] != "N/A") for row in rows)
+
+
+async def measure(engine, label, fn):
+    counter = {"queries": 0}
+
+    def count(*args):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    result = fn()
+    if inspect.isawaitable(result):
+        result = await result
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+
+    print(f"{label:<36} {elapsed * 1000:10.1f} ms  {counter['queries']:7d} queries  result={result}")
+
+
+async def run_benchmark(invoice_count=50000, page_size=100, db_name="ims_benchmark"):
+    bootstrap_tenant_db(db_name)
+    engine = get_tenant_engine(db_name)
+    async_engine = get_tenant_async_engine(db_name)
+    db = get_tenant_sessionmaker(db_name)()
+
+    try:
+        billing_ids = seed(db, invoice_count)
+        first_page = PageParams(limit=page_size, cursor=None)
+        deep_page = PageParams(limit=page_size, cursor=encode_cursor({"id": billing_ids[len(billing_ids) // 10]}))
+
+        newest = db.query(ReturnBilling).order_by(ReturnBilling.id.desc()).limit(page_size).all()
+        await measure(engine, "before: per-invoice lookups (1 page)", lambda: per_invoice_lookups(db, newest))
+        async with get_tenant_async_sessionmaker(db_name)() as async_db:
+            await measure(async_engine.sync_engine, "after:  joined query, first page",
+                          lambda: joined_page(async_db, first_page))
+            async_db.expire_all()
+            await measure(async_engine.sync_engine, "after:  joined query, deep page",
+                          lambda: joined_page(async_db, deep_page))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    tenant = sys.argv[3] if len(sys.argv) > 3 else "ims_benchmark"
+    asyncio.run(run_benchmark(invoices, page_size, tenant))
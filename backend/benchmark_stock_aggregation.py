@@ -0,0 +1,110 @@
+"""
+Benchmark: stock listing with set-based aggregation vs the old N+1 loops
+
+Seeds a scratch tenant database with N items x M batches (default 10k x 5)
+and times /stocks/ and /stock-overview/ handlers, counting SQL round trips.
+Run against a local MySQL: python benchmark_stock_aggregation.py [items] [batches] [tenant_db]
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event, text
+
+from database import bootstrap_tenant_db, get_tenant_engine, get_tenant_sessionmaker
+from models.tenant_models import Item, GRN, GRNItem, Batch, GRNStatus
+from routers.stocks.stock import list_stock
+from routers.stocks.stock_overview import _build_stock_overview
+
+
+def seed(db, item_count, batches_per_item):
+    print(f"Seeding {item_count} items x {batches_per_item} batches...")
+    for table in ("batches", "grn_items", "grns", "items"):
+        db.execute(text(f"DELETE FROM {table}"))
+    db.commit()
+
+    db.bulk_insert_mappings(Item, [
+        {"name": f"Item {i}", "item_code": f"BENCH-{i}", "min_stock": 10, "is_active": True}
+        for i in range(item_count)
+    ])
+
+    grn = GRN(grn_number="BENCH-GRN", grn_date=date.today(), store="Main Store", status=GRNStatus.approved)
+    db.add(grn)
+    db.flush()
+
+    db.bulk_insert_mappings(GRNItem, [
+        {"grn_id": grn.id, "item_name": f"Item {i}", "received_qty": 5 * batches_per_item, "rate": 10}
+        for i in range(item_count)
+    ])
+    db.flush()
+
+    grn_item_ids = [row[0] for row in db.query(GRNItem.id).filter(GRNItem.grn_id == grn.id).all()]
+    db.bulk_insert_mappings(Batch, [
+        {
+            "grn_item_id": grn_item_id,
+            "batch_no": f"B{grn_item_id}-{b}",
+            "qty": 5,
+            "expiry_date": date.today() + timedelta(days=30 * (b + 1))
+        }
+        for grn_item_id in grn_item_ids
+        for b in range(batches_per_item)
+    ])
+    db.commit()
+
+
+def legacy_list_stock(db):
+    """The pre-aggregation /stocks/ body: queries per item and per GRN item."""
+    result = []
+    for item in db.query(Item).filter(Item.is_active == True).all():
+        total_qty = 0
+        for grn_item in db.query(GRNItem).join(GRN).filter(
+            GRNItem.item_name == item.name, GRN.status == GRNStatus.approved
+        ).all():
+            for batch in db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all():
+                total_qty += batch.qty
+        latest_grn = db.query(GRN).join(GRNItem).filter(
+            GRNItem.item_name == item.name, GRN.status == GRNStatus.approved
+        ).order_by(GRN.grn_date.desc()).first()
+        result.append({"id": item.id, "available_qty": int(total_qty),
+                       "location": latest_grn.store if latest_grn else "Main Store"})
+    return result
+
+
+def measure(engine, label, fn):
+    counter = {"queries": 0}
+
+    def count(*args):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms  {counter['queries']:7d} queries  {len(rows)} rows")
+
+
+def run_benchmark(item_count=10000, batches_per_item=5, db_name="ims_benchmark"):
+    bootstrap_tenant_db(db_name)
+    engine = get_tenant_engine(db_name)
+    db = get_tenant_sessionmaker(db_name)()
+
+    try:
+        seed(db, item_count, batches_per_item)
+
+        measure(engine, "before: /stocks/ (N+1)", lambda: legacy_list_stock(db))
+        db.expire_all()
+        measure(engine, "after:  /stocks/", lambda: list_stock(db))
+        db.expire_all()
+        measure(engine, "after:  /stock-overview/", lambda: _build_stock_overview(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    tenant = sys.argv[3] if len(sys.argv) > 3 else "ims_benchmark"
+    run_benchmark(items, batches, tenant)
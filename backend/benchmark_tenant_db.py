@@ -0,0 +1,82 @@
+"""
+Benchmark: per-request overhead of get_tenant_db()
+
+Compares the old per-request provisioning path (CREATE DATABASE +
+create_all + ALTER TABLE on every call) with the bootstrap-once path.
+Run against a local MySQL: python benchmark_tenant_db.py [tenant_db] [iterations]
+"""
+
+import sys
+import time
+import statistics
+
+import pymysql
+from sqlalchemy import text
+
+from database import (
+    DB_HOST, DB_USER, DB_PASSWORD, DB_PORT,
+    get_tenant_db, get_tenant_engine, get_tenant_sessionmaker,
+    ensure_missing_columns, bootstrap_tenant_db
+)
+from models.tenant_models import TenantBase
+
+
+def legacy_open_session(db_name):
+    """The pre-bootstrap get_tenant_db() body, kept here for comparison."""
+    conn = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, port=int(DB_PORT))
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db_name}`")
+    conn.close()
+
+    engine = get_tenant_engine(db_name)
+    TenantBase.metadata.create_all(bind=engine)
+    ensure_missing_columns(engine)
+
+    return get_tenant_sessionmaker(db_name)()
+
+
+def current_open_session(db_name):
+    gen = get_tenant_db(db_name)
+    db = next(gen)
+    return db, gen
+
+
+def time_runs(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<12} mean={statistics.mean(timings):8.2f} ms  "
+          f"p50={statistics.median(timings):8.2f} ms  p95={p95:8.2f} ms")
+
+
+def run_benchmark(db_name="arun", iterations=50):
+    print(f"🔍 get_tenant_db overhead on '{db_name}' ({iterations} iterations, SELECT 1 per request)")
+
+    bootstrap_tenant_db(db_name)
+
+    def legacy():
+        db = legacy_open_session(db_name)
+        db.execute(text("SELECT 1"))
+        db.close()
+
+    def current():
+        db, gen = current_open_session(db_name)
+        db.execute(text("SELECT 1"))
+        gen.close()
+
+    report("before", time_runs(legacy, iterations))
+    report("after", time_runs(current, iterations))
+
+
+if __name__ == "__main__":
+    tenant = sys.argv[1] if len(sys.argv) > 1 else "arun"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    run_benchmark(tenant, runs)
@@ -1,12 +1,20 @@
 # database.py
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, inspect
 from sqlalchemy.orm import sessionmaker
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import json
+import os
+import threading
 import urllib.parse
 import pymysql
 
 from models.register_models import Base
 from utils.logger import log_error, log_audit, log_api
+from utils.item_refs import backfill_item_ids  # also registers the item_id flush hook
+from utils.master_data_cache import seed_master_data_version  # also registers the master data write hooks
 
 
 # -------------------------------------------------------
@@ -78,6 +86,27 @@ except Exception as e:
     log_error(e, location="Master Table Creation")
 
 
+# -------------------------------------------------------
+# WIDEN MASTER TEXT COLUMNS (create_all never alters)
+# -------------------------------------------------------
+MASTER_MEDIUMTEXT_COLUMNS = [
+    ("master_ephemeral_store", "value", "MEDIUMTEXT NOT NULL"),
+]
+
+try:
+    with engine.begin() as conn:
+        for table, column, definition in MASTER_MEDIUMTEXT_COLUMNS:
+            data_type = conn.execute(text(
+                "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = :c"
+            ), {"t": table, "c": column}).scalar()
+            if data_type == "text":
+                conn.execute(text(f"ALTER TABLE {table} MODIFY {column} {definition}"))
+                log_audit(f"Master column widened → {table}.{column} ({definition})")
+except Exception as e:
+    log_error(e, location="Master Column Widening")
+
+
 # -------------------------------------------------------
 # MASTER DB DEPENDENCY
 # -------------------------------------------------------
@@ -95,21 +124,71 @@ def get_master_db():
 
 
 # -------------------------------------------------------
-# TENANT ENGINE CACHE
+# TENANT POOL CONFIG
+# -------------------------------------------------------
+# Defaults apply to every tenant; TENANT_POOL_OVERRIDES is a JSON object of
+# per-tenant overrides, e.g. {"arun": {"pool_size": 20, "max_overflow": 20}}
+TENANT_POOL_DEFAULTS = {
+    "pool_size": int(os.getenv("TENANT_POOL_SIZE", 5)),
+    "max_overflow": int(os.getenv("TENANT_MAX_OVERFLOW", 10)),
+    "pool_timeout": int(os.getenv("TENANT_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("TENANT_POOL_RECYCLE", 1800)),
+    "pool_pre_ping": os.getenv("TENANT_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
+
+try:
+    TENANT_POOL_OVERRIDES = json.loads(os.getenv("TENANT_POOL_OVERRIDES", "{}"))
+except ValueError as e:
+    log_error(e, location="TENANT_POOL_OVERRIDES parsing")
+    TENANT_POOL_OVERRIDES = {}
+
+# Max number of tenant engines kept open; least recently used idle ones are disposed
+TENANT_ENGINE_CACHE_SIZE = int(os.getenv("TENANT_ENGINE_CACHE_SIZE", 50))
+
+
+def get_tenant_pool_settings(db_name: str) -> dict:
+    """Return pool settings for a tenant (defaults + overrides)."""
+    settings = dict(TENANT_POOL_DEFAULTS)
+    settings.update(TENANT_POOL_OVERRIDES.get(db_name, {}))
+    return settings
+
+
+# -------------------------------------------------------
+# TENANT ENGINE CACHE (LRU)
 # -------------------------------------------------------
-TENANT_ENGINES = {}
+TENANT_ENGINES = OrderedDict()
 TENANT_SESSIONS = {}
+_ENGINE_LOCK = threading.Lock()
+
+
+def _evict_idle_engines():
+    """Dispose least recently used engines with no checked-out connections."""
+    for db_name in list(TENANT_ENGINES.keys()):
+        if len(TENANT_ENGINES) <= TENANT_ENGINE_CACHE_SIZE:
+            return
+
+        engine = TENANT_ENGINES[db_name]
+        if engine.pool.checkedout() > 0:
+            continue
+
+        del TENANT_ENGINES[db_name]
+        TENANT_SESSIONS.pop(db_name, None)
+        engine.dispose()
+        log_api(f"Tenant DB engine disposed (LRU) → {db_name}")
 
 
 def get_tenant_engine(db_name: str):
     """Return cached engine or create new one."""
-    if db_name in TENANT_ENGINES:
-        return TENANT_ENGINES[db_name]
+    with _ENGINE_LOCK:
+        if db_name in TENANT_ENGINES:
+            TENANT_ENGINES.move_to_end(db_name)
+            return TENANT_ENGINES[db_name]
 
-    url = f"mysql+pymysql://{DB_USER}:{urllib.parse.quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{db_name}"
+        url = f"mysql+pymysql://{DB_USER}:{urllib.parse.quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{db_name}"
 
-    engine = create_engine(url, future=True)
-    TENANT_ENGINES[db_name] = engine
+        engine = create_engine(url, future=True, **get_tenant_pool_settings(db_name))
+        TENANT_ENGINES[db_name] = engine
+        _evict_idle_engines()
 
     log_api(f"Tenant DB engine created → {db_name}")
     return engine
@@ -117,45 +196,222 @@ def get_tenant_engine(db_name: str):
 
 def get_tenant_sessionmaker(db_name: str):
     """Return cached sessionmaker."""
-    if db_name in TENANT_SESSIONS:
-        return TENANT_SESSIONS[db_name]
-
     engine = get_tenant_engine(db_name)
+
+    SessionLocal = TENANT_SESSIONS.get(db_name)
+    if SessionLocal is not None and SessionLocal.kw.get("bind") is engine:
+        return SessionLocal
+
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     TENANT_SESSIONS[db_name] = SessionLocal
 
     return SessionLocal
 
 
+def get_pool_metrics() -> dict:
+    """Checked-out, idle and overflow connection counts per cached tenant engine."""
+    with _ENGINE_LOCK:
+        engines = list(TENANT_ENGINES.items())
+        async_engines = [(name, e.sync_engine) for name, e in TENANT_ASYNC_ENGINES.items()]
+
+    def pool_stats(pool):
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        }
+
+    return {
+        "engine_count": len(engines),
+        "async_engine_count": len(async_engines),
+        "engine_cache_size": TENANT_ENGINE_CACHE_SIZE,
+        "tenants": {name: pool_stats(engine.pool) for name, engine in engines},
+        "async_tenants": {name: pool_stats(engine.pool) for name, engine in async_engines},
+    }
+
+
+# -------------------------------------------------------
+# ASYNC TENANT ENGINE CACHE (LRU)
+# -------------------------------------------------------
+TENANT_ASYNC_ENGINES = OrderedDict()
+TENANT_ASYNC_SESSIONS = {}
+
+
+def _evict_idle_async_engines():
+    """Drop least recently used async engines with no checked-out connections."""
+    for db_name in list(TENANT_ASYNC_ENGINES.keys()):
+        if len(TENANT_ASYNC_ENGINES) <= TENANT_ENGINE_CACHE_SIZE:
+            return
+
+        engine = TENANT_ASYNC_ENGINES[db_name]
+        if engine.sync_engine.pool.checkedout() > 0:
+            continue
+
+        del TENANT_ASYNC_ENGINES[db_name]
+        TENANT_ASYNC_SESSIONS.pop(db_name, None)
+        try:
+            asyncio.get_running_loop().create_task(engine.dispose())
+        except RuntimeError:
+            engine.sync_engine.dispose()
+        log_api(f"Tenant async DB engine disposed (LRU) → {db_name}")
+
+
+def get_tenant_async_engine(db_name: str):
+    """Return cached async (aiomysql) engine or create new one."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    with _ENGINE_LOCK:
+        if db_name in TENANT_ASYNC_ENGINES:
+            TENANT_ASYNC_ENGINES.move_to_end(db_name)
+            return TENANT_ASYNC_ENGINES[db_name]
+
+        url = f"mysql+aiomysql://{DB_USER}:{urllib.parse.quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{db_name}"
+
+        engine = create_async_engine(url, **get_tenant_pool_settings(db_name))
+        TENANT_ASYNC_ENGINES[db_name] = engine
+        _evict_idle_async_engines()
+
+    log_api(f"Tenant async DB engine created → {db_name}")
+    return engine
+
+
+def get_tenant_async_sessionmaker(db_name: str):
+    """Return cached async sessionmaker."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    engine = get_tenant_async_engine(db_name)
+
+    SessionLocal = TENANT_ASYNC_SESSIONS.get(db_name)
+    if SessionLocal is not None and SessionLocal.kw.get("bind") is engine:
+        return SessionLocal
+
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    TENANT_ASYNC_SESSIONS[db_name] = SessionLocal
+
+    return SessionLocal
+
+
+# -------------------------------------------------------
+# TENANT BOOTSTRAP REGISTRY
+# -------------------------------------------------------
+# Bump this whenever TenantBase gains tables or indexes, or MISSING_COLUMNS
+# gains entries, so existing tenant databases get migrated once more.
+# v2: managed lookup indexes on grns, grn_items, batches, stock_overview, stock_ledger
+# v3: item_id foreign keys on item-referencing rows, backfilled from item_name
+# v4: status / location indexes backing the keyset-paginated list filters
+# v5: covering (billing_id, amount) index on return_billing_payments
+# v6: stock_ledger.location + created_at index, stock_balance_checkpoints table
+# v7: optimistic-concurrency version columns on batches and stock_overview
+# v8: unique (item, batch, location) key on stock_overview for bulk upserts
+# v9: domain_event_outbox table
+# v10: reorder_suggestions table
+# v11: master_data_version counter
+# v12: (item_id, grn_id) index on grn_items for the item_id stock aggregation
+# v13: GRN_RECEIPT member on stock_ledger.txn_type
+TENANT_SCHEMA_VERSION = 13
+
+BOOTSTRAPPED_TENANTS = {}
+_BOOTSTRAP_LOCK = threading.Lock()
+
+
+def _get_recorded_schema_version(engine):
+    """Return the schema version stored in the tenant DB, or None."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM tenant_schema_versions")).scalar()
+    except Exception:
+        # Database or version table does not exist yet
+        return None
+
+
+def bootstrap_tenant_db(db_name: str, force: bool = False):
+    """
+    Provision and migrate a tenant database once per process.
+
+    The applied schema version is recorded in the tenant DB itself, so other
+    workers only pay a single SELECT on first use instead of repeating DDL.
+    """
+    if not force and BOOTSTRAPPED_TENANTS.get(db_name) == TENANT_SCHEMA_VERSION:
+        return
+
+    with _BOOTSTRAP_LOCK:
+        if not force and BOOTSTRAPPED_TENANTS.get(db_name) == TENANT_SCHEMA_VERSION:
+            return
+
+        engine = get_tenant_engine(db_name)
+        recorded = None if force else _get_recorded_schema_version(engine)
+
+        if recorded is None or recorded < TENANT_SCHEMA_VERSION:
+            # 1️⃣ Create tenant DB if missing
+            conn = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, port=int(DB_PORT))
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db_name}`")
+            finally:
+                conn.close()
+
+            # 2️⃣ Ensure tables exist
+            from models.tenant_models import TenantBase
+            TenantBase.metadata.create_all(bind=engine)
+
+            # 3️⃣ Add missing columns and indexes to existing tables
+            from utils.stock_projector import dedupe_stock_overview
+            ensure_missing_columns(engine)
+            ensure_enum_members(engine)
+            dedupe_stock_overview(engine)
+            ensure_indexes(engine)
+            backfill_item_ids(engine)
+            seed_master_data_version(engine)
+
+            # 4️⃣ Record the applied version
+            with engine.begin() as conn:
+                conn.execute(
+                    text("INSERT INTO tenant_schema_versions (version, applied_at) VALUES (:v, :at)"),
+                    {"v": TENANT_SCHEMA_VERSION, "at": datetime.utcnow()}
+                )
+
+            log_audit(f"Tenant DB bootstrapped → {db_name} (schema v{TENANT_SCHEMA_VERSION})")
+
+        BOOTSTRAPPED_TENANTS[db_name] = TENANT_SCHEMA_VERSION
+
+
+def list_tenant_databases(default_db: str = "arun") -> list:
+    """The default tenant plus every tenant database registered in the master DB."""
+    from models.register_models import Tenant
+
+    db_names = {default_db}
+    db = SessionLocal()
+    try:
+        db_names.update(
+            name for (name,) in db.query(Tenant.database_name).all() if name
+        )
+    finally:
+        db.close()
+    return sorted(db_names)
+
+
+def bootstrap_all_tenants(default_db: str = "arun"):
+    """Bootstrap the default tenant and every tenant registered in the master DB."""
+    for db_name in list_tenant_databases(default_db):
+        try:
+            bootstrap_tenant_db(db_name)
+        except Exception as e:
+            log_error(e, location=f"Tenant Bootstrap → {db_name}")
+
+
 # -------------------------------------------------------
 # FINAL — TENANT SESSION (USED IN ROUTERS)
 # -------------------------------------------------------
 def get_tenant_db(tenant_db_name: str = "arun"):
 
-    """Creates tenant DB if not exists, ensures tables exist, returns session."""
+    """Returns a pooled session; schema provisioning happens once in bootstrap_tenant_db()."""
     try:
-        # 1️⃣ Create tenant DB if missing
-        conn = pymysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, port=int(DB_PORT))
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{tenant_db_name}`")
-        conn.close()
-
-        # 2️⃣ Get engine from cache
-        engine = get_tenant_engine(tenant_db_name)
-
-        # 3️⃣ Ensure tables exist
-        from models.tenant_models import TenantBase
-        TenantBase.metadata.create_all(bind=engine)
-        
-        # 4️⃣ Add missing columns to existing tables
-        ensure_missing_columns(engine)
-
-        # 5️⃣ Return DB session
+        bootstrap_tenant_db(tenant_db_name)
+
         SessionLocal = get_tenant_sessionmaker(tenant_db_name)
         db = SessionLocal()
 
-        print(f"Database session created for {tenant_db_name}")
-
         try:
             yield db
         finally:
@@ -166,89 +422,144 @@ def get_tenant_db(tenant_db_name: str = "arun"):
         raise
 
 
+# -------------------------------------------------------
+# ASYNC TENANT SESSION (USED IN async def ROUTES)
+# -------------------------------------------------------
+async def get_tenant_async_db(tenant_db_name: str = "arun"):
+    """Async counterpart of get_tenant_db(); DB waits do not hold a threadpool worker."""
+    if BOOTSTRAPPED_TENANTS.get(tenant_db_name) != TENANT_SCHEMA_VERSION:
+        await asyncio.to_thread(bootstrap_tenant_db, tenant_db_name)
+
+    SessionLocal = get_tenant_async_sessionmaker(tenant_db_name)
+    async with SessionLocal() as db:
+        yield db
+
+
 # -------------------------------------------------------
 # RUN DEFAULT TENANT INITIALIZATION
 # -------------------------------------------------------
-# Removed init_tenant_db() to prevent startup errors
+# Tenants are bootstrapped on app startup (see main.py) or on first use.
+
+
+# (table, column, column definition) added to databases created before the
+# column existed on the model
+MISSING_COLUMNS = [
+    ("batches", "warranty_start_date", "DATE NULL"),
+    ("batches", "warranty_end_date", "DATE NULL"),
+    ("return_headers", "location", "VARCHAR(150) NULL AFTER department"),
+    ("items", "safety_stock", "INT DEFAULT 0 AFTER max_stock"),
+
+    # External transfer status management columns
+    ("external_transfers", "approved_by", "VARCHAR(255) NULL"),
+    ("external_transfers", "approved_at", "DATETIME NULL"),
+    ("external_transfers", "rejection_reason", "TEXT NULL"),
+    ("external_transfers", "sent_at", "DATETIME NULL"),
+    ("external_transfers", "return_date", "DATE NULL"),
+    ("external_transfers", "returned_at", "DATETIME NULL"),
+    ("external_transfers", "return_deadline", "DATE NULL"),
+    ("external_transfers", "staff_phone", "VARCHAR(20) NULL"),
+    ("external_transfers", "staff_email", "VARCHAR(100) NULL"),
+
+    # External transfer item columns
+    ("external_transfer_items", "returned_quantity", "INT DEFAULT 0"),
+    ("external_transfer_items", "damaged_quantity", "INT DEFAULT 0"),
+    ("external_transfer_items", "damage_reason", "TEXT NULL"),
+    ("external_transfer_items", "returned_at", "DATETIME NULL"),
+
+    # Cumulative returned quantity on return items
+    ("return_items", "returned_qty", "DECIMAL(10, 2) DEFAULT 0.00"),
+
+    # Store a ledger movement happened at (balance checkpoints key on it)
+    ("stock_ledger", "location", "VARCHAR(100) NULL AFTER remarks"),
+
+    # Compare-and-swap versions for stock quantity updates
+    ("batches", "version", "INT NOT NULL DEFAULT 0"),
+    ("stock_overview", "version", "INT NOT NULL DEFAULT 0"),
+
+    # Integer references to the item master (backfilled by backfill_item_ids)
+    ("grn_items", "item_id", "INT NULL, ADD CONSTRAINT fk_grn_items_item_id FOREIGN KEY (item_id) REFERENCES items(id)"),
+    ("stocks", "item_id", "INT NULL, ADD CONSTRAINT fk_stocks_item_id FOREIGN KEY (item_id) REFERENCES items(id)"),
+    ("stock_overview", "item_id", "INT NULL, ADD CONSTRAINT fk_stock_overview_item_id FOREIGN KEY (item_id) REFERENCES items(id)"),
+    ("return_items", "item_id", "INT NULL, ADD CONSTRAINT fk_return_items_item_id FOREIGN KEY (item_id) REFERENCES items(id)"),
+    ("external_transfer_items", "item_id", "INT NULL, ADD CONSTRAINT fk_external_transfer_items_item_id FOREIGN KEY (item_id) REFERENCES items(id)"),
+    ("issue_items", "item_id", "INT NULL, ADD CONSTRAINT fk_issue_items_item_id FOREIGN KEY (item_id) REFERENCES items(id)"),
+]
 
 
 def ensure_missing_columns(engine):
     """Add missing columns to existing tables"""
     try:
+        inspector = inspect(engine)
+        existing = {}
+
         with engine.connect() as conn:
-            # Add warranty columns to batches table
-            try:
-                conn.execute(text("ALTER TABLE batches ADD COLUMN warranty_start_date DATE NULL"))
-                conn.execute(text("ALTER TABLE batches ADD COLUMN warranty_end_date DATE NULL"))
-                conn.commit()
-                print("Added warranty columns to batches table")
-            except Exception as e:
-                if "Duplicate column name" not in str(e):
-                    print(f"Error adding warranty columns: {e}")
-            
-            # Add location column to return_headers table
-            try:
-                conn.execute(text("ALTER TABLE return_headers ADD COLUMN location VARCHAR(150) NULL AFTER department"))
-                conn.commit()
-                print("Added location column to return_headers table")
-            except Exception as e:
-                if "Duplicate column name" not in str(e):
-                    print(f"Error adding location column: {e}")
-            
-            # Add safety_stock column to items table
-            try:
-                conn.execute(text("ALTER TABLE items ADD COLUMN safety_stock INT DEFAULT 0 AFTER max_stock"))
-                conn.commit()
-                print("Added safety_stock column to items table")
-            except Exception as e:
-                if "Duplicate column name" not in str(e):
-                    print(f"Error adding safety_stock column: {e}")
-            
-            # Add external transfer status management columns
-            external_transfer_columns = [
-                ("approved_by", "VARCHAR(255) NULL"),
-                ("approved_at", "DATETIME NULL"),
-                ("rejection_reason", "TEXT NULL"),
-                ("sent_at", "DATETIME NULL"),
-                ("return_date", "DATE NULL"),
-                ("returned_at", "DATETIME NULL"),
-                ("return_deadline", "DATE NULL"),
-                ("staff_phone", "VARCHAR(20) NULL"),
-                ("staff_email", "VARCHAR(100) NULL")
-            ]
-            
-            for column_name, column_def in external_transfer_columns:
+            for table_name, column_name, column_def in MISSING_COLUMNS:
+                if table_name not in existing:
+                    existing[table_name] = {c["name"] for c in inspector.get_columns(table_name)}
+
+                if column_name in existing[table_name]:
+                    continue
+
                 try:
-                    conn.execute(text(f"ALTER TABLE external_transfers ADD COLUMN {column_name} {column_def}"))
-                    print(f"Added {column_name} column to external_transfers table")
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_def}"))
+                    conn.commit()
+                    existing[table_name].add(column_name)
+                    print(f"Added {column_name} column to {table_name} table")
                 except Exception as e:
                     if "Duplicate column name" not in str(e):
-                        print(f"Error adding {column_name} column: {e}")
-            
-            # Add external transfer item columns
-            item_columns_to_add = [
-                ("returned_quantity", "INT DEFAULT 0"),
-                ("damaged_quantity", "INT DEFAULT 0"),
-                ("damage_reason", "TEXT NULL"),
-                ("returned_at", "DATETIME NULL")
-            ]
-            
-            for column_name, column_def in item_columns_to_add:
+                        print(f"Error adding {column_name} column to {table_name}: {e}")
+
+    except Exception as e:
+        print(f"Error in ensure_missing_columns: {e}")
+
+
+def ensure_enum_members(engine):
+    """Widen native MySQL ENUM columns to the members their model enums have gained"""
+    from models.tenant_models import StockLedger
+
+    if engine.dialect.name != "mysql":
+        return
+
+    try:
+        with engine.begin() as conn:
+            for column in (StockLedger.__table__.c.txn_type,):
+                column_type = conn.execute(text(
+                    "SELECT COLUMN_TYPE FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = :c"
+                ), {"t": column.table.name, "c": column.name}).scalar()
+                if column_type is None or all(f"'{member}'" in column_type for member in column.type.enums):
+                    continue
+
+                definition = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {column.table.name} MODIFY {column.name} {definition} NULL"))
+                print(f"Widened {column.table.name}.{column.name} to {definition}")
+
+    except Exception as e:
+        print(f"Error in ensure_enum_members: {e}")
+
+
+def ensure_indexes(engine):
+    """Create model-declared indexes that tables created before them are missing"""
+    from models.tenant_models import TenantBase
+
+    try:
+        inspector = inspect(engine)
+
+        for table in TenantBase.metadata.sorted_tables:
+            if not table.indexes:
+                continue
+
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+
                 try:
-                    conn.execute(text(f"ALTER TABLE external_transfer_items ADD COLUMN {column_name} {column_def}"))
-                    print(f"Added {column_name} column to external_transfer_items table")
+                    index.create(bind=engine)
+                    print(f"Added index {index.name} to {table.name} table")
                 except Exception as e:
-                    if "Duplicate column name" not in str(e):
-                        print(f"Error adding {column_name} column: {e}")
-            
-            # Add returned_qty column to return_items table
-            try:
-                conn.execute(text("ALTER TABLE return_items ADD COLUMN returned_qty DECIMAL(10, 2) DEFAULT 0.00"))
-                conn.commit()
-                print("Added returned_qty column to return_items table")
-            except Exception as e:
-                if "Duplicate column name" not in str(e):
-                    print(f"Error adding returned_qty column: {e}")
-                
+                    if "Duplicate key name" not in str(e):
+                        print(f"Error adding index {index.name} to {table.name}: {e}")
+
     except Exception as e:
-        print(f"Error in ensure_missing_columns: {e}")
+        print(f"Error in ensure_indexes: {e}")
@@ -19,6 +19,7 @@ from routers import register, auth
 from routers.department import router as department_router
 from routers.roles import router as roles_router
 from routers.users import router as users_router
+from routers.dashboard import router as dashboard_router
 
 # ----------------------------------------------------------
 # ORGANIZATION SETUP ROUTERS
@@ -84,6 +85,12 @@ from routers.billingSystem.billing import router as billing_router
 # External Transfer
 from routers.external_transfer.external_transfer import router as external_transfer_router
 
+# Streaming exports
+from routers.exports.exports import router as exports_router
+
+# Job scheduler
+from routers.scheduler import router as scheduler_router
+
 # ----------------------------------------------------------
 # LOGGER
 # ----------------------------------------------------------
@@ -103,6 +110,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # keyset pagination cursor; master data ETags for If-None-Match
 )
 
 # ----------------------------------------------------------
@@ -118,6 +126,9 @@ app.include_router(department_router)
 app.include_router(roles_router)
 app.include_router(users_router)
 
+# Dashboard
+app.include_router(dashboard_router)
+
 # Organization Setup
 app.include_router(company_router)
 app.include_router(branch_router)
@@ -162,6 +173,101 @@ app.include_router(billing_router)
 # External Transfer
 app.include_router(external_transfer_router)
 
+# Streaming exports
+app.include_router(exports_router)
+
+# Job scheduler
+app.include_router(scheduler_router)
+
+# ----------------------------------------------------------
+# STARTUP: ONE-TIME TENANT BOOTSTRAP
+# ----------------------------------------------------------
+@app.on_event("startup")
+def bootstrap_tenants():
+    try:
+        from database import bootstrap_all_tenants
+        bootstrap_all_tenants()
+        log_audit("Tenant databases bootstrapped")
+    except Exception as e:
+        # Tenants are still bootstrapped lazily on first use
+        log_error(e, location="Startup Tenant Bootstrap")
+
+
+# ----------------------------------------------------------
+# STARTUP: EXPIRED OTP / EPHEMERAL STATE SWEEPER
+# ----------------------------------------------------------
+@app.on_event("startup")
+def start_ephemeral_sweeper():
+    from utils.ephemeral_store import start_sweeper
+    start_sweeper()
+
+
+@app.on_event("shutdown")
+def stop_ephemeral_sweeper():
+    from utils.ephemeral_store import stop_sweeper
+    stop_sweeper()
+
+
+# ----------------------------------------------------------
+# STARTUP: EMAIL OUTBOX DELIVERY WORKERS
+# ----------------------------------------------------------
+@app.on_event("startup")
+def start_email_outbox():
+    from utils.email_outbox import start_email_workers
+    start_email_workers()
+
+
+@app.on_event("shutdown")
+def stop_email_outbox():
+    from utils.email_outbox import stop_email_workers
+    stop_email_workers()
+
+
+# ----------------------------------------------------------
+# STARTUP: DOMAIN EVENT SUBSCRIBER WORKERS
+# ----------------------------------------------------------
+@app.on_event("startup")
+def start_domain_events():
+    from utils.domain_events import start_event_workers
+    start_event_workers()
+
+
+@app.on_event("shutdown")
+def stop_domain_events():
+    from utils.domain_events import stop_event_workers
+    stop_event_workers()
+
+
+# ----------------------------------------------------------
+# STARTUP: PERIODIC JOB SCHEDULER
+# (return deadline alerts, expiry sweep, reorder refresh, stock checkpoints)
+# ----------------------------------------------------------
+@app.on_event("startup")
+def start_job_scheduler():
+    from utils.scheduler import start_scheduler
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+def stop_job_scheduler():
+    from utils.scheduler import stop_scheduler
+    stop_scheduler()
+
+
+# ----------------------------------------------------------
+# SHUTDOWN: INVOICE PDF RENDER / OCR PROCESS POOLS
+# ----------------------------------------------------------
+@app.on_event("shutdown")
+def stop_pdf_renderer():
+    from utils.pdf_renderer import shutdown_renderer
+    shutdown_renderer()
+
+
+@app.on_event("shutdown")
+def stop_ocr_pool():
+    from utils.ocr_jobs import shutdown_ocr_pool
+    shutdown_ocr_pool()
+
 # ----------------------------------------------------------
 # GLOBAL MIDDLEWARE: REQUEST LOGGING + ERROR HANDLING
 # ----------------------------------------------------------
@@ -206,6 +312,11 @@ def health():
     log_audit("Health check OK")
     return {"status": "running"}
 
+@app.get("/metrics")
+def metrics():
+    from database import get_pool_metrics
+    return get_pool_metrics()
+
 @app.get("/health/db")
 def health_db():
     try:
@@ -0,0 +1,40 @@
+"""
+Migration to add item_id foreign keys to item-referencing tables and
+backfill them from item_name.
+
+Tenants are migrated automatically on bootstrap (schema v3); run this to
+migrate a tenant ahead of time: python -m migrations.add_item_id_foreign_keys [tenant_db]
+"""
+
+import sys
+
+from sqlalchemy import text
+
+from database import get_tenant_engine, ensure_missing_columns, ensure_indexes
+from utils.item_refs import ITEM_REF_MODELS, backfill_item_ids
+
+
+def add_item_id_foreign_keys(db_name="arun"):
+    """Add item_id columns, their indexes and backfill them for one tenant"""
+    engine = get_tenant_engine(db_name)
+
+    print(f"Migrating item_id references in {db_name}...")
+    ensure_missing_columns(engine)
+    ensure_indexes(engine)
+    backfill_item_ids(engine)
+
+    # Rows whose item_name matches no item master record keep item_id NULL
+    with engine.connect() as conn:
+        for model in ITEM_REF_MODELS:
+            table = model.__tablename__
+            unmatched = conn.execute(text(
+                f"SELECT COUNT(*) FROM {table} WHERE item_id IS NULL AND item_name IS NOT NULL"
+            )).scalar()
+            if unmatched:
+                print(f"⚠️ {unmatched} {table} rows reference an item name not in the item master")
+
+    print("Item id migration completed")
+
+
+if __name__ == "__main__":
+    add_item_id_foreign_keys(sys.argv[1] if len(sys.argv) > 1 else "arun")
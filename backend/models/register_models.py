@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, UniqueConstraint, Index
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
+from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
 
 # ⬇️ IMPORT LOGGERS
@@ -59,3 +61,79 @@ class Tenant(Base):
         except Exception as e:
             log_error(e, location="Tenant Model __repr__")
             return "<Tenant Error>"
+
+
+class EphemeralEntry(Base):
+    """Short-lived key/value state (OTPs etc.) shared by all workers; see utils/ephemeral_store.py"""
+    __tablename__ = "master_ephemeral_store"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    namespace = Column(String(50), nullable=False)
+    key = Column(String(191), nullable=False)
+    value = Column(Text().with_variant(MEDIUMTEXT(), "mysql"), nullable=False)  # OCR results run past 64 KB
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("namespace", "key", name="uq_ephemeral_namespace_key"),
+    )
+
+
+class EmailOutbox(Base):
+    """Queued outgoing email, delivered by the background worker in utils/email_outbox.py"""
+    __tablename__ = "master_email_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    to_email = Column(String(255), nullable=False)
+    from_email = Column(String(255), nullable=True)
+    subject = Column(String(500), nullable=False)
+    body = Column(Text().with_variant(MEDIUMTEXT(), "mysql"), nullable=False)
+    is_html = Column(Boolean, default=False)
+
+    # pending → sending → sent, or back to pending with a later next_attempt_at; failed after max attempts
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+
+class SchedulerLease(Base):
+    """Leader lease of the in-process job scheduler; see utils/scheduler.py"""
+    __tablename__ = "master_scheduler_lease"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(255), nullable=False)
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class ScheduledJobRun(Base):
+    """One run of a scheduled job against one tenant database"""
+    __tablename__ = "master_scheduled_job_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_name = Column(String(100), nullable=False)
+    tenant = Column(String(255), nullable=False)
+    # manual runs are triggered through the API instead of the schedule
+    trigger = Column(String(20), nullable=False, default="schedule")
+    holder = Column(String(255), nullable=True)
+
+    # running → success / failed
+    status = Column(String(20), nullable=False, default="running")
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_scheduled_job_runs_job_tenant", "job_name", "tenant", "id"),
+        Index("ix_scheduled_job_runs_started_at", "started_at"),
+    )
@@ -1,9 +1,9 @@
 # ------------------ Department Model ------------------
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime,Table, ForeignKey,Text,Float,Date,Enum,DECIMAL
+from sqlalchemy import Column, Integer, String, Boolean, DateTime,Table, ForeignKey,Text,Float,Date,Enum,DECIMAL,Index
 import enum
 from datetime import date
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -343,7 +343,7 @@ class Item(TenantBase):
     id = Column(Integer, primary_key=True, index=True)
 
     # 1. Item Basic Information
-    name = Column(String(150), nullable=False)
+    name = Column(String(150), nullable=False, index=True)
     item_code = Column(String(50), unique=True, nullable=False)
     description = Column(String(255))
 
@@ -525,7 +525,7 @@ class PurchaseRequest(TenantBase):
     pr_number = Column(String(50), unique=True)
     requested_by = Column(String(100))
     request_date = Column(Date, default=date.today)
-    status = Column(Enum(PRStatus), default=PRStatus.draft)
+    status = Column(Enum(PRStatus), default=PRStatus.draft, index=True)
 
     items = relationship("PurchaseRequestItem", back_populates="pr")
 
@@ -646,6 +646,11 @@ class GRN(TenantBase):
     items = relationship("GRNItem", back_populates="grn")
     qc = relationship("QCInspection", back_populates="grn", uselist=False)
 
+    # Managed lookup indexes (added to existing DBs by database.ensure_indexes)
+    __table_args__ = (
+        Index("ix_grns_status_store", "status", "store"),
+    )
+
 # ---------------- GRN ITEMS ----------------
 class GRNItem(TenantBase):
     __tablename__ = "grn_items"
@@ -653,6 +658,7 @@ class GRNItem(TenantBase):
     id = Column(Integer, primary_key=True)
     grn_id = Column(Integer, ForeignKey("grns.id"))
     item_name = Column(String(100))
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     po_qty = Column(Float)
     received_qty = Column(Float)
     uom = Column(String(20))
@@ -661,6 +667,11 @@ class GRNItem(TenantBase):
     grn = relationship("GRN", back_populates="items")
     batches = relationship("Batch", back_populates="item")
 
+    __table_args__ = (
+        Index("ix_grn_items_item_name_grn_id", "item_name", "grn_id"),
+        Index("ix_grn_items_item_id_grn_id", "item_id", "grn_id"),
+    )
+
 # ---------------- BATCH & EXPIRY ----------------
 class Batch(TenantBase):
     __tablename__ = "batches"
@@ -673,9 +684,16 @@ class Batch(TenantBase):
     warranty_start_date = Column(Date, nullable=True)
     warranty_end_date = Column(Date, nullable=True)
     qty = Column(Float)
+    # Bumped on every qty change; see utils.stock_mutation.compare_and_swap
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     item = relationship("GRNItem", back_populates="batches")
 
+    __table_args__ = (
+        Index("ix_batches_grn_item_id_batch_no", "grn_item_id", "batch_no"),
+        Index("ix_batches_batch_no", "batch_no"),
+    )
+
 # ---------------- QC INSPECTION ----------------
 class QCInspection(TenantBase):
     __tablename__ = "qc_inspections"
@@ -702,6 +720,7 @@ class StockTxnType(str, enum.Enum):
     ADJUST_OUT = "ADJUST_OUT"
     TRANSFER = "TRANSFER"
     ISSUE = "ISSUE"
+    GRN_RECEIPT = "GRN_RECEIPT"
 
 # ---------------- STOCK MASTER ----------------
 class Stock(TenantBase):
@@ -709,6 +728,7 @@ class Stock(TenantBase):
 
     id = Column(Integer, primary_key=True)
     item_name = Column(String(150), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     sku = Column(String(50), unique=True)
     category = Column(String(100))
     uom = Column(String(50))
@@ -749,9 +769,72 @@ class StockLedger(TenantBase):
 
     ref_no = Column(String(100))
     remarks = Column(String(255))
+    # Store the movement happened at; NULL = default store
+    location = Column(String(100), nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_stock_ledger_stock_id_created_at", "stock_id", "created_at"),
+        Index("ix_stock_ledger_created_at", "created_at"),
+    )
+
+
+# ---------------- LEDGER BALANCE CHECKPOINTS ----------------
+class StockBalanceCheckpoint(TenantBase):
+    """End-of-day on-hand balance per item / batch / location, rolled forward from stock_ledger."""
+    __tablename__ = "stock_balance_checkpoints"
+
+    id = Column(Integer, primary_key=True)
+    checkpoint_date = Column(Date, nullable=False)
+    item_name = Column(String(150), nullable=False)
+    batch_no = Column(String(100), nullable=False, default="")
+    location = Column(String(100), nullable=False)
+    balance = Column(Float, nullable=False, default=0)
 
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        Index(
+            "ux_stock_balance_checkpoints_key",
+            "checkpoint_date", "item_name", "batch_no", "location",
+            unique=True
+        ),
+    )
+
+
+# ---------------- REORDER SUGGESTIONS ----------------
+class ReorderSuggestion(TenantBase):
+    """Demand-based reorder point per item, rebuilt on a schedule by utils/reorder_engine.py."""
+    __tablename__ = "reorder_suggestions"
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False)
+    item_name = Column(String(150), nullable=False)
+    item_code = Column(String(50))
+
+    current_stock = Column(Float, nullable=False, default=0)
+    avg_daily_demand = Column(Float, nullable=False, default=0)
+    demand_std = Column(Float, nullable=False, default=0)
+    lead_time_days = Column(Float, nullable=False, default=0)
+    safety_stock = Column(Float, nullable=False, default=0)
+    reorder_point = Column(Float, nullable=False, default=0)
+    max_level = Column(Float, nullable=False, default=0)
+    min_stock = Column(Float, nullable=False, default=0)
+    suggested_order_qty = Column(Float, nullable=False, default=0)
+    days_of_cover = Column(Float, nullable=True)
+
+    # Critical (out of stock) / High (at or below safety stock) / Medium (at or below reorder point)
+    priority = Column(String(20), nullable=False)
+    preferred_vendor = Column(String(150), nullable=True)
+
+    computed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ux_reorder_suggestions_item", "item_id", unique=True),
+        Index("ix_reorder_suggestions_priority", "priority", "current_stock"),
+    )
+
 
 # ---------------- TRANSFER ----------------
 class StockTransfer(TenantBase):
@@ -850,6 +933,7 @@ class IssueItem(TenantBase):
     issue_id = Column(Integer, ForeignKey("issue_headers.id"))
 
     item_name = Column(String(150))
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     qty = Column(Float)
     uom = Column(String(50))
     batch_no = Column(String(100), nullable=True)
@@ -894,7 +978,7 @@ class ReturnHeader(TenantBase):
 
     vendor = Column(String(150), nullable=True)
     department = Column(String(150), nullable=True)
-    location = Column(String(150), nullable=True)
+    location = Column(String(150), nullable=True, index=True)
     reference_no = Column(String(100), nullable=True)
     
     # Customer information fields
@@ -906,7 +990,7 @@ class ReturnHeader(TenantBase):
     reason = Column(String(255))
     return_date = Column(Date)
 
-    status = Column(String(50), default="DRAFT")
+    status = Column(String(50), default="DRAFT", index=True)
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationship
@@ -921,6 +1005,7 @@ class ReturnItem(TenantBase):
     return_id = Column(Integer, ForeignKey("return_headers.id"))
 
     item_name = Column(String(150))
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     batch_no = Column(String(100), nullable=True)
     qty = Column(Float)
     returned_qty = Column(DECIMAL(10, 2), default=0.00)  # Track cumulative returned quantity
@@ -985,6 +1070,7 @@ class StockOverview(TenantBase):
 
     id = Column(Integer, primary_key=True, index=True)
     item_name = Column(String(150), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     item_code = Column(String(50), nullable=False)
     location = Column(String(100), nullable=False)
     available_qty = Column(Integer, default=0)
@@ -993,10 +1079,22 @@ class StockOverview(TenantBase):
     expiry_date = Column(String(50), default="—")
     batch_no = Column(String(100), nullable=True)
     status = Column(String(50), nullable=False)
+    # Bumped on every available_qty change; see utils.stock_mutation.compare_and_swap
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_stock_overview_item_batch_location", "item_name", "batch_no", "location"),
+        # One row per (item, batch, location); conflict target of utils.stock_projector's bulk upsert
+        Index(
+            "ux_stock_overview_key",
+            "item_name", func.coalesce(batch_no, literal_column("''")), "location",
+            unique=True
+        ),
+    )
+
 # ============================================================
 #                   CUSTOMERS
 # ============================================================
@@ -1077,7 +1175,7 @@ class Billing(TenantBase):
     net_amount = Column(DECIMAL(10, 2), nullable=False)
     paid_amount = Column(DECIMAL(10, 2), default=0.00)
     balance_amount = Column(DECIMAL(10, 2), nullable=False)
-    status = Column(Enum(BillingStatus), default=BillingStatus.DRAFT)
+    status = Column(Enum(BillingStatus), default=BillingStatus.DRAFT, index=True)
     
     created_at = Column(DateTime, server_default=func.now())
     
@@ -1095,7 +1193,7 @@ class ReturnBilling(TenantBase):
     net_amount = Column(DECIMAL(10, 2), nullable=False)
     paid_amount = Column(DECIMAL(10, 2), default=0.00)
     balance_amount = Column(DECIMAL(10, 2), nullable=False)
-    status = Column(Enum(BillingStatus), default=BillingStatus.DRAFT)
+    status = Column(Enum(BillingStatus), default=BillingStatus.DRAFT, index=True)
     due_date = Column(Date, nullable=True)
     
     created_at = Column(DateTime, server_default=func.now())
@@ -1119,6 +1217,11 @@ class ReturnBillingPayment(TenantBase):
     # Relationships
     billing = relationship("ReturnBilling")
 
+    __table_args__ = (
+        # Covers the per-invoice paid total in the return-invoice listing
+        Index("ix_return_billing_payments_billing_id_amount", "billing_id", "amount"),
+    )
+
 
 # ============================================================
 #                   EXTERNAL TRANSFER MODELS
@@ -1133,14 +1236,14 @@ class ExternalTransfer(TenantBase):
     
     id = Column(Integer, primary_key=True, index=True)
     transfer_no = Column(String(50), unique=True, nullable=False)
-    location = Column(String(255), nullable=False)
+    location = Column(String(255), nullable=False, index=True)
     staff_name = Column(String(255), nullable=False)
     staff_id = Column(String(100), nullable=False)
     staff_location = Column(String(255), nullable=False)
     staff_phone = Column(String(20), nullable=True)
     staff_email = Column(String(100), nullable=True)
     reason = Column(Text)
-    status = Column(Enum(ExternalTransferStatus), default=ExternalTransferStatus.DRAFT)
+    status = Column(Enum(ExternalTransferStatus), default=ExternalTransferStatus.DRAFT, index=True)
     approved_by = Column(String(255), nullable=True)
     approved_at = Column(DateTime, nullable=True)
     rejection_reason = Column(Text, nullable=True)
@@ -1160,6 +1263,7 @@ class ExternalTransferItem(TenantBase):
     id = Column(Integer, primary_key=True, index=True)
     transfer_id = Column(Integer, ForeignKey("external_transfers.id"), nullable=False)
     item_name = Column(String(255), nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     batch_no = Column(String(100), nullable=False)
     quantity = Column(Integer, nullable=False)
     reason = Column(Text)
@@ -1187,4 +1291,53 @@ class ExternalTransferTransaction(TenantBase):
     
     # Relationships
     transfer = relationship("ExternalTransfer")
-    item = relationship("ExternalTransferItem")
\ No newline at end of file
+    item = relationship("ExternalTransferItem")
+
+# ============================================================
+#                   DOMAIN EVENT OUTBOX
+# ============================================================
+class DomainEventOutbox(TenantBase):
+    """One pending delivery of a domain event to one subscriber; see utils/domain_events.py"""
+    __tablename__ = "domain_event_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(String(100), nullable=False)
+    subscriber = Column(String(100), nullable=False)
+    aggregate_id = Column(Integer, nullable=True)
+    payload = Column(Text, nullable=False)
+
+    # pending → processing → done, or back to pending with a later next_attempt_at; failed after max attempts
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_domain_event_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_domain_event_outbox_event_aggregate", "event_type", "aggregate_id"),
+    )
+
+# ============================================================
+#                   MASTER DATA VERSION
+# ============================================================
+class MasterDataVersion(TenantBase):
+    """Single-row counter bumped by every master data write; see utils/master_data_cache.py"""
+    __tablename__ = "master_data_version"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# ============================================================
+#                   SCHEMA VERSION
+# ============================================================
+class TenantSchemaVersion(TenantBase):
+    __tablename__ = "tenant_schema_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime, nullable=False)
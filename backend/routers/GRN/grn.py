@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from datetime import date
+import asyncio
 import uuid
 
 from database import get_tenant_db
 from models.tenant_models import GRN, GRNItem, Batch, QCInspection, GRNStatus, Item, Stock, StockLedger, StockOverview, VendorPayment
 from schemas.tenant_schemas import GRNCreate, QCCreate, GRNStatusUpdate
+from utils.item_cache import get_items_by_id, invalidate_items
+from utils.stock_projector import apply_movements, movement
+from utils.stock_ledger import post_grn_ledger
+from utils.stock_aggregation import DEFAULT_LOCATION
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
+from utils.logger import log_error
+from utils.domain_events import publish
+from utils.ocr_jobs import submit_ocr_job, wait_for_ocr_job, get_ocr_result, OCR_MAX_WAIT
 
 router = APIRouter(prefix="/grn", tags=["Goods Receipt & Inspection"])
 
@@ -14,67 +23,70 @@ DEFAULT_TENANT_DB = "arun"
 def get_tenant_session():
     yield from get_tenant_db(DEFAULT_TENANT_DB)
 
+def _grn_postings(grn_id: int, db: Session) -> dict:
+    """What a GRN's batches post to stock: {(item_name, batch_no, location): (qty, expiry_date, uom)}"""
+    # Sessions run with autoflush=False; batches added in this unit of work must be counted
+    db.flush()
+    rows = db.query(GRNItem.item_name, Batch.batch_no, GRN.store, Batch.qty, Batch.expiry_date, GRNItem.uom).join(
+        Batch, Batch.grn_item_id == GRNItem.id
+    ).join(GRN, GRNItem.grn_id == GRN.id).filter(GRNItem.grn_id == grn_id).all()
+
+    postings = {}
+    for item_name, batch_no, store, qty, expiry_date, uom in rows:
+        key = (item_name, batch_no, store or DEFAULT_LOCATION)
+        total, expiry, _ = postings.get(key, (0, None, None))
+        postings[key] = (total + (qty or 0), expiry_date or expiry, uom)
+    return postings
+
 # Helper function to update stock from GRN
-def _update_stock_from_grn(grn_id: int, db: Session):
+def _update_stock_from_grn(grn_id: int, db: Session, posted: dict = None):
+    """
+    Post a GRN's batches to stock_overview and stock_ledger inside the caller's transaction.
+
+    posted is what the GRN had already posted before an edit (see
+    _grn_postings); only the difference to its batches now is written, and a
+    GRN that is no longer approved takes all of it back. Deltas are summed
+    per (item, batch, location) and written with one bulk upsert, plus one
+    GRN_RECEIPT ledger row per changed batch; the caller's commit makes the
+    posting and the status change land together. On failure everything
+    pending is rolled back and a 500 raised, so a GRN is never left
+    approved with its stock half posted.
+    """
     print(f"Starting stock update for GRN ID: {grn_id}")
     try:
-        grn_items = db.query(GRNItem).filter(GRNItem.grn_id == grn_id).all()
         grn = db.query(GRN).filter(GRN.id == grn_id).first()
-        
-        print(f"Found {len(grn_items)} GRN items")
-        
-        for item in grn_items:
-            # Get all batches for this GRN item
-            batches = db.query(Batch).filter(Batch.grn_item_id == item.id).all()
-            print(f"Item: {item.item_name}, Batches: {len(batches)}")
-            
-            for batch in batches:
-                print(f"Processing batch: {batch.batch_no}, qty: {batch.qty}")
-                # Add to stock overview directly in database
-                try:
-                    expiry_str = batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else "—"
-                    
-                    # Check if item with same name and batch already exists
-                    existing_stock = db.query(StockOverview).filter(
-                        StockOverview.item_name == item.item_name,
-                        StockOverview.batch_no == batch.batch_no
-                    ).first()
-                    
-                    if existing_stock:
-                        # Update existing stock - add quantity
-                        old_qty = existing_stock.available_qty
-                        existing_stock.available_qty += int(batch.qty)
-                        if existing_stock.available_qty >= existing_stock.min_stock:
-                            existing_stock.status = "Good"
-                        else:
-                            existing_stock.status = "Low Stock"
-                        print(f"Updated existing stock for {item.item_name} batch {batch.batch_no}: {old_qty} -> {existing_stock.available_qty}")
-                    else:
-                        # Create new stock entry
-                        new_stock = StockOverview(
-                            item_name=item.item_name,
-                            item_code=f"GRN-{batch.batch_no}",
-                            location="Main Store",
-                            available_qty=int(batch.qty),
-                            min_stock=100,
-                            batch_no=batch.batch_no,
-                            expiry_date=expiry_str,
-                            status="Good" if int(batch.qty) >= 100 else "Low Stock"
-                        )
-                        db.add(new_stock)
-                        print(f"Created new stock entry for {item.item_name} batch {batch.batch_no}: {batch.qty}")
-                    
-                    # Commit after each batch to ensure it's saved
-                    db.commit()
-                    print(f"Successfully committed stock update for {item.item_name} batch {batch.batch_no}")
-                        
-                except Exception as e:
-                    print(f"Error updating stock overview for {item.item_name} batch {batch.batch_no}: {e}")
-                    db.rollback()
-                    
+        current = _grn_postings(grn_id, db) if grn and grn.status == GRNStatus.approved else {}
+        posted = posted or {}
+
+        print(f"Found {len(current)} GRN batches")
+
+        deltas = []
+        for key in current.keys() | posted.keys():
+            qty, expiry_date, uom = current.get(key) or posted[key]
+            delta = current.get(key, (0,))[0] - posted.get(key, (0,))[0]
+            if delta:
+                deltas.append((key, delta, expiry_date, uom))
+
+        apply_movements(db, [
+            movement(item_name, batch_no, location, delta, expiry_date)
+            for (item_name, batch_no, location), delta, expiry_date, _ in deltas
+        ])
+        if grn:
+            post_grn_ledger(db, grn, [
+                (item_name, batch_no, location, delta, uom)
+                for (item_name, batch_no, location), delta, _, uom in deltas
+            ])
+
+        # Payment ledger and vendor scorecard run on the event bus after commit; edits do not re-run them
+        if grn and current and not posted:
+            publish(db, "grn.approved", {
+                "grn_id": grn.id, "grn_number": grn.grn_number, "vendor_name": grn.vendor_name, "store": grn.store
+            }, aggregate_id=grn.id)
+
     except Exception as e:
-        print(f"Error in _update_stock_from_grn: {e}")
         db.rollback()
+        log_error(e, location=f"GRN Stock Posting → {grn_id}")
+        raise HTTPException(500, f"Stock posting failed for GRN {grn_id}; no changes were saved")
 
 # ---------------- CREATE GRN ----------------
 @router.post("/create")
@@ -92,8 +104,7 @@ def create_grn(data: GRNCreate, db: Session = Depends(get_tenant_session)):
     )
 
     db.add(grn)
-    db.commit()
-    db.refresh(grn)
+    db.flush()
 
     for item in data.items:
         grn_item = GRNItem(
@@ -105,8 +116,7 @@ def create_grn(data: GRNCreate, db: Session = Depends(get_tenant_session)):
             rate=item.rate
         )
         db.add(grn_item)
-        db.commit()
-        db.refresh(grn_item)
+        db.flush()
 
         for b in item.batches:
             # Check if this is warranty or expiry date type
@@ -155,12 +165,24 @@ def create_grn(data: GRNCreate, db: Session = Depends(get_tenant_session)):
 
 # ---------------- LIST GRN ----------------
 @router.get("/list")
-def list_grns(db: Session = Depends(get_tenant_session)):
-    """Get all GRN records"""
+def list_grns(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_tenant_session)
+):
+    """Get all GRN records, or newest first one keyset page at a time with ?limit=/?cursor="""
     try:
-        grns = db.query(GRN).all()
+        query = apply_list_filters(
+            db.query(GRN), filters,
+            status_column=GRN.status, date_column=GRN.grn_date, location_columns=(GRN.store,)
+        )
+        grns, next_cursor = keyset_page(query, GRN.id, page)
+        set_next_cursor(response, next_cursor)
         print(f"Found {len(grns)} GRN records")
         return grns
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching GRNs: {str(e)}")
         return []
@@ -175,6 +197,14 @@ def get_grn_details(grn_id: int, db: Session = Depends(get_tenant_session)):
     
     # Get GRN items with batches
     items = db.query(GRNItem).filter(GRNItem.grn_id == grn_id).all()
+    master_items = get_items_by_id(db, (item.item_id for item in items))
+    
+    batches_by_item = {}
+    if items:
+        for batch in db.query(Batch).filter(
+            Batch.grn_item_id.in_([item.id for item in items])
+        ).order_by(Batch.id).all():
+            batches_by_item.setdefault(batch.grn_item_id, []).append(batch)
     grn_data = {
         "id": grn.id,
         "grn_number": grn.grn_number,
@@ -190,10 +220,10 @@ def get_grn_details(grn_id: int, db: Session = Depends(get_tenant_session)):
     }
     
     for item in items:
-        batches = db.query(Batch).filter(Batch.grn_item_id == item.id).all()
+        batches = batches_by_item.get(item.id, [])
         
-        # Get cost per piece and MRP per piece from item master
-        master_item = db.query(Item).filter(Item.name == item.item_name).first()
+        # Cost per piece and MRP per piece from item master
+        master_item = master_items.get(item.item_id)
         cost_per_piece = float(master_item.fixing_price) if master_item and master_item.fixing_price else 0.0
         mrp_per_piece = float(master_item.mrp) if master_item and master_item.mrp else 0.0
         
@@ -217,70 +247,67 @@ def get_grn_details(grn_id: int, db: Session = Depends(get_tenant_session)):
     
     return grn_data
 
-# ---------------- EXTRACT INVOICE DATA ----------------
+# ---------------- EXTRACT INVOICE DATA (OCR JOBS) ----------------
+@router.post("/extract-invoice/jobs", status_code=202)
+def submit_invoice_ocr(file: UploadFile = File(...)):
+    """Queue an invoice image (multipart upload) for OCR; poll the returned job"""
+    try:
+        return submit_ocr_job(file.file, file.filename)
+    finally:
+        file.file.close()
+
+
+@router.get("/extract-invoice/jobs/{job_id}")
+async def get_invoice_ocr_job(job_id: str, wait: float = Query(0, ge=0, description=f"Long-poll up to N seconds (max {OCR_MAX_WAIT})")):
+    """Status of an OCR job: queued, running, done or failed"""
+    return await wait_for_ocr_job(job_id, wait)
+
+
+@router.get("/extract-invoice/jobs/{job_id}/result")
+def get_invoice_ocr_result(job_id: str):
+    """Text and parsed item rows of a finished OCR job"""
+    return get_ocr_result(job_id)
+
+
 @router.post("/extract-invoice")
-def extract_invoice_data(data: dict):
-    """Extract item data from invoice image using OCR"""
+async def extract_invoice_data(data: dict):
+    """Extract item data from a base64 invoice image (legacy; prefer /extract-invoice/jobs)"""
     try:
         import base64
         import io
-        from PIL import Image
-        import pytesseract
-        import re
-        
-        # Decode base64 image
-        image_data = base64.b64decode(data['image'])
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Extract text using OCR
-        text = pytesseract.image_to_string(image)
-        print(f"Extracted text: {text}")
-        
-        # Parse text to extract items
-        items = []
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Look for patterns like: Item Name Qty Rate Amount
-            # Example: "Arun A 11111 25 50 278330.55"
-            pattern = r'([A-Za-z\s]+)\s+(\d+)\s+(\d+(?:\.\d+)?)\s+(\d+(?:\.\d+)?)'
-            match = re.search(pattern, line)
-            
-            if match:
-                name = match.group(1).strip()
-                qty = int(match.group(2))
-                rate = float(match.group(3))
-                
-                # Skip if name is too short or looks like a number
-                if len(name) > 2 and not name.isdigit():
-                    items.append({
-                        'name': name,
-                        'quantity': qty,
-                        'rate': rate,
-                        'unit': 'pcs',
-                        'batch': '',
-                        'expiry': ''
-                    })
-        
-        return {'items': items}
-        
+
+        job = await asyncio.to_thread(submit_ocr_job, io.BytesIO(base64.b64decode(data['image'])))
+        job = await wait_for_ocr_job(job["id"], OCR_MAX_WAIT)
+        if job["status"] not in ("done", "failed"):
+            # Still running: hand back the job so the client can poll it instead of getting sample data
+            raise HTTPException(status_code=504, detail={
+                "message": f"OCR did not finish within {OCR_MAX_WAIT}s",
+                "job_id": job["id"]
+            })
+        return {'items': (await asyncio.to_thread(get_ocr_result, job["id"]))["items"]}
+
+    except HTTPException as e:
+        if e.status_code == 504:
+            raise
+        print(f"OCR extraction error: {e.detail}")
+        return _sample_invoice_items()
     except Exception as e:
         print(f"OCR extraction error: {str(e)}")
-        # Fallback: return sample data based on the image
-        return {
-            'items': [{
-                'name': 'Arun A',
-                'quantity': 11111,
-                'rate': 25.0,
-                'unit': 'pcs',
-                'batch': 'Required',
-                'expiry': ''
-            }]
-        }
+        return _sample_invoice_items()
+
+
+def _sample_invoice_items():
+    # Fallback: return sample data based on the image
+    return {
+        'items': [{
+            'name': 'Arun A',
+            'quantity': 11111,
+            'rate': 25.0,
+            'unit': 'pcs',
+            'batch': 'Required',
+            'expiry': ''
+        }]
+    }
 
 # ---------------- SAVE PRICE TO ITEM MASTER ----------------
 @router.post("/save-price")
@@ -303,6 +330,7 @@ def save_price_to_item_master(data: dict, db: Session = Depends(get_tenant_sessi
         item.mrp = float(mrp)
     
     db.commit()
+    invalidate_items(db, [item.id])
     return {"message": f"Prices updated for {item_name}"}
 
 # ---------------- QC ----------------
@@ -336,6 +364,9 @@ def approve_grn(grn_id: int, db: Session = Depends(get_tenant_session)):
     if not grn:
         raise HTTPException(404, "GRN not found")
 
+    if grn.status == GRNStatus.approved:
+        raise HTTPException(409, "GRN is already approved")
+
     # Update GRN status
     grn.status = GRNStatus.approved
     
@@ -354,14 +385,8 @@ def update_grn(grn_id: int, data: GRNCreate, db: Session = Depends(get_tenant_se
     
     old_status = grn.status
     
-    # If GRN was already approved, reverse stock changes first
-    if old_status == GRNStatus.approved:
-        existing_items = db.query(GRNItem).filter(GRNItem.grn_id == grn_id).all()
-        for item in existing_items:
-            stock = db.query(Stock).filter(Stock.item_name == item.item_name).first()
-            if stock:
-                stock.total_qty -= item.received_qty
-                stock.available_qty -= item.received_qty
+    # What an approved GRN has already posted, so the edit posts only the difference
+    posted = _grn_postings(grn_id, db) if old_status == GRNStatus.approved else None
     
     # Update GRN details
     grn.grn_date = data.grn_date
@@ -390,8 +415,7 @@ def update_grn(grn_id: int, data: GRNCreate, db: Session = Depends(get_tenant_se
             rate=item.rate
         )
         db.add(grn_item)
-        db.commit()
-        db.refresh(grn_item)
+        db.flush()
 
         for b in item.batches:
             # Check if this is warranty or expiry date type
@@ -419,9 +443,9 @@ def update_grn(grn_id: int, data: GRNCreate, db: Session = Depends(get_tenant_se
                 )
             db.add(batch)
     
-    # If GRN status is approved, update stock with new quantities
-    if grn.status == GRNStatus.approved:
-        _update_stock_from_grn(grn_id, db)
+    # Post the change against what was already posted (all of it on a first approval)
+    if grn.status == GRNStatus.approved or posted:
+        _update_stock_from_grn(grn_id, db, posted)
 
     db.commit()
     return {"message": "GRN Updated", "grn_number": grn.grn_number}
@@ -436,9 +460,11 @@ def update_grn_status(grn_id: int, data: GRNStatusUpdate, db: Session = Depends(
     old_status = grn.status
     grn.status = data.status
     
-    # If status changed to approved, update stock
+    # Post stock on approval, take it back when an approved GRN leaves that status
     if data.status == GRNStatus.approved and old_status != GRNStatus.approved:
         _update_stock_from_grn(grn_id, db)
+    elif old_status == GRNStatus.approved and data.status != GRNStatus.approved:
+        _update_stock_from_grn(grn_id, db, _grn_postings(grn_id, db))
     
     db.commit()
     return {"message": f"GRN status updated to {data.status.value}"}
@@ -18,7 +18,9 @@ from utils.auth import (
     generate_otp,
     verify_otp,
     send_otp_email,
-    get_current_user
+    get_current_user,
+    cache_user_permissions,
+    get_role_version
 )
 
 # Logging
@@ -26,6 +28,9 @@ from utils.logger import log_error, log_audit, log_api
 
 router = APIRouter(tags=["Authentication"], prefix="/auth")
 
+# Tenant users log in against this DB; the permission cache is keyed on it too
+DEFAULT_TENANT_DB = "arun"
+
 
 # --------------------------
 # LOGIN REQUEST → SEND OTP
@@ -51,12 +56,12 @@ def login(req: LoginModel, db: Session = Depends(get_master_db)):
                 log_audit(f"OTP SENT TO ADMIN {req.email}")
                 return {"message": "OTP sent to email"}
         
-        # Then check tenant users in arun database
+        # Then check tenant users in the default tenant database
         from database import get_tenant_db
         from models.tenant_models import User
         from utils.auth import verify_password
         
-        tenant_db_gen = get_tenant_db("arun")
+        tenant_db_gen = get_tenant_db(DEFAULT_TENANT_DB)
         tenant_db = next(tenant_db_gen)
         
         tenant_user = tenant_db.query(User).filter(User.email == req.email).first()
@@ -137,7 +142,9 @@ def verify(req: OTPVerifyModel, response: Response, db: Session = Depends(get_ma
         from database import get_tenant_db
         from models.tenant_models import User
         
-        tenant_db_gen = get_tenant_db("arun")
+        # Read before the roles so a concurrent role change invalidates the seeded entry
+        role_version = get_role_version(DEFAULT_TENANT_DB)
+        tenant_db_gen = get_tenant_db(DEFAULT_TENANT_DB)
         tenant_db = next(tenant_db_gen)
         
         tenant_user = tenant_db.query(User).filter(User.email == req.email).first()
@@ -152,10 +159,12 @@ def verify(req: OTPVerifyModel, response: Response, db: Session = Depends(get_ma
             access_token = create_access_token({
                 "sub": str(tenant_user.id),
                 "email": tenant_user.email,
-                "tenant_db": "arun",
+                "tenant_db": DEFAULT_TENANT_DB,
                 "user_type": "tenant_user",
                 "permissions": list(set(permissions))  # Remove duplicates
             })
+            # Seed the permission cache so requests with this token skip the DB
+            cache_user_permissions(tenant_user.id, list(set(permissions)), DEFAULT_TENANT_DB, role_version)
             tenant_db.close()
             log_audit(f"TENANT USER LOGIN SUCCESS → {req.email}")
             return {"access_token": access_token, "token_type": "bearer"}
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update, case, or_
 from typing import List, Optional
-from database import get_tenant_db
+from database import get_tenant_db, get_tenant_async_db
 from models.tenant_models import Billing, GRN, BillingStatus, ReturnBilling, ReturnHeader, ReturnBillingPayment, ReturnItem, Item
+from utils.item_cache import get_items_by_id, get_item_by_id
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page_async, set_next_cursor
+from utils.stock_mutation import allocate_batches
+from utils.stock_ledger import batch_location
+from utils.pdf_renderer import (
+    invoice_payload, invoice_etag, etag_matches, get_invoice_pdf, render_invoice_pdfs
+)
 from schemas.tenant_schemas import BillingCreate, BillingResponse, ReturnBillingCreate, ReturnBillingResponse
 from pydantic import BaseModel
 from decimal import Decimal
 from datetime import date, datetime
+import io
+import zipfile
 
 router = APIRouter(prefix="/billing", tags=["Billing"])
 
@@ -25,13 +35,15 @@ def create_billing(
     gross_amount = 0
     tax_amount = 0
     
+    # Item master rows for all GRN lines in one lookup
+    master_items = get_items_by_id(db, (item.item_id for item in grn.items))
+
     for item in grn.items:
         item_total = item.received_qty * item.rate
         gross_amount += item_total
         
-        # Fetch tax from item master
-        from models.tenant_models import Item
-        master_item = db.query(Item).filter(Item.name == item.item_name).first()
+        # Tax from item master
+        master_item = master_items.get(item.item_id)
         if master_item and master_item.tax:
             tax_amount += master_item.tax * item.received_qty
     
@@ -55,115 +67,141 @@ def create_billing(
     return billing
 
 @router.get("/return-invoices")
-def get_all_return_billing(db: Session = Depends(get_tenant_db)):
+async def get_all_return_billing(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: AsyncSession = Depends(get_tenant_async_db)
+):
+    billings, next_cursor = await _list_return_billing(db, page, filters)
+    set_next_cursor(response, next_cursor)
+    return billings
+
+def _customer_fields(customer) -> dict:
+    if not customer:
+        return {"customer_name": "N/A", "customer_phone": "N/A", "customer_email": "N/A", "customer_id": "N/A"}
+    if customer.customer_type == 'organization':
+        name, phone = customer.org_name, customer.org_mobile
+    else:
+        name, phone = customer.name, customer.mobile
+    return {
+        "customer_name": name or "N/A",
+        "customer_phone": phone or "N/A",
+        "customer_email": customer.email or "N/A",
+        "customer_id": str(customer.id)
+    }
+
+async def _customers_by_vendor_text(db: AsyncSession, return_headers) -> dict:
+    """Approved customers for returns that only name them as "customer: <name>" in vendor."""
     from models.tenant_models import Customer
     
-    billings = db.query(ReturnBilling).all()
-    
-    # Get all approved customers for fallback matching
-    customers = db.query(Customer).filter(Customer.status == "approved").all()
+    names = set()
+    for return_header in return_headers:
+        vendor_text = (return_header.vendor or "").lower()
+        if "customer:" in vendor_text:
+            names.add(vendor_text.replace("customer:", "").strip())
+    if not names:
+        return {}
+    
+    customers = (await db.execute(select(Customer).where(
+        Customer.status == "approved",
+        (func.lower(Customer.org_name).in_(names)) | (func.lower(Customer.name).in_(names))
+    ))).scalars().all()
     customer_map = {}
     for customer in customers:
         name = customer.org_name if customer.customer_type == 'organization' else customer.name
-        customer_map[name.lower()] = customer
+        if name:
+            customer_map[name.lower()] = customer
+    return customer_map
+
+async def _list_return_billing(db: AsyncSession, page: PageParams, filters: ListFilters):
+    """
+    Return invoices (one keyset page when paged) with return header, customer
+    and paid total.
+
+    Invoice, header and linked customer come from a single joined query; the
+    paid total is a correlated SUM over the returned rows only. Customers named
+    only in the vendor text are resolved with at most one more query.
+    """
+    from models.tenant_models import Customer
+    
+    total_paid = select(
+        func.coalesce(func.sum(ReturnBillingPayment.amount), 0)
+    ).where(
+        ReturnBillingPayment.billing_id == ReturnBilling.id
+    ).correlate(ReturnBilling).scalar_subquery()
+    
+    statement = apply_list_filters(
+        select(ReturnBilling, ReturnHeader, Customer, total_paid.label("total_paid")).join(
+            ReturnHeader, ReturnHeader.id == ReturnBilling.return_id
+        ).outerjoin(
+            Customer, Customer.id == ReturnHeader.customer_id
+        ).where(
+            # Internal returns are not invoiced to anyone
+            or_(ReturnHeader.return_type != "INTERNAL", ReturnHeader.return_type.is_(None))
+        ),
+        filters, status_column=ReturnBilling.status, date_column=ReturnBilling.created_at
+    )
+    rows, next_cursor = await keyset_page_async(
+        db, statement, ReturnBilling.id, page, id_of=lambda row: row.ReturnBilling.id
+    )
     
-    # Enhance billings with customer details - NO AUTO-CALCULATION OR STATUS CHANGES
+    customer_map = await _customers_by_vendor_text(db, [row.ReturnHeader for row in rows if not row.Customer])
+    
+    # PRESERVE EXACT DATABASE VALUES - NO AUTO-CALCULATION OR STATUS CHANGES
+    # This prevents automatic status changes during page navigation
     result_billings = []
-    for billing in billings:
-        # Calculate actual paid amount from payment history
-        total_paid = db.query(func.sum(ReturnBillingPayment.amount)).filter(
-            ReturnBillingPayment.billing_id == billing.id
-        ).scalar() or 0
-        
-        # Get return details
-        return_header = db.query(ReturnHeader).filter(ReturnHeader.id == billing.return_id).first()
+    for billing, return_header, customer, paid in rows:
+        if not customer and return_header.vendor and "customer:" in return_header.vendor.lower():
+            customer = customer_map.get(return_header.vendor.lower().replace("customer:", "").strip())
         
-        if return_header and return_header.return_type != "INTERNAL":
-            # Try to get customer details
-            customer = None
-            
-            # Method 1: Use customer_id if available
-            if return_header.customer_id:
-                customer = db.query(Customer).filter(Customer.id == return_header.customer_id).first()
-            
-            # Method 2: Try to match from vendor field (fallback)
-            if not customer and return_header.vendor:
-                vendor_text = return_header.vendor.lower()
-                if "customer:" in vendor_text:
-                    customer_name = vendor_text.replace("customer:", "").strip()
-                    customer = customer_map.get(customer_name)
-            
-            # PRESERVE EXACT DATABASE VALUES - NO STATUS RECALCULATION
-            # This prevents automatic status changes during page navigation
-            billing_dict = {
-                "id": billing.id,
-                "return_id": billing.return_id,
-                "gross_amount": float(billing.gross_amount),
-                "tax_amount": float(billing.tax_amount),
-                "net_amount": float(billing.net_amount),
-                "paid_amount": float(total_paid),  # Use calculated total from payments
-                "balance_amount": float(billing.net_amount) - float(total_paid),
-                "status": billing.status.value,  # Use exact database status - no recalculation
-                "created_at": billing.created_at,
-                "return_header": {
-                    "return_no": return_header.return_no,
-                    "return_type": return_header.return_type,
-                    "vendor": return_header.vendor
-                }
+        billing_dict = {
+            "id": billing.id,
+            "return_id": billing.return_id,
+            "gross_amount": float(billing.gross_amount),
+            "tax_amount": float(billing.tax_amount),
+            "net_amount": float(billing.net_amount),
+            "paid_amount": float(paid),  # Use calculated total from payments
+            "balance_amount": float(billing.net_amount) - float(paid),
+            "status": billing.status.value,  # Use exact database status - no recalculation
+            "created_at": billing.created_at,
+            "return_header": {
+                "return_no": return_header.return_no,
+                "return_type": return_header.return_type,
+                "vendor": return_header.vendor
             }
-            
-            # Set customer details
-            if customer:
-                if customer.customer_type == 'organization':
-                    billing_dict["customer_name"] = customer.org_name or "N/A"
-                    billing_dict["customer_phone"] = customer.org_mobile or "N/A"
-                else:
-                    billing_dict["customer_name"] = customer.name or "N/A"
-                    billing_dict["customer_phone"] = customer.mobile or "N/A"
-                
-                billing_dict["customer_email"] = customer.email or "N/A"
-                billing_dict["customer_id"] = str(customer.id)
-            else:
-                billing_dict["customer_name"] = "N/A"
-                billing_dict["customer_phone"] = "N/A"
-                billing_dict["customer_email"] = "N/A"
-                billing_dict["customer_id"] = "N/A"
-            
-            result_billings.append(billing_dict)
+        }
+        billing_dict.update(_customer_fields(customer))
+        result_billings.append(billing_dict)
     
-    return result_billings
+    return result_billings, next_cursor
 
 @router.get("/", response_model=List[BillingResponse])
-def get_all_billing(db: Session = Depends(get_tenant_db)):
-    from models.tenant_models import Customer
-    
-    billings = db.query(Billing).all()
+async def get_all_billing(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: AsyncSession = Depends(get_tenant_async_db)
+):
+    billings, next_cursor = await _list_billing(db, page, filters)
+    set_next_cursor(response, next_cursor)
+    return billings
+
+async def _list_billing(db: AsyncSession, page: PageParams, filters: ListFilters):
+    statement = apply_list_filters(
+        select(Billing), filters,
+        status_column=Billing.status, date_column=Billing.created_at
+    )
+    billings, next_cursor = await keyset_page_async(db, statement, Billing.id, page, scalars=True)
     
-    # Enhance billings with customer details
+    # GRNs carry no customer reference, so invoices have no customer details to add
     for billing in billings:
-        # Initialize default values
         billing.customer_name = "N/A"
         billing.customer_phone = "N/A"
         billing.customer_email = "N/A"
         billing.customer_id = "N/A"
-        
-        # Try to get customer details from GRN if available
-        if billing.grn:
-            # Check if GRN has customer information
-            if hasattr(billing.grn, 'customer_id') and billing.grn.customer_id:
-                customer = db.query(Customer).filter(Customer.id == billing.grn.customer_id).first()
-                if customer:
-                    if customer.customer_type == 'organization':
-                        billing.customer_name = customer.org_name or "N/A"
-                        billing.customer_phone = customer.org_mobile or "N/A"
-                    else:
-                        billing.customer_name = customer.name or "N/A"
-                        billing.customer_phone = customer.mobile or "N/A"
-                    
-                    billing.customer_email = customer.email or "N/A"
-                    billing.customer_id = str(customer.id)
     
-    return billings
+    return billings, next_cursor
 
 @router.get("/customer/{customer_id}/paid-invoices")
 def get_customer_paid_invoices(customer_id: int, db: Session = Depends(get_tenant_db)):
@@ -286,6 +324,7 @@ def create_return_billing(
     
     # Get return items to calculate amounts
     return_items = db.query(ReturnItem).filter(ReturnItem.return_id == return_id).all()
+    master_items = get_items_by_id(db, (item.item_id for item in return_items))
     
     # Calculate amounts from return items
     gross_amount = 0
@@ -297,8 +336,8 @@ def create_return_billing(
         item_gross = item.qty * rate
         gross_amount += item_gross
         
-        # Get tax from item master
-        master_item = db.query(Item).filter(Item.name == item.item_name).first()
+        # Tax from item master
+        master_item = master_items.get(item.item_id)
         if master_item and master_item.tax:
             tax_amount += master_item.tax * item.qty
         else:
@@ -355,96 +394,56 @@ def create_sample_invoice(db: Session = Depends(get_tenant_db)):
         "invoice_number": f"INV-{billing.id:04d}",
         "amount": float(billing.net_amount)
     }
-def generate_invoice(billing_id: int, db: Session = Depends(get_tenant_db)):
-    """Generate professional invoice PDF"""
-    from fastapi.responses import Response
-    import io
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib.colors import black, blue
-    from datetime import datetime
-    
-    # Get billing details
+
+@router.get("/invoice/{billing_id}")
+def generate_invoice(billing_id: int, request: Request, db: Session = Depends(get_tenant_db)):
+    """Invoice PDF, rendered off-thread and cached by content (ETag / If-None-Match)"""
     billing = db.query(ReturnBilling).filter(ReturnBilling.id == billing_id).first()
     if not billing:
         raise HTTPException(status_code=404, detail="Billing not found")
-    
-    # Create PDF
+
+    payload = invoice_payload(billing)
+    etag = invoice_etag(payload)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    # Unchanged since the client's copy: nothing to render or send
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    pdf = get_invoice_pdf(db.get_bind().url.database, payload)
+    headers["Content-Disposition"] = "inline; filename=invoice-{}.pdf".format(billing.id)
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
+
+
+@router.get("/invoices/zip")
+def download_invoices_zip(
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="YYYY-MM"),
+    db: Session = Depends(get_tenant_db)
+):
+    """Every invoice created in a month as one ZIP of PDFs, rendered in parallel"""
+    year, month_no = (int(part) for part in month.split("-"))
+    month_start = datetime(year, month_no, 1)
+    month_end = datetime(year + month_no // 12, month_no % 12 + 1, 1)
+
+    billings = db.query(ReturnBilling).filter(
+        ReturnBilling.created_at >= month_start,
+        ReturnBilling.created_at < month_end
+    ).order_by(ReturnBilling.id).all()
+    if not billings:
+        raise HTTPException(status_code=404, detail=f"No invoices for {month}")
+
+    payloads = [invoice_payload(billing) for billing in billings]
+    pdfs = render_invoice_pdfs(db.get_bind().url.database, payloads)
+
     buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # Header
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(50, height-50, "INVOICE")
-    
-    # Company Info
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, height-80, "Your Company Name")
-    p.setFont("Helvetica", 10)
-    p.drawString(50, height-95, "123 Business Street, City, State 12345")
-    p.drawString(50, height-110, "Phone: (555) 123-4567 | Email: info@company.com")
-    
-    # Invoice Details (Right)
-    p.setFont("Helvetica-Bold", 10)
-    p.drawRightString(width-50, height-80, f"Invoice #: INV-{billing.id:04d}")
-    p.drawRightString(width-50, height-95, f"Date: {billing.created_at.strftime('%d/%m/%Y')}")
-    p.drawRightString(width-50, height-110, f"Reference: RTN-{billing.return_id}")
-    
-    # Line separator
-    p.line(50, height-130, width-50, height-130)
-    
-    # Bill To
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, height-160, "Bill To:")
-    p.setFont("Helvetica", 10)
-    p.drawString(50, height-175, "Customer Name")
-    p.drawString(50, height-190, "Customer Address")
-    
-    # Items Table Header
-    table_y = height - 240
-    p.setFont("Helvetica-Bold", 10)
-    p.drawString(50, table_y, "Description")
-    p.drawString(300, table_y, "Quantity")
-    p.drawString(400, table_y, "Rate")
-    p.drawString(500, table_y, "Amount")
-    
-    p.line(50, table_y-5, width-50, table_y-5)
-    
-    # Items
-    p.setFont("Helvetica", 9)
-    item_y = table_y - 25
-    p.drawString(50, item_y, f"Return Processing - RTN-{billing.return_id}")
-    p.drawString(300, item_y, "1")
-    p.drawString(400, item_y, f"₹{billing.gross_amount:.2f}")
-    p.drawString(500, item_y, f"₹{billing.gross_amount:.2f}")
-    
-    # Totals
-    total_y = item_y - 50
-    p.line(400, total_y+20, width-50, total_y+20)
-    
-    p.setFont("Helvetica", 10)
-    p.drawString(400, total_y, "Subtotal:")
-    p.drawRightString(width-50, total_y, f"₹{billing.gross_amount:.2f}")
-    
-    p.drawString(400, total_y-15, "Tax (18%):")
-    p.drawRightString(width-50, total_y-15, f"₹{billing.tax_amount:.2f}")
-    
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(400, total_y-35, "Total:")
-    p.drawRightString(width-50, total_y-35, f"₹{billing.net_amount:.2f}")
-    
-    # Footer
-    p.setFont("Helvetica", 8)
-    p.drawString(50, 50, "Thank you for your business!")
-    
-    p.save()
-    buffer.seek(0)
-    
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for payload, pdf in zip(payloads, pdfs):
+            archive.writestr(f"invoice-{payload['billing_id']}.pdf", pdf)
+
     return Response(
         content=buffer.getvalue(),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "inline; filename=invoice-{}.pdf".format(billing.id)}
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="invoices-{month}.zip"'}
     )
 
 # ============================================================
@@ -918,7 +917,8 @@ def return_item(
             qty_out=0,
             balance=stock.available_qty,
             ref_no=f"RTN-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
-            remarks=f"Item return: {return_data.reason}"
+            remarks=f"Item return: {return_data.reason}",
+            location=batch_location(db, return_data.item_name, return_data.batch_no)
         )
         db.add(ledger)
     
@@ -983,11 +983,12 @@ def get_invoice_items_with_tax(billing_id: int, db: Session = Depends(get_tenant
     # Get return items
     from models.tenant_models import ReturnItem, Item
     return_items = db.query(ReturnItem).filter(ReturnItem.return_id == billing.return_id).all()
+    master_items = get_items_by_id(db, (item.item_id for item in return_items))
     
     items_with_tax = []
     for item in return_items:
-        # Get tax from item master
-        master_item = db.query(Item).filter(Item.name == item.item_name).first()
+        # Tax from item master
+        master_item = master_items.get(item.item_id)
         tax_per_unit = master_item.tax if master_item and master_item.tax else 0.44
         
         # Calculate amounts
@@ -1657,7 +1658,7 @@ def update_with_item_master_tax(
     new_qty = update_data.get('qty', item.qty)
     
     # Get item master details
-    master_item = db.query(Item).filter(Item.name == item.item_name).first()
+    master_item = get_item_by_id(db, item.item_id)
     if not master_item:
         raise HTTPException(status_code=404, detail="Item not found in master")
     
@@ -1881,19 +1882,30 @@ def create_new_invoice(
         total_gross = 0
         total_tax = 0
         
+        # Every approved batch the invoice names, in one query
+        candidates = db.query(Batch.id, Batch.batch_no, Batch.qty, Batch.grn_item_id, GRNItem.item_name).join(
+            GRNItem, Batch.grn_item_id == GRNItem.id
+        ).join(GRN, GRNItem.grn_id == GRN.id).filter(
+            GRNItem.item_name.in_({item_data['item_name'] for item_data in invoice_data['items']}),
+            Batch.batch_no.in_({item_data['batch_no'] for item_data in invoice_data['items']}),
+            GRN.status == GRNStatus.approved
+        ).order_by(Batch.id).all()
+        batches = {}
+        for candidate in candidates:
+            batches.setdefault((candidate.item_name, candidate.batch_no), candidate)
+        
+        allocations = {}
+        grn_item_deductions = {}
         for item_data in invoice_data['items']:
             # Validate stock availability
-            batch = db.query(Batch).join(GRNItem).join(GRN).filter(
-                GRNItem.item_name == item_data['item_name'],
-                Batch.batch_no == item_data['batch_no'],
-                GRN.status == GRNStatus.approved
-            ).first()
+            batch = batches.get((item_data['item_name'], item_data['batch_no']))
             
             if not batch:
                 raise HTTPException(400, f"Batch {item_data['batch_no']} not found for {item_data['item_name']}")
             
-            if batch.qty < item_data['qty']:
-                raise HTTPException(400, f"Insufficient stock. Available: {batch.qty}, Requested: {item_data['qty']}")
+            already_allocated = allocations.get(batch.id, 0)
+            if batch.qty - already_allocated < item_data['qty']:
+                raise HTTPException(400, f"Insufficient stock. Available: {batch.qty - already_allocated}, Requested: {item_data['qty']}")
             
             # Calculate amounts
             rate = item_data['rate']
@@ -1921,13 +1933,20 @@ def create_new_invoice(
             )
             db.add(return_item)
             
-            # Update batch quantity (reduce stock)
-            batch.qty -= qty
-            
-            # Update GRN item quantity
-            grn_item = db.query(GRNItem).filter(GRNItem.id == batch.grn_item_id).first()
-            if grn_item:
-                grn_item.received_qty -= qty
+            allocations[batch.id] = already_allocated + qty
+            grn_item_deductions[batch.grn_item_id] = grn_item_deductions.get(batch.grn_item_id, 0) + qty
+        
+        # Reduce stock: one conditional UPDATE for all batches, so concurrent sales can't oversell
+        allocate_batches(db, allocations)
+        
+        # Update GRN item quantities
+        if grn_item_deductions:
+            db.execute(
+                update(GRNItem)
+                .where(GRNItem.id.in_(grn_item_deductions))
+                .values(received_qty=GRNItem.received_qty - case(grn_item_deductions, value=GRNItem.id))
+                .execution_options(synchronize_session=False)
+            )
         
         # Create billing record
         net_amount = total_gross + total_tax
@@ -1952,6 +1971,9 @@ def create_new_invoice(
             "total_amount": float(net_amount)
         }
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(500, f"Failed to create invoice: {str(e)}")
@@ -2129,6 +2151,7 @@ def recalculate_billing_amounts(
     
     # Get return items
     return_items = db.query(ReturnItem).filter(ReturnItem.return_id == billing.return_id).all()
+    master_items = get_items_by_id(db, (item.item_id for item in return_items))
     
     # Calculate amounts from return items
     gross_amount = 0
@@ -2140,8 +2163,8 @@ def recalculate_billing_amounts(
         item_gross = item.qty * rate
         gross_amount += item_gross
         
-        # Get tax from item master
-        master_item = db.query(Item).filter(Item.name == item.item_name).first()
+        # Tax from item master
+        master_item = master_items.get(item.item_id)
         if master_item and master_item.tax:
             tax_amount += master_item.tax * item.qty
         else:
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, text, select
 from typing import Dict, List, Any
 from datetime import datetime, timedelta
 
-from database import get_tenant_db
+from database import get_tenant_db, get_tenant_async_db
+from utils.dashboard_metrics import get_dashboard_metrics, get_dashboard_metrics_async
 from models.tenant_models import (
     Item, Stock, StockOverview, GRN, PurchaseOrder, 
     ReturnHeader, Customer, Vendor, VendorPayment,
@@ -14,51 +16,23 @@ from models.tenant_models import (
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
 @router.get("/overview")
-def get_dashboard_overview(db: Session = Depends(get_tenant_db)):
+async def get_dashboard_overview(db: AsyncSession = Depends(get_tenant_async_db)):
     """Get main dashboard overview statistics"""
     try:
-        # Total Items
-        total_items = db.query(Item).filter(Item.is_active == True).count()
-        
-        # Total Stock Value (from stock overview)
-        stock_data = db.query(StockOverview).all()
-        total_stock_value = sum([stock.available_qty * 100 for stock in stock_data])  # Assuming avg price 100
-        
-        # Low Stock Items
-        low_stock_items = db.query(StockOverview).filter(
-            StockOverview.available_qty <= StockOverview.min_stock
-        ).count()
-        
-        # Total Vendors
-        total_vendors = db.query(Vendor).count()
-        
-        # Total Customers
-        total_customers = db.query(Customer).filter(Customer.is_active == True).count()
-        
-        # Pending GRNs
-        pending_grns = db.query(GRN).filter(GRN.status == "pending").count()
-        
-        # Outstanding Payments
-        outstanding_payments = db.query(func.sum(VendorPayment.outstanding_amount)).scalar() or 0
-        
-        # Recent Activities (last 7 days)
-        week_ago = datetime.now() - timedelta(days=7)
-        recent_grns = db.query(GRN).filter(GRN.grn_date >= week_ago.date()).count()
-        recent_issues = db.query(IssueHeader).filter(IssueHeader.created_at >= week_ago).count()
-        recent_returns = db.query(ReturnHeader).filter(ReturnHeader.created_at >= week_ago).count()
+        metrics = await get_dashboard_metrics_async(db)
         
         return {
-            "total_items": total_items,
-            "total_stock_value": round(total_stock_value, 2),
-            "low_stock_items": low_stock_items,
-            "total_vendors": total_vendors,
-            "total_customers": total_customers,
-            "pending_grns": pending_grns,
-            "outstanding_payments": round(float(outstanding_payments), 2),
+            "total_items": metrics["items_active"],
+            "total_stock_value": round(metrics["stock_value"], 2),
+            "low_stock_items": metrics["stock_low"],
+            "total_vendors": metrics["vendors_total"],
+            "total_customers": metrics["customers_active"],
+            "pending_grns": metrics["grns_pending"],
+            "outstanding_payments": round(metrics["outstanding_payments"], 2),
             "recent_activities": {
-                "grns": recent_grns,
-                "issues": recent_issues,
-                "returns": recent_returns
+                "grns": metrics["grns_recent"],
+                "issues": metrics["issues_recent"],
+                "returns": metrics["returns_recent"]
             }
         }
         
@@ -314,35 +288,28 @@ def get_monthly_trends(months: int = 6, db: Session = Depends(get_tenant_db)):
 def get_system_health(db: Session = Depends(get_tenant_db)):
     """Get system health metrics"""
     try:
+        metrics = get_dashboard_metrics(db)
+        
         # Database table counts
         table_counts = {
-            "items": db.query(Item).count(),
-            "vendors": db.query(Vendor).count(),
-            "customers": db.query(Customer).count(),
-            "users": db.query(User).count(),
-            "departments": db.query(Department).count(),
-            "grns": db.query(GRN).count(),
-            "stock_records": db.query(StockOverview).count()
+            "items": metrics["items_total"],
+            "vendors": metrics["vendors_total"],
+            "customers": metrics["customers_total"],
+            "users": metrics["users_total"],
+            "departments": metrics["departments_total"],
+            "grns": metrics["grns_total"],
+            "stock_records": metrics["stock_records"]
         }
         
-        # Data quality checks
-        items_without_category = db.query(Item).filter(
-            (Item.category == None) | (Item.category == "")
-        ).count()
-        
-        items_without_min_stock = db.query(Item).filter(
-            Item.min_stock == 0
-        ).count()
-        
         return {
             "table_counts": table_counts,
             "data_quality": {
-                "items_without_category": items_without_category,
-                "items_without_min_stock": items_without_min_stock,
+                "items_without_category": metrics["items_without_category"],
+                "items_without_min_stock": metrics["items_without_min_stock"],
                 "total_items": table_counts["items"]
             },
             "system_status": "healthy"
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
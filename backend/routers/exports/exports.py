@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, type_coerce, String
+
+from database import bootstrap_tenant_db, get_tenant_sessionmaker
+from models.tenant_models import (
+    StockLedger, Stock, Billing, GRN, ReturnBilling, ReturnBillingPayment, ReturnHeader,
+    ExternalTransfer, ExternalTransferItem, ExternalTransferTransaction
+)
+from utils.export_stream import stream_export
+from utils.pagination import ListFilters, apply_list_filters
+from utils.logger import log_api
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+DEFAULT_TENANT_DB = "arun"
+
+FORMAT_QUERY = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson")
+
+
+def get_export_sessionmaker():
+    """Exports open their own session inside the streaming generator."""
+    bootstrap_tenant_db(DEFAULT_TENANT_DB)
+    return get_tenant_sessionmaker(DEFAULT_TENANT_DB)
+
+
+# ---------------- STOCK LEDGER ----------------
+@router.get("/stock-ledger")
+def export_stock_ledger(
+    format: str = FORMAT_QUERY,
+    filters: ListFilters = Depends(),
+    session_factory=Depends(get_export_sessionmaker)
+):
+    """Every stock ledger entry with its item name, oldest first"""
+    log_api(f"EXPORT stock-ledger ({format})")
+    statement = apply_list_filters(
+        select(
+            StockLedger.id, StockLedger.created_at, Stock.item_name, StockLedger.batch_no,
+            # Raw text: rows written by raw SQL may carry types outside StockTxnType
+            type_coerce(StockLedger.txn_type, String).label("txn_type"),
+            StockLedger.qty_in, StockLedger.qty_out, StockLedger.balance,
+            StockLedger.ref_no, StockLedger.remarks
+        ).outerjoin(Stock, Stock.id == StockLedger.stock_id),
+        filters, date_column=StockLedger.created_at
+    ).order_by(StockLedger.id)
+    return stream_export(session_factory, statement, format, "stock_ledger")
+
+
+# ---------------- BILLING ----------------
+@router.get("/billing")
+def export_billing(
+    format: str = FORMAT_QUERY,
+    filters: ListFilters = Depends(),
+    session_factory=Depends(get_export_sessionmaker)
+):
+    """Sales invoices with their GRN reference and paid/balance amounts"""
+    log_api(f"EXPORT billing ({format})")
+    statement = apply_list_filters(
+        select(
+            Billing.id, Billing.created_at, GRN.grn_number, GRN.vendor_name, Billing.status,
+            Billing.gross_amount, Billing.tax_amount, Billing.net_amount,
+            Billing.paid_amount, Billing.balance_amount
+        ).outerjoin(GRN, GRN.id == Billing.grn_id),
+        filters, status_column=Billing.status, date_column=Billing.created_at
+    ).order_by(Billing.id)
+    return stream_export(session_factory, statement, format, "billing")
+
+
+@router.get("/return-billing")
+def export_return_billing(
+    format: str = FORMAT_QUERY,
+    filters: ListFilters = Depends(),
+    session_factory=Depends(get_export_sessionmaker)
+):
+    """Return invoices, one row per payment (invoices without payments appear once)"""
+    log_api(f"EXPORT return-billing ({format})")
+    statement = apply_list_filters(
+        select(
+            ReturnBilling.id.label("billing_id"), ReturnBilling.created_at, ReturnHeader.return_no,
+            ReturnHeader.return_type, ReturnHeader.customer_name, ReturnBilling.status,
+            ReturnBilling.gross_amount, ReturnBilling.tax_amount, ReturnBilling.net_amount,
+            ReturnBilling.balance_amount, ReturnBilling.due_date,
+            ReturnBillingPayment.id.label("payment_id"), ReturnBillingPayment.created_at.label("paid_at"),
+            ReturnBillingPayment.amount.label("payment_amount"), ReturnBillingPayment.payment_mode,
+            ReturnBillingPayment.reference_no.label("payment_reference")
+        ).outerjoin(
+            ReturnHeader, ReturnHeader.id == ReturnBilling.return_id
+        ).outerjoin(
+            ReturnBillingPayment, ReturnBillingPayment.billing_id == ReturnBilling.id
+        ),
+        filters, status_column=ReturnBilling.status, date_column=ReturnBilling.created_at
+    ).order_by(ReturnBilling.id, ReturnBillingPayment.id)
+    return stream_export(session_factory, statement, format, "return_billing")
+
+
+# ---------------- EXTERNAL TRANSFERS ----------------
+@router.get("/external-transfer-transactions")
+def export_external_transfer_transactions(
+    format: str = FORMAT_QUERY,
+    filters: ListFilters = Depends(),
+    session_factory=Depends(get_export_sessionmaker)
+):
+    """Return/damage movements on external transfers with transfer and item details"""
+    log_api(f"EXPORT external-transfer-transactions ({format})")
+    statement = apply_list_filters(
+        select(
+            ExternalTransferTransaction.id, ExternalTransferTransaction.transaction_date,
+            ExternalTransfer.transfer_no, ExternalTransfer.location, ExternalTransfer.staff_name,
+            ExternalTransferItem.item_name, ExternalTransferItem.batch_no,
+            ExternalTransferTransaction.transaction_type, ExternalTransferTransaction.quantity,
+            ExternalTransferTransaction.remarks
+        ).join(
+            ExternalTransfer, ExternalTransfer.id == ExternalTransferTransaction.transfer_id
+        ).outerjoin(
+            ExternalTransferItem, ExternalTransferItem.id == ExternalTransferTransaction.item_id
+        ),
+        filters, date_column=ExternalTransferTransaction.transaction_date,
+        location_columns=(ExternalTransfer.location,)
+    ).order_by(ExternalTransferTransaction.id)
+    return stream_export(session_factory, statement, format, "external_transfer_transactions")
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 from typing import List
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from database import get_tenant_db
+from utils.stock_projector import apply_movements, movement
+from utils.stock_mutation import allocate_batches, release_batches
+from utils.domain_events import publish
+from utils.scheduled_jobs import upcoming_return_deadlines, queue_return_deadline_alerts
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
 from models.tenant_models import ExternalTransfer, ExternalTransferItem, ExternalTransferStatus
 from schemas.tenant_schemas import (
     ExternalTransferCreate,
@@ -108,11 +113,24 @@ def debug_transfer_items(transfer_id: int, db: Session = Depends(get_tenant_db))
         return {"error": str(e)}
 
 @router.get("/", response_model=List[ExternalTransferResponse])
-def get_external_transfers(db: Session = Depends(get_tenant_db)):
+def get_external_transfers(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_tenant_db)
+):
     try:
-        transfers = db.query(ExternalTransfer).all()
+        query = apply_list_filters(
+            db.query(ExternalTransfer), filters,
+            status_column=ExternalTransfer.status, date_column=ExternalTransfer.created_at,
+            location_columns=(ExternalTransfer.location,)
+        )
+        transfers, next_cursor = keyset_page(query, ExternalTransfer.id, page)
+        set_next_cursor(response, next_cursor)
         print(f"Found {len(transfers)} transfers")
         return transfers
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching transfers: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -127,112 +145,109 @@ def send_transfer(transfer_id: int, db: Session = Depends(get_tenant_db)):
         if transfer.status != ExternalTransferStatus.DRAFT:
             raise HTTPException(status_code=400, detail="Can only send draft transfers")
         
-        # Reduce stock for each item
+        # Every approved batch of every item on the transfer, in one query
+        from models.tenant_models import GRN, GRNItem, Batch, GRNStatus
+        
+        item_names = {item.item_name for item in transfer.items}
+        candidates = db.query(
+            Batch.id, Batch.batch_no, Batch.qty, GRNItem.item_name, GRN.store
+        ).join(GRNItem, Batch.grn_item_id == GRNItem.id).join(GRN, GRNItem.grn_id == GRN.id).filter(
+            GRNItem.item_name.in_(item_names),
+            GRN.status == GRNStatus.approved
+        ).order_by(Batch.id).all()
+        
+        batches_by_item = {}
+        for candidate in candidates:
+            batches_by_item.setdefault(candidate.item_name, []).append(candidate)
+        # Quantities left after earlier lines of this transfer claimed from the same batch
+        remaining = {candidate.id: candidate.qty or 0 for candidate in candidates}
+        
+        def pick(item_batches, quantity, batch_no=None, match_batch=True, store_match=None):
+            for candidate in item_batches:
+                if match_batch and candidate.batch_no != batch_no:
+                    continue
+                if store_match and not store_match(candidate.store):
+                    continue
+                if remaining[candidate.id] >= quantity:
+                    return candidate
+            return None
+        
+        # Pick a batch per line: same store first, then any store holding the batch
+        allocations = {}
+        movements = []
+        ledger_rows = []
         for item in transfer.items:
-            print(f"Processing item: {item.item_name}, location: {transfer.location}, batch: {item.batch_no}")
-            
-            # Find the actual batch record in the GRN system
-            from models.tenant_models import Item, GRN, GRNItem, Batch, GRNStatus
-            
-            # First, check what GRN stores exist for this item
-            available_stores = db.query(GRN.store).join(GRNItem).filter(
-                GRNItem.item_name == item.item_name,
-                GRN.status == GRNStatus.approved
-            ).distinct().all()
-            print(f"Available stores for {item.item_name}: {[store[0] for store in available_stores]}")
-            
+            item_batches = batches_by_item.get(item.item_name, [])
+            location = transfer.location or ""
             batch_record = None
             
-            # If batch_no is empty or None, find any available batch
+            # If batch_no is empty or None, take any batch at the transfer's store
             if not item.batch_no or item.batch_no.strip() == "":
-                print(f"Empty batch number, finding any available batch for {item.item_name}")
-                batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                    GRNItem.item_name == item.item_name,
-                    GRN.status == GRNStatus.approved,
-                    GRN.store == transfer.location,
-                    Batch.qty >= item.quantity
-                ).first()
-                
+                batch_record = pick(item_batches, item.quantity, match_batch=False,
+                                    store_match=lambda store: store == transfer.location)
                 if batch_record:
                     # Update the item with the found batch number
                     item.batch_no = batch_record.batch_no
-                    print(f"Found batch {batch_record.batch_no} for {item.item_name}")
             else:
-                # Try exact match first
-                batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                    GRNItem.item_name == item.item_name,
-                    Batch.batch_no == item.batch_no,
-                    GRN.status == GRNStatus.approved,
-                    GRN.store == transfer.location,
-                    Batch.qty >= item.quantity
-                ).first()
+                batch_record = pick(item_batches, item.quantity, item.batch_no,
+                                    store_match=lambda store: store == transfer.location)
             
-            # If not found, try case-insensitive match
+            # If not found, try case-insensitive store match
             if not batch_record:
-                batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                    GRNItem.item_name == item.item_name,
-                    Batch.batch_no == item.batch_no,
-                    GRN.status == GRNStatus.approved,
-                    func.lower(GRN.store) == func.lower(transfer.location),
-                    Batch.qty >= item.quantity
-                ).first()
+                batch_record = pick(item_batches, item.quantity, item.batch_no,
+                                    store_match=lambda store: (store or "").lower() == location.lower())
             
             # If still not found, try any location with this item and batch
             if not batch_record:
-                batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                    GRNItem.item_name == item.item_name,
-                    Batch.batch_no == item.batch_no,
-                    GRN.status == GRNStatus.approved,
-                    Batch.qty >= item.quantity
-                ).first()
-                
+                batch_record = pick(item_batches, item.quantity, item.batch_no)
                 if batch_record:
                     # Update transfer location to match where item actually exists
-                    actual_grn = db.query(GRN).join(GRNItem).join(Batch).filter(
-                        Batch.id == batch_record.id
-                    ).first()
-                    if actual_grn:
-                        print(f"Item found at {actual_grn.store}, updating transfer location from {transfer.location}")
-                        transfer.location = actual_grn.store
+                    print(f"Item found at {batch_record.store}, updating transfer location from {transfer.location}")
+                    transfer.location = batch_record.store
             
             if not batch_record:
+                available_stores = sorted({candidate.store for candidate in item_batches if candidate.store})
                 raise HTTPException(
                     status_code=400,
-                    detail=f"No suitable batch found for {item.item_name} with batch {item.batch_no} and sufficient quantity ({item.quantity}). Available stores: {[store[0] for store in available_stores]}"
-                )
-            
-            # Check if we have enough quantity
-            if batch_record.qty < item.quantity:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Insufficient stock in batch {batch_record.batch_no} for {item.item_name}. Available: {batch_record.qty}, Required: {item.quantity}"
+                    detail=f"No suitable batch found for {item.item_name} with batch {item.batch_no} and sufficient quantity ({item.quantity}). Available stores: {available_stores}"
                 )
             
-            # Reduce quantity from the actual batch
-            old_qty = batch_record.qty
-            batch_record.qty = batch_record.qty - item.quantity
-            print(f"SUCCESS: Reduced batch {batch_record.batch_no} for {item.item_name} from {old_qty} to {batch_record.qty}")
-            
-            # Create stock ledger entry using the batch record ID
-            try:
-                db.execute(text("""
-                    INSERT INTO stock_ledger (stock_id, batch_no, txn_type, qty_out, balance, ref_no, remarks, created_at)
-                    VALUES (:stock_id, :batch_no, 'ISSUE', :qty_out, :balance, :ref_no, :remarks, NOW())
-                """), {
-                    "stock_id": batch_record.id,
-                    "batch_no": item.batch_no,
-                    "qty_out": item.quantity,
-                    "balance": batch_record.qty,
-                    "ref_no": transfer.transfer_no,
-                    "remarks": f"External transfer to {transfer.staff_name}"
-                })
-            except Exception as ledger_error:
-                print(f"Warning: Could not create ledger entry: {ledger_error}")
+            remaining[batch_record.id] -= item.quantity
+            allocations[batch_record.id] = allocations.get(batch_record.id, 0) + item.quantity
+            movements.append(movement(item.item_name, batch_record.batch_no, batch_record.store, -item.quantity))
+            ledger_rows.append({
+                "stock_id": batch_record.id,
+                "batch_no": item.batch_no,
+                "qty_out": item.quantity,
+                "balance": remaining[batch_record.id],
+                "ref_no": transfer.transfer_no,
+                "remarks": f"External transfer to {transfer.staff_name}"
+            })
+        
+        # One conditional UPDATE for every batch; fails as a whole if a concurrent send took the stock
+        allocate_batches(db, allocations)
+        print(f"SUCCESS: Reduced {len(allocations)} batches for transfer {transfer.transfer_no}")
+        
+        # Create stock ledger entries using the batch record IDs
+        try:
+            db.execute(text("""
+                INSERT INTO stock_ledger (stock_id, batch_no, txn_type, qty_out, balance, ref_no, remarks, created_at)
+                VALUES (:stock_id, :batch_no, 'ISSUE', :qty_out, :balance, :ref_no, :remarks, NOW())
+            """), ledger_rows)
+        except Exception as ledger_error:
+            print(f"Warning: Could not create ledger entries: {ledger_error}")
+        
+        apply_movements(db, movements)
         
         # Update transfer status
         transfer.status = ExternalTransferStatus.SENT
         transfer.sent_at = datetime.now()
         
+        publish(db, "transfer.sent", {
+            "transfer_id": transfer.id, "transfer_no": transfer.transfer_no,
+            "items": sorted(item_names)
+        }, aggregate_id=transfer.id)
+        
         db.commit()
         print(f"COMMITTED: Transfer {transfer.transfer_no} sent successfully")
         db.refresh(transfer)
@@ -260,11 +275,13 @@ def return_transfer(transfer_id: int, return_data: ExternalTransferReturn, db: S
             transfer.return_deadline = return_data.return_deadline
         
         # Update return quantities for each item
+        items_by_id = {item.id: item for item in transfer.items}
+        transactions = []
+        good_returns = []
+        damage_rows = []
+        ledger_rows = []
         for return_item in return_data.items:
-            item = db.query(ExternalTransferItem).filter(
-                ExternalTransferItem.id == return_item.item_id,
-                ExternalTransferItem.transfer_id == transfer_id
-            ).first()
+            item = items_by_id.get(return_item.item_id)
             
             if not item:
                 continue
@@ -299,119 +316,102 @@ def return_transfer(transfer_id: int, return_data: ExternalTransferReturn, db: S
                 
                 # Log individual transactions
                 if return_item.returned_quantity > 0:
-                    db.execute(text("""
-                        INSERT INTO external_transfer_transactions 
-                        (transfer_id, item_id, transaction_type, quantity, transaction_date, remarks)
-                        VALUES (:transfer_id, :item_id, 'RETURN', :quantity, NOW(), :remarks)
-                    """), {
+                    transactions.append({
                         "transfer_id": transfer_id,
                         "item_id": item.id,
+                        "transaction_type": "RETURN",
                         "quantity": return_item.returned_quantity,
                         "remarks": f"Good return - {return_item.returned_quantity} units"
                     })
                 
                 if return_item.damaged_quantity > 0:
-                    db.execute(text("""
-                        INSERT INTO external_transfer_transactions 
-                        (transfer_id, item_id, transaction_type, quantity, transaction_date, remarks)
-                        VALUES (:transfer_id, :item_id, 'DAMAGE', :quantity, NOW(), :remarks)
-                    """), {
+                    transactions.append({
                         "transfer_id": transfer_id,
                         "item_id": item.id,
+                        "transaction_type": "DAMAGE",
                         "quantity": return_item.damaged_quantity,
                         "remarks": f"Damaged return - {return_item.damage_reason or 'No reason provided'}"
                     })
             
-            # Add good items back to stock
+            # Good items go back to stock below, in one statement
             if return_item.returned_quantity > 0:
-                print(f"Processing return for {item.item_name}, batch {item.batch_no}, quantity {return_item.returned_quantity}")
-                print(f"Transfer location: {transfer.location}")
-                
-                # Find the batch record in the GRN system - must match exact location and batch
-                from models.tenant_models import Item, GRN, GRNItem, Batch, GRNStatus
-                
-                # First try exact match with transfer location
-                batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                    GRNItem.item_name == item.item_name,
-                    Batch.batch_no == item.batch_no,
-                    GRN.status == GRNStatus.approved,
-                    GRN.store == transfer.location
-                ).first()
-                
-                print(f"Exact location match: {batch_record.id if batch_record else 'None'}")
-                
-                # If not found, try case-insensitive match
-                if not batch_record:
-                    batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                        GRNItem.item_name == item.item_name,
-                        Batch.batch_no == item.batch_no,
-                        GRN.status == GRNStatus.approved,
-                        func.lower(GRN.store) == func.lower(transfer.location)
-                    ).first()
-                    print(f"Case-insensitive match: {batch_record.id if batch_record else 'None'}")
-                
-                # If still not found, try fuzzy match but prefer same location
-                if not batch_record:
-                    batch_record = db.query(Batch).join(GRNItem).join(GRN).filter(
-                        GRNItem.item_name == item.item_name,
-                        Batch.batch_no == item.batch_no,
-                        GRN.status == GRNStatus.approved
-                    ).first()
-                    print(f"Any location match: {batch_record.id if batch_record else 'None'}")
-                    
-                    if batch_record:
-                        actual_grn = db.query(GRN).join(GRNItem).join(Batch).filter(
-                            Batch.id == batch_record.id
-                        ).first()
-                        print(f"WARNING: Returning to different location. Transfer: {transfer.location}, Actual: {actual_grn.store if actual_grn else 'Unknown'}")
-                
-                if batch_record:
-                    old_qty = batch_record.qty
-                    batch_record.qty = batch_record.qty + return_item.returned_quantity
-                    print(f"RETURN SUCCESS: Added {return_item.returned_quantity} back to batch {batch_record.batch_no} for {item.item_name}: {old_qty} -> {batch_record.qty}")
-                    
-                    # Verify the change
-                    db.flush()
-                    updated_batch = db.query(Batch).filter(Batch.id == batch_record.id).first()
-                    print(f"VERIFICATION: Batch {updated_batch.batch_no} now has quantity {updated_batch.qty}")
-                    
-                    # Create stock ledger entry for return
-                    try:
-                        db.execute(text("""
-                            INSERT INTO stock_ledger (stock_id, batch_no, txn_type, qty_in, balance, ref_no, remarks, created_at)
-                            VALUES (:stock_id, :batch_no, 'ADJUST_IN', :qty_in, :balance, :ref_no, :remarks, NOW())
-                        """), {
-                            "stock_id": batch_record.id,
-                            "batch_no": item.batch_no,
-                            "qty_in": return_item.returned_quantity,
-                            "balance": batch_record.qty,
-                            "ref_no": transfer.transfer_no,
-                            "remarks": f"Return from {transfer.staff_name}"
-                        })
-                        print(f"Created ledger entry for return")
-                    except Exception as ledger_error:
-                        print(f"Warning: Could not create return ledger entry: {ledger_error}")
-                else:
-                    print(f"ERROR: Could not find batch record to return {item.item_name} to")
+                good_returns.append((item, return_item.returned_quantity))
             
             # Track damaged items without adding to stock
             if return_item.damaged_quantity > 0:
-                print(f"Processing damaged return for {item.item_name}, batch {item.batch_no}, quantity {return_item.damaged_quantity}")
                 print(f"DAMAGE TRACKING: {return_item.damaged_quantity} units of {item.item_name} marked as damaged - NOT added to stock")
+                damage_rows.append({
+                    "batch_no": item.batch_no,
+                    "ref_no": transfer.transfer_no,
+                    "remarks": f"DAMAGE TRACKING ONLY - {return_item.damaged_quantity} units from {transfer.staff_name}: {return_item.damage_reason}"
+                })
+        
+        if transactions:
+            db.execute(text("""
+                INSERT INTO external_transfer_transactions 
+                (transfer_id, item_id, transaction_type, quantity, transaction_date, remarks)
+                VALUES (:transfer_id, :item_id, :transaction_type, :quantity, NOW(), :remarks)
+            """), transactions)
+        
+        if good_returns:
+            # Find the batch records in the GRN system - one query for every returned line
+            from models.tenant_models import GRN, GRNItem, Batch, GRNStatus
+            
+            candidates = db.query(
+                Batch.id, Batch.batch_no, Batch.qty, GRNItem.item_name, GRN.store
+            ).join(GRNItem, Batch.grn_item_id == GRNItem.id).join(GRN, GRNItem.grn_id == GRN.id).filter(
+                GRNItem.item_name.in_({item.item_name for item, _ in good_returns}),
+                Batch.batch_no.in_({item.batch_no for item, _ in good_returns}),
+                GRN.status == GRNStatus.approved
+            ).order_by(Batch.id).all()
+            
+            location = (transfer.location or "").lower()
+            balances = {candidate.id: candidate.qty or 0 for candidate in candidates}
+            additions = {}
+            movements = []
+            for item, quantity in good_returns:
+                matches = [c for c in candidates if c.item_name == item.item_name and c.batch_no == item.batch_no]
+                # Exact location first, then case-insensitive, then any location holding the batch
+                batch_record = (
+                    next((c for c in matches if c.store == transfer.location), None)
+                    or next((c for c in matches if (c.store or "").lower() == location), None)
+                    or next(iter(matches), None)
+                )
+                if not batch_record:
+                    print(f"ERROR: Could not find batch record to return {item.item_name} to")
+                    continue
+                if batch_record.store != transfer.location:
+                    print(f"WARNING: Returning to different location. Transfer: {transfer.location}, Actual: {batch_record.store}")
                 
-                # Create stock ledger entry for damaged return tracking only
-                try:
-                    db.execute(text("""
-                        INSERT INTO stock_ledger (stock_id, batch_no, txn_type, qty_in, balance, ref_no, remarks, created_at)
-                        VALUES (0, :batch_no, 'DAMAGE_TRACK', 0, 0, :ref_no, :remarks, NOW())
-                    """), {
-                        "batch_no": item.batch_no,
-                        "ref_no": transfer.transfer_no,
-                        "remarks": f"DAMAGE TRACKING ONLY - {return_item.damaged_quantity} units from {transfer.staff_name}: {return_item.damage_reason}"
-                    })
-                    print(f"Created damage tracking ledger entry - NO STOCK ADDED")
-                except Exception as ledger_error:
-                    print(f"Warning: Could not create damage tracking ledger entry: {ledger_error}")
+                balances[batch_record.id] += quantity
+                additions[batch_record.id] = additions.get(batch_record.id, 0) + quantity
+                movements.append(movement(item.item_name, batch_record.batch_no, batch_record.store, quantity))
+                ledger_rows.append({
+                    "stock_id": batch_record.id,
+                    "batch_no": item.batch_no,
+                    "txn_type": "ADJUST_IN",
+                    "qty_in": quantity,
+                    "balance": balances[batch_record.id],
+                    "ref_no": transfer.transfer_no,
+                    "remarks": f"Return from {transfer.staff_name}"
+                })
+            
+            release_batches(db, additions)
+            apply_movements(db, movements)
+            print(f"RETURN SUCCESS: Added stock back to {len(additions)} batches for transfer {transfer.transfer_no}")
+        
+        # Stock ledger entries for good returns and damage tracking (stock_id 0, nothing added)
+        ledger_rows += [
+            dict(row, stock_id=0, txn_type="DAMAGE_TRACK", qty_in=0, balance=0) for row in damage_rows
+        ]
+        if ledger_rows:
+            try:
+                db.execute(text("""
+                    INSERT INTO stock_ledger (stock_id, batch_no, txn_type, qty_in, balance, ref_no, remarks, created_at)
+                    VALUES (:stock_id, :batch_no, :txn_type, :qty_in, :balance, :ref_no, :remarks, NOW())
+                """), ledger_rows)
+            except Exception as ledger_error:
+                print(f"Warning: Could not create return ledger entries: {ledger_error}")
         
         # Check if all items are fully returned
         all_returned = all(
@@ -423,21 +423,15 @@ def return_transfer(transfer_id: int, return_data: ExternalTransferReturn, db: S
             transfer.status = ExternalTransferStatus.RETURNED
             transfer.returned_at = datetime.now()
         
+        publish(db, "transfer.returned", {
+            "transfer_id": transfer.id, "transfer_no": transfer.transfer_no,
+            "items": sorted({item.item_name for item, _ in good_returns}),
+            "fully_returned": all_returned
+        }, aggregate_id=transfer.id)
+        
         db.commit()
         print(f"COMMITTED: Return processed for transfer {transfer.transfer_no}")
         
-        # Final verification - check if batch quantities were actually updated
-        for item in transfer.items:
-            if item.returned_quantity > 0:
-                from models.tenant_models import Batch, GRNItem, GRN, GRNStatus
-                final_batch = db.query(Batch).join(GRNItem).join(GRN).filter(
-                    GRNItem.item_name == item.item_name,
-                    Batch.batch_no == item.batch_no,
-                    GRN.status == GRNStatus.approved
-                ).first()
-                if final_batch:
-                    print(f"FINAL CHECK: {item.item_name} batch {item.batch_no} final quantity: {final_batch.qty}")
-        
         db.refresh(transfer)
         return transfer
     except Exception as e:
@@ -815,57 +809,15 @@ def get_external_transfer(transfer_id: int, db: Session = Depends(get_tenant_db)
 
 @router.post("/check-deadlines")
 def check_return_deadlines(db: Session = Depends(get_tenant_db)):
-    """Check for upcoming return deadlines and send email alerts"""
+    """List upcoming return deadlines (the scheduler emails them daily; see send-deadline-alerts)"""
     try:
-        # Get transfers with upcoming deadlines (next 3 days)
-        tomorrow = datetime.now() + timedelta(days=1)
-        three_days = datetime.now() + timedelta(days=3)
-        
-        query = text("""
-            SELECT 
-                et.id,
-                et.transfer_no,
-                et.staff_name,
-                et.staff_email,
-                et.return_deadline,
-                et.location,
-                SUM(eti.quantity - COALESCE(eti.returned_quantity, 0) - COALESCE(eti.damaged_quantity, 0)) as pending_qty
-            FROM external_transfers et
-            JOIN external_transfer_items eti ON et.id = eti.transfer_id
-            WHERE et.return_deadline BETWEEN :tomorrow AND :three_days
-            AND et.status = 'SENT'
-            AND (eti.quantity - COALESCE(eti.returned_quantity, 0) - COALESCE(eti.damaged_quantity, 0)) > 0
-            GROUP BY et.id
-            HAVING pending_qty > 0
-        """)
-        
-        result = db.execute(query, {
-            'tomorrow': tomorrow.strftime('%Y-%m-%d'),
-            'three_days': three_days.strftime('%Y-%m-%d')
-        })
-        
-        alerts = []
-        for row in result:
-            transfer_no = row[1]
-            staff_name = row[2]
-            staff_email = row[3]
-            return_deadline = row[4]
-            location = row[5]
-            pending_qty = row[6]
-            
-            if staff_email:
-                days_left = (return_deadline - datetime.now().date()).days
-                
-                alert_info = {
-                    "transfer_no": transfer_no,
-                    "staff_name": staff_name,
-                    "staff_email": staff_email,
-                    "return_deadline": return_deadline.strftime('%d-%m-%Y'),
-                    "days_left": days_left,
-                    "pending_qty": int(pending_qty),
-                    "location": location
-                }
-                alerts.append(alert_info)
+        alerts = [
+            dict(deadline, return_deadline=deadline["return_deadline"].strftime('%d-%m-%Y'))
+            for deadline in upcoming_return_deadlines(db)
+            if deadline["staff_email"]
+        ]
+        for alert in alerts:
+            alert.pop("transfer_id")
         
         return {
             "message": f"Found {len(alerts)} transfers with upcoming deadlines",
@@ -877,72 +829,10 @@ def check_return_deadlines(db: Session = Depends(get_tenant_db)):
 
 @router.post("/send-deadline-alerts")
 def send_deadline_alerts(db: Session = Depends(get_tenant_db)):
-    """Send email alerts for upcoming return deadlines"""
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-    
-    def send_email(to_email, subject, body):
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = "inventory@company.com"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'html'))
-            
-            server = smtplib.SMTP("smtp.gmail.com", 587)
-            server.starttls()
-            server.login("your-email@gmail.com", "your-password")
-            server.sendmail("inventory@company.com", to_email, msg.as_string())
-            server.quit()
-            return True
-        except:
-            return False
-    
+    """Queue email alerts for upcoming return deadlines now instead of at the scheduled time"""
     try:
-        tomorrow = datetime.now() + timedelta(days=1)
-        three_days = datetime.now() + timedelta(days=3)
-        
-        query = text("""
-            SELECT et.transfer_no, et.staff_name, et.staff_email, et.return_deadline, et.location,
-                   SUM(eti.quantity - COALESCE(eti.returned_quantity, 0) - COALESCE(eti.damaged_quantity, 0)) as pending_qty
-            FROM external_transfers et
-            JOIN external_transfer_items eti ON et.id = eti.transfer_id
-            WHERE et.return_deadline BETWEEN :tomorrow AND :three_days
-            AND et.status = 'SENT' AND et.staff_email IS NOT NULL
-            AND (eti.quantity - COALESCE(eti.returned_quantity, 0) - COALESCE(eti.damaged_quantity, 0)) > 0
-            GROUP BY et.id HAVING pending_qty > 0
-        """)
-        
-        result = db.execute(query, {
-            'tomorrow': tomorrow.strftime('%Y-%m-%d'),
-            'three_days': three_days.strftime('%Y-%m-%d')
-        })
-        
-        sent_count = 0
-        for row in result:
-            transfer_no, staff_name, staff_email, return_deadline, location, pending_qty = row
-            days_left = (return_deadline - datetime.now().date()).days
-            
-            subject = f"Return Reminder: {transfer_no} - Due in {days_left} days"
-            body = f"""
-            <h2>Return Deadline Reminder</h2>
-            <p>Dear {staff_name},</p>
-            <p>You have <strong>{int(pending_qty)} items</strong> pending return for transfer <strong>{transfer_no}</strong>.</p>
-            <ul>
-                <li>Transfer: {transfer_no}</li>
-                <li>Location: {location}</li>
-                <li>Deadline: {return_deadline.strftime('%d-%m-%Y')}</li>
-                <li>Days Left: {days_left}</li>
-                <li>Pending Items: {int(pending_qty)}</li>
-            </ul>
-            <p>Please return all items by the deadline.</p>
-            """
-            
-            if send_email(staff_email, subject, body):
-                sent_count += 1
-        
-        return {"message": f"Sent {sent_count} email alerts"}
+        sent_count = queue_return_deadline_alerts(db)
+        return {"message": f"Queued {sent_count} email alerts"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -4,12 +4,17 @@ from sqlalchemy import func, and_
 from typing import Dict, List, Any
 from datetime import datetime, timedelta
 
-from database import get_tenant_db
+from database import get_tenant_db, get_tenant_sessionmaker
 from models.tenant_models import (
     Item, GRN, GRNItem, Batch, StockOverview, VendorPayment,
     PurchaseOrder, ReturnHeader, Customer, Vendor, StockLedger,
     IssueHeader, ExternalTransfer
 )
+from utils.dashboard_metrics import get_dashboard_metrics
+from utils.domain_events import publish
+from utils.logger import log_error
+from utils.reorder_engine import load_reorder_suggestions
+from utils.stock_projector import apply_movements, movement, rebuild_stock_overview
 
 router = APIRouter(prefix="/api/integration", tags=["System Integration"])
 
@@ -29,58 +34,22 @@ class InventoryWorkflowService:
             # Update GRN status
             grn.status = "approved"
             
-            # Update stock overview for each item
+            # Update stock overview per received batch
+            movements = []
             for grn_item in grn.items:
-                # Check if item exists in stock overview
-                stock_record = self.db.query(StockOverview).filter(
-                    and_(
-                        StockOverview.item_name == grn_item.item_name,
-                        StockOverview.location == grn.store
+                if grn_item.batches:
+                    movements.extend(
+                        movement(grn_item.item_name, batch.batch_no, grn.store, batch.qty, batch.expiry_date)
+                        for batch in grn_item.batches
                     )
-                ).first()
-                
-                if stock_record:
-                    # Update existing record
-                    stock_record.available_qty += int(grn_item.received_qty)
                 else:
-                    # Create new stock record
-                    # Get item details
-                    item = self.db.query(Item).filter(Item.name == grn_item.item_name).first()
-                    
-                    stock_record = StockOverview(
-                        item_name=grn_item.item_name,
-                        item_code=item.item_code if item else f"CODE_{grn_item.item_name[:10]}",
-                        location=grn.store,
-                        available_qty=int(grn_item.received_qty),
-                        min_stock=item.min_stock if item else 0,
-                        status="In Stock"
-                    )
-                    self.db.add(stock_record)
-                
-                # Update batch information
-                for batch in grn_item.batches:
-                    stock_record.batch_no = batch.batch_no
-                    if batch.expiry_date:
-                        stock_record.expiry_date = batch.expiry_date.isoformat()
-                    if batch.warranty_end_date:
-                        stock_record.warranty = batch.warranty_end_date.isoformat()
+                    movements.append(movement(grn_item.item_name, None, grn.store, grn_item.received_qty))
+            apply_movements(self.db, movements)
             
-            # Create vendor payment record
-            if grn.total_amount and grn.total_amount > 0:
-                existing_payment = self.db.query(VendorPayment).filter(
-                    VendorPayment.grn_number == grn.grn_number
-                ).first()
-                
-                if not existing_payment:
-                    payment = VendorPayment(
-                        grn_number=grn.grn_number,
-                        vendor_name=grn.vendor_name,
-                        invoice_number=grn.invoice_number,
-                        total_amount=grn.total_amount,
-                        outstanding_amount=grn.total_amount,
-                        payment_status="unpaid"
-                    )
-                    self.db.add(payment)
+            # Vendor payment and scorecard follow from the event, off the request
+            publish(self.db, "grn.approved", {
+                "grn_id": grn.id, "grn_number": grn.grn_number, "vendor_name": grn.vendor_name, "store": grn.store
+            }, aggregate_id=grn.id)
             
             self.db.commit()
             
@@ -103,6 +72,7 @@ class InventoryWorkflowService:
                 raise ValueError("Issue not found")
             
             # Update stock for each issued item
+            movements = []
             for issue_item in issue.items:
                 stock_record = self.db.query(StockOverview).filter(
                     StockOverview.item_name == issue_item.item_name
@@ -110,21 +80,20 @@ class InventoryWorkflowService:
                 
                 if stock_record:
                     if stock_record.available_qty >= issue_item.qty:
-                        stock_record.available_qty -= int(issue_item.qty)
-                        
-                        # Update status based on new quantity
-                        if stock_record.available_qty == 0:
-                            stock_record.status = "Out of Stock"
-                        elif stock_record.available_qty <= stock_record.min_stock:
-                            stock_record.status = "Low Stock"
-                        else:
-                            stock_record.status = "In Stock"
+                        movements.append(movement(
+                            issue_item.item_name, stock_record.batch_no, stock_record.location, -issue_item.qty
+                        ))
                     else:
                         raise ValueError(f"Insufficient stock for {issue_item.item_name}")
+            apply_movements(self.db, movements)
             
             # Update issue status
             issue.status = "COMPLETED"
             
+            publish(self.db, "stock.issued", {
+                "issue_id": issue.id, "issue_no": issue.issue_no, "items": [item.item_name for item in issue.items]
+            }, aggregate_id=issue.id)
+            
             self.db.commit()
             
             return {
@@ -138,36 +107,18 @@ class InventoryWorkflowService:
             raise e
     
     def generate_reorder_alerts(self) -> List[Dict[str, Any]]:
-        """Generate reorder alerts for low stock items"""
+        """Reorder alerts from the precomputed demand-based suggestions"""
         try:
-            low_stock_items = self.db.query(StockOverview).filter(
-                and_(
-                    StockOverview.available_qty <= StockOverview.min_stock,
-                    StockOverview.min_stock > 0
-                )
-            ).all()
-            
-            alerts = []
-            for item in low_stock_items:
-                # Find preferred vendor (most recent GRN)
-                recent_grn = self.db.query(GRN).join(
-                    GRNItem, GRN.id == GRNItem.grn_id
-                ).filter(
-                    GRNItem.item_name == item.item_name
-                ).order_by(GRN.grn_date.desc()).first()
-                
-                alert = {
-                    "item_name": item.item_name,
-                    "current_stock": item.available_qty,
-                    "min_stock": item.min_stock,
-                    "suggested_order_qty": item.min_stock * 2,
-                    "preferred_vendor": recent_grn.vendor_name if recent_grn else "Not Available",
-                    "location": item.location,
-                    "priority": "Critical" if item.available_qty == 0 else "High"
-                }
-                alerts.append(alert)
-            
-            return alerts
+            return [{
+                "item_name": suggestion.item_name,
+                "current_stock": suggestion.current_stock,
+                "min_stock": suggestion.min_stock,
+                "reorder_point": suggestion.reorder_point,
+                "suggested_order_qty": suggestion.suggested_order_qty,
+                "preferred_vendor": suggestion.preferred_vendor or "Not Available",
+                "location": "All Locations",
+                "priority": suggestion.priority
+            } for suggestion in load_reorder_suggestions(self.db)]
             
         except Exception as e:
             raise e
@@ -175,17 +126,12 @@ class InventoryWorkflowService:
 @router.post("/process-grn-approval/{grn_id}")
 def process_grn_approval(
     grn_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_tenant_db)
 ):
     """Process GRN approval workflow"""
     try:
         service = InventoryWorkflowService(db)
         result = service.process_grn_approval(grn_id)
-        
-        # Add background task to update related records
-        background_tasks.add_task(update_vendor_performance, grn_id, db)
-        
         return result
         
     except Exception as e:
@@ -216,6 +162,7 @@ def get_reorder_alerts(db: Session = Depends(get_tenant_db)):
             "total_alerts": len(alerts),
             "critical_count": len([a for a in alerts if a["priority"] == "Critical"]),
             "high_count": len([a for a in alerts if a["priority"] == "High"]),
+            "medium_count": len([a for a in alerts if a["priority"] == "Medium"]),
             "alerts": alerts
         }
         
@@ -230,7 +177,7 @@ def perform_data_integrity_check(db: Session = Depends(get_tenant_db)):
         
         # Check for items without stock records
         items_without_stock = db.query(Item).outerjoin(
-            StockOverview, Item.name == StockOverview.item_name
+            StockOverview, Item.id == StockOverview.item_id
         ).filter(StockOverview.id.is_(None)).count()
         
         if items_without_stock > 0:
@@ -308,7 +255,7 @@ def sync_all_inventory_data(
     """Sync all inventory data across modules"""
     try:
         # Add background tasks for data synchronization
-        background_tasks.add_task(sync_stock_from_grn, db)
+        background_tasks.add_task(sync_stock_from_grn, db.get_bind().url.database)
         background_tasks.add_task(sync_payment_records, db)
         background_tasks.add_task(update_stock_status, db)
         
@@ -322,15 +269,16 @@ def sync_all_inventory_data(
         raise HTTPException(status_code=500, detail=str(e))
 
 # Background task functions
-def update_vendor_performance(grn_id: int, db: Session):
-    """Update vendor performance metrics"""
-    # Implementation for vendor performance update
-    pass
-
-def sync_stock_from_grn(db: Session):
-    """Sync stock overview from GRN data"""
-    # Implementation for stock sync
-    pass
+def sync_stock_from_grn(tenant_db: str):
+    """Reconcile stock overview from GRN data in a session of its own"""
+    db = get_tenant_sessionmaker(tenant_db)()
+    try:
+        rebuild_stock_overview(db)
+    except Exception as e:
+        db.rollback()
+        log_error(e, location="Integration → sync_stock_from_grn")
+    finally:
+        db.close()
 
 def sync_payment_records(db: Session):
     """Sync payment records from GRN data"""
@@ -346,42 +294,43 @@ def update_stock_status(db: Session):
 def get_module_statistics(db: Session = Depends(get_tenant_db)):
     """Get statistics for all modules"""
     try:
+        metrics = get_dashboard_metrics(db)
         stats = {
             "items": {
-                "total": db.query(Item).count(),
-                "active": db.query(Item).filter(Item.is_active == True).count()
+                "total": metrics["items_total"],
+                "active": metrics["items_active"]
             },
             "vendors": {
-                "total": db.query(Vendor).count()
+                "total": metrics["vendors_total"]
             },
             "customers": {
-                "total": db.query(Customer).count(),
-                "active": db.query(Customer).filter(Customer.is_active == True).count()
+                "total": metrics["customers_total"],
+                "active": metrics["customers_active"]
             },
             "grns": {
-                "total": db.query(GRN).count(),
-                "pending": db.query(GRN).filter(GRN.status == "pending").count(),
-                "approved": db.query(GRN).filter(GRN.status == "approved").count()
+                "total": metrics["grns_total"],
+                "pending": metrics["grns_pending"],
+                "approved": metrics["grns_approved"]
             },
             "stock": {
-                "total_items": db.query(StockOverview).count(),
-                "in_stock": db.query(StockOverview).filter(StockOverview.status == "In Stock").count(),
-                "low_stock": db.query(StockOverview).filter(StockOverview.status == "Low Stock").count(),
-                "out_of_stock": db.query(StockOverview).filter(StockOverview.status == "Out of Stock").count()
+                "total_items": metrics["stock_records"],
+                "in_stock": metrics["stock_in_stock"],
+                "low_stock": metrics["stock_low_status"],
+                "out_of_stock": metrics["stock_out_of_stock"]
             },
             "returns": {
-                "total": db.query(ReturnHeader).count()
+                "total": metrics["returns_total"]
             },
             "external_transfers": {
-                "total": db.query(ExternalTransfer).count(),
-                "draft": db.query(ExternalTransfer).filter(ExternalTransfer.status == "DRAFT").count()
+                "total": metrics["transfers_total"],
+                "draft": metrics["transfers_draft"]
             }
         }
         
         return {
-            "generated_at": datetime.now().isoformat(),
+            "generated_at": metrics["computed_at"],
             "statistics": stats
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from database import get_tenant_db
 from models.tenant_models import InventoryLocation
 from schemas.tenant_schemas import InventoryLocationCreate, InventoryLocationResponse
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/inventory/locations", tags=["Inventory Locations"])
 DEFAULT_DB = "arun"
@@ -11,9 +12,12 @@ def get_db():
     yield from get_tenant_db(DEFAULT_DB)
 
 @router.get("/", response_model=list[InventoryLocationResponse])
-def list_locations(db: Session = Depends(get_db)):
-    locations = db.query(InventoryLocation).filter(InventoryLocation.is_active == True).all()
-    return locations
+def list_locations(request: Request, db: Session = Depends(get_db)):
+    return master_data_response(
+        request, db,
+        lambda: db.query(InventoryLocation).filter(InventoryLocation.is_active == True).all(),
+        schema=list[InventoryLocationResponse]
+    )
 
 @router.post("/", response_model=InventoryLocationResponse)
 def create_location(data: InventoryLocationCreate, db: Session = Depends(get_db)):
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from typing import List
 
 from database import get_tenant_db
 from models.tenant_models import Item, Category, SubCategory
 from schemas.tenant_schemas import ItemCreate, ItemUpdate, ItemResponse
+from utils.item_cache import invalidate_items
+from utils.master_data_cache import master_data_response
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
 
 DEFAULT_TENANT_DB = "arun"
 
@@ -27,12 +30,31 @@ def create_item(payload: ItemCreate, db: Session = Depends(get_db)):
     db.add(item)
     db.commit()
     db.refresh(item)
+    invalidate_items(db, [item.id])
     return item
 
 # ---------------- GET ALL ----------------
 @router.get("/")
-def list_items(db: Session = Depends(get_db)):
-    items = db.query(Item).order_by(Item.id.desc()).all()
+def list_items(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    return master_data_response(
+        request, db, lambda: _item_rows(db, page, filters, response), response=response
+    )
+
+def _item_rows(db: Session, page: PageParams, filters: ListFilters, response: Response):
+    query = apply_list_filters(db.query(Item), filters, date_column=Item.created_at)
+    # ?status=active|inactive
+    if filters.status:
+        if filters.status.lower() not in ("active", "inactive"):
+            raise HTTPException(400, "status must be 'active' or 'inactive'")
+        query = query.filter(Item.is_active == (filters.status.lower() == "active"))
+    items, next_cursor = keyset_page(query, Item.id, page, unpaged_order=(Item.id.desc(),))
+    set_next_cursor(response, next_cursor)
     
     # Get category and subcategory names
     categories = {cat.id: cat.name for cat in db.query(Category).all()}
@@ -150,6 +172,7 @@ def update_item(item_id: int, payload: ItemUpdate, db: Session = Depends(get_db)
 
     db.commit()
     db.refresh(item)
+    invalidate_items(db, [item.id])
     return item
 
 # ---------------- SOFT DELETE ----------------
@@ -161,6 +184,7 @@ def deactivate_item(item_id: int, db: Session = Depends(get_db)):
 
     item.is_active = False
     db.commit()
+    invalidate_items(db, [item.id])
     return {"message": "Item deactivated"}
 
 # ---------------- SEARCH ----------------
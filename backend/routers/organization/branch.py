@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from database import get_tenant_db
@@ -9,6 +9,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/branch", tags=["Branch"])
 
@@ -43,8 +44,10 @@ def create_branch(data: BranchCreate, db: Session = Depends(get_tenant_db)):
 # LIST ALL BRANCHES
 # --------------------------
 @router.get("/", response_model=list[BranchResponse])
-def list_branches(db: Session = Depends(get_tenant_db)):
-    return db.query(Branch).all()
+def list_branches(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(Branch).all(), schema=list[BranchResponse]
+    )
 
 
 # --------------------------
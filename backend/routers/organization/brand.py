@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from database import get_tenant_db
@@ -8,6 +8,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/brand", tags=["Brand"])
 
@@ -42,8 +43,10 @@ def create_brand(data: BrandCreate, db: Session = Depends(get_tenant_db)):
 # LIST BRANDS
 # --------------------------
 @router.get("/", response_model=list[BrandResponse])
-def list_brands(db: Session = Depends(get_tenant_db)):
-    return db.query(Brand).all()
+def list_brands(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(Brand).all(), schema=list[BrandResponse]
+    )
 
 
 # --------------------------
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from database import get_tenant_db
@@ -9,6 +9,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/category", tags=["Category"])
 
@@ -42,8 +43,10 @@ def create_category(data: CategoryCreate, db: Session = Depends(get_tenant_db)):
 # LIST ALL CATEGORIES
 # --------------------------
 @router.get("/", response_model=list[CategoryResponse])
-def list_categories(db: Session = Depends(get_tenant_db)):
-    return db.query(Category).all()
+def list_categories(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(Category).all(), schema=list[CategoryResponse]
+    )
 
 
 # --------------------------
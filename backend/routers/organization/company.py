@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from database import get_tenant_db
@@ -8,6 +8,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/company", tags=["Company"])
 
@@ -36,8 +37,10 @@ def create_company(data: CompanyCreate, db: Session = Depends(get_tenant_db)):
 # LIST ALL COMPANIES
 # --------------------------
 @router.get("/", response_model=list[CompanyResponse])
-def list_companies(db: Session = Depends(get_tenant_db)):
-    return db.query(Company).all()
+def list_companies(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(Company).all(), schema=list[CompanyResponse]
+    )
 
 
 # --------------------------
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -10,6 +10,7 @@ from models.tenant_models import (
     InventoryAlertRule
 )
 from schemas.tenant_schemas import *
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/inventory-rules", tags=["Inventory Rules"])
 DEFAULT_TENANT_DB = "arun"
@@ -32,8 +33,8 @@ def save_global_rules(payload: InventoryGlobalRuleCreate, db: Session = Depends(
 
 
 @router.get("/global", response_model=List[InventoryGlobalRuleResponse])
-def get_global_rules(db: Session = Depends(get_db)):
-    return db.query(InventoryGlobalRule).all()
+def get_global_rules(request: Request, db: Session = Depends(get_db)):
+    return master_data_response(request, db, lambda: db.query(InventoryGlobalRule).all(), schema=List[InventoryGlobalRuleResponse])
 
 
 # ---------------------------------------------------------
@@ -49,8 +50,8 @@ def create_item_rule(payload: ItemReorderRuleCreate, db: Session = Depends(get_d
 
 
 @router.get("/item", response_model=List[ItemReorderRuleResponse])
-def list_item_rules(db: Session = Depends(get_db)):
-    return db.query(ItemReorderRule).all()
+def list_item_rules(request: Request, db: Session = Depends(get_db)):
+    return master_data_response(request, db, lambda: db.query(ItemReorderRule).all(), schema=List[ItemReorderRuleResponse])
 
 
 # ---------------------------------------------------------
@@ -66,8 +67,8 @@ def save_lead_time(payload: LeadTimeCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/lead-time", response_model=List[LeadTimeResponse])
-def list_lead_times(db: Session = Depends(get_db)):
-    return db.query(ItemVendorLeadTime).all()
+def list_lead_times(request: Request, db: Session = Depends(get_db)):
+    return master_data_response(request, db, lambda: db.query(ItemVendorLeadTime).all(), schema=List[LeadTimeResponse])
 
 
 # ---------------------------------------------------------
@@ -84,5 +85,5 @@ def save_alert_rule(payload: InventoryAlertRuleCreate, db: Session = Depends(get
 
 
 @router.get("/alerts", response_model=List[InventoryAlertRuleResponse])
-def get_alert_rules(db: Session = Depends(get_db)):
-    return db.query(InventoryAlertRule).all()
+def get_alert_rules(request: Request, db: Session = Depends(get_db)):
+    return master_data_response(request, db, lambda: db.query(InventoryAlertRule).all(), schema=List[InventoryAlertRuleResponse])
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session, joinedload
 
 from database import get_tenant_db
@@ -9,6 +9,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/store", tags=["Store"])
 
@@ -43,8 +44,10 @@ def create_store(data: StoreCreate, db: Session = Depends(get_tenant_db)):
 # LIST ALL STORES
 # --------------------------
 @router.get("/", response_model=list[StoreResponse])
-def list_stores(db: Session = Depends(get_tenant_db)):
-    return db.query(Store).options(joinedload(Store.branch)).all()
+def list_stores(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(Store).options(joinedload(Store.branch)).all(), schema=list[StoreResponse]
+    )
 
 
 # --------------------------
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session, joinedload
 
 from database import get_tenant_db
@@ -9,6 +9,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/subcategory", tags=["SubCategory"])
 
@@ -43,16 +44,22 @@ def create_subcategory(data: SubCategoryCreate, db: Session = Depends(get_tenant
 # LIST ALL SUBCATEGORIES
 # --------------------------
 @router.get("/", response_model=list[SubCategoryResponse])
-def list_subcategories(db: Session = Depends(get_tenant_db)):
-    return db.query(SubCategory).options(joinedload(SubCategory.category)).all()
+def list_subcategories(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(SubCategory).options(joinedload(SubCategory.category)).all(), schema=list[SubCategoryResponse]
+    )
 
 
 # --------------------------
 # GET SUBCATEGORIES BY CATEGORY
 # --------------------------
 @router.get("/by-category/{category_id}", response_model=list[SubCategoryResponse])
-def get_subcategories_by_category(category_id: int, db: Session = Depends(get_tenant_db)):
-    return db.query(SubCategory).filter(SubCategory.category_id == category_id).all()
+def get_subcategories_by_category(category_id: int, request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db,
+        lambda: db.query(SubCategory).filter(SubCategory.category_id == category_id).all(),
+        schema=list[SubCategoryResponse]
+    )
 
 
 # --------------------------
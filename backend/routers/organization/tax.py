@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from database import get_tenant_db
@@ -8,6 +8,7 @@ from schemas.tenant_schemas import (
 )
 
 from utils.logger import log_api, log_error, log_audit
+from utils.master_data_cache import master_data_response
 
 router = APIRouter(prefix="/tax", tags=["Tax / GST / HSN"])
 
@@ -42,8 +43,10 @@ def create_tax_code(data: TaxCodeCreate, db: Session = Depends(get_tenant_db)):
 # LIST TAX CODES
 # --------------------------
 @router.get("/", response_model=list[TaxCodeResponse])
-def list_tax_codes(db: Session = Depends(get_tenant_db)):
-    return db.query(TaxCode).all()
+def list_tax_codes(request: Request, db: Session = Depends(get_tenant_db)):
+    return master_data_response(
+        request, db, lambda: db.query(TaxCode).all(), schema=list[TaxCodeResponse]
+    )
 
 
 # --------------------------
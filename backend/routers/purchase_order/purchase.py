@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from database import get_tenant_db
 from datetime import date
@@ -15,6 +15,9 @@ from models.tenant_models import (
 )
 
 from schemas.tenant_schemas import *
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
+from utils.master_data_cache import master_data_response
+from utils.email_outbox import enqueue_email
 
 router = APIRouter(
     prefix="/purchase",
@@ -77,8 +80,18 @@ def create_purchase_request_pr(data: PRCreate, db: Session = Depends(get_tenant_
 
 
 @router.get("/")
-def get_purchase_requests(db: Session = Depends(get_tenant_session)):
-    prs = db.query(PurchaseRequest).all()
+def get_purchase_requests(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_tenant_session)
+):
+    query = apply_list_filters(
+        db.query(PurchaseRequest), filters,
+        status_column=PurchaseRequest.status, date_column=PurchaseRequest.request_date
+    )
+    prs, next_cursor = keyset_page(query, PurchaseRequest.id, page)
+    set_next_cursor(response, next_cursor)
     return prs
 
 @router.get("/pr")
@@ -119,6 +132,14 @@ def list_purchase_orders(db: Session = Depends(get_tenant_session)):
     pos = db.query(PurchaseOrder).all()
     return pos
 
+# Registered ahead of /{pr_id}, which would otherwise capture "/items"
+@router.get("/items")
+def get_items_for_purchase(request: Request, db: Session = Depends(get_tenant_session)):
+    """Get all active item names for purchase forms"""
+    return master_data_response(
+        request, db, lambda: [item.name for item in db.query(Item.name).filter(Item.is_active == True).all()]
+    )
+
 @router.get("/{pr_id}")
 def get_purchase_request_by_id(pr_id: int, db: Session = Depends(get_tenant_session)):
     pr = db.query(PurchaseRequest).filter(PurchaseRequest.id == pr_id).first()
@@ -300,12 +321,7 @@ def update_po_tracking(data: POTrackingCreate, db: Session = Depends(get_tenant_
     }
 
 def send_tracking_email(po, tracking, status):
-    """Send professional tracking email based on status"""
-    import os
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
-    
+    """Queue professional tracking email based on status"""
     # Email templates based on status
     email_templates = {
         "Dispatched": {
@@ -425,26 +441,13 @@ NUTRYAH Supply Chain Team
     if not template:
         return
     
-    # SMTP Configuration
-    smtp_host = os.getenv('SMTP_HOST', 'smtp.office365.com')
-    smtp_port = int(os.getenv('SMTP_PORT', 587))
-    smtp_user = os.getenv('SMTP_USER', 'no-reply@nutryah.com')
-    smtp_password = os.getenv('SMTP_PASSWORD', 'Nutryah@123')
-    smtp_from = os.getenv('SMTP_FROM', 'NUTRYAH Supply Chain <no-reply@nutryah.com>')
-    
-    # Create email message
-    msg = MIMEMultipart()
-    msg['From'] = smtp_from
-    msg['To'] = 'vendor@example.com'  # Replace with actual vendor email
-    msg['Subject'] = template['subject']
-    msg.attach(MIMEText(template['body'], 'plain'))
-    
-    # Send email via SMTP
-    server = smtplib.SMTP(smtp_host, smtp_port)
-    server.starttls()
-    server.login(smtp_user, smtp_password)
-    server.send_message(msg)
-    server.quit()
+    # Queue for background delivery (utils/email_outbox.py)
+    enqueue_email(
+        to_email='vendor@example.com',  # Replace with actual vendor email
+        subject=template['subject'],
+        body=template['body'],
+        from_email=os.getenv('SMTP_FROM', 'NUTRYAH Supply Chain <no-reply@nutryah.com>')
+    )
 
 
 @router.get("/po-tracking")
@@ -484,16 +487,6 @@ def get_po_items(po_id: int, db: Session = Depends(get_tenant_session)):
     return []
 
 
-# =====================================================
-# ITEMS FOR PURCHASE MANAGEMENT
-# =====================================================
-@router.get("/items")
-def get_items_for_purchase(db: Session = Depends(get_tenant_session)):
-    """Get all active item names for purchase forms"""
-    items = db.query(Item.name).filter(Item.is_active == True).all()
-    return [item.name for item in items]
-
-
 # ---------------- UPDATE PURCHASE REQUEST ----------------
 @router.put("/{pr_id}")
 def update_purchase_request(pr_id: int, data: PRCreate, db: Session = Depends(get_tenant_session)):
@@ -574,13 +567,8 @@ def test_api():
 # ---------------- SEND EMAIL TO VENDOR ----------------
 @router.post("/send-email")
 def send_email_to_vendor(data: dict, db: Session = Depends(get_tenant_session)):
-    """Send email to vendor for approved PR"""
+    """Queue an email to the vendor for an approved PR"""
     try:
-        import os
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        
         # Get PR details with items
         pr = db.query(PurchaseRequest).filter(PurchaseRequest.id == data.get("pr_id")).first()
         if not pr:
@@ -609,34 +597,18 @@ Best regards,
 NUTRYAH Team
         """
         
-        # SMTP Configuration from .env
-        smtp_host = os.getenv('SMTP_HOST', 'smtp.office365.com')
-        smtp_port = int(os.getenv('SMTP_PORT', 587))
-        smtp_user = os.getenv('SMTP_USER', 'no-reply@nutryah.com')
-        smtp_password = os.getenv('SMTP_PASSWORD', 'Nutryah@123')
-        smtp_from = os.getenv('SMTP_FROM', 'NUTRYAH <no-reply@nutryah.com>')
-        
-        # Create email message
-        msg = MIMEMultipart()
-        msg['From'] = smtp_from
-        msg['To'] = data.get('vendor_email')
-        msg['Subject'] = data.get('subject')
-        msg.attach(MIMEText(email_body, 'plain'))
-        
-        # Send email via SMTP
-        server = smtplib.SMTP(smtp_host, smtp_port)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
+        # The outbox workers deliver it with the SMTP settings from .env
+        enqueue_email(data.get('vendor_email'), data.get('subject'), email_body)
         
         return {
-            "message": f"Email sent successfully to {data.get('vendor_email')}",
+            "message": f"Email queued for {data.get('vendor_email')}",
             "items_count": len(pr.items)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Email error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue email: {str(e)}")
 
 # ---------------- CREATE SAMPLE DATA ----------------
 @router.post("/create-sample")
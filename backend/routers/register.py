@@ -6,15 +6,12 @@ from schemas.register_schema import RegisterModel
 from models.register_models import Tenant
 from database import (
     get_master_db,
-    get_tenant_engine
+    bootstrap_tenant_db
 )
 import hashlib
 import re
 import traceback
 
-# Tenant model base (for creating tenant tables)
-from models.tenant_models import TenantBase
-
 # Logging
 from utils.logger import log_error, log_audit, log_api
 
@@ -82,24 +79,12 @@ def register(data: RegisterModel, db: Session = Depends(get_master_db)):
         log_audit(f"Tenant saved in master DB with ID: {tenant.id}")
 
         # -----------------------------------------------------
-        # STEP 1 → Create the tenant database
-        # -----------------------------------------------------
-        import pymysql
-        conn = pymysql.connect(host="localhost", user="root", password="", port=3306)
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {db_name}")
-        conn.close()
-        log_audit(f"Database created for tenant: {db_name}")
-
+        # Create, migrate and register the tenant database
         # -----------------------------------------------------
-        # STEP 2 → Create tables inside tenant DB
-        # -----------------------------------------------------
-        tenant_engine = get_tenant_engine(db_name)
-        TenantBase.metadata.create_all(bind=tenant_engine)
-
-        log_audit(f"Tenant tables created for database: {db_name}")
+        bootstrap_tenant_db(db_name)
+        log_audit(f"Tenant database ready: {db_name}")
 
-        # Send registration confirmation email
+        # Queue the registration confirmation email for the outbox workers
         email_sent = send_registration_email(
             admin_email=data.admin_email,
             organization_name=data.organization_name,
@@ -107,9 +92,9 @@ def register(data: RegisterModel, db: Session = Depends(get_master_db)):
         )
         
         if email_sent:
-            log_audit(f"Registration email sent to {data.admin_email}")
+            log_audit(f"Registration email queued for {data.admin_email}")
         else:
-            log_error(Exception("Email sending failed"), f"Failed to send registration email to {data.admin_email}")
+            log_error(Exception("Email queueing failed"), f"Failed to queue registration email to {data.admin_email}")
 
         return {
             "message": "Organization registered successfully",
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import date, datetime
@@ -8,15 +8,33 @@ from models.tenant_models import (
     DisposalTransaction, SalvageValuation,
     ReturnTypeEnum, ItemConditionEnum, DisposalMethodEnum
 )
-from utils.email import send_email
+from utils.email_outbox import enqueue_email
+from utils.domain_events import publish
+from utils.stock_projector import apply_movements, movement
+from utils.stock_mutation import decrement_batch_qty, release_batches, delete_batch_if_empty
+from utils.stock_ledger import batch_location
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
 from typing import List, Optional
 
 router = APIRouter(prefix="/returns", tags=["Return & Disposal"])
 
 @router.get("/")
-def list_returns(db: Session = Depends(get_tenant_db)):
-    """Get all returns with proper location data"""
-    returns = db.query(ReturnHeader).order_by(ReturnHeader.created_at.desc()).all()
+def list_returns(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_tenant_db)
+):
+    """Get returns with proper location data, newest first; ?limit=/?cursor= page it"""
+    query = apply_list_filters(
+        db.query(ReturnHeader), filters,
+        status_column=ReturnHeader.status, date_column=ReturnHeader.return_date,
+        location_columns=(ReturnHeader.location,)
+    )
+    returns, next_cursor = keyset_page(
+        query, ReturnHeader.id, page, unpaged_order=(ReturnHeader.created_at.desc(),)
+    )
+    set_next_cursor(response, next_cursor)
     
     # Convert to dict to ensure location field is included
     return_list = []
@@ -108,7 +126,8 @@ def create_return(return_data: dict, db: Session = Depends(get_tenant_db)):
                         qty_out=qty,
                         balance=stock.available_qty,
                         ref_no=return_no,
-                        remarks=f"Return to vendor: {return_data.get('supplier')}"
+                        remarks=f"Return to vendor: {return_data.get('supplier')}",
+                        location=location_value or batch_location(db, item_data.get('item_name'), item_data.get('batch_no'))
                     )
                     db.add(ledger)
                     
@@ -124,7 +143,8 @@ def create_return(return_data: dict, db: Session = Depends(get_tenant_db)):
                         qty_in=qty,
                         balance=stock.available_qty,
                         ref_no=return_no,
-                        remarks=f"Return from customer"
+                        remarks=f"Return from customer",
+                        location=location_value or batch_location(db, item_data.get('item_name'), item_data.get('batch_no'))
                     )
                     db.add(ledger)
     
@@ -154,18 +174,19 @@ def get_return_details(return_id: int, db: Session = Depends(get_tenant_db)):
 @router.get("/{return_id}/items")
 def get_return_items(return_id: int, db: Session = Depends(get_tenant_db)):
     """Get return items for a specific return with correct rates, warranty, and tax info"""
-    return_items = db.query(ReturnItem).filter(ReturnItem.return_id == return_id).all()
+    from models.tenant_models import Item
+    return_items = db.query(ReturnItem, Item).outerjoin(
+        Item, ReturnItem.item_id == Item.id
+    ).filter(ReturnItem.return_id == return_id).all()
     
     # Enhance items with correct rates, warranty, and tax
     enhanced_items = []
-    for item in return_items:
+    for item, master_item in return_items:
         # Use same logic as billing calculation
         rate = 30  # Default
         if hasattr(item, 'rate') and item.rate:
             rate = float(item.rate)
         else:
-            from models.tenant_models import Item
-            master_item = db.query(Item).filter(Item.name == item.item_name).first()
             if master_item:
                 rate = float(master_item.mrp or master_item.fixing_price or 30)
         
@@ -180,8 +201,6 @@ def get_return_items(return_id: int, db: Session = Depends(get_tenant_db)):
         # Get warranty info
         warranty_info = "N/A"
         try:
-            from models.tenant_models import Item, Batch, GRNItem, GRN
-            master_item = db.query(Item).filter(Item.name == item.item_name).first()
             if master_item and master_item.has_warranty:
                 if master_item.warranty_start_date and master_item.warranty_end_date:
                     warranty_info = f"{master_item.warranty_start_date} to {master_item.warranty_end_date}"
@@ -225,6 +244,7 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
     # Handle stock adjustments when return is approved
     if status == "APPROVED" and old_status != "APPROVED":
         return_items = db.query(ReturnItem).filter(ReturnItem.return_id == return_id).all()
+        movements = []
         
         for item in return_items:
             qty = float(item.qty)
@@ -239,11 +259,11 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                     GRN.store == return_header.location
                 ).first()
                 
-                if batch and batch.qty >= qty:
-                    batch.qty -= qty
+                # Deduct only if the batch still holds qty, decided by the UPDATE itself
+                if batch and decrement_batch_qty(db, batch.id, qty):
+                    movements.append(movement(item.item_name, item.batch_no, return_header.location, -qty))
                     print(f"TO_CUSTOMER: Reduced {qty} from batch {item.batch_no} in {return_header.location}")
-                    if batch.qty <= 0:
-                        db.delete(batch)
+                    delete_batch_if_empty(db, batch.id)
                         
             elif return_header.return_type == 'INTERNAL':
                 # Get from_location and to_location from return data
@@ -258,8 +278,8 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                     GRN.store == from_location
                 ).first()
                 
-                if from_batch and from_batch.qty >= qty:
-                    from_batch.qty -= qty
+                if from_batch and decrement_batch_qty(db, from_batch.id, qty):
+                    movements.append(movement(item.item_name, item.batch_no, from_location, -qty))
                     print(f"INTERNAL: Reduced {qty} from {from_location}")
                     
                     # Add to destination location (create new batch or add to existing)
@@ -281,7 +301,7 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                             ).first()
                             
                             if to_batch:
-                                to_batch.qty += qty
+                                release_batches(db, {to_batch.id: qty})
                             else:
                                 # Create new batch in destination
                                 new_batch = Batch(
@@ -292,6 +312,7 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                                     mfg_date=from_batch.mfg_date
                                 )
                                 db.add(new_batch)
+                            movements.append(movement(item.item_name, item.batch_no, to_location, qty, from_batch.expiry_date))
                     
                     print(f"INTERNAL: Added {qty} to {to_location}")
                     
@@ -305,7 +326,8 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                 ).first()
                 
                 if batch:
-                    batch.qty += qty
+                    release_batches(db, {batch.id: qty})
+                    movements.append(movement(item.item_name, item.batch_no, return_header.location, qty))
                     print(f"FROM_CUSTOMER: Added {qty} to batch {item.batch_no} in {return_header.location}")
                     
             elif return_header.return_type == 'EXTERNAL':
@@ -317,23 +339,19 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                     GRN.store == return_header.location
                 ).first()
                 
-                if batch and batch.qty >= qty:
-                    batch.qty -= qty
+                if batch and decrement_batch_qty(db, batch.id, qty):
                     print(f"EXTERNAL: Reduced {qty} from batch {item.batch_no} in {return_header.location}")
-                    if batch.qty <= 0:
-                        db.delete(batch)
-                    
-                    # Update StockOverview
-                    from models.tenant_models import StockOverview
-                    stock_overview = db.query(StockOverview).filter(
-                        StockOverview.item_name == item.item_name,
-                        StockOverview.batch_no == item.batch_no
-                    ).first()
-                    if stock_overview:
-                        stock_overview.available_qty -= int(qty)
-                        if stock_overview.available_qty <= 0:
-                            db.delete(stock_overview)
-                        print(f"EXTERNAL: Updated StockOverview for {item.item_name} batch {item.batch_no}")
+                    delete_batch_if_empty(db, batch.id)
+                    movements.append(movement(item.item_name, item.batch_no, return_header.location, -qty))
+        
+        # Keep stock_overview in step with the batch changes, in the same commit
+        apply_movements(db, movements)
+        
+        publish(db, "return.approved", {
+            "return_id": return_id,
+            "return_type": str(return_header.return_type),
+            "items": sorted({item.item_name for item in return_items})
+        }, aggregate_id=return_id)
     
     
     db.commit()
@@ -448,21 +466,17 @@ def generate_invoice_and_send_email(data: dict, db: Session = Depends(get_tenant
     # Generate invoice content
     invoice_content = generate_invoice_html(return_header, return_items, customer)
     
-    # Send email
+    # Queue email; the outbox worker delivers and retries it
     try:
-        success = send_email(
+        enqueue_email(
             to_email=customer_email,
             subject=f"Return Invoice - {return_header.return_no}",
             body=invoice_content,
             is_html=True
         )
-        
-        if success:
-            return {"message": "Invoice generated and sent successfully"}
-        else:
-            raise HTTPException(500, "Failed to send email")
+        return {"message": "Invoice generated and queued for email delivery"}
     except Exception as e:
-        raise HTTPException(500, f"Failed to send email: {str(e)}")
+        raise HTTPException(500, f"Failed to queue email: {str(e)}")
 
 def generate_invoice_html(return_header, return_items, customer):
     """Generate HTML invoice content"""
@@ -479,9 +493,13 @@ def generate_invoice_html(return_header, return_items, customer):
     db_gen = get_tenant_db("arun")
     db = next(db_gen)
     
+    # Item master rows for all lines in one query
+    item_ids = {item.item_id for item in return_items if item.item_id}
+    items_by_id = {i.id: i for i in db.query(Item).filter(Item.id.in_(item_ids)).all()} if item_ids else {}
+    
     for item in return_items:
         # Get item details from Item table
-        item_record = db.query(Item).filter(Item.name == item.item_name).first()
+        item_record = items_by_id.get(item.item_id)
         mrp_price = float(item_record.mrp) if item_record and item_record.mrp else 100.0
         tax_rate = float(item_record.tax) if item_record and item_record.tax else 18.0
         
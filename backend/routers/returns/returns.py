@@ -1,18 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from database import get_tenant_db
 from models.tenant_models import ReturnHeader, ReturnItem, ReturnTypeEnum, ItemConditionEnum
 from datetime import datetime, date
 from typing import List
+from utils.stock_projector import apply_movements, movement
+from utils.stock_mutation import release_batches
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
 
 router = APIRouter(prefix="/returns", tags=["Returns & Disposal"])
 
 @router.get("/")
-def list_returns(db: Session = Depends(get_tenant_db)):
-    """Get all returns with existing invoice info"""
+def list_returns(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_tenant_db)
+):
+    """Get returns with existing invoice info, newest first; ?limit=/?cursor= page it"""
     from models.tenant_models import Billing
     
-    returns = db.query(ReturnHeader).order_by(ReturnHeader.created_at.desc()).all()
+    query = apply_list_filters(
+        db.query(ReturnHeader), filters,
+        status_column=ReturnHeader.status, date_column=ReturnHeader.return_date,
+        location_columns=(ReturnHeader.location,)
+    )
+    returns, next_cursor = keyset_page(
+        query, ReturnHeader.id, page, unpaged_order=(ReturnHeader.created_at.desc(),)
+    )
+    set_next_cursor(response, next_cursor)
     
     # Add existing invoice info to each return
     result = []
@@ -163,7 +179,7 @@ def get_return_items(return_id: int, db: Session = Depends(get_tenant_db)):
 @router.patch("/{return_id}/status")
 def update_return_status(return_id: int, status: str, db: Session = Depends(get_tenant_db)):
     """Update return status and adjust inventory if approved"""
-    from models.tenant_models import Batch, GRNItem, GRN, GRNStatus, StockOverview, Billing
+    from models.tenant_models import Batch, GRNItem, GRN, GRNStatus, Billing
     
     return_header = db.query(ReturnHeader).filter(ReturnHeader.id == return_id).first()
     if not return_header:
@@ -178,6 +194,7 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
         
         # Calculate refund amount
         total_refund = 0
+        movements = []
         for item in return_items:
             refund_amount = item.qty * item.rate
             total_refund += refund_amount
@@ -197,28 +214,9 @@ def update_return_status(return_id: int, status: str, db: Session = Depends(get_
                     
                     if batch:
                         batch.qty += item.qty
-                        
-                        # Update StockOverview
-                        stock_overview = db.query(StockOverview).filter(
-                            StockOverview.item_name == item.item_name,
-                            StockOverview.batch_no == item.batch_no
-                        ).first()
-                        if stock_overview:
-                            stock_overview.available_qty += int(item.qty)
-                            if stock_overview.available_qty >= stock_overview.min_stock:
-                                stock_overview.status = "Good"
-                        else:
-                            # Create stock overview if doesn't exist
-                            stock_overview = StockOverview(
-                                item_name=item.item_name,
-                                item_code=f"ITM-{item.item_name[:3].upper()}",
-                                location="Main Store",
-                                available_qty=int(item.qty),
-                                min_stock=10,
-                                batch_no=item.batch_no,
-                                status="Good"
-                            )
-                            db.add(stock_overview)
+                        movements.append(movement(item.item_name, item.batch_no, grn_item.grn.store, item.qty, batch.expiry_date))
+        
+        apply_movements(db, movements)
         
         # Update existing billing with negative balance for refund
         if return_header.return_type == "FROM_CUSTOMER" and return_header.reference_no and total_refund > 0:
@@ -270,7 +268,7 @@ def update_return_item(return_id: int, item_id: int, item_data: dict, db: Sessio
 @router.post("/{return_id}/process-return")
 def process_item_return(return_id: int, return_data: dict, db: Session = Depends(get_tenant_db)):
     """Process item return - add stock back and update returned quantity"""
-    from models.tenant_models import Batch, GRNItem, GRN, GRNStatus, StockOverview
+    from models.tenant_models import Batch, GRNItem, GRN, GRNStatus
     from sqlalchemy import text
     
     item_name = return_data.get('item_name')
@@ -302,18 +300,11 @@ def process_item_return(return_id: int, return_data: dict, db: Session = Depends
     if not batch:
         raise HTTPException(404, "Batch not found in approved stock")
     
-    # Add returned quantity back to batch
-    batch.qty += quantity
+    # Add returned quantity back to batch (an increment in the database, no read-modify-write)
+    release_batches(db, {batch.id: quantity})
     
-    # Update StockOverview table if it exists
-    stock_overview = db.query(StockOverview).filter(
-        StockOverview.item_name == item_name,
-        StockOverview.batch_no == batch_no
-    ).first()
-    if stock_overview:
-        stock_overview.available_qty += quantity
-        if stock_overview.available_qty >= stock_overview.min_stock:
-            stock_overview.status = "Good"
+    # Keep stock_overview in step with the batch
+    apply_movements(db, [movement(item_name, batch_no, batch.item.grn.store, quantity, batch.expiry_date)])
     
     # Update the returned_qty in return_item
     return_item.returned_qty = new_returned_qty
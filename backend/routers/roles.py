@@ -10,7 +10,7 @@ from schemas.tenant_schemas import (
     RoleCreate, RoleUpdate, RoleResponse,
     PermissionCreate, PermissionResponse
 )
-from utils.auth import check_permission
+from utils.auth import check_permission, bump_role_version
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
@@ -139,6 +139,7 @@ def update_role(
         role.permissions = perms
 
     db.commit()
+    bump_role_version(DEFAULT_TENANT_DB)
     db.refresh(role)
     return role
 
@@ -158,4 +159,5 @@ def delete_role(
 
     db.delete(role)
     db.commit()
+    bump_role_version(DEFAULT_TENANT_DB)
     return {"message": "Role deleted successfully"}
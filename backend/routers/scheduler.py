@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from database import get_master_db, bootstrap_tenant_db, get_tenant_sessionmaker, list_tenant_databases
+from models.register_models import ScheduledJobRun
+from utils.pagination import PageParams, keyset_page, set_next_cursor
+from utils.scheduler import get_scheduler, registered_jobs, latest_runs, run_job, run_to_dict
+
+router = APIRouter(prefix="/api/scheduler", tags=["Scheduler"])
+
+@router.get("/jobs")
+def list_jobs(db: Session = Depends(get_master_db)):
+    """Registered jobs, their schedule and the latest run per tenant"""
+    try:
+        last_runs = {}
+        for (job_name, tenant), run in sorted(latest_runs(db).items()):
+            last_runs.setdefault(job_name, []).append(run_to_dict(run))
+
+        scheduler = get_scheduler()
+        return {
+            "leader": bool(scheduler and scheduler.is_leader),
+            "holder": scheduler.holder if scheduler else None,
+            "jobs": [{
+                "name": job.name,
+                "interval_seconds": job.interval,
+                "daily_at": job.daily_at,
+                "last_runs": last_runs.get(job.name, [])
+            } for job in registered_jobs().values()]
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/runs")
+def list_runs(
+    response: Response,
+    job_name: Optional[str] = None,
+    tenant: Optional[str] = None,
+    status: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_master_db)
+):
+    """Run history, newest first (next page cursor in X-Next-Cursor)"""
+    query = db.query(ScheduledJobRun)
+    if job_name:
+        query = query.filter(ScheduledJobRun.job_name == job_name)
+    if tenant:
+        query = query.filter(ScheduledJobRun.tenant == tenant)
+    if status:
+        query = query.filter(ScheduledJobRun.status == status)
+
+    runs, next_cursor = keyset_page(query, ScheduledJobRun.id, page, unpaged_order=(ScheduledJobRun.id.desc(),))
+    set_next_cursor(response, next_cursor)
+    return [run_to_dict(run) for run in runs]
+
+@router.post("/jobs/{job_name}/run")
+def run_job_now(job_name: str, tenant: str = "arun"):
+    """Run a job for one tenant now, outside its schedule; the run is recorded as manual"""
+    job = registered_jobs().get(job_name)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_name}'")
+    if tenant not in list_tenant_databases():
+        raise HTTPException(status_code=404, detail=f"Unknown tenant '{tenant}'")
+
+    try:
+        bootstrap_tenant_db(tenant)
+        return run_job(job, tenant, get_tenant_sessionmaker(tenant), trigger="manual")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
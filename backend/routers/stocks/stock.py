@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from database import get_tenant_db
 from models.tenant_models import Stock, StockLedger, StockTransfer, StockIssue, Item, GRNItem, Batch, Department
 from schemas.tenant_schemas import *
 from datetime import datetime, date, timedelta
-from typing import List
+from typing import List, Optional
+from utils.stock_aggregation import (
+    get_active_items, get_item_stock_summary, get_received_qty_by_item,
+    get_issued_qty_by_item, get_expiring_batches, DEFAULT_LOCATION
+)
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
+from utils.stock_checkpoints import stock_balances_as_of, refresh_checkpoints
+from utils.stock_mutation import decrement_batch_qty, release_batches, delete_batch_if_empty
+from utils.master_data_cache import master_data_response
+from utils.stock_ledger import batch_location
 
 router = APIRouter(prefix="/stocks", tags=["Stock Management"])
 DEFAULT_DB = "arun"
@@ -17,40 +26,25 @@ def get_db():
 @router.get("/")
 def list_stock(db: Session = Depends(get_db)):
     # Get all active items from item master
-    items = db.query(Item).filter(Item.is_active == True).all()
+    items = get_active_items(db)
+    
+    # Batches and latest receipt location for every item in a few grouped queries
+    summary = get_item_stock_summary(db)
     
     result = []
     for item in items:
-        # Get all batches for this item from approved GRNs
-        from models.tenant_models import GRN, GRNStatus
-        approved_grn_items = db.query(GRNItem).join(GRN).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).all()
-        
-        # Get all batches for this item
-        all_batches = []
-        total_qty = 0
-        
-        for grn_item in approved_grn_items:
-            batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all()
-            for batch in batches:
-                batch_info = {
-                    "batch_no": batch.batch_no,
-                    "qty": batch.qty,
-                    "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
-                    "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None
-                }
-                all_batches.append(batch_info)
-                total_qty += batch.qty
+        entry = summary.get(item.id, {})
         
-        # Get location from the latest approved GRN
-        latest_grn = db.query(GRN).join(GRNItem).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).order_by(GRN.grn_date.desc()).first()
+        all_batches = [{
+            "batch_no": batch.batch_no,
+            "qty": batch.qty,
+            "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
+            "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None
+        } for batch in entry.get("batches", [])]
+        total_qty = entry.get("total_qty", 0)
         
-        location = latest_grn.store if latest_grn else "Main Store"
+        # Location from the latest approved GRN
+        location = entry.get("location", DEFAULT_LOCATION)
         
         stock_data = {
             "id": item.id,
@@ -107,7 +101,8 @@ def migrate_stock_data(db: Session = Depends(get_db)):
                         qty_out=0,
                         balance=stock.available_qty,
                         ref_no=grn.grn_number,
-                        remarks=f"Migration: {grn.vendor_name} - Batch {batch.batch_no}"
+                        remarks=f"Migration: {grn.vendor_name} - Batch {batch.batch_no}",
+                        location=grn.store or DEFAULT_LOCATION
                     )
                     db.add(ledger)
                     stock_count += 1
@@ -187,7 +182,8 @@ def adjust_stock(data: StockAdjustmentCreate, db: Session = Depends(get_db)):
         qty_in=qty_in,
         qty_out=qty_out,
         balance=stock.available_qty,
-        remarks=data.reason
+        remarks=data.reason,
+        location=data.location or batch_location(db, data.item_name, data.batch_no)
     )
 
     db.add(ledger)
@@ -197,11 +193,15 @@ def adjust_stock(data: StockAdjustmentCreate, db: Session = Depends(get_db)):
 
 # ---------------- TRANSFER ----------------
 @router.get("/stores")
-def get_stores(db: Session = Depends(get_db)):
+def get_stores(request: Request, db: Session = Depends(get_db)):
     """Get all stores for transfer dropdown"""
     from models.tenant_models import Store
-    stores = db.query(Store).filter(Store.is_active == True).all()
-    return [{"id": store.id, "name": store.name, "code": store.code} for store in stores]
+
+    def load():
+        stores = db.query(Store).filter(Store.is_active == True).all()
+        return [{"id": store.id, "name": store.name, "code": store.code} for store in stores]
+
+    return master_data_response(request, db, load)
 
 @router.post("/transfer")
 def transfer_stock(data: StockTransferCreate, db: Session = Depends(get_db)):
@@ -229,35 +229,66 @@ def transfer_stock(data: StockTransferCreate, db: Session = Depends(get_db)):
     # For internal transfers, stock quantities remain the same
     # Only create ledger entries to track the movement
     
-    # Create ledger entry for the transfer
-    ledger = StockLedger(
+    # Out of the source store and into the destination: per-store balances move, the total does not
+    ref_no = f"TRF-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+    remarks = f"Internal transfer: {data.qty} units from {data.from_store} to {data.to_store}"
+    ledger_out = StockLedger(
         stock_id=stock.id,
+        batch_no=data.batch_no,
         txn_type="TRANSFER",
-        qty_in=0,  # No change in total stock
-        qty_out=0,  # No change in total stock
+        qty_in=0,
+        qty_out=data.qty,
         balance=stock.available_qty,  # Balance remains same
-        ref_no=f"TRF-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
-        remarks=f"Internal transfer: {data.qty} units from {data.from_store} to {data.to_store}"
+        ref_no=ref_no,
+        remarks=remarks,
+        location=data.from_store
+    )
+    ledger_in = StockLedger(
+        stock_id=stock.id,
+        batch_no=data.batch_no,
+        txn_type="TRANSFER",
+        qty_in=data.qty,
+        qty_out=0,
+        balance=stock.available_qty,
+        ref_no=ref_no,
+        remarks=remarks,
+        location=data.to_store
     )
     
     db.add(transfer)
-    db.add(ledger)
+    db.add_all([ledger_out, ledger_in])
     db.commit()
     return {"message": f"Stock transferred successfully: {data.qty} units moved from {data.from_store} to {data.to_store}"}
 
 @router.get("/transfers")
-def list_transfers(db: Session = Depends(get_db)):
-    """List all stock transfers"""
-    transfers = db.query(StockTransfer).order_by(StockTransfer.created_at.desc()).all()
+def list_transfers(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """List stock transfers, newest first; ?location= matches either store"""
+    query = apply_list_filters(
+        db.query(StockTransfer), filters,
+        status_column=StockTransfer.status, date_column=StockTransfer.created_at,
+        location_columns=(StockTransfer.from_store, StockTransfer.to_store)
+    )
+    transfers, next_cursor = keyset_page(
+        query, StockTransfer.id, page, unpaged_order=(StockTransfer.created_at.desc(),)
+    )
+    set_next_cursor(response, next_cursor)
     return transfers
 
 
 # ---------------- ISSUE ----------------
 @router.get("/departments")
-def get_departments(db: Session = Depends(get_db)):
+def get_departments(request: Request, db: Session = Depends(get_db)):
     """Get all departments for stock issue dropdown"""
-    departments = db.query(Department).filter(Department.is_active == True).all()
-    return [{"id": dept.id, "name": dept.name} for dept in departments]
+    def load():
+        departments = db.query(Department).filter(Department.is_active == True).all()
+        return [{"id": dept.id, "name": dept.name} for dept in departments]
+
+    return master_data_response(request, db, load)
 
 @router.post("/issue")
 def issue_stock(data: StockIssueCreate, db: Session = Depends(get_db)):
@@ -287,8 +318,10 @@ def issue_stock(data: StockIssueCreate, db: Session = Depends(get_db)):
         txn_type="ISSUE",
         qty_out=data.qty,
         balance=stock.available_qty,
+        batch_no=data.batch_no,
         ref_no=issue.issue_no,
-        remarks=f"Issued to {data.department} - {data.reason}"
+        remarks=f"Issued to {data.department} - {data.reason}",
+        location=data.location or batch_location(db, data.item_name, data.batch_no)
     )
     
     db.add(issue)
@@ -297,41 +330,39 @@ def issue_stock(data: StockIssueCreate, db: Session = Depends(get_db)):
     return {"message": "Stock issued successfully", "issue_no": issue.issue_no}
 
 @router.get("/issues")
-def list_issues(db: Session = Depends(get_db)):
-    """List all stock issues"""
-    issues = db.query(StockIssue).order_by(StockIssue.created_at.desc()).all()
+def list_issues(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """List stock issues, newest first; ?location= matches the department"""
+    query = apply_list_filters(
+        db.query(StockIssue), filters,
+        status_column=StockIssue.status, date_column=StockIssue.created_at,
+        location_columns=(StockIssue.department,)
+    )
+    issues, next_cursor = keyset_page(query, StockIssue.id, page, unpaged_order=(StockIssue.created_at.desc(),))
+    set_next_cursor(response, next_cursor)
     return issues
 
 # ---------------- DASHBOARD & ALERTS ----------------
 @router.get("/dashboard")
 def stock_dashboard(db: Session = Depends(get_db)):
     """Real-time stock dashboard with alerts"""
-    from models.tenant_models import GRN, GRNStatus
-    
     # Get all items with stock data
-    items = db.query(Item).filter(Item.is_active == True).all()
+    items = get_active_items(db)
+    
+    # Received and issued totals for every item in two grouped queries
+    received_by_item = get_received_qty_by_item(db)
+    issued_by_item = get_issued_qty_by_item(db)
     
     low_stock_alerts = []
     expiry_alerts = []
     stock_movements = []
     
     for item in items:
-        # Calculate current stock from approved GRNs
-        approved_grn_items = db.query(GRNItem).join(GRN).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).all()
-        
-        current_qty = sum(grn_item.received_qty for grn_item in approved_grn_items)
-        
-        # Subtract issued quantities
-        issued_qty = db.query(func.sum(StockIssue.qty)).filter(
-            StockIssue.stock_id.in_(
-                db.query(Stock.id).filter(Stock.item_name == item.name)
-            )
-        ).scalar() or 0
-        
-        available_qty = current_qty - issued_qty
+        available_qty = received_by_item.get(item.id, 0) - issued_by_item.get(item.id, 0)
         
         # Check for low stock alerts
         if item.min_stock and available_qty <= item.min_stock:
@@ -341,34 +372,30 @@ def stock_dashboard(db: Session = Depends(get_db)):
                 "min_stock": item.min_stock,
                 "shortage": item.min_stock - available_qty
             })
-        
-        # Check for expiry alerts (items expiring in next 30 days)
-        expiring_batches = db.query(Batch).join(GRNItem).join(GRN).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved,
-            Batch.expiry_date <= date.today() + timedelta(days=30),
-            Batch.expiry_date >= date.today()
-        ).all()
-        
-        for batch in expiring_batches:
-            days_to_expiry = (batch.expiry_date - date.today()).days
-            expiry_alerts.append({
-                "item_name": item.name,
-                "batch_no": batch.batch_no,
-                "expiry_date": batch.expiry_date,
-                "days_to_expiry": days_to_expiry,
-                "qty": batch.qty
-            })
+    
+    # Check for expiry alerts (items expiring in next 30 days)
+    active_ids = {item.id for item in items}
+    for batch in get_expiring_batches(db, date.today(), date.today() + timedelta(days=30)):
+        if batch.item_id not in active_ids:
+            continue
+        expiry_alerts.append({
+            "item_name": batch.item_name,
+            "batch_no": batch.batch_no,
+            "expiry_date": batch.expiry_date,
+            "days_to_expiry": (batch.expiry_date - date.today()).days,
+            "qty": batch.qty
+        })
     
     # Get recent stock movements
-    recent_movements = db.query(StockLedger).order_by(
+    recent_movements = db.query(StockLedger, Stock.item_name).outerjoin(
+        Stock, Stock.id == StockLedger.stock_id
+    ).order_by(
         StockLedger.created_at.desc()
     ).limit(10).all()
     
-    for movement in recent_movements:
-        stock = db.query(Stock).filter(Stock.id == movement.stock_id).first()
+    for movement, item_name in recent_movements:
         stock_movements.append({
-            "item_name": stock.item_name if stock else "Unknown",
+            "item_name": item_name or "Unknown",
             "txn_type": movement.txn_type,
             "qty_in": movement.qty_in,
             "qty_out": movement.qty_out,
@@ -421,35 +448,92 @@ def get_stock_movements(limit: int = 50, db: Session = Depends(get_db)):
     return result
 
 @router.get("/ledger")
-def get_stock_ledger(db: Session = Depends(get_db)):
-    """Get stock ledger with batch information from GRN data"""
+def get_stock_ledger(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """Get the stock ledger, newest first; ?limit=/?cursor= page it"""
     from models.tenant_models import GRN, GRNStatus
     
     ledger_entries = []
-    
-    # Get all approved GRNs with their items and batches
-    approved_grns = db.query(GRN).filter(GRN.status == GRNStatus.approved).order_by(GRN.grn_date.desc()).all()
-    
-    for grn in approved_grns:
-        grn_items = db.query(GRNItem).filter(GRNItem.grn_id == grn.id).all()
+    source = page.after.get("source", "ledger") if page.after else "ledger"
+    
+    # Stock ledger entries are the actual transactions; item names come from one outer join.
+    # GRN receipts stand in only while the ledger is empty: a filter that matches no
+    # ledger rows gets an empty page, not a different dataset
+    if source == "ledger" and (page.after or db.query(StockLedger.id).first() is not None):
+        query = apply_list_filters(
+            db.query(StockLedger, Stock.item_name).outerjoin(Stock, Stock.id == StockLedger.stock_id),
+            filters, date_column=StockLedger.created_at, location_columns=(StockLedger.location,)
+        )
+        rows, next_cursor = keyset_page(
+            query, StockLedger.id, page, id_of=lambda row: row.StockLedger.id,
+            unpaged_order=(StockLedger.created_at.desc(),)
+        )
         
-        for grn_item in grn_items:
-            batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all()
-            
-            for batch in batches:
-                ledger_entries.append({
-                    "date": grn.grn_date.strftime("%d/%m/%Y"),
-                    "item_name": grn_item.item_name,
-                    "batch_no": batch.batch_no,
-                    "txn_type": "GRN_RECEIPT",
-                    "qty_in": batch.qty,
-                    "qty_out": 0,
-                    "balance": batch.qty,
-                    "ref_no": grn.grn_number
-                })
+        for entry, item_name in rows:
+            ledger_entries.append({
+                "date": entry.created_at.strftime("%d/%m/%Y"),
+                "item_name": item_name or "Unknown",
+                "batch_no": entry.batch_no or "—",
+                "location": entry.location or DEFAULT_LOCATION,
+                "txn_type": entry.txn_type,
+                "qty_in": entry.qty_in or 0,
+                "qty_out": entry.qty_out or 0,
+                "balance": entry.balance,
+                "ref_no": entry.ref_no or "—"
+            })
+        
+        set_next_cursor(response, next_cursor)
+        return ledger_entries
+    
+    # Approved GRN batches in one joined query instead of a walk per GRN / item / batch
+    query = apply_list_filters(
+        db.query(
+            Batch.id, Batch.batch_no, Batch.qty, GRNItem.item_name, GRN.grn_date, GRN.grn_number, GRN.store
+        ).join(GRNItem, Batch.grn_item_id == GRNItem.id).join(GRN, GRNItem.grn_id == GRN.id).filter(
+            GRN.status == GRNStatus.approved
+        ),
+        filters, date_column=GRN.grn_date, location_columns=(GRN.store,)
+    )
+    rows, next_cursor = keyset_page(
+        query, Batch.id, page, cursor_fields={"source": "grn"}, unpaged_order=(GRN.grn_date.desc(),)
+    )
+    
+    for row in rows:
+        ledger_entries.append({
+            "date": row.grn_date.strftime("%d/%m/%Y"),
+            "item_name": row.item_name,
+            "batch_no": row.batch_no,
+            "location": row.store or DEFAULT_LOCATION,
+            "txn_type": "GRN_RECEIPT",
+            "qty_in": row.qty,
+            "qty_out": 0,
+            "balance": row.qty,
+            "ref_no": row.grn_number
+        })
     
+    set_next_cursor(response, next_cursor)
     return ledger_entries
 
+# ---------------- POINT-IN-TIME BALANCES ----------------
+@router.get("/balances/as-of")
+def get_balances_as_of(
+    as_of: date = Query(..., description="End of this day (YYYY-MM-DD)"),
+    item_name: Optional[str] = None,
+    location: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """On-hand qty per item / batch / location on a past date, from the nearest ledger checkpoint"""
+    return stock_balances_as_of(db, as_of, item_name, location)
+
+@router.post("/balances/checkpoints")
+def refresh_balance_checkpoints(through: Optional[date] = None, db: Session = Depends(get_db)):
+    """Roll ledger checkpoints forward (through yesterday unless given)"""
+    return refresh_checkpoints(db, through)
+
 @router.post("/internal-transfer")
 def internal_transfer(data: dict, db: Session = Depends(get_db)):
     """Handle internal stock transfer between locations with batch tracking"""
@@ -527,14 +611,13 @@ def internal_transfer(data: dict, db: Session = Depends(get_db)):
     if not source_batch:
         raise HTTPException(404, f"Batch {batch_no} not found in {from_location}")
     
-    if source_batch.qty < quantity:
-        raise HTTPException(400, f"Insufficient quantity. Available: {source_batch.qty}, Requested: {quantity}")
-    
     # Use the GRN item that actually has the batch
     source_grn_item = source_grn_item_with_batch
     
-    # Reduce quantity from source batch
-    source_batch.qty -= quantity
+    # Reduce quantity from source batch only if it still holds enough (one conditional UPDATE)
+    available = source_batch.qty
+    if not decrement_batch_qty(db, source_batch.id, quantity):
+        raise HTTPException(400, f"Insufficient quantity. Available: {available}, Requested: {quantity}")
     
     # Find or create destination GRN for the target location
     dest_grn = db.query(GRN).filter(
@@ -578,7 +661,7 @@ def internal_transfer(data: dict, db: Session = Depends(get_db)):
     
     if dest_batch:
         # Add to existing batch
-        dest_batch.qty += quantity
+        release_batches(db, {dest_batch.id: quantity})
     else:
         # Create new batch in destination
         dest_batch = Batch(
@@ -594,8 +677,7 @@ def internal_transfer(data: dict, db: Session = Depends(get_db)):
     dest_grn_item.received_qty += quantity
     
     # Remove source batch if quantity becomes 0
-    if source_batch.qty == 0:
-        db.delete(source_batch)
+    if delete_batch_if_empty(db, source_batch.id):
         source_grn_item.received_qty -= quantity
     
     db.commit()
@@ -668,7 +750,8 @@ def dispense_expired_stock(data: dict, db: Session = Depends(get_db)):
         qty_out=0,  # Quantity to be determined
         balance=stock.available_qty,
         ref_no=disposal.transaction_no,
-        remarks=f"Expired batch disposal: {reason}"
+        remarks=f"Expired batch disposal: {reason}",
+        location=batch_location(db, item_name, batch_no)
     )
     
     db.add(disposal)
@@ -740,7 +823,8 @@ def add_batch_stock(data: dict, db: Session = Depends(get_db)):
             qty_out=0,
             balance=stock.available_qty,
             ref_no=f"RTN-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}",
-            remarks="Item return"
+            remarks="Item return",
+            location=batch_location(db, item_name, batch_no)
         )
         db.add(ledger)
     
@@ -787,7 +871,8 @@ def add_batch_stock(data: dict, db: Session = Depends(get_db)):
                 qty_in=quantity,
                 qty_out=0,
                 balance=stock.available_qty + quantity,
-                remarks=f"Return processed - return_id:{return_id}"
+                remarks=f"Return processed - return_id:{return_id}",
+                location=batch_location(db, item_name, batch_no)
             )
             db.add(ledger)
     
@@ -10,6 +10,8 @@ from models.tenant_models import (
     GRN, GRNItem, Batch, StockTxnType
 )
 from schemas.tenant_schemas import StockResponse
+from utils.stock_projector import rebuild_stock_overview
+from utils.reorder_engine import load_reorder_suggestions, refresh_reorder_suggestions
 
 router = APIRouter(prefix="/api/stock-management", tags=["Stock Management"])
 
@@ -212,70 +214,18 @@ def get_expiry_tracking(days_ahead: int = 30, db: Session = Depends(get_tenant_d
 
 @router.post("/sync-stock-overview")
 def sync_stock_overview(db: Session = Depends(get_tenant_db)):
-    """Sync stock overview with latest data from GRN and stock tables"""
+    """Reconcile stock overview with approved GRN batches, chunk by chunk"""
     try:
-        # Clear existing stock overview
-        db.query(StockOverview).delete()
-        
-        # Get data from Items and GRN
-        items_with_stock = db.query(
-            Item.name,
-            Item.item_code,
-            Item.min_stock,
-            func.coalesce(func.sum(Batch.qty), 0).label("total_qty")
-        ).outerjoin(
-            GRNItem, Item.name == GRNItem.item_name
-        ).outerjoin(
-            Batch, GRNItem.id == Batch.grn_item_id
-        ).group_by(
-            Item.id, Item.name, Item.item_code, Item.min_stock
-        ).all()
-        
-        # Create new stock overview records
-        for item in items_with_stock:
-            # Determine status
-            if item.total_qty == 0:
-                status = "Out of Stock"
-            elif item.total_qty <= item.min_stock and item.min_stock > 0:
-                status = "Low Stock"
-            else:
-                status = "In Stock"
-            
-            # Get latest batch info for this item
-            latest_batch = db.query(
-                Batch.batch_no,
-                Batch.expiry_date,
-                Batch.warranty_end_date
-            ).join(
-                GRNItem, Batch.grn_item_id == GRNItem.id
-            ).filter(
-                GRNItem.item_name == item.name
-            ).order_by(
-                Batch.id.desc()
-            ).first()
-            
-            stock_overview = StockOverview(
-                item_name=item.name,
-                item_code=item.item_code,
-                location="Main Store",  # Default location
-                available_qty=int(item.total_qty),
-                min_stock=item.min_stock or 0,
-                warranty=latest_batch.warranty_end_date.isoformat() if latest_batch and latest_batch.warranty_end_date else "—",
-                expiry_date=latest_batch.expiry_date.isoformat() if latest_batch and latest_batch.expiry_date else "—",
-                batch_no=latest_batch.batch_no if latest_batch else None,
-                status=status
-            )
-            
-            db.add(stock_overview)
-        
-        db.commit()
-        
-        # Get updated count
+        # Only rows that differ are written, so readers never see an empty table
+        stats = rebuild_stock_overview(db)
         updated_count = db.query(StockOverview).count()
         
         return {
             "message": "Stock overview synchronized successfully",
             "updated_records": updated_count,
+            "inserted": stats["inserted"],
+            "updated": stats["updated"],
+            "deleted": stats["deleted"],
             "sync_time": datetime.now().isoformat()
         }
         
@@ -323,40 +273,47 @@ def get_stock_movement_history(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/reorder-suggestions")
-def get_reorder_suggestions(db: Session = Depends(get_tenant_db)):
-    """Get items that need reordering based on stock levels"""
+def get_reorder_suggestions(
+    priority: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_tenant_db)
+):
+    """Get items at or below their demand-based reorder point (precomputed by the reorder engine)"""
     try:
-        # Get items below minimum stock
-        low_stock_items = db.query(StockOverview).filter(
-            and_(
-                StockOverview.available_qty <= StockOverview.min_stock,
-                StockOverview.min_stock > 0
-            )
-        ).all()
-        
-        suggestions = []
-        for item in low_stock_items:
-            # Calculate suggested order quantity (simple logic: bring to 2x min stock)
-            suggested_qty = (item.min_stock * 2) - item.available_qty
-            
-            suggestions.append({
-                "item_name": item.item_name,
-                "item_code": item.item_code,
-                "current_stock": item.available_qty,
-                "min_stock": item.min_stock,
-                "suggested_order_qty": max(suggested_qty, item.min_stock),
-                "location": item.location,
-                "priority": "High" if item.available_qty == 0 else "Medium"
-            })
-        
-        # Sort by priority and shortage
-        suggestions.sort(key=lambda x: (x["priority"] == "High", x["current_stock"]))
-        
+        rows = load_reorder_suggestions(db, priority=priority, limit=limit)
+
+        suggestions = [{
+            "item_name": row.item_name,
+            "item_code": row.item_code,
+            "current_stock": row.current_stock,
+            "min_stock": row.min_stock,
+            "suggested_order_qty": row.suggested_order_qty,
+            "location": "All Locations",
+            "priority": row.priority,
+            "reorder_point": row.reorder_point,
+            "safety_stock": row.safety_stock,
+            "max_level": row.max_level,
+            "avg_daily_demand": row.avg_daily_demand,
+            "lead_time_days": row.lead_time_days,
+            "days_of_cover": row.days_of_cover,
+            "preferred_vendor": row.preferred_vendor
+        } for row in rows]
+
         return {
             "total_suggestions": len(suggestions),
-            "high_priority": len([s for s in suggestions if s["priority"] == "High"]),
+            "high_priority": len([s for s in suggestions if s["priority"] in ("Critical", "High")]),
+            "computed_at": max((row.computed_at for row in rows), default=None),
             "suggestions": suggestions
         }
-        
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/reorder-suggestions/refresh")
+def refresh_reorder_suggestions_now(db: Session = Depends(get_tenant_db)):
+    """Recompute reorder suggestions now instead of waiting for the scheduled refresh"""
+    try:
+        return refresh_reorder_suggestions(db)
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
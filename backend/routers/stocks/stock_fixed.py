@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from database import get_tenant_db
@@ -6,6 +6,9 @@ from models.tenant_models import Stock, StockLedger, StockTransfer, StockIssue,
 from schemas.tenant_schemas import *
 from datetime import datetime, date, timedelta
 from typing import List
+from utils.stock_aggregation import get_active_items, get_item_stock_summary, DEFAULT_LOCATION
+from utils.pagination import PageParams, ListFilters, apply_list_filters, keyset_page, set_next_cursor
+from utils.stock_ledger import batch_location
 
 router = APIRouter(prefix="/stocks", tags=["Stock Management"])
 DEFAULT_DB = "arun"
@@ -17,40 +20,25 @@ def get_db():
 @router.get("/")
 def list_stock(db: Session = Depends(get_db)):
     # Get all active items from item master
-    items = db.query(Item).filter(Item.is_active == True).all()
+    items = get_active_items(db)
+    
+    # Batches and latest receipt location for every item in a few grouped queries
+    summary = get_item_stock_summary(db)
     
     result = []
     for item in items:
-        # Get all batches for this item from approved GRNs
-        from models.tenant_models import GRN, GRNStatus
-        approved_grn_items = db.query(GRNItem).join(GRN).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).all()
+        entry = summary.get(item.id, {})
         
-        # Get all batches for this item
-        all_batches = []
-        total_qty = 0
+        all_batches = [{
+            "batch_no": batch.batch_no,
+            "qty": batch.qty,
+            "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
+            "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None
+        } for batch in entry.get("batches", [])]
+        total_qty = entry.get("total_qty", 0)
         
-        for grn_item in approved_grn_items:
-            batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all()
-            for batch in batches:
-                batch_info = {
-                    "batch_no": batch.batch_no,
-                    "qty": batch.qty,
-                    "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
-                    "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None
-                }
-                all_batches.append(batch_info)
-                total_qty += batch.qty
-        
-        # Get location from the latest approved GRN
-        latest_grn = db.query(GRN).join(GRNItem).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).order_by(GRN.grn_date.desc()).first()
-        
-        location = latest_grn.store if latest_grn else "Main Store"
+        # Location from the latest approved GRN
+        location = entry.get("location", DEFAULT_LOCATION)
         
         stock_data = {
             "id": item.id,
@@ -138,7 +126,8 @@ def add_batch_stock(data: dict, db: Session = Depends(get_db)):
         qty_out=0,
         balance=stock.available_qty,
         ref_no=ref_no,
-        remarks=f"Stock adjustment - {return_id if return_id else 'quantity update'}"
+        remarks=f"Stock adjustment - {return_id if return_id else 'quantity update'}",
+        location=batch_location(db, item_name, batch_no)
     )
     db.add(ledger)
     
@@ -147,48 +136,69 @@ def add_batch_stock(data: dict, db: Session = Depends(get_db)):
     return {"message": f"Added {quantity} units back to stock", "updated_qty": batch.qty}
 
 @router.get("/ledger")
-def get_stock_ledger(db: Session = Depends(get_db)):
-    """Get comprehensive stock ledger with all transactions"""
+def get_stock_ledger(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ListFilters = Depends(),
+    db: Session = Depends(get_db)
+):
+    """Get the stock ledger, newest first; ?limit=/?cursor= page it"""
     from models.tenant_models import GRN, GRNStatus
     
     ledger_entries = []
+    source = page.after.get("source", "ledger") if page.after else "ledger"
+    
+    # Stock ledger entries are the actual transactions; item names come from one outer join.
+    # GRN receipts stand in only while the ledger is empty: a filter that matches no
+    # ledger rows gets an empty page, not a different dataset
+    if source == "ledger" and (page.after or db.query(StockLedger.id).first() is not None):
+        query = apply_list_filters(
+            db.query(StockLedger, Stock.item_name).outerjoin(Stock, Stock.id == StockLedger.stock_id),
+            filters, date_column=StockLedger.created_at
+        )
+        rows, next_cursor = keyset_page(
+            query, StockLedger.id, page, id_of=lambda row: row.StockLedger.id,
+            unpaged_order=(StockLedger.created_at.desc(),)
+        )
+        
+        for entry, item_name in rows:
+            ledger_entries.append({
+                "date": entry.created_at.strftime("%d/%m/%Y"),
+                "item_name": item_name or "Unknown",
+                "batch_no": entry.batch_no or "—",
+                "txn_type": entry.txn_type,
+                "qty_in": entry.qty_in or 0,
+                "qty_out": entry.qty_out or 0,
+                "balance": entry.balance,
+                "ref_no": entry.ref_no or "—"
+            })
+        
+        set_next_cursor(response, next_cursor)
+        return ledger_entries
     
-    # Get all stock ledger entries first (these are the actual transactions)
-    stock_ledger_entries = db.query(StockLedger).order_by(StockLedger.created_at.desc()).all()
+    query = apply_list_filters(
+        db.query(
+            Batch.id, Batch.batch_no, Batch.qty, GRNItem.item_name, GRN.grn_date, GRN.grn_number
+        ).join(GRNItem, Batch.grn_item_id == GRNItem.id).join(GRN, GRNItem.grn_id == GRN.id).filter(
+            GRN.status == GRNStatus.approved
+        ),
+        filters, date_column=GRN.grn_date, location_columns=(GRN.store,)
+    )
+    rows, next_cursor = keyset_page(
+        query, Batch.id, page, cursor_fields={"source": "grn"}, unpaged_order=(GRN.grn_date.desc(),)
+    )
     
-    for entry in stock_ledger_entries:
-        stock = db.query(Stock).filter(Stock.id == entry.stock_id).first()
+    for row in rows:
         ledger_entries.append({
-            "date": entry.created_at.strftime("%d/%m/%Y"),
-            "item_name": stock.item_name if stock else "Unknown",
-            "batch_no": entry.batch_no or "—",
-            "txn_type": entry.txn_type,
-            "qty_in": entry.qty_in or 0,
-            "qty_out": entry.qty_out or 0,
-            "balance": entry.balance,
-            "ref_no": entry.ref_no or "—"
+            "date": row.grn_date.strftime("%d/%m/%Y"),
+            "item_name": row.item_name,
+            "batch_no": row.batch_no,
+            "txn_type": "GRN_RECEIPT",
+            "qty_in": row.qty,
+            "qty_out": 0,
+            "balance": row.qty,
+            "ref_no": row.grn_number
         })
     
-    # If no stock ledger entries exist, fall back to GRN data
-    if not ledger_entries:
-        approved_grns = db.query(GRN).filter(GRN.status == GRNStatus.approved).order_by(GRN.grn_date.desc()).all()
-        
-        for grn in approved_grns:
-            grn_items = db.query(GRNItem).filter(GRNItem.grn_id == grn.id).all()
-            
-            for grn_item in grn_items:
-                batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all()
-                
-                for batch in batches:
-                    ledger_entries.append({
-                        "date": grn.grn_date.strftime("%d/%m/%Y"),
-                        "item_name": grn_item.item_name,
-                        "batch_no": batch.batch_no,
-                        "txn_type": "GRN_RECEIPT",
-                        "qty_in": batch.qty,
-                        "qty_out": 0,
-                        "balance": batch.qty,
-                        "ref_no": grn.grn_number
-                    })
-    
+    set_next_cursor(response, next_cursor)
     return ledger_entries
\ No newline at end of file
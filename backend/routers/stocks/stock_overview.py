@@ -1,62 +1,56 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_tenant_db
+from database import get_tenant_db, get_tenant_async_db
 from models.tenant_models import StockOverview
+from utils.stock_aggregation import (
+    get_active_items, get_active_items_async, get_item_stock_summary, get_item_stock_summary_async,
+    DEFAULT_LOCATION
+)
+from utils.stock_mutation import decrement_batch_qty, delete_batch_if_empty
 
 router = APIRouter(prefix="/stock-overview", tags=["Stock Overview"])
 
 @router.get("/")
-def get_all_stock_overview(db: Session = Depends(get_tenant_db)):
+async def get_all_stock_overview(db: AsyncSession = Depends(get_tenant_async_db)):
     """Get all stock overview records from GRN batches"""
-    from models.tenant_models import Item, GRN, GRNItem, Batch, GRNStatus
-    
-    # Get all active items
-    items = db.query(Item).filter(Item.is_active == True).all()
+    items = await get_active_items_async(db)
     
+    # Batches, totals and latest receipt location for every item in a few grouped queries
+    summary = await get_item_stock_summary_async(db)
+    return _stock_overview_rows(items, summary)
+
+def _build_stock_overview(db: Session):
+    return _stock_overview_rows(get_active_items(db), get_item_stock_summary(db))
+
+def _stock_overview_rows(items, summary: dict):
     result = []
     for item in items:
-        # Get all batches for this item from approved GRNs
-        approved_grn_items = db.query(GRNItem).join(GRN).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).all()
+        entry = summary.get(item.id, {})
         
-        # Get all batches for this item
         all_batches = []
-        total_qty = 0
-        
-        for grn_item in approved_grn_items:
-            grn = db.query(GRN).filter(GRN.id == grn_item.grn_id).first()
-            batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all()
-            for batch in batches:
-                # Check if batch has warranty dates
-                warranty_info = None
-                if hasattr(batch, 'warranty_start_date') and hasattr(batch, 'warranty_end_date'):
-                    if batch.warranty_start_date and batch.warranty_end_date:
-                        warranty_info = {
-                            "start_date": batch.warranty_start_date.strftime("%d/%m/%Y"),
-                            "end_date": batch.warranty_end_date.strftime("%d/%m/%Y")
-                        }
-                
-                batch_info = {
-                    "batch_no": batch.batch_no,
-                    "qty": batch.qty,
-                    "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
-                    "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None,
-                    "location": grn.store if grn else "Main Store",
-                    "warranty": warranty_info
+        for batch in entry.get("batches", []):
+            # Check if batch has warranty dates
+            warranty_info = None
+            if batch.warranty_start_date and batch.warranty_end_date:
+                warranty_info = {
+                    "start_date": batch.warranty_start_date.strftime("%d/%m/%Y"),
+                    "end_date": batch.warranty_end_date.strftime("%d/%m/%Y")
                 }
-                all_batches.append(batch_info)
-                total_qty += batch.qty
-        
-        # Get location from the latest approved GRN
-        latest_grn = db.query(GRN).join(GRNItem).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved
-        ).order_by(GRN.grn_date.desc()).first()
+            
+            all_batches.append({
+                "batch_no": batch.batch_no,
+                "qty": batch.qty,
+                "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
+                "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None,
+                "location": batch.store,
+                "warranty": warranty_info
+            })
+        total_qty = entry.get("total_qty", 0)
         
-        location = latest_grn.store if latest_grn else "Main Store"
+        # Location from the latest approved GRN
+        location = entry.get("location", DEFAULT_LOCATION)
         
         # Determine status
         status = "Good" if total_qty > item.min_stock else "Low Stock"
@@ -81,42 +75,32 @@ def get_all_stock_overview(db: Session = Depends(get_tenant_db)):
     return result
 
 @router.get("/by-location/{location_name}")
-def get_stock_by_location(location_name: str, db: Session = Depends(get_tenant_db)):
+async def get_stock_by_location(location_name: str, db: AsyncSession = Depends(get_tenant_async_db)):
     """Get stock overview records filtered by location"""
-    from models.tenant_models import Item, GRN, GRNItem, Batch, GRNStatus
-    
-    # Get all active items that have stock in the specified location
-    items = db.query(Item).filter(Item.is_active == True).all()
+    items = await get_active_items_async(db)
     
+    # Positive batches of approved GRNs in this location, grouped by item
+    summary = await get_item_stock_summary_async(
+        db, location=location_name, positive_only=True, with_latest_location=False
+    )
+    return _stock_by_location_rows(items, summary, location_name)
+
+def _stock_by_location_rows(items, summary: dict, location_name: str):
     result = []
     for item in items:
-        # Get batches for this item from approved GRNs in the specified location
-        approved_grn_items = db.query(GRNItem).join(GRN).filter(
-            GRNItem.item_name == item.name,
-            GRN.status == GRNStatus.approved,
-            GRN.store == location_name
-        ).all()
-        
-        if not approved_grn_items:
+        entry = summary.get(item.id)
+        if not entry:
             continue  # Skip items not in this location
         
-        # Get all batches for this item in this location
-        location_batches = []
-        total_qty = 0
-        
-        for grn_item in approved_grn_items:
-            batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id, Batch.qty > 0).all()
-            for batch in batches:
-                batch_info = {
-                    "batch_no": batch.batch_no,
-                    "qty": batch.qty,
-                    "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
-                    "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None,
-                    "location": location_name,
-                    "rate": float(item.mrp or item.fixing_price or 30)
-                }
-                location_batches.append(batch_info)
-                total_qty += batch.qty
+        location_batches = [{
+            "batch_no": batch.batch_no,
+            "qty": batch.qty,
+            "expiry_date": batch.expiry_date.strftime("%d/%m/%Y") if batch.expiry_date else None,
+            "mfg_date": batch.mfg_date.strftime("%d/%m/%Y") if batch.mfg_date else None,
+            "location": location_name,
+            "rate": float(item.mrp or item.fixing_price or 30)
+        } for batch in entry["batches"]]
+        total_qty = entry["total_qty"]
         
         if total_qty > 0:  # Only include items with available stock
             result.append({
@@ -193,28 +177,24 @@ def dispense_stock(item_id: int, batch_index: int, quantity: int, db: Session =
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    approved_grn_items = db.query(GRNItem).join(GRN).filter(
+    # Batches in the same order as GRN item by GRN item, in one query
+    all_batches = db.query(Batch.id, Batch.batch_no).join(GRNItem, Batch.grn_item_id == GRNItem.id).join(
+        GRN, GRNItem.grn_id == GRN.id
+    ).filter(
         GRNItem.item_name == item.name,
         GRN.status == GRNStatus.approved
-    ).all()
-    
-    all_batches = []
-    for grn_item in approved_grn_items:
-        batches = db.query(Batch).filter(Batch.grn_item_id == grn_item.id).all()
-        all_batches.extend(batches)
+    ).order_by(GRNItem.id, Batch.id).all()
     
     if batch_index >= len(all_batches):
         raise HTTPException(status_code=404, detail="Batch not found")
     
     target_batch = all_batches[batch_index]
     
-    if target_batch.qty < quantity:
+    # Conditional decrement: the check and the write are one statement
+    if not decrement_batch_qty(db, target_batch.id, quantity):
         raise HTTPException(status_code=400, detail="Insufficient quantity in batch")
     
-    target_batch.qty -= quantity
-    
-    if target_batch.qty == 0:
-        db.delete(target_batch)
+    delete_batch_if_empty(db, target_batch.id)
     
     db.commit()
     
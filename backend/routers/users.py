@@ -9,7 +9,7 @@ import logging
 from database import get_tenant_db
 from models.tenant_models import User, Role
 from schemas.tenant_schemas import UserCreate, UserUpdate, UserResponse
-from utils.auth import hash_password, send_welcome_email, check_permission
+from utils.auth import hash_password, send_welcome_email, check_permission, invalidate_user_permissions
 
 logger = logging.getLogger(__name__)
 
@@ -129,6 +129,7 @@ def update_user(
         user.roles = roles
 
     db.commit()
+    invalidate_user_permissions(user_id, DEFAULT_TENANT_DB)
     db.refresh(user)
     return user
 
@@ -148,4 +149,5 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    invalidate_user_permissions(user_id, DEFAULT_TENANT_DB)
     return {"message": "User deleted successfully"}
@@ -700,6 +700,7 @@ class StockAdjustmentCreate(BaseModel):
     batch_no: Optional[str] = None
     quantity: float
     reason: Optional[str] = None
+    location: Optional[str] = None  # defaults to the store that received the batch
 
 
 # ---------- TRANSFER ----------
@@ -721,6 +722,7 @@ class StockIssueCreate(BaseModel):
     qty: float
     batch_no: Optional[str] = None
     reason: Optional[str] = None
+    location: Optional[str] = None  # store issued from; defaults to the store that received the batch
 
 # ============================================================
 #                   INVENTORY LOCATION SCHEMAS
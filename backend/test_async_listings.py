@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the async stock overview and billing listings.
+Serves the real async routes from a scratch SQLite tenant DB (aiosqlite) and
+checks that the stock overview matches the sync builder, that the
+by-location view keeps only that store's batches, and that the billing list
+pages with X-Next-Cursor.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from database import get_tenant_async_db
+from models.tenant_models import (
+    TenantBase, Item, GRN, GRNItem, Batch, GRNStatus, Billing, BillingStatus
+)
+from routers.stocks.stock_overview import router as stock_overview_router, _build_stock_overview
+from routers.billingSystem.billing import router as billing_router
+from utils.pagination import NEXT_CURSOR_HEADER
+
+
+def seed(db):
+    gauze = Item(name="Gauze", item_code="GZ-1", min_stock=5)
+    syringe = Item(name="Syringe", item_code="SY-1", min_stock=50)
+    db.add_all([gauze, syringe])
+    db.flush()
+
+    for number, store, item, qty in (("GRN-1", "Main Store", gauze, 20), ("GRN-2", "Annex", gauze, 7),
+                                     ("GRN-3", "Annex", syringe, 10)):
+        grn = GRN(grn_number=number, grn_date=date.today(), po_number="PO-1", vendor_name="Acme",
+                  store=store, status=GRNStatus.approved)
+        db.add(grn)
+        db.flush()
+        line = GRNItem(grn_id=grn.id, item_id=item.id, item_name=item.name, po_qty=qty, received_qty=qty,
+                       uom="PCS", rate=1)
+        db.add(line)
+        db.flush()
+        db.add(Batch(grn_item_id=line.id, batch_no=f"{number}-B", qty=qty))
+        db.add(Billing(grn_id=grn.id, gross_amount=qty, tax_amount=0, net_amount=qty,
+                       paid_amount=0, balance_amount=qty, status=BillingStatus.DRAFT))
+    db.commit()
+
+
+def test_async_listings():
+    print("🔍 Testing async stock overview and billing listings...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "async_listings.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    TenantBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    seed(db)
+    expected_overview = _build_stock_overview(db)
+    db.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    AsyncSession = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def session_override():
+        async with AsyncSession() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(stock_overview_router)
+    app.include_router(billing_router)
+    app.dependency_overrides[get_tenant_async_db] = session_override
+    client = TestClient(app)
+    ok = True
+
+    overview = client.get("/stock-overview/")
+    if overview.status_code == 200 and overview.json() == expected_overview:
+        print("✅ Async stock overview matches the sync builder")
+    else:
+        print(f"❌ Stock overview: {overview.status_code} {overview.text[:300]}")
+        ok = False
+
+    annex = client.get("/stock-overview/by-location/Annex").json()
+    by_item = {row["item_name"]: (row["available_qty"], row["status"], [b["batch_no"] for b in row["batches"]])
+               for row in annex}
+    if by_item == {"Gauze": (7, "Good", ["GRN-2-B"]), "Syringe": (10, "Low Stock", ["GRN-3-B"])}:
+        print("✅ By-location view keeps only that store's batches")
+    else:
+        print(f"❌ By location: {by_item}")
+        ok = False
+
+    first = client.get("/billing/?limit=2")
+    cursor = first.headers.get(NEXT_CURSOR_HEADER)
+    second = client.get(f"/billing/?limit=2&cursor={cursor}") if cursor else None
+    everything = client.get("/billing/").json()
+    paged_ids = [row["id"] for row in first.json()] + ([row["id"] for row in second.json()] if second else [])
+    if paged_ids == [3, 2, 1] and second.headers.get(NEXT_CURSOR_HEADER) is None and len(everything) == 3:
+        print("✅ Billing list pages with X-Next-Cursor")
+    else:
+        print(f"❌ Billing pages: {paged_ids}, unpaged {len(everything)} rows")
+        ok = False
+
+    client.close()
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_async_listings()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Async listings test passed")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the domain event bus and its outbox.
+Publishes events inside a business transaction against a scratch SQLite
+tenant DB and checks that rolled-back events never run, committed ones run
+once per subscriber on the worker pool (a failing subscriber is retried
+without re-running the others), and publishing costs the request only the
+outbox inserts.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.tenant_models import TenantBase, DomainEventOutbox, GRN, GRNStatus, VendorPayment
+import utils.domain_events as bus
+
+
+def test_domain_events(event_count=20):
+    print("🔍 Testing domain event outbox and subscriber workers...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "events.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False, "timeout": 30})
+    TenantBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    bus.EVENT_BUS_BACKOFF = 0
+    bus.EVENT_BUS_POLL = 0.2
+
+    calls = {"audit": [], "flaky": 0}
+    lock = threading.Lock()
+
+    @bus.subscribe("test.happened", "audit")
+    def audit(db, payload):
+        with lock:
+            calls["audit"].append(payload["n"])
+
+    @bus.subscribe("test.happened", "flaky")
+    def flaky(db, payload):
+        with lock:
+            calls["flaky"] += 1
+            if calls["flaky"] <= 3:
+                raise RuntimeError("transient failure")
+
+    # A rolled-back transaction must not leave events behind
+    db = Session()
+    bus.publish(db, "test.happened", {"n": -1})
+    db.rollback()
+    db.close()
+
+    start = time.perf_counter()
+    db = Session()
+    for n in range(event_count):
+        bus.publish(db, "test.happened", {"n": n}, aggregate_id=n)
+    grn = GRN(grn_number="EVT-1", grn_date=date.today(), vendor_name="Vendor", store="Main Store",
+              status=GRNStatus.approved, total_amount=100)
+    db.add(grn)
+    db.flush()
+    bus.publish(db, "grn.approved", {"grn_id": grn.id, "grn_number": grn.grn_number, "vendor_name": "Vendor"})
+    db.commit()
+    db.close()
+    publish_ms = (time.perf_counter() - start) * 1000 / (event_count + 1)
+    print(f"✅ Published {event_count + 1} events with the business write ({publish_ms:.2f} ms each)")
+
+    bus.start_event_workers(count=3, session_factories=lambda: {"scratch": Session})
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        db = Session()
+        open_rows = db.query(DomainEventOutbox).filter(DomainEventOutbox.status.in_(("pending", "processing"))).count()
+        db.close()
+        if not open_rows:
+            break
+        time.sleep(0.2)
+
+    bus.stop_event_workers()
+
+    db = Session()
+    rows = db.query(DomainEventOutbox).all()
+    payments = db.query(VendorPayment).filter(VendorPayment.grn_number == "EVT-1").count()
+    db.close()
+
+    ok = True
+    done = [row for row in rows if row.status == "done"]
+    if len(done) == len(rows) and -1 not in calls["audit"]:
+        print(f"✅ All {len(rows)} subscriber deliveries done; the rolled-back event never ran")
+    else:
+        print(f"❌ {len(done)}/{len(rows)} deliveries done; audit saw {sorted(calls['audit'])[:5]}...")
+        ok = False
+
+    if sorted(calls["audit"]) == list(range(event_count)):
+        print("✅ Each event reached the healthy subscriber exactly once despite the flaky one")
+    else:
+        print(f"❌ Healthy subscriber ran {len(calls['audit'])} times for {event_count} events")
+        ok = False
+
+    if any(row.attempts > 0 for row in rows if row.subscriber == "flaky"):
+        print("✅ Failing subscriber was retried and then succeeded")
+    else:
+        print("❌ No retries recorded for the failing subscriber")
+        ok = False
+
+    if payments == 1:
+        print("✅ grn.approved opened one vendor payment off the request path")
+    else:
+        print(f"❌ Expected 1 vendor payment, found {payments}")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_domain_events()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Domain event test passed")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for the email outbox against a local stand-in SMTP server.
+Enqueues messages, lets the background workers deliver them (the stand-in
+rejects the first attempt to exercise retry/backoff) and checks that every
+message arrives once and that enqueueing does not wait on SMTP.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import socketserver
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.register_models import Base, EmailOutbox
+import utils.email_outbox as outbox
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no TLS, no auth, optional forced 451 on DATA."""
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline().decode(errors="replace").strip()
+            if not line:
+                return
+            command = line.split(" ")[0].upper()
+
+            if command in ("EHLO", "HELO"):
+                self.reply("250 stand-in")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline().decode(errors="replace")
+                    if chunk in (".\r\n", ".\n", ""):
+                        break
+                    data.append(chunk)
+                with self.server.lock:
+                    if self.server.fail_next > 0:
+                        self.server.fail_next -= 1
+                        self.reply("451 Try again later")
+                        continue
+                    self.server.messages.append("".join(data))
+                self.reply("250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, fail_next=0):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.messages = []
+        self.fail_next = fail_next
+        self.lock = threading.Lock()
+
+
+def test_email_outbox(message_count=20):
+    print("🔍 Testing email outbox against a stand-in SMTP server...")
+
+    smtp = StandInSMTPServer(fail_next=3)
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp.server_address[1]),
+        "SMTP_STARTTLS": "false",
+        "SMTP_USER": "",
+    })
+    outbox.EMAIL_OUTBOX_BACKOFF = 1
+    outbox.EMAIL_OUTBOX_POLL = 0.2
+
+    db_path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[EmailOutbox.__table__])
+    Session = sessionmaker(bind=engine)
+
+    outbox.start_email_workers(count=2, session_factory=Session)
+
+    start = time.perf_counter()
+    for i in range(message_count):
+        outbox.enqueue_email(f"user{i}@example.com", f"Test {i}", f"Body {i}", session_factory=Session)
+    enqueue_ms = (time.perf_counter() - start) * 1000 / message_count
+    print(f"✅ Enqueued {message_count} emails ({enqueue_ms:.2f} ms each)")
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        db = Session()
+        pending = db.query(EmailOutbox).filter(EmailOutbox.status != "sent").count()
+        db.close()
+        if not pending:
+            break
+        time.sleep(0.2)
+
+    outbox.stop_email_workers()
+    smtp.shutdown()
+
+    db = Session()
+    rows = db.query(EmailOutbox).all()
+    sent = [row for row in rows if row.status == "sent"]
+    retried = [row for row in rows if row.attempts > 0]
+    db.close()
+
+    ok = True
+    if len(sent) == message_count:
+        print(f"✅ All {message_count} emails delivered")
+    else:
+        print(f"❌ {len(sent)}/{message_count} emails delivered")
+        ok = False
+
+    if len(smtp.messages) == message_count:
+        print("✅ Stand-in server received each email exactly once")
+    else:
+        print(f"❌ Stand-in server received {len(smtp.messages)} emails")
+        ok = False
+
+    if retried:
+        print(f"✅ {len(retried)} emails were retried after a 451 and then delivered")
+    else:
+        print("❌ No retries recorded")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_email_outbox()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Email outbox test passed")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script for GRN stock posting.
+Drives the GRN endpoints against a scratch SQLite tenant DB and checks that
+a second approval is refused without posting again, that editing an
+approved GRN posts only the quantity difference (moving it when the store
+changes), that leaving the approved status takes the stock back, and that
+batches added in the same unit of work are posted.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from models.tenant_models import TenantBase, Item, StockOverview, StockLedger, DomainEventOutbox
+from routers.GRN import grn as grn_module
+
+
+def grn_payload(store, qty):
+    return {
+        "grn_date": date.today().isoformat(), "po_number": "PO-1", "vendor_name": "Acme", "store": store,
+        "items": [{"item_name": "Gauze", "po_qty": qty, "received_qty": qty, "uom": "PCS", "rate": 1,
+                   "batches": [{"batch_no": "G-1", "mfg_date": None, "expiry_date": None, "qty": qty}]}]
+    }
+
+
+def test_grn_posting():
+    print("🔍 Testing GRN stock posting...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "grn_posting.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TenantBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    db = Session()
+    db.add_all([Item(name="Gauze", item_code="GZ-1"), Item(name="Paracetamol 500mg", item_code="PCM-500")])
+    db.commit()
+    db.close()
+
+    def session_override():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(grn_module.router)
+    app.dependency_overrides[grn_module.get_tenant_session] = session_override
+    client = TestClient(app)
+
+    def on_hand():
+        db = Session()
+        rows = {}
+        for row in db.query(StockOverview):
+            rows[(row.item_name, row.location)] = rows.get((row.item_name, row.location), 0) + row.available_qty
+        ledger = db.query(func.sum(StockLedger.qty_in - StockLedger.qty_out)).scalar() or 0
+        approvals = db.query(DomainEventOutbox).filter(DomainEventOutbox.event_type == "grn.approved").count()
+        db.close()
+        return rows, ledger, approvals
+
+    ok = True
+
+    client.post("/grn/create", json=grn_payload("Annex", 6))
+    first = client.post("/grn/1/approve")
+    second = client.post("/grn/1/approve")
+    rows, ledger, approvals = on_hand()
+    if first.status_code == 200 and second.status_code == 409 and rows == {("Gauze", "Annex"): 6} and ledger == 6:
+        print("✅ A second approval is refused and posts nothing")
+    else:
+        print(f"❌ Double approval: {first.status_code}/{second.status_code}, {rows}, ledger {ledger}")
+        ok = False
+
+    client.put("/grn/1", json=grn_payload("Annex", 9))
+    rows, ledger, edit_approvals = on_hand()
+    if rows == {("Gauze", "Annex"): 9} and ledger == 9 and edit_approvals == approvals:
+        print("✅ Editing an approved GRN posts only the difference")
+    else:
+        print(f"❌ After edit: {rows}, ledger {ledger}, {edit_approvals} approval events")
+        ok = False
+
+    client.put("/grn/1", json=grn_payload("Main Store", 9))
+    rows, ledger, _ = on_hand()
+    if rows == {("Gauze", "Annex"): 0, ("Gauze", "Main Store"): 9} and ledger == 9:
+        print("✅ Changing the store moves the posted stock")
+    else:
+        print(f"❌ After store change: {rows}, ledger {ledger}")
+        ok = False
+
+    client.put("/grn/1/status", json={"status": "Pending"})
+    rows, ledger, _ = on_hand()
+    if rows.get(("Gauze", "Main Store")) == 0 and ledger == 0:
+        print("✅ Leaving the approved status takes the stock back")
+    else:
+        print(f"❌ After un-approval: {rows}, ledger {ledger}")
+        ok = False
+
+    client.post("/grn/test-grn-batches")
+    rows, _, _ = on_hand()
+    if rows.get(("Paracetamol 500mg", "Main Store")) == 300:
+        print("✅ Batches added in the same unit of work are posted")
+    else:
+        print(f"❌ Test GRN posting: {rows}")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_grn_posting()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ GRN posting test passed")
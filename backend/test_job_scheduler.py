@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process job scheduler.
+Runs two schedulers against one scratch SQLite master DB and six scratch
+tenant DBs and checks that only the lease holder runs jobs, tenants are
+fanned out over the bounded pool, every run is recorded with its timing or
+error, nothing is due again before its interval, and a second process takes
+over the schedule (without repeating it) once the leader steps down.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.register_models import Base, ScheduledJobRun
+from models.tenant_models import TenantBase
+import utils.scheduler as scheduler_module
+from utils.scheduler import JobScheduler, Job, is_due, register_job
+
+TENANTS = 6
+WORKERS = 2
+
+
+def wait_idle(scheduler, timeout=30):
+    deadline = time.time() + timeout
+    while scheduler._running and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def test_job_scheduler():
+    print(f"🔍 Testing job scheduler ({TENANTS} tenants, {WORKERS} pool threads)...")
+
+    scratch = tempfile.mkdtemp()
+    master_engine = create_engine(f"sqlite:///{scratch}/master.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(master_engine)
+    Master = sessionmaker(bind=master_engine)
+
+    tenants = {}
+    for index in range(TENANTS):
+        engine = create_engine(f"sqlite:///{scratch}/tenant_{index}.db", connect_args={"check_same_thread": False})
+        TenantBase.metadata.create_all(engine)
+        tenants[f"tenant_{index}"] = sessionmaker(bind=engine)
+
+    # Only the test jobs below, not the app's real ones
+    scheduler_module._JOBS.clear()
+    scheduler_module._jobs_loaded = True
+
+    state = {"active": 0, "peak": 0, "runs": 0}
+    lock = threading.Lock()
+
+    @register_job("slow_job", interval=3600)
+    def slow_job(db):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["runs"] += 1
+        time.sleep(0.2)
+        with lock:
+            state["active"] -= 1
+        return {"tenant": db.get_bind().url.database}
+
+    @register_job("broken_job", interval=3600)
+    def broken_job(db):
+        raise RuntimeError("boom")
+
+    leader = JobScheduler(workers=WORKERS, master_sessionmaker=Master, session_factories=lambda: tenants)
+    standby = JobScheduler(workers=WORKERS, master_sessionmaker=Master, session_factories=lambda: tenants)
+
+    ok = True
+
+    start = time.perf_counter()
+    submitted = leader.tick()
+    standby_submitted = standby.tick()
+    wait_idle(leader)
+    elapsed = time.perf_counter() - start
+
+    if leader.is_leader and not standby.is_leader and standby_submitted == 0:
+        print("✅ Only the lease holder schedules jobs")
+    else:
+        print(f"❌ Leadership: leader={leader.is_leader}, standby={standby.is_leader} ({standby_submitted} submitted)")
+        ok = False
+
+    if submitted == 2 * TENANTS and state["runs"] == TENANTS and state["peak"] <= WORKERS:
+        print(f"✅ {submitted} runs fanned out, at most {state['peak']} at once, in {elapsed:.2f}s")
+    else:
+        print(f"❌ Submitted {submitted}, ran {state['runs']}, peak concurrency {state['peak']}")
+        ok = False
+
+    db = Master()
+    runs = db.query(ScheduledJobRun).all()
+    db.close()
+    succeeded = [run for run in runs if run.job_name == "slow_job" and run.status == "success"]
+    failed = [run for run in runs if run.job_name == "broken_job" and run.status == "failed"]
+    if len(succeeded) == TENANTS and all(run.duration_ms >= 150 and run.result for run in succeeded) \
+            and len(failed) == TENANTS and all(run.error == "boom" for run in failed):
+        print("✅ Every run is recorded with status, duration and result or error")
+    else:
+        print(f"❌ History: {len(succeeded)} successes, {len(failed)} failures of {len(runs)} runs")
+        ok = False
+
+    again = leader.tick()
+    if again == 0:
+        print("✅ Nothing is due again before its interval (failures wait for the retry delay)")
+    else:
+        print(f"❌ {again} runs resubmitted right away")
+        ok = False
+
+    leader.stop()
+    takeover = standby.tick()
+    standby.stop()
+    if standby.is_leader and takeover == 0:
+        print("✅ Standby took over the lease and continued from the recorded history")
+    else:
+        print(f"❌ Failover: standby leader={standby.is_leader}, {takeover} runs repeated")
+        ok = False
+
+    now = datetime(2026, 1, 2, 9, 30)
+    daily = Job("daily", None, None, "09:00")
+    yesterday = ScheduledJobRun(status="success", started_at=datetime(2026, 1, 1, 9, 0))
+    this_morning = ScheduledJobRun(status="success", started_at=datetime(2026, 1, 2, 9, 1))
+    stuck = ScheduledJobRun(status="running", started_at=now - timedelta(days=1))
+    if is_due(daily, yesterday, now) and not is_due(daily, this_morning, now) \
+            and not is_due(daily, yesterday, datetime(2026, 1, 2, 8, 59)) and is_due(daily, stuck, now):
+        print("✅ Daily jobs run once per day after their slot; stale running rows do not block them")
+    else:
+        print("❌ Daily due calculation is wrong")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_job_scheduler()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Job scheduler test passed")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script for conditional GET caching of master data endpoints.
+Serves the category and item lists from a scratch SQLite tenant DB and
+checks that repeat loads are answered (304 or cached 200) without a single
+query, that committed master data writes (flushed or query-level) move the
+ETag while rolled-back ones do not, that a write made by another process is
+picked up once the version TTL passes, that the item list keeps its
+X-Next-Cursor header when served from cache, and that /purchase/items is
+reachable ahead of /purchase/{pr_id}.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from database import get_tenant_db
+from models.tenant_models import TenantBase, Category, Item
+from routers.organization.category import router as category_router
+from routers.items import item as item_module
+from routers.purchase_order import purchase as purchase_module
+import utils.master_data_cache as cache
+
+
+def test_master_data_cache():
+    print("🔍 Testing master data ETags and payload cache...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "master_data.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TenantBase.metadata.create_all(engine)
+    cache.seed_master_data_version(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    db.add_all([Category(name=f"Category {n}") for n in range(5)])
+    db.add_all([Item(name=f"Item {n}", item_code=f"IT-{n:03d}") for n in range(5)])
+    db.commit()
+    db.close()
+
+    def session_override():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(category_router)
+    app.include_router(item_module.router)
+    app.include_router(purchase_module.router)
+    app.dependency_overrides[get_tenant_db] = session_override
+    app.dependency_overrides[item_module.get_db] = session_override
+    app.dependency_overrides[purchase_module.get_tenant_session] = session_override
+    client = TestClient(app)
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    cache.clear_master_data_cache()
+    cache.MASTER_DATA_VERSION_TTL = 60
+    ok = True
+
+    first = client.get("/category/")
+    etag = first.headers.get("etag")
+    if first.status_code == 200 and len(first.json()) == 5 and etag and etag.startswith('W/"'):
+        print(f"✅ First load returns the list with weak ETag {etag}")
+    else:
+        print(f"❌ First load: {first.status_code} {first.headers}")
+        ok = False
+
+    queries.clear()
+    not_modified = client.get("/category/", headers={"If-None-Match": etag})
+    cached = client.get("/category/")
+    if not_modified.status_code == 304 and not not_modified.content and cached.status_code == 200 \
+            and cached.content == first.content and cached.headers.get("etag") == etag and not queries:
+        print("✅ Repeat loads (304 and cached 200) ran no queries")
+    else:
+        print(f"❌ Repeat loads: {not_modified.status_code}, {cached.status_code}, {len(queries)} queries")
+        ok = False
+
+    db = Session()
+    db.add(Category(name="Rolled back"))
+    db.flush()
+    db.rollback()
+    db.close()
+    if client.get("/category/", headers={"If-None-Match": etag}).status_code == 304:
+        print("✅ A rolled-back write leaves the ETag alone")
+    else:
+        print("❌ A rolled-back write changed the ETag")
+        ok = False
+
+    created = client.post("/category/", json={"name": "Fresh"})
+    after_create = client.get("/category/", headers={"If-None-Match": etag})
+    new_etag = after_create.headers.get("etag")
+    if created.status_code == 200 and after_create.status_code == 200 and new_etag != etag \
+            and any(row["name"] == "Fresh" for row in after_create.json()):
+        print("✅ A committed create moves the ETag and the new row is served")
+    else:
+        print(f"❌ After create: {created.status_code}, {after_create.status_code}, etag {new_etag}")
+        ok = False
+
+    db = Session()
+    db.query(Category).filter(Category.name == "Fresh").update({"description": "bulk"})
+    db.commit()
+    db.close()
+    after_update = client.get("/category/", headers={"If-None-Match": new_etag})
+    if after_update.status_code == 200 and any(row["description"] == "bulk" for row in after_update.json()):
+        print("✅ Query-level updates bump the version too")
+    else:
+        print(f"❌ Query-level update still answered {after_update.status_code}")
+        ok = False
+
+    # Another worker process bumps the counter; this process sees it after the TTL
+    etag = after_update.headers.get("etag")
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE master_data_version SET version = version + 1 WHERE id = 1"))
+    within_ttl = client.get("/category/", headers={"If-None-Match": etag}).status_code
+    cache.MASTER_DATA_VERSION_TTL = 0.05
+    time.sleep(0.1)
+    after_ttl = client.get("/category/", headers={"If-None-Match": etag}).status_code
+    cache.MASTER_DATA_VERSION_TTL = 60
+    if within_ttl == 304 and after_ttl == 200:
+        print("✅ Writes from other processes show up once the version TTL passes")
+    else:
+        print(f"❌ Cross-process write: {within_ttl} within TTL, {after_ttl} after")
+        ok = False
+
+    page = client.get("/items/?limit=2")
+    queries.clear()
+    cached_page = client.get("/items/?limit=2")
+    cursor = cached_page.headers.get("x-next-cursor")
+    if page.status_code == 200 and len(page.json()) == 2 and cursor and cursor == page.headers.get("x-next-cursor") \
+            and cached_page.content == page.content and not queries:
+        print("✅ Cached item pages keep their X-Next-Cursor header")
+    else:
+        print(f"❌ Item page cache: cursor {cursor}, {len(queries)} queries")
+        ok = False
+
+    second_page = client.get(f"/items/?limit=2&cursor={cursor}")
+    first_ids = {row["id"] for row in page.json()}
+    second_ids = {row["id"] for row in second_page.json()}
+    if second_page.status_code == 200 and len(second_ids) == 2 and not first_ids & second_ids:
+        print("✅ Each query string is cached separately")
+    else:
+        print(f"❌ Second page: {second_page.status_code} {second_page.text[:200]}")
+        ok = False
+
+    purchase_items = client.get("/purchase/items")
+    purchase_etag = purchase_items.headers.get("etag")
+    if purchase_items.status_code == 200 and sorted(purchase_items.json()) == [f"Item {n}" for n in range(5)] \
+            and client.get("/purchase/items", headers={"If-None-Match": purchase_etag}).status_code == 304:
+        print("✅ /purchase/items is served (not captured by /purchase/{pr_id})")
+    else:
+        print(f"❌ /purchase/items: {purchase_items.status_code} {purchase_items.text[:200]}")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_master_data_cache()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Master data cache test passed")
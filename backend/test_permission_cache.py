@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared role version behind the permission cache.
+Runs the SQL ephemeral store on a scratch SQLite master DB and checks that
+a role change made by another worker (a second store instance on the same
+DB) invalidates this worker's cached permissions on the next request, that
+user edits do the same, and that concurrent increments are never lost.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.register_models import Base
+import utils.auth as auth
+from utils.ephemeral_store import SQLEphemeralStore, set_ephemeral_store
+
+
+def test_permission_cache(threads=4, increments=25):
+    print("🔍 Testing shared role versions for cached permissions...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "master.db")
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    set_ephemeral_store(SQLEphemeralStore(Session))
+    other_worker = SQLEphemeralStore(Session)
+    ok = True
+
+    auth.cache_user_permissions(7, ["items.view"], "tenant_a", auth.get_role_version("tenant_a"))
+    if auth.get_cached_permissions(7, "tenant_a") == ["items.view"]:
+        print("✅ Cached permissions are served while the role version holds")
+    else:
+        print("❌ Fresh cache entry was not served")
+        ok = False
+
+    other_worker.incr(auth.ROLE_VERSION_NAMESPACE, "tenant_a", auth.ROLE_VERSION_TTL)
+    if auth.get_cached_permissions(7, "tenant_a") is None:
+        print("✅ A role change on another worker invalidates this worker's cache")
+    else:
+        print("❌ Stale permissions survived another worker's role change")
+        ok = False
+
+    auth.cache_user_permissions(8, ["items.view"], "tenant_b", auth.get_role_version("tenant_b"))
+    auth.cache_user_permissions(9, ["items.view"], "tenant_a", auth.get_role_version("tenant_a"))
+    auth.invalidate_user_permissions(1, "tenant_a")
+    if auth.get_cached_permissions(9, "tenant_a") is None and auth.get_cached_permissions(8, "tenant_b"):
+        print("✅ User edits bump the shared version of their tenant only")
+    else:
+        print("❌ User edit invalidation did not reach the shared version")
+        ok = False
+
+    start = auth.get_role_version("tenant_c")
+
+    def bump():
+        for _ in range(increments):
+            auth.bump_role_version("tenant_c")
+
+    workers = [threading.Thread(target=bump) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    final = auth.get_role_version("tenant_c")
+    if final - start == threads * increments:
+        print(f"✅ {threads * increments} concurrent bumps, none lost")
+    else:
+        print(f"❌ Concurrent bumps: expected {threads * increments}, got {final - start}")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_permission_cache()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Permission cache test passed")
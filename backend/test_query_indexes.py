@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the hot batch/GRN lookups use the managed indexes.
+Seeds a scratch tenant DB, runs EXPLAIN on each query shape and exits
+non-zero if any table is read with a full scan (type = ALL).
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Query
+
+from database import bootstrap_tenant_db, get_tenant_engine
+from models.tenant_models import Batch, GRNItem, GRN, GRNStatus, StockOverview, StockLedger
+
+SCRATCH_DB = "ims_index_check"
+ROWS = 2000
+
+
+def seed(conn):
+    for table in ("batches", "grn_items", "grns", "stock_overview", "stock_ledger"):
+        conn.execute(text(f"DELETE FROM {table}"))
+
+    conn.execute(
+        text("INSERT INTO grns (id, grn_number, grn_date, store, status) VALUES (:id, :no, :d, :store, :status)"),
+        [{"id": i + 1, "no": f"GRN-{i}", "d": date.today(), "store": f"Store {i % 20}",
+          "status": "approved" if i % 3 else "pending"} for i in range(ROWS // 10)]
+    )
+    conn.execute(
+        text("INSERT INTO grn_items (id, grn_id, item_name, received_qty) VALUES (:id, :grn_id, :name, 10)"),
+        [{"id": i + 1, "grn_id": i % (ROWS // 10) + 1, "name": f"Item {i}"} for i in range(ROWS)]
+    )
+    conn.execute(
+        text("INSERT INTO batches (grn_item_id, batch_no, qty) VALUES (:grn_item_id, :batch_no, 5)"),
+        [{"grn_item_id": i % ROWS + 1, "batch_no": f"B-{i}"} for i in range(ROWS * 2)]
+    )
+    conn.execute(
+        text("INSERT INTO stock_overview (item_name, item_code, location, available_qty, batch_no, status) "
+             "VALUES (:name, :code, :loc, 5, :batch_no, 'Good')"),
+        [{"name": f"Item {i}", "code": f"C{i}", "loc": f"Store {i % 20}", "batch_no": f"B-{i}"} for i in range(ROWS)]
+    )
+    conn.execute(
+        text("INSERT INTO stock_ledger (stock_id, txn_type, qty_in, qty_out, balance, created_at) "
+             "VALUES (:stock_id, 'ISSUE', 0, 1, 1, :created_at)"),
+        [{"stock_id": i % 200, "created_at": datetime.now() - timedelta(minutes=i)} for i in range(ROWS)]
+    )
+
+    for table in ("batches", "grn_items", "grns", "stock_overview", "stock_ledger"):
+        conn.execute(text(f"ANALYZE TABLE {table}"))
+
+
+def hot_queries():
+    """Query shapes used by transfers, returns, invoicing and stock views."""
+    return {
+        "batch by item/batch/store/status": Query(Batch).join(GRNItem).join(GRN).filter(
+            GRNItem.item_name == "Item 42",
+            Batch.batch_no == "B-42",
+            GRN.store == "Store 2",
+            GRN.status == GRNStatus.approved
+        ),
+        "batch by item/batch/status": Query(Batch).join(GRNItem).join(GRN).filter(
+            GRNItem.item_name == "Item 42",
+            Batch.batch_no == "B-42",
+            GRN.status == GRNStatus.approved
+        ),
+        "batch by batch_no": Query(Batch).filter(Batch.batch_no == "B-42"),
+        "stock_overview by item/batch/location": Query(StockOverview).filter(
+            StockOverview.item_name == "Item 42",
+            StockOverview.batch_no == "B-42",
+            StockOverview.location == "Store 2"
+        ),
+        "stock_ledger by stock ordered by date": Query(StockLedger).filter(
+            StockLedger.stock_id == 42
+        ).order_by(StockLedger.created_at.desc()),
+    }
+
+
+def explain(conn, query):
+    sql = str(query.statement.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+    return conn.execute(text(f"EXPLAIN {sql}")).mappings().all()
+
+
+def test_query_indexes():
+    print("🔍 Checking hot queries for full table scans...")
+
+    bootstrap_tenant_db(SCRATCH_DB)
+    engine = get_tenant_engine(SCRATCH_DB)
+
+    failures = []
+    with engine.begin() as conn:
+        seed(conn)
+
+        for label, query in hot_queries().items():
+            for row in explain(conn, query):
+                if row["type"] == "ALL":
+                    failures.append(f"{label}: full scan on {row['table']}")
+                    print(f"❌ {label}: full scan on {row['table']} (rows={row['rows']})")
+                else:
+                    print(f"✅ {label}: {row['table']} via {row['key']} ({row['type']})")
+
+    assert not failures, failures
+
+
+if __name__ == "__main__":
+    try:
+        test_query_indexes()
+    except AssertionError as e:
+        print(f"\n❌ {len(e.args[0])} query plan(s) degraded to a full table scan")
+        sys.exit(1)
+    print("\n✅ All hot queries use an index")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the demand-based reorder engine.
+Seeds a scratch SQLite tenant DB with items, a full history window of
+consumption, vendor lead times and a reorder rule, refreshes
+reorder_suggestions and checks the stored levels against the formulas;
+then times the vectorized forecast for a synthetic 100k-item catalog.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import math
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.tenant_models import (
+    TenantBase, Item, IssueHeader, IssueItem, IssueTypeEnum, ItemReorderRule, ItemVendorLeadTime,
+    Stock, StockLedger, StockOverview, StockTxnType, Vendor
+)
+import utils.reorder_engine as engine_module
+from utils.reorder_engine import compute_reorder_levels, load_reorder_suggestions, refresh_reorder_suggestions
+
+
+def seed(db, today):
+    vendor = Vendor(vendor_name="Fast Supplies", phone="0000000000", email="fast@example.com")
+    db.add(vendor)
+    items = [
+        Item(name="Gloves", item_code="GLV", min_stock=10, max_stock=0, safety_stock=0),
+        Item(name="Masks", item_code="MSK", min_stock=5, max_stock=0, safety_stock=0),
+        Item(name="Syringes", item_code="SYR", min_stock=0, max_stock=0, safety_stock=0),
+        Item(name="Idle Item", item_code="IDL", min_stock=0, max_stock=0, safety_stock=0),
+    ]
+    db.add_all(items)
+    db.flush()
+    gloves, masks, syringes, idle = items
+
+    stock = Stock(item_name="Gloves", item_id=gloves.id, sku="GLV")
+    db.add(stock)
+    db.flush()
+
+    for offset in range(engine_module.REORDER_HISTORY_DAYS):
+        day = today - timedelta(days=offset)
+        # Gloves: 10/day through the ledger; Masks: 4/day through departmental issues
+        db.add(StockLedger(stock_id=stock.id, txn_type=StockTxnType.ISSUE, qty_out=10,
+                           created_at=datetime(day.year, day.month, day.day, 12)))
+        header = IssueHeader(issue_no=f"ISS-{offset}", issue_type=list(IssueTypeEnum)[0], issue_date=day)
+        db.add(header)
+        db.flush()
+        db.add(IssueItem(issue_id=header.id, item_name="Masks", qty=4))
+
+    db.add_all([
+        StockOverview(item_name="Gloves", item_id=gloves.id, item_code="GLV", location="Main Store", available_qty=50, status="In Stock"),
+        StockOverview(item_name="Masks", item_id=masks.id, item_code="MSK", location="Main Store", available_qty=500, status="In Stock"),
+        StockOverview(item_name="Syringes", item_id=syringes.id, item_code="SYR", location="Main Store", available_qty=3, status="In Stock"),
+        StockOverview(item_name="Idle Item", item_id=idle.id, item_code="IDL", location="Main Store", available_qty=0, status="In Stock"),
+        ItemVendorLeadTime(item_id=gloves.id, vendor_id=vendor.id, avg_lead_time=5, min_lead_time=3, max_lead_time=7),
+        ItemVendorLeadTime(item_id=gloves.id, vendor_id=vendor.id + 1, avg_lead_time=12, min_lead_time=10, max_lead_time=14),
+        ItemReorderRule(item_id=syringes.id, min_level=2, max_level=40, reorder_level=8, safety_stock=4),
+    ])
+    db.commit()
+
+
+def test_reorder_engine(catalog_size=100_000):
+    print("🔍 Testing demand-based reorder suggestions...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "reorder.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    TenantBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    today = date.today()
+    db = Session()
+    seed(db, today)
+    stats = refresh_reorder_suggestions(db, today=today)
+    rows = {row.item_name: row for row in load_reorder_suggestions(db)}
+    order = [row.item_name for row in load_reorder_suggestions(db)]
+    db.close()
+
+    ok = True
+
+    gloves = rows.get("Gloves")
+    expected_rop = 10 * 5 + engine_module.REORDER_SERVICE_Z * math.sqrt(5 * 0 + 10 ** 2 * 1 ** 2)
+    if gloves and abs(gloves.avg_daily_demand - 10) < 1e-6 and gloves.lead_time_days == 5 \
+            and abs(gloves.reorder_point - round(expected_rop, 2)) < 0.01 \
+            and gloves.preferred_vendor == "Fast Supplies":
+        print(f"✅ Gloves: 10/day over the fastest vendor's 5 days → reorder at {gloves.reorder_point}, "
+              f"order {gloves.suggested_order_qty:.0f}")
+    else:
+        print(f"❌ Unexpected Gloves suggestion: {gloves and vars(gloves)}")
+        ok = False
+
+    if "Masks" not in rows:
+        print("✅ Masks (500 on hand, 4/day) is above its reorder point and not suggested")
+    else:
+        print(f"❌ Masks should not need reordering: {vars(rows['Masks'])}")
+        ok = False
+
+    syringes = rows.get("Syringes")
+    if syringes and syringes.reorder_point == 8 and syringes.safety_stock == 4 and syringes.suggested_order_qty == 37:
+        print("✅ Syringes follows its reorder rule (reorder at 8, order up to 40)")
+    else:
+        print(f"❌ Reorder rule not honoured: {syringes and vars(syringes)}")
+        ok = False
+
+    if "Idle Item" not in rows and order and rows[order[0]].priority in ("Critical", "High"):
+        print(f"✅ Items without demand or levels are skipped; {stats['suggestions']} suggestions, most urgent first")
+    else:
+        print(f"❌ Unexpected suggestion set or order: {order}")
+        ok = False
+
+    rng = np.random.default_rng(7)
+    catalog = {
+        "min_stock": rng.integers(0, 50, catalog_size).astype(np.float64),
+        "max_stock": np.zeros(catalog_size),
+        "safety_stock": np.zeros(catalog_size),
+    }
+    history = rng.poisson(3, (catalog_size, engine_module.REORDER_HISTORY_DAYS)).astype(np.float64)
+    rules = np.full((4, catalog_size), np.nan)
+    start = time.perf_counter()
+    levels = compute_reorder_levels(catalog, history, rng.integers(0, 200, catalog_size).astype(np.float64),
+                                    np.full(catalog_size, 7.0), np.ones(catalog_size), rules)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"✅ Forecast and reorder levels for {catalog_size:,} items in {elapsed_ms:.0f} ms "
+          f"({int(levels['needs_order'].sum()):,} to reorder)")
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_reorder_engine()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Reorder engine test passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the return-invoice listing.
+Seeds a scratch SQLite tenant DB with customer and internal returns, lists
+them through an async (aiosqlite) session as the route does, and checks
+that internal returns stay out of the listing, that customers are resolved
+from customer_id or the "customer: <name>" vendor text, and that paid
+totals come from the payment rows.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import tempfile
+from datetime import date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from models.tenant_models import (
+    TenantBase, Customer, ReturnHeader, ReturnBilling, ReturnBillingPayment, ReturnTypeEnum, BillingStatus
+)
+from routers.billingSystem.billing import _list_return_billing
+from utils.pagination import PageParams, ListFilters
+
+
+def test_return_invoices():
+    print("🔍 Testing return-invoice listing...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "return_invoices.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    TenantBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    customer = Customer(customer_type="self", name="Asha", mobile="999", status="approved")
+    db.add(customer)
+    db.flush()
+
+    linked = ReturnHeader(return_no="RET-1", return_type=ReturnTypeEnum.TO_CUSTOMER,
+                          return_date=date.today(), customer_id=customer.id, status="APPROVED")
+    by_vendor = ReturnHeader(return_no="RET-2", return_type=ReturnTypeEnum.FROM_CUSTOMER,
+                             return_date=date.today(), vendor="Customer: Asha", status="APPROVED")
+    db.add_all([linked, by_vendor])
+    db.flush()
+    # Legacy internal return, written before the enum lost its INTERNAL member
+    db.execute(text(
+        "INSERT INTO return_headers (return_no, return_type, return_date, status) "
+        "VALUES ('RET-3', 'INTERNAL', :today, 'APPROVED')"
+    ), {"today": date.today()})
+    internal_id = db.execute(text("SELECT id FROM return_headers WHERE return_no = 'RET-3'")).scalar()
+
+    for return_id in (linked.id, by_vendor.id, internal_id):
+        db.add(ReturnBilling(return_id=return_id, gross_amount=100, tax_amount=0, net_amount=100,
+                             paid_amount=0, balance_amount=100, status=BillingStatus.DRAFT))
+    db.flush()
+    first_billing = db.query(ReturnBilling).filter(ReturnBilling.return_id == linked.id).one()
+    db.add_all([ReturnBillingPayment(billing_id=first_billing.id, amount=30),
+                ReturnBillingPayment(billing_id=first_billing.id, amount=20)])
+    db.commit()
+    db.close()
+
+    async def list_all():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with async_sessionmaker(bind=async_engine)() as session:
+                return await _list_return_billing(session, PageParams(limit=None, cursor=None), ListFilters())
+        finally:
+            await async_engine.dispose()
+
+    ok = True
+    billings, next_cursor = asyncio.run(list_all())
+    return_nos = sorted(billing["return_header"]["return_no"] for billing in billings)
+
+    if return_nos == ["RET-1", "RET-2"] and next_cursor is None:
+        print("✅ Internal returns are left out of the listing")
+    else:
+        print(f"❌ Listed returns: {return_nos}")
+        ok = False
+
+    by_no = {billing["return_header"]["return_no"]: billing for billing in billings}
+    if all(by_no.get(no, {}).get("customer_name") == "Asha" for no in ("RET-1", "RET-2")):
+        print("✅ Customers resolved from customer_id and from the vendor text")
+    else:
+        print(f"❌ Customers: {[(no, b.get('customer_name')) for no, b in by_no.items()]}")
+        ok = False
+
+    if by_no.get("RET-1", {}).get("paid_amount") == 50 and by_no["RET-1"]["balance_amount"] == 50:
+        print("✅ Paid total summed from payment rows")
+    else:
+        print(f"❌ Paid total: {by_no.get('RET-1')}")
+        ok = False
+
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_return_invoices()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Return invoice test passed")
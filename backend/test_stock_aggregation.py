@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the grouped stock aggregation queries.
+Seeds a scratch SQLite tenant DB with GRN lines and stock rows whose item_id
+was never resolved and checks that their batches, received and issued
+totals, latest location and expiry alerts are still counted under the item
+with the same name, while rows naming no item at all stay out.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from models.tenant_models import (
+    TenantBase, Item, GRN, GRNItem, Batch, GRNStatus, Stock, StockIssue
+)
+from utils.stock_aggregation import (
+    get_item_stock_summary, get_received_qty_by_item, get_issued_qty_by_item, get_expiring_batches
+)
+
+
+def receive(db, number, store, item_name, qty, grn_date, item_id=None):
+    grn = GRN(grn_number=number, grn_date=grn_date, po_number="PO-1", vendor_name="Acme",
+              store=store, status=GRNStatus.approved)
+    db.add(grn)
+    db.flush()
+    line = GRNItem(grn_id=grn.id, item_id=item_id, item_name=item_name, po_qty=qty, received_qty=qty, uom="PCS", rate=1)
+    db.add(line)
+    db.flush()
+    db.add(Batch(grn_item_id=line.id, batch_no=f"{number}-B", qty=qty,
+                 expiry_date=date.today() + timedelta(days=10)))
+    return line
+
+
+def test_stock_aggregation():
+    print("🔍 Testing stock aggregation for unresolved item references...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "stock_aggregation.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    TenantBase.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    gauze = Item(name="Gauze", item_code="GZ-1")
+    db.add(gauze)
+    db.flush()
+
+    receive(db, "GRN-1", "Main Store", "Gauze", 20, date.today() - timedelta(days=5), item_id=gauze.id)
+    receive(db, "GRN-2", "Annex", "Gauze", 7, date.today())
+    receive(db, "GRN-3", "Annex", "Retired Item", 4, date.today())
+    stock = Stock(item_name="Gauze", uom="PCS", total_qty=27, available_qty=24, reserved_qty=0, reorder_level=0)
+    db.add(stock)
+    db.flush()
+    db.add(StockIssue(stock_id=stock.id, qty=3, department="Ward", requested_by="Nurse"))
+    db.commit()
+
+    # Rows written before item_id existed and not backfilled yet
+    db.execute(text("UPDATE grn_items SET item_id = NULL WHERE grn_id = 2"))
+    db.execute(text("UPDATE stocks SET item_id = NULL"))
+    db.commit()
+    ok = True
+
+    summary = get_item_stock_summary(db)
+    entry = summary.get(gauze.id, {})
+    if entry.get("total_qty") == 27 and len(entry.get("batches", [])) == 2 and set(summary) == {gauze.id}:
+        print("✅ Unresolved batches are summed under the item with the same name")
+    else:
+        print(f"❌ Summary: {summary}")
+        ok = False
+
+    if entry.get("location") == "Annex":
+        print("✅ Latest location counts the unresolved GRN")
+    else:
+        print(f"❌ Latest location: {entry.get('location')}")
+        ok = False
+
+    received, issued = get_received_qty_by_item(db), get_issued_qty_by_item(db)
+    if received == {gauze.id: 27} and issued == {gauze.id: 3}:
+        print("✅ Received and issued totals include unresolved rows")
+    else:
+        print(f"❌ Received {received}, issued {issued}")
+        ok = False
+
+    expiring = [(row.item_id, row.batch_no) for row in
+                get_expiring_batches(db, date.today(), date.today() + timedelta(days=30))]
+    if expiring == [(gauze.id, "GRN-1-B"), (gauze.id, "GRN-2-B"), (None, "GRN-3-B")]:
+        print("✅ Expiring batches carry the resolved item id")
+    else:
+        print(f"❌ Expiring batches: {expiring}")
+        ok = False
+
+    db.close()
+    assert ok
+
+
+if __name__ == "__main__":
+    try:
+        test_stock_aggregation()
+    except AssertionError:
+        sys.exit(1)
+    print("\n✅ Stock aggregation test passed")
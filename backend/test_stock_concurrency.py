@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script for compare-and-swap stock updates under contention.
+Seeds one batch in a scratch tenant DB, fires hundreds of concurrent
+issues at it from a thread pool (each in its own session/transaction) and
+checks that no update was lost and the batch was never oversold, both for
+compare-and-swap and for the single-statement conditional decrement. The
+same load through the old read-check-write path is run first for contrast.
+Run against a local MySQL: python test_stock_concurrency.py [issues] [workers] [tenant_db]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from database import bootstrap_tenant_db, get_tenant_sessionmaker
+from models.tenant_models import Batch, GRN, GRNItem, GRNStatus
+from utils.stock_mutation import adjust_batch_qty, decrement_batch_qty
+
+SCRATCH_DB = "ims_concurrency_check"
+START_QTY = 500
+ISSUE_QTY = 2
+
+
+def seed(session_factory) -> int:
+    db = session_factory()
+    try:
+        for table in ("batches", "grn_items", "grns"):
+            db.execute(text(f"DELETE FROM {table}"))
+        grn = GRN(grn_number="CONC-1", grn_date=date.today(), store="Main Store", status=GRNStatus.approved)
+        db.add(grn)
+        db.flush()
+        grn_item = GRNItem(grn_id=grn.id, item_name="Concurrency Item", received_qty=START_QTY)
+        db.add(grn_item)
+        db.flush()
+        batch = Batch(grn_item_id=grn_item.id, batch_no="CONC-B1", qty=START_QTY)
+        db.add(batch)
+        db.commit()
+        return batch.id
+    finally:
+        db.close()
+
+
+def reset(session_factory, batch_id):
+    db = session_factory()
+    try:
+        db.query(Batch).filter(Batch.id == batch_id).update({"qty": START_QTY, "version": 0})
+        db.commit()
+    finally:
+        db.close()
+
+
+def naive_issue(session_factory, batch_id):
+    """Pre-CAS shape: read, check in Python, write qty - n."""
+    db = session_factory()
+    try:
+        batch = db.query(Batch).filter(Batch.id == batch_id).first()
+        if batch.qty < ISSUE_QTY:
+            return "insufficient"
+        batch.qty -= ISSUE_QTY
+        db.commit()
+        return "issued"
+    finally:
+        db.close()
+
+
+def cas_issue(session_factory, batch_id):
+    db = session_factory()
+    try:
+        batch = db.query(Batch).filter(Batch.id == batch_id).first()
+        try:
+            adjust_batch_qty(db, batch, -ISSUE_QTY)
+        except HTTPException as e:
+            db.rollback()
+            return "insufficient" if e.status_code == 400 else "conflict"
+        db.commit()
+        return "issued"
+    finally:
+        db.close()
+
+
+def atomic_issue(session_factory, batch_id):
+    """UPDATE ... SET qty = qty - n WHERE qty >= n: no read at all."""
+    db = session_factory()
+    try:
+        if not decrement_batch_qty(db, batch_id, ISSUE_QTY):
+            db.rollback()
+            return "insufficient"
+        db.commit()
+        return "issued"
+    finally:
+        db.close()
+
+
+def fire(session_factory, batch_id, issue, issues, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda _: issue(session_factory, batch_id), range(issues)))
+    elapsed = time.perf_counter() - start
+
+    db = session_factory()
+    try:
+        final_qty = db.query(Batch.qty).filter(Batch.id == batch_id).scalar()
+    finally:
+        db.close()
+
+    issued = outcomes.count("issued")
+    return {
+        "issued": issued,
+        "insufficient": outcomes.count("insufficient"),
+        "conflict": outcomes.count("conflict"),
+        "final_qty": final_qty,
+        # Units deducted by successful issues that the batch never saw
+        "lost_updates": final_qty - (START_QTY - issued * ISSUE_QTY),
+        "per_second": issues / elapsed
+    }
+
+
+def test_stock_concurrency(session_factory=None, issues=400, workers=32):
+    if session_factory is None:
+        bootstrap_tenant_db(SCRATCH_DB)
+        session_factory = get_tenant_sessionmaker(SCRATCH_DB)
+
+    print(f"🔍 {issues} concurrent issues of {ISSUE_QTY} against one batch of {START_QTY} ({workers} workers)...")
+    batch_id = seed(session_factory)
+
+    naive = fire(session_factory, batch_id, naive_issue, issues, workers)
+    print(f"   read-check-write: {naive['issued']} issued, final qty {naive['final_qty']}, "
+          f"{naive['lost_updates']:.0f} units lost, {naive['per_second']:.0f} issues/s")
+
+    reset(session_factory, batch_id)
+    cas = fire(session_factory, batch_id, cas_issue, issues, workers)
+    print(f"   compare-and-swap: {cas['issued']} issued, {cas['insufficient']} insufficient, "
+          f"{cas['conflict']} gave up, final qty {cas['final_qty']}, {cas['per_second']:.0f} issues/s")
+
+    reset(session_factory, batch_id)
+    atomic = fire(session_factory, batch_id, atomic_issue, issues, workers)
+    print(f"   conditional decrement: {atomic['issued']} issued, {atomic['insufficient']} insufficient, "
+          f"final qty {atomic['final_qty']}, {atomic['per_second']:.0f} issues/s")
+
+    failures = []
+    for label, run in (("compare-and-swap", cas), ("conditional decrement", atomic)):
+        if run["lost_updates"] != 0:
+            failures.append(f"{label}: {run['lost_updates']} units of lost updates")
+        if run["final_qty"] < 0:
+            failures.append(f"{label}: batch oversold to {run['final_qty']}")
+        if issues * ISSUE_QTY >= START_QTY and run["issued"] != START_QTY // ISSUE_QTY:
+            failures.append(f"{label}: expected {START_QTY // ISSUE_QTY} successful issues, got {run['issued']}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Every successful issue is reflected in the batch and nothing was oversold")
+    assert not failures, failures
+
+
+if __name__ == "__main__":
+    issue_count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    worker_count = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    tenant = sys.argv[3] if len(sys.argv) > 3 else SCRATCH_DB
+
+    bootstrap_tenant_db(tenant)
+    try:
+        test_stock_concurrency(get_tenant_sessionmaker(tenant), issue_count, worker_count)
+    except AssertionError:
+        sys.exit(1)
@@ -5,16 +5,17 @@ from jose import jwt, JWTError
 import os
 import hashlib
 import secrets
-import smtplib
-import ssl
+import threading
+import time
 import traceback
-from email.mime.text import MIMEText
 from dotenv import load_dotenv
 from fastapi import HTTPException, Header, Depends
 from typing import Optional, Dict, Any
 
 # Logging helpers (assumed present in your project)
 from utils.logger import log_error, log_audit, log_api
+from utils.ephemeral_store import get_ephemeral_store
+from utils.email_outbox import enqueue_email
 
 load_dotenv()
 
@@ -69,19 +70,18 @@ def refresh_expiry() -> datetime:
 
 
 # ===========================================================
-# OTP STORAGE (IN-MEMORY)
+# OTP STORAGE (SHARED EPHEMERAL STORE)
 # ===========================================================
-otp_store: dict = {}
 OTP_EXPIRY_MIN = 5
+OTP_NAMESPACE = "otp"
 
 
 def generate_otp(email: str) -> str:
     """Generate & store 6-digit OTP for 5 minutes."""
     try:
         otp = str(secrets.randbelow(900000) + 100000)
-        expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MIN)
 
-        otp_store[email] = {"otp": otp, "expires": expires_at}
+        get_ephemeral_store().set(OTP_NAMESPACE, email, {"otp": otp}, OTP_EXPIRY_MIN * 60)
 
         log_audit(f"OTP generated for {email}")
         return otp
@@ -94,19 +94,20 @@ def generate_otp(email: str) -> str:
 def verify_otp(email: str, otp: str) -> bool:
     """Validate OTP and delete after use."""
     try:
-        if email not in otp_store:
-            return False
+        store = get_ephemeral_store()
 
-        data = otp_store[email]
+        # Expired entries are never returned
+        data = store.get(OTP_NAMESPACE, email)
+        if not data:
+            return False
 
-        if datetime.utcnow() > data["expires"]:
-            del otp_store[email]
+        if not secrets.compare_digest(data["otp"], otp):
             return False
 
-        if data["otp"] != otp:
+        # Only the request that removes the entry may use it
+        if not store.delete(OTP_NAMESPACE, email):
             return False
 
-        del otp_store[email]
         log_audit(f"OTP verified successfully for {email}")
         return True
 
@@ -130,21 +131,9 @@ def send_otp_email(to_email: str, otp: str):
     Nutryah Team
     """
 
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = SMTP_FROM
-    msg["To"] = to_email
-
     try:
-        log_api(f"Sending OTP email → {to_email}")
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=15) as server:
-            server.starttls(context=context)
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(SMTP_FROM, to_email, msg.as_string())
-
-        log_audit(f"OTP email sent to {to_email}")
+        log_api(f"Queueing OTP email → {to_email}")
+        enqueue_email(to_email, subject, body, from_email=SMTP_FROM)
 
     except Exception as e:
         log_error(e, location="send_otp_email()")
@@ -169,19 +158,9 @@ def send_welcome_email(to_email: str, username: str, temp_password: str):
     Nutryah Team
     """
 
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = SMTP_FROM
-    msg["To"] = to_email
-
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=15) as server:
-            server.starttls(context=context)
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(SMTP_FROM, to_email, msg.as_string())
-
-        log_audit(f"Welcome email sent to {to_email}")
+        enqueue_email(to_email, subject, body, from_email=SMTP_FROM)
+        log_audit(f"Welcome email queued for {to_email}")
 
     except Exception as e:
         log_error(e, location="send_welcome_email()")
@@ -203,6 +182,84 @@ def verify_password(plain: str, hashed: str) -> bool:
         return False
 
 
+# ===========================================================
+# PERMISSION CACHE (TENANT USERS)
+# ===========================================================
+# Resolved permission lists keyed by (tenant_db, user_id), per worker. An
+# entry is valid while its role version matches the tenant's current one and
+# its TTL has not run out. The role version lives in the shared ephemeral
+# store and is read on every request, so a role change or revocation on any
+# worker invalidates the entries of all workers at once.
+PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", 60))
+ROLE_VERSION_NAMESPACE = "role_version"
+ROLE_VERSION_TTL = int(os.getenv("ROLE_VERSION_TTL", 365 * 24 * 3600))
+
+permission_cache: dict = {}
+_permission_lock = threading.Lock()
+
+
+def get_role_version(tenant_db: str) -> int:
+    return get_ephemeral_store().get(ROLE_VERSION_NAMESPACE, tenant_db) or 0
+
+
+def bump_role_version(tenant_db: str = "arun"):
+    """Invalidate every cached permission list of a tenant, on every worker (role definitions changed)."""
+    version = get_ephemeral_store().incr(ROLE_VERSION_NAMESPACE, tenant_db, ROLE_VERSION_TTL)
+    log_audit(f"Role version bumped for {tenant_db} → {version}")
+
+
+def invalidate_user_permissions(user_id: int, tenant_db: str = "arun"):
+    """Invalidate one user's cached permissions (role assignment changed).
+
+    Other workers only learn about it through the shared role version, so
+    this bumps it for the whole tenant; user edits are rare enough for that.
+    """
+    with _permission_lock:
+        permission_cache.pop((tenant_db, int(user_id)), None)
+    bump_role_version(tenant_db)
+
+
+def cache_user_permissions(user_id: int, permissions: list, tenant_db: str = "arun", version: int = None):
+    """Store a resolved permission list; version is the role version read before resolving."""
+    if version is None:
+        version = get_role_version(tenant_db)
+    expires_at = time.monotonic() + PERMISSION_CACHE_TTL
+    with _permission_lock:
+        permission_cache[(tenant_db, int(user_id))] = (version, expires_at, list(permissions))
+
+
+def get_cached_permissions(user_id: int, tenant_db: str = "arun") -> Optional[list]:
+    entry = permission_cache.get((tenant_db, int(user_id)))
+    if not entry:
+        return None
+
+    version, expires_at, permissions = entry
+    if version != get_role_version(tenant_db) or time.monotonic() > expires_at:
+        return None
+    return permissions
+
+
+def load_user_permissions(user_id: int, tenant_db: str = "arun") -> list:
+    """Resolve a tenant user's permissions from the DB and cache them."""
+    from database import get_tenant_sessionmaker, bootstrap_tenant_db
+    from models.tenant_models import User
+
+    version = get_role_version(tenant_db)
+
+    bootstrap_tenant_db(tenant_db)
+    db = get_tenant_sessionmaker(tenant_db)()
+    try:
+        db_user = db.query(User).filter(User.id == user_id).first()
+        permissions = []
+        if db_user:
+            permissions = list({perm.name for role in db_user.roles for perm in role.permissions})
+    finally:
+        db.close()
+
+    cache_user_permissions(user_id, permissions, tenant_db, version)
+    return permissions
+
+
 # ===========================================================
 # JWT VERIFY + CURRENT USER
 # ===========================================================
@@ -248,16 +305,10 @@ def get_current_user(Authorization: str = Header(None)) -> dict:
     payload.setdefault("permissions", [])
     payload.setdefault("role", payload.get("role", "user"))
 
-    # TENANT USER: refresh permissions from tenant DB (safe fetch)
+    # TENANT USER: permissions from the versioned cache, DB only on a miss
     if payload.get("user_type") == "tenant_user":
-        tenant_db = None
+        tenant_db = payload.get("tenant_db", "arun")
         try:
-            from database import get_tenant_db
-            from models.tenant_models import User
-
-            tenant_db_gen = get_tenant_db("arun")
-            tenant_db = next(tenant_db_gen)
-
             # sub may be string; convert safely
             try:
                 user_id = int(payload.get("sub"))
@@ -265,35 +316,20 @@ def get_current_user(Authorization: str = Header(None)) -> dict:
                 user_id = None
 
             if user_id is not None:
-                db_user = tenant_db.query(User).filter(User.id == user_id).first()
+                permissions = get_cached_permissions(user_id, tenant_db)
+                if permissions is None:
+                    permissions = load_user_permissions(user_id, tenant_db)
             else:
-                db_user = None
-
-            if db_user:
                 permissions = []
-                for role in db_user.roles:
-                    for perm in role.permissions:
-                        permissions.append(perm.name)
 
-                payload["permissions"] = list(set(permissions))
-                payload["role"] = "user"
-            else:
-                payload["permissions"] = []
-                payload["role"] = "user"
+            payload["permissions"] = permissions
+            payload["role"] = "user"
 
         except Exception as e:
             log_error(e, location="get_current_user tenant_user load")
             # On error, do not escalate to 500 here — mark as unauthenticated
             raise HTTPException(401, "Unable to load user permissions")
 
-        finally:
-            # Close tenant DB session if we obtained one
-            try:
-                if tenant_db is not None:
-                    tenant_db.close()
-            except Exception:
-                pass
-
     else:
         # ADMIN or master user token: respect any permissions already present on token.
         # If none provided, default to wildcard (full access)
@@ -0,0 +1,206 @@
+# backend/utils/dashboard_metrics.py
+"""
+Dashboard / module-statistics figures for one tenant.
+
+compute_dashboard_metrics() gathers every count and sum the dashboard,
+system-health and module-statistics endpoints show in a single SELECT:
+one conditional-aggregate subquery per table, cross joined into one row.
+Stock is valued at the item master price (fixing price, else MRP).
+
+Results are cached per tenant for DASHBOARD_CACHE_TTL seconds. Concurrent
+misses for the same tenant are coalesced: the first caller computes, the
+rest wait on its future, so a burst of dashboard loads costs one query.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, case, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.tenant_models import (
+    Item, StockOverview, GRN, ReturnHeader, Customer, Vendor, VendorPayment,
+    IssueHeader, User, Department, ExternalTransfer
+)
+
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+# How long a coalesced caller waits for the in-flight computation
+DASHBOARD_COMPUTE_TIMEOUT = int(os.getenv("DASHBOARD_COMPUTE_TIMEOUT", "30"))
+
+RECENT_DAYS = 7
+
+_METRICS_CACHE = {}  # {tenant: (expires_at, metrics)}
+_IN_FLIGHT = {}      # {tenant: Future}
+_METRICS_LOCK = threading.Lock()
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _aggregates(week_ago: datetime):
+    """One single-row subquery per table; cross joined by the caller."""
+    price = func.coalesce(func.nullif(Item.fixing_price, 0), Item.mrp, 0)
+
+    items = select(
+        func.count(Item.id).label("items_total"),
+        _count_if(Item.is_active == True).label("items_active"),
+        _count_if((Item.category == None) | (Item.category == "")).label("items_without_category"),
+        _count_if(Item.min_stock == 0).label("items_without_min_stock")
+    ).subquery("items_agg")
+
+    stock = select(
+        func.count(StockOverview.id).label("stock_records"),
+        func.coalesce(func.sum(StockOverview.available_qty), 0).label("stock_qty"),
+        func.coalesce(func.sum(StockOverview.available_qty * price), 0).label("stock_value"),
+        _count_if(StockOverview.available_qty <= StockOverview.min_stock).label("stock_low"),
+        _count_if(StockOverview.status.in_(("Good", "In Stock"))).label("stock_in_stock"),
+        _count_if(StockOverview.status == "Low Stock").label("stock_low_status"),
+        _count_if(StockOverview.status == "Out of Stock").label("stock_out_of_stock")
+    ).select_from(StockOverview).outerjoin(Item, Item.id == StockOverview.item_id).subquery("stock_agg")
+
+    vendors = select(func.count(Vendor.id).label("vendors_total")).subquery("vendors_agg")
+
+    customers = select(
+        func.count(Customer.id).label("customers_total"),
+        _count_if(Customer.is_active == True).label("customers_active")
+    ).subquery("customers_agg")
+
+    users = select(func.count(User.id).label("users_total")).subquery("users_agg")
+    departments = select(func.count(Department.id).label("departments_total")).subquery("departments_agg")
+
+    grns = select(
+        func.count(GRN.id).label("grns_total"),
+        _count_if(GRN.status == "pending").label("grns_pending"),
+        _count_if(GRN.status == "approved").label("grns_approved"),
+        _count_if(GRN.grn_date >= week_ago.date()).label("grns_recent")
+    ).subquery("grns_agg")
+
+    issues = select(
+        _count_if(IssueHeader.created_at >= week_ago).label("issues_recent")
+    ).subquery("issues_agg")
+
+    returns = select(
+        func.count(ReturnHeader.id).label("returns_total"),
+        _count_if(ReturnHeader.created_at >= week_ago).label("returns_recent")
+    ).subquery("returns_agg")
+
+    transfers = select(
+        func.count(ExternalTransfer.id).label("transfers_total"),
+        _count_if(ExternalTransfer.status == "DRAFT").label("transfers_draft")
+    ).subquery("transfers_agg")
+
+    payments = select(
+        func.coalesce(func.sum(VendorPayment.outstanding_amount), 0).label("outstanding_payments")
+    ).subquery("payments_agg")
+
+    return [items, stock, vendors, customers, users, departments, grns, issues, returns, transfers, payments]
+
+
+def compute_dashboard_metrics(db: Session) -> dict:
+    """All dashboard figures in one round trip (uncached)."""
+    subqueries = _aggregates(datetime.now() - timedelta(days=RECENT_DAYS))
+
+    source = subqueries[0]
+    for subquery in subqueries[1:]:
+        source = source.join(subquery, true())
+
+    row = db.execute(select(*subqueries).select_from(source)).mappings().one()
+
+    metrics = {key: (float(value) if key in ("stock_value", "outstanding_payments") else int(value or 0))
+               for key, value in row.items()}
+    metrics["computed_at"] = datetime.now().isoformat()
+    return metrics
+
+
+# -------------------------------------------------------
+# PER-TENANT CACHE + REQUEST COALESCING
+# -------------------------------------------------------
+def _claim(tenant: str):
+    """(cached, None, False) on a hit, else (None, future, is_leader)."""
+    with _METRICS_LOCK:
+        entry = _METRICS_CACHE.get(tenant)
+        if entry and entry[0] > time.monotonic():
+            return entry[1], None, False
+
+        future = _IN_FLIGHT.get(tenant)
+        if future is not None:
+            return None, future, False
+
+        future = Future()
+        _IN_FLIGHT[tenant] = future
+        return None, future, True
+
+
+def _publish(tenant: str, future: Future, metrics=None, error=None):
+    """Release the tenant's in-flight slot and resolve its future (the leader always calls this)."""
+    with _METRICS_LOCK:
+        if _IN_FLIGHT.get(tenant) is future:
+            del _IN_FLIGHT[tenant]
+        if error is None:
+            _METRICS_CACHE[tenant] = (time.monotonic() + DASHBOARD_CACHE_TTL, metrics)
+
+    if future.done():
+        return
+    if error is None:
+        future.set_result(metrics)
+    elif isinstance(error, Exception):
+        future.set_exception(error)
+    else:
+        # Leader was cancelled (client went away); waiters get an error, not a cancellation
+        future.set_exception(RuntimeError("Dashboard metrics computation was interrupted"))
+
+
+def get_dashboard_metrics(db: Session) -> dict:
+    """Cached metrics for the session's tenant (sync handlers)."""
+    tenant = db.get_bind().url.database
+    cached, future, leader = _claim(tenant)
+    if cached is not None:
+        return cached
+    if not leader:
+        return future.result(timeout=DASHBOARD_COMPUTE_TIMEOUT)
+
+    metrics, error = None, None
+    try:
+        metrics = compute_dashboard_metrics(db)
+        return metrics
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _publish(tenant, future, metrics, error)
+
+
+async def get_dashboard_metrics_async(db: AsyncSession) -> dict:
+    """Cached metrics for the session's tenant (async handlers)."""
+    tenant = db.get_bind().url.database
+    cached, future, leader = _claim(tenant)
+    if cached is not None:
+        return cached
+    if not leader:
+        # shield: a timed-out or cancelled waiter must not cancel the shared future
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), DASHBOARD_COMPUTE_TIMEOUT)
+
+    metrics, error = None, None
+    try:
+        metrics = await db.run_sync(compute_dashboard_metrics)
+        return metrics
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _publish(tenant, future, metrics, error)
+
+
+def invalidate_dashboard_metrics(tenant: str = None):
+    """Drop cached metrics for one tenant (or all)."""
+    with _METRICS_LOCK:
+        if tenant is None:
+            _METRICS_CACHE.clear()
+        else:
+            _METRICS_CACHE.pop(tenant, None)
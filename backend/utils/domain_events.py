@@ -0,0 +1,225 @@
+# backend/utils/domain_events.py
+"""
+In-process domain event bus backed by a durable per-tenant outbox.
+
+Handlers call publish(db, "grn.approved", {...}) next to their core write.
+publish() only adds one domain_event_outbox row per registered subscriber
+to the caller's session, so the events commit (or roll back) atomically
+with the write that caused them and the request never runs subscriber
+work itself. When that transaction commits the worker pool is woken.
+
+EVENT_BUS_WORKERS threads claim due rows from every bootstrapped tenant
+database and run the subscriber in a session of its own; the subscriber's
+writes and the row's "done" mark commit together. Failures are retried
+with exponential backoff until EVENT_BUS_MAX_ATTEMPTS, each subscriber
+independently of the others.
+
+Subscribers live in utils/domain_subscribers.py:
+
+    @subscribe("grn.approved", "payment_ledger")
+    def create_vendor_payment(db, payload): ...
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_, and_
+from sqlalchemy.orm import Session
+
+from models.tenant_models import DomainEventOutbox
+from utils.logger import log_error, log_audit
+
+EVENT_BUS_WORKERS = int(os.getenv("EVENT_BUS_WORKERS", 4))
+EVENT_BUS_BATCH = int(os.getenv("EVENT_BUS_BATCH", 20))
+EVENT_BUS_MAX_ATTEMPTS = int(os.getenv("EVENT_BUS_MAX_ATTEMPTS", 8))
+EVENT_BUS_BACKOFF = int(os.getenv("EVENT_BUS_BACKOFF", 10))
+EVENT_BUS_MAX_BACKOFF = int(os.getenv("EVENT_BUS_MAX_BACKOFF", 3600))
+EVENT_BUS_POLL = float(os.getenv("EVENT_BUS_POLL", 5))
+# Rows left in "processing" this long (worker died mid-handler) are picked up again
+EVENT_BUS_STALE_LOCK = int(os.getenv("EVENT_BUS_STALE_LOCK", 600))
+
+_SUBSCRIBERS = {}  # {event_type: {subscriber_name: handler}}
+_subscribers_loaded = False
+
+_wake = threading.Event()
+_stop = threading.Event()
+_workers = []
+
+
+# -------------------------------------------------------
+# SUBSCRIBE / PUBLISH
+# -------------------------------------------------------
+def subscribe(event_type: str, name: str):
+    """Register handler(db, payload) for event_type under a stable subscriber name."""
+    def register(handler):
+        _SUBSCRIBERS.setdefault(event_type, {})[name] = handler
+        return handler
+    return register
+
+
+def _load_subscribers():
+    global _subscribers_loaded
+    if not _subscribers_loaded:
+        import utils.domain_subscribers  # noqa: F401  (registers via @subscribe)
+        _subscribers_loaded = True
+
+
+def publish(db: Session, event_type: str, payload: dict, aggregate_id: int = None) -> int:
+    """Queue event_type for every subscriber in the caller's transaction (no commit)."""
+    _load_subscribers()
+    subscribers = _SUBSCRIBERS.get(event_type, {})
+    if not subscribers:
+        return 0
+
+    body = json.dumps(payload, default=str)
+    now = datetime.utcnow()
+    for name in subscribers:
+        db.add(DomainEventOutbox(
+            event_type=event_type,
+            subscriber=name,
+            aggregate_id=aggregate_id,
+            payload=body,
+            status="pending",
+            attempts=0,
+            next_attempt_at=now
+        ))
+    db.info["domain_events_published"] = True
+    return len(subscribers)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop("domain_events_published", False):
+        _wake.set()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop("domain_events_published", None)
+
+
+# -------------------------------------------------------
+# WORKER
+# -------------------------------------------------------
+def backoff_seconds(attempts: int) -> int:
+    return min(EVENT_BUS_BACKOFF * (2 ** max(attempts - 1, 0)), EVENT_BUS_MAX_BACKOFF)
+
+
+def _tenant_session_factories() -> dict:
+    from database import BOOTSTRAPPED_TENANTS, get_tenant_sessionmaker
+    return {db_name: get_tenant_sessionmaker(db_name) for db_name in list(BOOTSTRAPPED_TENANTS)}
+
+
+class DomainEventWorker(threading.Thread):
+
+    def __init__(self, session_factories=None, index: int = 0):
+        super().__init__(name=f"domain-events-{index}", daemon=True)
+        # Callable returning {tenant: sessionmaker}; re-read every pass so new tenants are picked up
+        self.session_factories = session_factories or _tenant_session_factories
+
+    def claim_batch(self, db):
+        """Mark up to EVENT_BUS_BATCH due rows as processing; only the worker whose UPDATE matched owns a row."""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=EVENT_BUS_STALE_LOCK)
+        due = or_(
+            and_(DomainEventOutbox.status == "pending", DomainEventOutbox.next_attempt_at <= now),
+            and_(DomainEventOutbox.status == "processing", DomainEventOutbox.locked_at < stale)
+        )
+
+        candidate_ids = [row.id for row in db.query(DomainEventOutbox.id).filter(due).order_by(
+            DomainEventOutbox.next_attempt_at, DomainEventOutbox.id
+        ).limit(EVENT_BUS_BATCH).all()]
+
+        claimed = []
+        for event_id in candidate_ids:
+            updated = db.query(DomainEventOutbox).filter(DomainEventOutbox.id == event_id, due).update(
+                {"status": "processing", "locked_at": now}, synchronize_session=False
+            )
+            db.commit()
+            if updated:
+                claimed.append(event_id)
+
+        if not claimed:
+            return []
+        return db.query(DomainEventOutbox).filter(DomainEventOutbox.id.in_(claimed)).order_by(DomainEventOutbox.id).all()
+
+    def dispatch(self, db, tenant: str, row):
+        event_id = row.id
+        handler = _SUBSCRIBERS.get(row.event_type, {}).get(row.subscriber)
+        try:
+            if handler is None:
+                raise LookupError(f"No subscriber {row.subscriber!r} for {row.event_type}")
+            handler(db, json.loads(row.payload))
+            row.status = "done"
+            row.processed_at = datetime.utcnow()
+            row.last_error = None
+            row.locked_at = None
+            db.commit()
+            return
+        except Exception as e:
+            db.rollback()
+            error = e
+
+        # The handler's partial writes are gone; record the failed attempt on a fresh read
+        row = db.query(DomainEventOutbox).filter(DomainEventOutbox.id == event_id).first()
+        row.attempts = (row.attempts or 0) + 1
+        row.last_error = str(error)[:2000] or error.__class__.__name__
+        row.locked_at = None
+        if row.attempts >= EVENT_BUS_MAX_ATTEMPTS:
+            row.status = "failed"
+            log_error(error, location=f"Domain Events → gave up on {tenant}:{row.event_type}/{row.subscriber} (id {event_id})")
+        else:
+            row.status = "pending"
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(row.attempts))
+        db.commit()
+
+    def run_once(self) -> int:
+        """Claim and dispatch one batch per tenant; returns the number of events processed."""
+        processed = 0
+        for tenant, factory in self.session_factories().items():
+            db = factory()
+            try:
+                batch = self.claim_batch(db)
+                for row in batch:
+                    self.dispatch(db, tenant, row)
+                processed += len(batch)
+            except Exception as e:
+                db.rollback()
+                log_error(e, location=f"Domain Events Worker {self.name} → {tenant}")
+            finally:
+                db.close()
+        return processed
+
+    def run(self):
+        while not _stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                log_error(e, location=f"Domain Events Worker {self.name}")
+
+            _wake.wait(EVENT_BUS_POLL)
+            _wake.clear()
+
+
+def start_event_workers(count: int = EVENT_BUS_WORKERS, session_factories=None):
+    """Start the subscriber worker pool (idempotent)."""
+    if any(worker.is_alive() for worker in _workers):
+        return
+    _load_subscribers()
+    _stop.clear()
+    _workers.clear()
+    for index in range(count):
+        worker = DomainEventWorker(session_factories, index)
+        worker.start()
+        _workers.append(worker)
+    log_audit(f"Domain event workers started ({count})")
+
+
+def stop_event_workers(timeout: float = 10):
+    _stop.set()
+    _wake.set()
+    for worker in _workers:
+        worker.join(timeout)
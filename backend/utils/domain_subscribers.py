@@ -0,0 +1,126 @@
+# backend/utils/domain_subscribers.py
+"""
+Subscribers of the domain event bus (utils/domain_events.py).
+
+Each handler runs on a worker thread in its own tenant session and must not
+commit; the bus commits its writes together with the outbox row. Handlers
+can be retried after a failure, so they only ever converge state (create if
+missing, recompute from source rows) instead of applying increments.
+
+    grn.approved      → payment_ledger, vendor_scorecard
+    stock.issued      → low_stock_alerts
+    return.approved   → low_stock_alerts
+    transfer.sent     → low_stock_alerts
+"""
+
+import os
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.tenant_models import (
+    GRN, GRNItem, GRNStatus, QCInspection, Vendor, VendorPayment, VendorPerformance, StockOverview
+)
+from utils.domain_events import subscribe
+from utils.ephemeral_store import get_ephemeral_store
+from utils.logger import log_audit
+
+STOCK_ALERT_EMAIL = os.getenv("STOCK_ALERT_EMAIL", "")
+STOCK_ALERT_COOLDOWN = int(os.getenv("STOCK_ALERT_COOLDOWN", "21600"))
+
+ALERT_NAMESPACE = "low_stock_alert"
+
+
+# -------------------------------------------------------
+# PAYMENT LEDGER
+# -------------------------------------------------------
+@subscribe("grn.approved", "payment_ledger")
+def create_vendor_payment(db: Session, payload: dict):
+    """Open a vendor payment for an approved GRN that does not have one yet."""
+    grn = db.query(GRN).filter(GRN.id == payload["grn_id"]).first()
+    if not grn or not grn.total_amount or grn.total_amount <= 0:
+        return
+
+    existing_payment = db.query(VendorPayment.id).filter(VendorPayment.grn_number == grn.grn_number).first()
+    if existing_payment:
+        return
+
+    db.add(VendorPayment(
+        grn_number=grn.grn_number,
+        vendor_name=grn.vendor_name,
+        invoice_number=grn.invoice_number,
+        total_amount=grn.total_amount,
+        outstanding_amount=grn.total_amount,
+        payment_status="unpaid"
+    ))
+
+
+# -------------------------------------------------------
+# VENDOR SCORECARD
+# -------------------------------------------------------
+@subscribe("grn.approved", "vendor_scorecard")
+def update_vendor_scorecard(db: Session, payload: dict):
+    """Recompute a vendor's delivery quality (% of received qty not rejected at QC)."""
+    vendor_name = payload.get("vendor_name")
+    vendor = db.query(Vendor).filter(Vendor.vendor_name == vendor_name).first() if vendor_name else None
+    if not vendor:
+        return
+
+    received = db.query(func.sum(GRNItem.received_qty)).join(GRN, GRNItem.grn_id == GRN.id).filter(
+        GRN.vendor_name == vendor_name,
+        GRN.status == GRNStatus.approved
+    ).scalar() or 0
+    if received <= 0:
+        return
+
+    rejected = db.query(func.sum(QCInspection.rejected_qty)).join(GRN, QCInspection.grn_id == GRN.id).filter(
+        GRN.vendor_name == vendor_name,
+        GRN.status == GRNStatus.approved
+    ).scalar() or 0
+    quality = round(max(0.0, 100.0 * (1 - rejected / received)), 2)
+
+    performance = db.query(VendorPerformance).filter(
+        VendorPerformance.vendor_id == vendor.id
+    ).order_by(VendorPerformance.id.desc()).first()
+    if performance is None:
+        performance = VendorPerformance(vendor_id=vendor.id)
+        db.add(performance)
+    performance.delivery_quality = quality
+
+
+# -------------------------------------------------------
+# LOW STOCK ALERTS
+# -------------------------------------------------------
+def _alert_low_stock(db: Session, payload: dict):
+    """Alert once per STOCK_ALERT_COOLDOWN for each affected item that fell below its minimum."""
+    item_names = {name for name in payload.get("items", []) if name}
+    if not item_names:
+        return
+
+    rows = db.query(
+        StockOverview.item_name,
+        func.sum(StockOverview.available_qty),
+        func.max(StockOverview.min_stock)
+    ).filter(StockOverview.item_name.in_(item_names)).group_by(StockOverview.item_name).all()
+
+    tenant = db.get_bind().url.database
+    store = get_ephemeral_store()
+    for item_name, available, min_stock in rows:
+        if not min_stock or (available or 0) >= min_stock:
+            continue
+
+        key = f"{tenant}:{item_name}"
+        if store.get(ALERT_NAMESPACE, key):
+            continue
+        store.set(ALERT_NAMESPACE, key, True, STOCK_ALERT_COOLDOWN)
+
+        message = f"Low stock: {item_name} has {available or 0} on hand (minimum {min_stock}) in {tenant}"
+        log_audit(message)
+        if STOCK_ALERT_EMAIL:
+            from utils.email_outbox import enqueue_email
+            enqueue_email(STOCK_ALERT_EMAIL, f"Low stock alert: {item_name}", message)
+
+
+subscribe("stock.issued", "low_stock_alerts")(_alert_low_stock)
+subscribe("return.approved", "low_stock_alerts")(_alert_low_stock)
+subscribe("transfer.sent", "low_stock_alerts")(_alert_low_stock)
@@ -1,61 +1,17 @@
-import smtplib
-import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from utils.logger import log_error, log_audit
-import threading
+from utils.logger import log_error
+from utils.email_outbox import enqueue_email
 
 def send_email_async(to_email: str, subject: str, body: str, is_html: bool = False):
-    """Send email asynchronously to avoid blocking"""
-    def _send():
-        try:
-            send_email(to_email, subject, body, is_html)
-        except Exception as e:
-            log_error(e, f"Async email failed to {to_email}")
-    
-    thread = threading.Thread(target=_send)
-    thread.daemon = True
-    thread.start()
-    return True
-
-def send_email(to_email: str, subject: str, body: str, is_html: bool = False):
-    """Send email using SMTP configuration from .env"""
+    """Queue email for the background outbox worker to avoid blocking"""
     try:
-        # Get SMTP settings from environment
-        smtp_host = os.getenv("SMTP_HOST")
-        smtp_port = int(os.getenv("SMTP_PORT", 587))
-        smtp_user = os.getenv("SMTP_USER")
-        smtp_password = os.getenv("SMTP_PASSWORD")
-        smtp_from = os.getenv("SMTP_FROM")
-
-        if not all([smtp_host, smtp_user, smtp_password, smtp_from]):
-            raise ValueError("Missing SMTP configuration in .env file")
-
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = smtp_from
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        # Attach body
-        msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
-
-        # Connect and send with timeout
-        server = smtplib.SMTP(smtp_host, smtp_port, timeout=10)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
-        server.quit()
-
-        log_audit(f"Email sent successfully to {to_email}")
+        enqueue_email(to_email, subject, body, is_html)
         return True
-
     except Exception as e:
-        log_error(e, f"Failed to send email to {to_email}")
+        log_error(e, f"Queueing email failed for {to_email}")
         return False
 
 def send_registration_email(admin_email: str, organization_name: str, admin_name: str):
-    """Send registration confirmation email"""
+    """Queue the registration confirmation email"""
     subject = f"Welcome to NUTRYAH IMS - {organization_name} Registration Confirmed"
     
     body = f"""
@@ -86,4 +42,4 @@ def send_registration_email(admin_email: str, organization_name: str, admin_name
     </html>
     """
     
-    return send_email(admin_email, subject, body, is_html=True)
\ No newline at end of file
+    return send_email_async(admin_email, subject, body, is_html=True)
@@ -0,0 +1,241 @@
+# backend/utils/email_outbox.py
+"""
+Persistent email outbox with background SMTP delivery.
+
+Handlers call enqueue_email(), which only inserts a master_email_outbox row.
+A small pool of worker threads (started on app startup) claims due rows,
+sends them over a kept-alive SMTP connection and retries failures with
+exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+"""
+
+import os
+import smtplib
+import ssl
+import threading
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional
+
+from sqlalchemy import or_, and_
+
+from utils.logger import log_error, log_audit
+
+EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", 2))
+EMAIL_OUTBOX_BATCH = int(os.getenv("EMAIL_OUTBOX_BATCH", 20))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_BACKOFF = int(os.getenv("EMAIL_OUTBOX_BACKOFF", 30))
+EMAIL_OUTBOX_MAX_BACKOFF = int(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF", 3600))
+EMAIL_OUTBOX_POLL = float(os.getenv("EMAIL_OUTBOX_POLL", 5))
+# Rows left in "sending" this long (worker died mid-send) are picked up again
+EMAIL_OUTBOX_STALE_LOCK = int(os.getenv("EMAIL_OUTBOX_STALE_LOCK", 600))
+SMTP_IDLE_SECONDS = int(os.getenv("SMTP_IDLE_SECONDS", 60))
+
+_wake = threading.Event()
+_stop = threading.Event()
+_workers = []
+
+
+def _default_session_factory():
+    from database import SessionLocal
+    return SessionLocal
+
+
+# -------------------------------------------------------
+# ENQUEUE (CALLED FROM REQUEST HANDLERS)
+# -------------------------------------------------------
+def enqueue_email(to_email: str, subject: str, body: str, is_html: bool = False,
+                  from_email: Optional[str] = None, session_factory=None) -> int:
+    """Queue an email for background delivery and return the outbox id."""
+    from models.register_models import EmailOutbox
+
+    db = (session_factory or _default_session_factory())()
+    try:
+        message = EmailOutbox(
+            to_email=to_email,
+            from_email=from_email,
+            subject=subject,
+            body=body,
+            is_html=is_html,
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        )
+        db.add(message)
+        db.commit()
+        log_audit(f"Email queued → {to_email} (outbox id {message.id})")
+    finally:
+        db.close()
+
+    _wake.set()
+    return message.id
+
+
+# -------------------------------------------------------
+# SMTP CONNECTION (ONE PER WORKER, KEPT ALIVE)
+# -------------------------------------------------------
+class SMTPConnection:
+
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST")
+        self.port = int(os.getenv("SMTP_PORT", 587))
+        self.user = os.getenv("SMTP_USER")
+        self.password = os.getenv("SMTP_PASSWORD")
+        self.default_from = os.getenv("SMTP_FROM", "NUTRYAH <no-reply@nutryah.com>")
+        self.starttls = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+        self.timeout = int(os.getenv("SMTP_TIMEOUT", 15))
+        self._server = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        if not self.host:
+            raise ValueError("SMTP_HOST is not configured")
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls(context=ssl.create_default_context())
+        if self.user:
+            server.login(self.user, self.password)
+        return server
+
+    def send(self, message) -> None:
+        msg = MIMEMultipart()
+        msg["From"] = message.from_email or self.default_from
+        msg["To"] = message.to_email
+        msg["Subject"] = message.subject
+        msg.attach(MIMEText(message.body, "html" if message.is_html else "plain"))
+
+        # A kept-alive connection may have been dropped by the relay; reconnect once
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(msg)
+                self._last_used = time.monotonic()
+                return
+            except smtplib.SMTPResponseException:
+                # The relay answered (e.g. 451/550); retry later, not on a new connection
+                raise
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+            self.close()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+# -------------------------------------------------------
+# WORKER
+# -------------------------------------------------------
+def backoff_seconds(attempts: int) -> int:
+    return min(EMAIL_OUTBOX_BACKOFF * (2 ** max(attempts - 1, 0)), EMAIL_OUTBOX_MAX_BACKOFF)
+
+
+class EmailOutboxWorker(threading.Thread):
+
+    def __init__(self, session_factory, index: int = 0):
+        super().__init__(name=f"email-outbox-{index}", daemon=True)
+        self.session_factory = session_factory
+        self.connection = SMTPConnection()
+
+    def claim_batch(self, db):
+        """Mark up to EMAIL_OUTBOX_BATCH due rows as sending; only the worker whose UPDATE matched owns a row."""
+        from models.register_models import EmailOutbox
+
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=EMAIL_OUTBOX_STALE_LOCK)
+        due = or_(
+            and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == "sending", EmailOutbox.locked_at < stale)
+        )
+
+        candidate_ids = [row.id for row in db.query(EmailOutbox.id).filter(due).order_by(
+            EmailOutbox.next_attempt_at, EmailOutbox.id
+        ).limit(EMAIL_OUTBOX_BATCH).all()]
+
+        claimed = []
+        for message_id in candidate_ids:
+            updated = db.query(EmailOutbox).filter(EmailOutbox.id == message_id, due).update(
+                {"status": "sending", "locked_at": now}, synchronize_session=False
+            )
+            db.commit()
+            if updated:
+                claimed.append(message_id)
+
+        if not claimed:
+            return []
+        return db.query(EmailOutbox).filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+
+    def deliver(self, db, message):
+        try:
+            self.connection.send(message)
+            message.status = "sent"
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+            log_audit(f"Email sent → {message.to_email} (outbox id {message.id})")
+        except Exception as e:
+            message.attempts = (message.attempts or 0) + 1
+            message.last_error = str(e)[:2000]
+            if message.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+                message.status = "failed"
+                log_error(e, location=f"Email Outbox → gave up on id {message.id} ({message.to_email})")
+            else:
+                message.status = "pending"
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(message.attempts))
+        message.locked_at = None
+        db.commit()
+
+    def run_once(self) -> int:
+        """Claim and deliver one batch; returns the number of messages processed."""
+        db = self.session_factory()
+        try:
+            batch = self.claim_batch(db)
+            for message in batch:
+                self.deliver(db, message)
+            return len(batch)
+        finally:
+            db.close()
+
+    def run(self):
+        while not _stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                log_error(e, location=f"Email Outbox Worker {self.name}")
+
+            self.connection.close_if_idle()
+            _wake.wait(EMAIL_OUTBOX_POLL)
+            _wake.clear()
+
+        self.connection.close()
+
+
+def start_email_workers(count: int = EMAIL_OUTBOX_WORKERS, session_factory=None):
+    """Start the outbox delivery threads (idempotent)."""
+    if any(worker.is_alive() for worker in _workers):
+        return
+    _stop.clear()
+    _workers.clear()
+    factory = session_factory or _default_session_factory()
+    for index in range(count):
+        worker = EmailOutboxWorker(factory, index)
+        worker.start()
+        _workers.append(worker)
+
+
+def stop_email_workers(timeout: float = 10):
+    _stop.set()
+    _wake.set()
+    for worker in _workers:
+        worker.join(timeout)
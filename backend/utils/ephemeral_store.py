@@ -0,0 +1,254 @@
+# backend/utils/ephemeral_store.py
+"""
+Pluggable store for short-lived state such as login OTPs and the
+per-tenant role versions that invalidate cached permissions.
+
+MemoryEphemeralStore keeps entries in the process (single worker only);
+SQLEphemeralStore keeps them in the master DB so every worker and pod sees
+the same entries. EPHEMERAL_STORE=memory|sql picks the backend (default sql).
+Both expire entries on read and are swept periodically by start_sweeper().
+"""
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from utils.logger import log_error, log_audit
+
+EPHEMERAL_STORE_BACKEND = os.getenv("EPHEMERAL_STORE", "sql").lower()
+EPHEMERAL_SWEEP_INTERVAL = int(os.getenv("EPHEMERAL_SWEEP_INTERVAL", 60))
+
+
+class EphemeralStore(ABC):
+    """Interface: namespaced key/value entries with a TTL."""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: int):
+        ...
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        """Remove an entry; True only for the caller that actually removed it."""
+        ...
+
+    @abstractmethod
+    def incr(self, namespace: str, key: str, ttl_seconds: int) -> int:
+        """Atomically add 1 to an integer entry (missing counts as 0), renew its TTL and return the new value."""
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove expired entries, returning how many were removed."""
+        ...
+
+
+# -------------------------------------------------------
+# IN-MEMORY BACKEND
+# -------------------------------------------------------
+class MemoryEphemeralStore(EphemeralStore):
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def set(self, namespace, key, value, ttl_seconds):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        with self._lock:
+            self._entries[(namespace, key)] = (value, expires_at)
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if not entry:
+                return None
+            if datetime.utcnow() > entry[1]:
+                del self._entries[(namespace, key)]
+                return None
+            return entry[0]
+
+    def delete(self, namespace, key):
+        with self._lock:
+            return self._entries.pop((namespace, key), None) is not None
+
+    def incr(self, namespace, key, ttl_seconds):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            current = entry[0] if entry and datetime.utcnow() <= entry[1] else 0
+            self._entries[(namespace, key)] = (int(current) + 1, expires_at)
+            return int(current) + 1
+
+    def sweep(self):
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._entries.items() if now > expires_at]
+            for k in expired:
+                del self._entries[k]
+        return len(expired)
+
+
+# -------------------------------------------------------
+# SQL BACKEND (MASTER DB)
+# -------------------------------------------------------
+class SQLEphemeralStore(EphemeralStore):
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from database import SessionLocal
+            session_factory = SessionLocal
+        self._session_factory = session_factory
+
+    def set(self, namespace, key, value, ttl_seconds):
+        from models.register_models import EphemeralEntry
+
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+        payload = json.dumps(value, default=str)
+
+        db = self._session_factory()
+        try:
+            # Replace any previous entry; retry once if another worker raced the insert
+            for attempt in range(2):
+                try:
+                    db.query(EphemeralEntry).filter(
+                        EphemeralEntry.namespace == namespace, EphemeralEntry.key == key
+                    ).delete(synchronize_session=False)
+                    db.add(EphemeralEntry(namespace=namespace, key=key, value=payload, expires_at=expires_at))
+                    db.commit()
+                    return
+                except IntegrityError:
+                    db.rollback()
+                    if attempt:
+                        raise
+        finally:
+            db.close()
+
+    def get(self, namespace, key):
+        from models.register_models import EphemeralEntry
+
+        db = self._session_factory()
+        try:
+            entry = db.query(EphemeralEntry).filter(
+                EphemeralEntry.namespace == namespace,
+                EphemeralEntry.key == key,
+                EphemeralEntry.expires_at >= datetime.utcnow()
+            ).first()
+            return json.loads(entry.value) if entry else None
+        finally:
+            db.close()
+
+    def delete(self, namespace, key):
+        from models.register_models import EphemeralEntry
+
+        db = self._session_factory()
+        try:
+            deleted = db.query(EphemeralEntry).filter(
+                EphemeralEntry.namespace == namespace, EphemeralEntry.key == key
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted > 0
+        finally:
+            db.close()
+
+    def incr(self, namespace, key, ttl_seconds):
+        from models.register_models import EphemeralEntry
+
+        db = self._session_factory()
+        try:
+            # Compare-and-swap on the stored text; a lost race re-reads and tries again
+            while True:
+                expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+                entry = db.query(EphemeralEntry.value, EphemeralEntry.expires_at).filter(
+                    EphemeralEntry.namespace == namespace, EphemeralEntry.key == key
+                ).first()
+
+                if entry is None:
+                    try:
+                        db.add(EphemeralEntry(namespace=namespace, key=key, value=json.dumps(1), expires_at=expires_at))
+                        db.commit()
+                        return 1
+                    except IntegrityError:
+                        db.rollback()
+                        continue
+
+                current = json.loads(entry.value) if entry.expires_at >= datetime.utcnow() else 0
+                swapped = db.query(EphemeralEntry).filter(
+                    EphemeralEntry.namespace == namespace,
+                    EphemeralEntry.key == key,
+                    EphemeralEntry.value == entry.value
+                ).update({"value": json.dumps(int(current) + 1), "expires_at": expires_at}, synchronize_session=False)
+                db.commit()
+                if swapped:
+                    return int(current) + 1
+        finally:
+            db.close()
+
+    def sweep(self):
+        from models.register_models import EphemeralEntry
+
+        db = self._session_factory()
+        try:
+            deleted = db.query(EphemeralEntry).filter(
+                EphemeralEntry.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+# -------------------------------------------------------
+# SHARED INSTANCE + BACKGROUND SWEEPER
+# -------------------------------------------------------
+_store: Optional[EphemeralStore] = None
+_store_lock = threading.Lock()
+_sweeper_stop = threading.Event()
+_sweeper_thread: Optional[threading.Thread] = None
+
+
+def get_ephemeral_store() -> EphemeralStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryEphemeralStore() if EPHEMERAL_STORE_BACKEND == "memory" else SQLEphemeralStore()
+    return _store
+
+
+def set_ephemeral_store(store: EphemeralStore):
+    """Swap the backend (e.g. for a script running without the master DB)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def _sweep_loop(interval: int):
+    while not _sweeper_stop.wait(interval):
+        try:
+            removed = get_ephemeral_store().sweep()
+            if removed:
+                log_audit(f"Ephemeral store sweep removed {removed} expired entries")
+        except Exception as e:
+            log_error(e, location="Ephemeral Store Sweep")
+
+
+def start_sweeper(interval: int = EPHEMERAL_SWEEP_INTERVAL):
+    """Start the daemon thread that deletes expired entries every interval seconds."""
+    global _sweeper_thread
+    if _sweeper_thread and _sweeper_thread.is_alive():
+        return
+    _sweeper_stop.clear()
+    _sweeper_thread = threading.Thread(target=_sweep_loop, args=(interval,), name="ephemeral-sweeper", daemon=True)
+    _sweeper_thread.start()
+
+
+def stop_sweeper():
+    _sweeper_stop.set()
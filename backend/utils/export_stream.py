@@ -0,0 +1,81 @@
+# backend/utils/export_stream.py
+"""
+Constant-memory CSV / NDJSON exports.
+
+stream_export() runs a select() with stream_results + yield_per, so the
+driver uses a server-side cursor and rows arrive EXPORT_YIELD_PER at a
+time, and hands each encoded chunk to a StreamingResponse as soon as it is
+ready. The generator owns its session (the request-scoped one is closed
+before a streamed body finishes), so exports of any size start sending
+immediately and never hold more than one chunk in Python.
+"""
+
+import csv
+import enum
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import StreamingResponse
+
+from utils.logger import log_error
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+
+
+def _plain(value):
+    """Scalar suitable for csv/json: enums by value, dates ISO, decimals as float."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _encode_chunk(rows, keys, fmt: str) -> str:
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if value is None else _plain(value) for value in row])
+    else:
+        for row in rows:
+            buffer.write(json.dumps({key: _plain(value) for key, value in zip(keys, row)}))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def stream_export(session_factory, statement, fmt: str, filename: str) -> StreamingResponse:
+    """StreamingResponse that writes every row of statement as CSV (with header) or NDJSON."""
+    keys = [column.key for column in statement.selected_columns]
+
+    def generate():
+        db = session_factory()
+        try:
+            if fmt == "csv":
+                yield _encode_chunk([keys], keys, fmt)
+
+            result = db.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER))
+            for partition in result.partitions():
+                yield _encode_chunk(partition, keys, fmt)
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated file
+            log_error(e, location=f"Export Stream → {filename}")
+            raise
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
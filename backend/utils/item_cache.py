@@ -0,0 +1,77 @@
+# backend/utils/item_cache.py
+"""
+Read-through cache of item master pricing/tax fields.
+
+Handlers collect the item ids a document needs and call get_items_by_id()
+once; misses are loaded with a single IN query and kept process-wide per
+tenant for ITEM_CACHE_TTL seconds. Item writes call invalidate_items().
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy.orm import Session
+
+from models.tenant_models import Item
+
+ITEM_CACHE_TTL = int(os.getenv("ITEM_CACHE_TTL", "300"))
+
+CachedItem = namedtuple("CachedItem", [
+    "id", "name", "item_code", "tax", "mrp", "fixing_price", "min_stock", "is_active",
+    "has_warranty", "warranty_period", "warranty_period_type"
+])
+
+_ITEM_CACHE = {}  # {(tenant, item_id): (expires_at, CachedItem)}
+_ITEM_CACHE_LOCK = threading.Lock()
+
+
+def _tenant_key(db: Session) -> str:
+    return db.get_bind().url.database
+
+
+def _snapshot(item: Item) -> CachedItem:
+    return CachedItem(**{field: getattr(item, field) for field in CachedItem._fields})
+
+
+def get_items_by_id(db: Session, item_ids) -> dict:
+    """{item_id: CachedItem} for the given ids; at most one query for the misses."""
+    item_ids = {item_id for item_id in item_ids if item_id}
+    tenant = _tenant_key(db)
+    now = time.monotonic()
+
+    found, missing = {}, set()
+    with _ITEM_CACHE_LOCK:
+        for item_id in item_ids:
+            entry = _ITEM_CACHE.get((tenant, item_id))
+            if entry and entry[0] > now:
+                found[item_id] = entry[1]
+            else:
+                missing.add(item_id)
+
+    if missing:
+        loaded = {item.id: _snapshot(item) for item in db.query(Item).filter(Item.id.in_(missing)).all()}
+        expires_at = now + ITEM_CACHE_TTL
+        with _ITEM_CACHE_LOCK:
+            for item_id, cached in loaded.items():
+                _ITEM_CACHE[(tenant, item_id)] = (expires_at, cached)
+        found.update(loaded)
+
+    return found
+
+
+def get_item_by_id(db: Session, item_id):
+    return get_items_by_id(db, [item_id]).get(item_id)
+
+
+def invalidate_items(db: Session, item_ids=None):
+    """Drop cached items of the session's tenant (all of them when item_ids is None)."""
+    tenant = _tenant_key(db)
+    with _ITEM_CACHE_LOCK:
+        if item_ids is None:
+            for key in [key for key in _ITEM_CACHE if key[0] == tenant]:
+                del _ITEM_CACHE[key]
+        else:
+            for item_id in item_ids:
+                _ITEM_CACHE.pop((tenant, item_id), None)
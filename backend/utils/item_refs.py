@@ -0,0 +1,71 @@
+# backend/utils/item_refs.py
+"""
+Integer item_id references from transactional rows to the item master.
+
+Rows still carry item_name for display, but joins and lookups go through
+item_id. New rows get item_id filled from item_name on flush, and existing
+rows are backfilled by the tenant bootstrap migration.
+"""
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from models.tenant_models import (
+    Item, GRNItem, Stock, StockOverview, ReturnItem, ExternalTransferItem, IssueItem
+)
+
+ITEM_REF_MODELS = (GRNItem, Stock, StockOverview, ReturnItem, ExternalTransferItem, IssueItem)
+
+
+def get_item_ids_by_name(db: Session, names) -> dict:
+    """{item_name: item_id} for the given names (1 query). First item wins on duplicate names."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+
+    ids = {}
+    for item_id, name in db.query(Item.id, Item.name).filter(Item.name.in_(names)).order_by(Item.id):
+        ids.setdefault(name, item_id)
+    return ids
+
+
+@event.listens_for(Session, "before_flush")
+def assign_item_ids(session, flush_context, instances):
+    """Resolve item_id from item_name for new or renamed item references."""
+    pending = []
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, ITEM_REF_MODELS) or not obj.item_name:
+            continue
+        if obj.item_id is None or (obj in session.dirty and _item_name_changed(obj)):
+            pending.append(obj)
+
+    if not pending:
+        return
+
+    with session.no_autoflush:
+        ids = get_item_ids_by_name(session, (obj.item_name for obj in pending))
+
+    for obj in pending:
+        obj.item_id = ids.get(obj.item_name)
+
+
+def _item_name_changed(obj) -> bool:
+    return inspect(obj).attrs.item_name.history.has_changes()
+
+
+def backfill_item_ids(engine):
+    """Fill item_id from item_name on rows written before the column existed"""
+    try:
+        with engine.begin() as conn:
+            for model in ITEM_REF_MODELS:
+                table = model.__tablename__
+                result = conn.execute(text(
+                    f"UPDATE {table} SET item_id = ("
+                    f"SELECT MIN(items.id) FROM items WHERE items.name = {table}.item_name"
+                    f") WHERE item_id IS NULL AND item_name IS NOT NULL"
+                ))
+                if result.rowcount:
+                    print(f"Backfilled item_id on {result.rowcount} {table} rows")
+
+    except Exception as e:
+        print(f"Error in backfill_item_ids: {e}")
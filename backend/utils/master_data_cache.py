@@ -0,0 +1,229 @@
+# backend/utils/master_data_cache.py
+"""
+Conditional GET and payload caching for master data list endpoints.
+
+Every tenant DB holds a single master_data_version counter. Any ORM write to
+a MASTER_DATA_MODELS table (flushed rows or query-level update/delete) bumps
+it in the same transaction, so the bump commits or rolls back with the write.
+
+GET handlers wrap their query in master_data_response(). The response carries
+a weak ETag built from the version; a matching If-None-Match is answered with
+304, and the serialized JSON is kept process-wide per (tenant, URL) until the
+version moves. The version itself is re-read at most every
+MASTER_DATA_VERSION_TTL seconds (at once after a local commit that bumped
+it), so repeat page loads cost no queries at all and writes made by other
+worker processes show up within that window.
+
+    @router.get("/", response_model=list[CategoryResponse])
+    def list_categories(request: Request, db: Session = Depends(get_tenant_db)):
+        return master_data_response(request, db, lambda: db.query(Category).all(),
+                                    schema=list[CategoryResponse])
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from models.tenant_models import (
+    Company, Branch, Store, Category, SubCategory, Brand, TaxCode,
+    InventoryGlobalRule, ItemReorderRule, ItemVendorLeadTime, InventoryAlertRule,
+    InventoryLocation, Department, Item
+)
+from utils.logger import log_error
+
+MASTER_DATA_VERSION_TTL = float(os.getenv("MASTER_DATA_VERSION_TTL", "2"))
+MASTER_DATA_CACHE_SIZE = int(os.getenv("MASTER_DATA_CACHE_SIZE", "512"))
+
+MASTER_DATA_MODELS = (
+    Company, Branch, Store, Category, SubCategory, Brand, TaxCode,
+    InventoryGlobalRule, ItemReorderRule, ItemVendorLeadTime, InventoryAlertRule,
+    InventoryLocation, Department, Item
+)
+
+CACHE_CONTROL = "private, no-cache"  # browsers keep the body but revalidate every time
+
+_VERSIONS = {}         # {tenant: (version, checked_at)}
+_GENERATIONS = {}      # {tenant: local commits that bumped the version}
+_PAYLOADS = OrderedDict()  # {(tenant, url): (version, body, headers)}
+_LOCK = threading.Lock()
+
+
+def _tenant_key(db: Session) -> str:
+    return db.get_bind().url.database
+
+
+# -------------------------------------------------------
+# VERSION COUNTER
+# -------------------------------------------------------
+def seed_master_data_version(engine):
+    """Create the counter row of a tenant DB if it is missing (tenant bootstrap)"""
+    try:
+        with engine.begin() as conn:
+            if not conn.execute(text("SELECT COUNT(*) FROM master_data_version WHERE id = 1")).scalar():
+                conn.execute(text("INSERT INTO master_data_version (id, version) VALUES (1, 0)"))
+    except Exception as e:
+        log_error(e, location="Seed master_data_version")
+
+
+def bump_master_data_version(db: Session):
+    """Move the tenant's master data version in the caller's transaction (no commit).
+
+    Called automatically for ORM writes to MASTER_DATA_MODELS; only raw SQL
+    writes to those tables need to call it themselves. Bumps once per transaction.
+    """
+    if db.info.get("master_data_changed"):
+        return
+    with db.no_autoflush:
+        bumped = db.execute(text("UPDATE master_data_version SET version = version + 1 WHERE id = 1")).rowcount
+        if not bumped:
+            db.execute(text("INSERT INTO master_data_version (id, version) VALUES (1, 1)"))
+    db.info["master_data_changed"] = True
+
+
+def current_master_data_version(db: Session) -> int:
+    """The tenant's master data version; one SELECT at most every MASTER_DATA_VERSION_TTL seconds."""
+    tenant = _tenant_key(db)
+    now = time.monotonic()
+    with _LOCK:
+        cached = _VERSIONS.get(tenant)
+        if cached and now - cached[1] < MASTER_DATA_VERSION_TTL:
+            return cached[0]
+        generation = _GENERATIONS.get(tenant, 0)
+
+    version = db.execute(text("SELECT version FROM master_data_version WHERE id = 1")).scalar() or 0
+
+    with _LOCK:
+        # A local commit in the meantime may already have moved past what we read
+        if _GENERATIONS.get(tenant, 0) == generation:
+            _VERSIONS[tenant] = (version, now)
+    return version
+
+
+def invalidate_master_data(db: Session):
+    """Forget the cached version of the session's tenant so the next read goes to the DB."""
+    tenant = _tenant_key(db)
+    with _LOCK:
+        _VERSIONS.pop(tenant, None)
+        _GENERATIONS[tenant] = _GENERATIONS.get(tenant, 0) + 1
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_flush(session, flush_context, instances):
+    if session.info.get("master_data_changed"):
+        return
+    changed = any(isinstance(obj, MASTER_DATA_MODELS) for obj in list(session.new) + list(session.deleted)) or any(
+        isinstance(obj, MASTER_DATA_MODELS) and session.is_modified(obj, include_collections=False)
+        for obj in session.dirty
+    )
+    if changed:
+        bump_master_data_version(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_bulk_write(orm_execute_state):
+    # query(...).update() / .delete() and update(Model) statements skip the flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, MASTER_DATA_MODELS):
+        bump_master_data_version(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("master_data_changed", False):
+        invalidate_master_data(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop("master_data_changed", None)
+
+
+# -------------------------------------------------------
+# CONDITIONAL RESPONSES
+# -------------------------------------------------------
+@lru_cache(maxsize=None)
+def _type_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def _cache_url(request: Request) -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def master_data_response(request: Request, db: Session, load, schema=None, response: Response = None) -> Response:
+    """
+    Serve load()'s result as JSON with a weak ETag, from cache while the version holds.
+
+    load() runs only on a cache miss. schema (e.g. list[CategoryResponse])
+    serializes ORM rows like the route's response_model would. Headers the
+    loader sets on response (such as X-Next-Cursor) are cached with the body.
+    """
+    tenant = _tenant_key(db)
+    url = _cache_url(request)
+    version = current_master_data_version(db)
+    digest = hashlib.sha1(f"{tenant}|{url}".encode()).hexdigest()[:12]
+    etag = f'W/"{version}-{digest}"'
+
+    with _LOCK:
+        cached = _PAYLOADS.get((tenant, url))
+        if cached and cached[0] == version:
+            _PAYLOADS.move_to_end((tenant, url))
+        else:
+            cached = None
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        headers = dict(cached[2]) if cached else {}
+        headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        return Response(status_code=304, headers=headers)
+
+    if cached:
+        body, extra_headers = cached[1], cached[2]
+    else:
+        content = load()
+        if schema is not None:
+            adapter = _type_adapter(schema)
+            content = adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json")
+        body = JSONResponse(jsonable_encoder(content)).body
+        extra_headers = {
+            key: value for key, value in (response.headers.items() if response is not None else [])
+            if key.lower() != "content-length"
+        }
+        with _LOCK:
+            _PAYLOADS[(tenant, url)] = (version, body, extra_headers)
+            _PAYLOADS.move_to_end((tenant, url))
+            while len(_PAYLOADS) > MASTER_DATA_CACHE_SIZE:
+                _PAYLOADS.popitem(last=False)
+
+    headers = dict(extra_headers)
+    headers.update({"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def clear_master_data_cache():
+    """Drop every cached version and payload (all tenants)."""
+    with _LOCK:
+        _VERSIONS.clear()
+        _PAYLOADS.clear()
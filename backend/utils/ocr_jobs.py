@@ -0,0 +1,296 @@
+# backend/utils/ocr_jobs.py
+"""
+Invoice OCR as background jobs.
+
+submit_ocr_job() takes an uploaded file object and copies it in chunks to a
+temporary file while hashing it (uploads over OCR_MAX_UPLOAD_BYTES are
+rejected), so neither the upload nor the job ever holds the whole image in
+API memory. The file is OCR'd in a process pool (OCR_WORKERS processes):
+every page is downscaled to OCR_MAX_DIMENSION and binarized before
+tesseract sees it, which is most of the speed-up on phone photos.
+
+Job state and results live in the ephemeral store, so any API worker can
+answer status / result requests. Results are cached by the image's sha256
+for OCR_RESULT_TTL seconds: resubmitting the same image completes at once,
+and a second upload while the first is still running joins that job.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+from utils.ephemeral_store import get_ephemeral_store
+from utils.logger import log_error, log_audit
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", "2000"))
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "20"))
+OCR_JOB_TTL = int(os.getenv("OCR_JOB_TTL", "3600"))
+OCR_RESULT_TTL = int(os.getenv("OCR_RESULT_TTL", "604800"))
+OCR_POLL_INTERVAL = float(os.getenv("OCR_POLL_INTERVAL", "0.5"))
+OCR_MAX_WAIT = int(os.getenv("OCR_MAX_WAIT", "30"))
+
+JOB_NAMESPACE = "ocr_job"
+RESULT_NAMESPACE = "ocr_result"
+IN_FLIGHT_NAMESPACE = "ocr_in_flight"
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Item lines like: "Arun A 11111 25 50 278330.55" -> name, qty, rate, amount
+ITEM_LINE_PATTERN = re.compile(r'([A-Za-z\s]+)\s+(\d+)\s+(\d+(?:\.\d+)?)\s+(\d+(?:\.\d+)?)')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# -------------------------------------------------------
+# OCR (RUNS IN A WORKER PROCESS)
+# -------------------------------------------------------
+def parse_invoice_items(text: str) -> list:
+    """Item rows found in OCR text, in the shape the GRN form expects."""
+    items = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        match = ITEM_LINE_PATTERN.search(line)
+        if match:
+            name = match.group(1).strip()
+            # Skip if name is too short or looks like a number
+            if len(name) > 2 and not name.isdigit():
+                items.append({
+                    'name': name,
+                    'quantity': int(match.group(2)),
+                    'rate': float(match.group(3)),
+                    'unit': 'pcs',
+                    'batch': '',
+                    'expiry': ''
+                })
+    return items
+
+
+def _otsu_threshold(histogram: list) -> int:
+    """Grey level that best separates ink from paper (Otsu's method)."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = background_sum = 0
+    best_level, best_variance = 127, 0.0
+
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_back = background_sum / background
+        mean_fore = (weighted_total - background_sum) / foreground
+        variance = background * foreground * (mean_back - mean_fore) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess_page(page, max_dimension: int = OCR_MAX_DIMENSION):
+    """Greyscale, downscale to max_dimension and binarize one page."""
+    from PIL import Image, ImageOps
+
+    gray = ImageOps.exif_transpose(page).convert("L")
+    gray.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    threshold = _otsu_threshold(gray.histogram())
+    return gray.point(lambda value: 255 if value > threshold else 0, mode="1")
+
+
+def run_ocr(path: str) -> dict:
+    """OCR every page of the image at path; must stay top-level for pickling."""
+    from PIL import Image, ImageSequence
+    import pytesseract
+
+    texts = []
+    with Image.open(path) as image:
+        for index, page in enumerate(ImageSequence.Iterator(image)):
+            if index >= OCR_MAX_PAGES:
+                break
+            texts.append(pytesseract.image_to_string(preprocess_page(page)))
+
+    text = "\n".join(texts)
+    return {"pages": len(texts), "text": text, "items": parse_invoice_items(text)}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process holding DB connections and server threads
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# -------------------------------------------------------
+# UPLOAD SPOOLING
+# -------------------------------------------------------
+def _spool_upload(fileobj) -> tuple:
+    """Copy an upload to a temp file in chunks; returns (path, sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    handle, path = tempfile.mkstemp(prefix="ocr-", suffix=".img")
+    try:
+        with os.fdopen(handle, "wb") as out:
+            while True:
+                chunk = fileobj.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > OCR_MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Image exceeds {OCR_MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+
+    if size == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Empty image upload")
+    return path, digest.hexdigest(), size
+
+
+# -------------------------------------------------------
+# JOBS
+# -------------------------------------------------------
+def _save_job(job: dict):
+    get_ephemeral_store().set(JOB_NAMESPACE, job["id"], job, OCR_JOB_TTL)
+
+
+def _finish(job: dict, path: str, future):
+    """Done-callback: record the result (or error) and drop the temp file."""
+    store = get_ephemeral_store()
+    try:
+        try:
+            result = future.result()
+            store.set(RESULT_NAMESPACE, job["image_hash"], result, OCR_RESULT_TTL)
+            job.update(status="done", pages=result["pages"])
+            log_audit(f"OCR job {job['id']} done ({result['pages']} pages, {len(result['items'])} items)")
+        except Exception as e:
+            job.update(status="failed", error=str(e) or e.__class__.__name__)
+            log_error(e, location=f"OCR Job → {job['id']}")
+        job["finished_at"] = datetime.utcnow().isoformat()
+        _save_job(job)
+        store.delete(IN_FLIGHT_NAMESPACE, job["image_hash"])
+    except Exception as e:
+        log_error(e, location=f"OCR Job Finish → {job['id']}")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def submit_ocr_job(fileobj, filename: Optional[str] = None) -> dict:
+    """Spool an upload and queue it for OCR; returns the job record."""
+    path, image_hash, size = _spool_upload(fileobj)
+    store = get_ephemeral_store()
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "image_hash": image_hash,
+        "filename": filename,
+        "size": size,
+        "pages": None,
+        "error": None,
+        "cached": False,
+        "submitted_at": datetime.utcnow().isoformat(),
+        "finished_at": None
+    }
+
+    # Same image OCR'd before: complete immediately from the cache
+    cached = store.get(RESULT_NAMESPACE, image_hash)
+    if cached is not None:
+        os.remove(path)
+        job.update(status="done", cached=True, pages=cached["pages"], finished_at=job["submitted_at"])
+        _save_job(job)
+        return job
+
+    # Same image already being OCR'd: hand back that job
+    running_id = store.get(IN_FLIGHT_NAMESPACE, image_hash)
+    running = store.get(JOB_NAMESPACE, running_id) if running_id else None
+    if running and running["status"] in ("queued", "running"):
+        os.remove(path)
+        return running
+
+    _save_job(job)
+    store.set(IN_FLIGHT_NAMESPACE, image_hash, job["id"], OCR_JOB_TTL)
+    try:
+        future = _get_pool().submit(run_ocr, path)
+    except Exception:
+        store.delete(IN_FLIGHT_NAMESPACE, image_hash)
+        os.remove(path)
+        raise
+
+    job["status"] = "running"
+    _save_job(job)
+    future.add_done_callback(lambda done: _finish(dict(job), path, done))
+    return job
+
+
+def get_ocr_job(job_id: str) -> dict:
+    """Current job record."""
+    job = get_ephemeral_store().get(JOB_NAMESPACE, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="OCR job not found")
+    return job
+
+
+async def wait_for_ocr_job(job_id: str, wait: float) -> dict:
+    """Long-poll the job record until it finishes or wait seconds (capped at OCR_MAX_WAIT) pass.
+
+    Sleeps on the event loop and reads the store on a worker thread, so a
+    waiting client does not hold a threadpool worker for the whole wait.
+    """
+    deadline = time.monotonic() + min(max(wait, 0), OCR_MAX_WAIT)
+    while True:
+        job = await asyncio.to_thread(get_ocr_job, job_id)
+        if job["status"] in ("done", "failed") or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(OCR_POLL_INTERVAL)
+
+
+def get_ocr_result(job_id: str) -> dict:
+    """Extracted text and items of a finished job."""
+    job = get_ocr_job(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=422, detail=f"OCR failed: {job['error']}")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"OCR job is {job['status']}")
+
+    result = get_ephemeral_store().get(RESULT_NAMESPACE, job["image_hash"])
+    if result is None:
+        raise HTTPException(status_code=410, detail="OCR result expired; submit the image again")
+    return {"job_id": job_id, **result}
@@ -0,0 +1,173 @@
+# backend/utils/pagination.py
+"""
+Keyset (cursor) pagination and common list filters.
+
+List endpoints take `limit` and `cursor` query parameters via PageParams
+and page on the primary key: WHERE id < :last_id ORDER BY id DESC LIMIT n.
+Every page is one index range scan, so page 500 costs the same as page 1,
+and rows inserted while a client is paging never shift later pages.
+
+Paging is opt-in: without `limit` or `cursor` an endpoint returns its full
+list in its original order, so existing screens see every row. Bodies stay
+plain lists; the cursor for the next page is returned in the X-Next-Cursor
+response header (absent on the last page). ListFilters adds optional
+status / date range / location filters. keyset_page_async() pages a
+select() on an AsyncSession the same way.
+"""
+
+import base64
+import json
+import os
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, Enum, or_
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(position, dict) or not isinstance(position.get("id"), int):
+            raise ValueError("cursor has no id")
+        return position
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PageParams:
+    """FastAPI dependency: ?limit=&cursor= with the page size capped at PAGE_SIZE_MAX.
+
+    Neither parameter means "no paging" (paged is False); a cursor without a
+    limit pages with PAGE_SIZE_DEFAULT.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, description=f"Page size (default {PAGE_SIZE_DEFAULT}, max {PAGE_SIZE_MAX})"),
+        cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
+    ):
+        self.paged = limit is not None or cursor is not None
+        self.limit = min(limit or PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX)
+        self.after = decode_cursor(cursor)
+
+
+class ListFilters:
+    """FastAPI dependency: optional ?status=&date_from=&date_to=&location= filters."""
+
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        location: Optional[str] = None
+    ):
+        self.status = status
+        self.date_from = date_from
+        self.date_to = date_to
+        self.location = location
+
+
+def _status_value(column, status: str):
+    """Map ?status= onto an Enum column's member (by name or value); 400 if unknown."""
+    enum_class = getattr(column.type, "enum_class", None) if isinstance(column.type, Enum) else None
+    if enum_class is None:
+        return status
+
+    for member in enum_class:
+        if status in (member.name, member.value) or status.lower() == member.name.lower():
+            return member
+    raise HTTPException(status_code=400, detail=f"Unknown status '{status}'")
+
+
+def apply_list_filters(query, filters: ListFilters, status_column=None, date_column=None, location_columns=()):
+    """Apply whichever filters were supplied to the columns this endpoint supports."""
+    if filters.status and status_column is not None:
+        query = query.filter(status_column == _status_value(status_column, filters.status))
+
+    if date_column is not None:
+        # date_to is inclusive; DateTime columns are compared against the next midnight
+        is_datetime = isinstance(date_column.type, DateTime)
+        if filters.date_from:
+            query = query.filter(date_column >= filters.date_from)
+        if filters.date_to:
+            if is_datetime:
+                query = query.filter(date_column < filters.date_to + timedelta(days=1))
+            else:
+                query = query.filter(date_column <= filters.date_to)
+
+    if filters.location and location_columns:
+        query = query.filter(or_(*(column == filters.location for column in location_columns)))
+
+    return query
+
+
+def _keyset_statement(query, id_column, page: PageParams, descending: bool, unpaged_order):
+    """query (a Query or a select()) narrowed to the requested page, plus one look-ahead row."""
+    if not page.paged:
+        return query.order_by(*unpaged_order) if unpaged_order else query
+
+    after = page.after.get("id") if page.after else None
+    if after is not None:
+        query = query.filter(id_column < after if descending else id_column > after)
+
+    return query.order_by(id_column.desc() if descending else id_column.asc()).limit(page.limit + 1)
+
+
+def _keyset_result(rows, page: PageParams, cursor_fields: dict, id_of):
+    if not page.paged:
+        return rows, None
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last_id = id_of(rows[-1]) if id_of else rows[-1].id
+        next_cursor = encode_cursor({**(cursor_fields or {}), "id": last_id})
+    return rows, next_cursor
+
+
+def keyset_page(query, id_column, page: PageParams, descending: bool = True, cursor_fields: dict = None,
+                id_of=None, unpaged_order=()):
+    """
+    One page of query ordered by id_column; returns (rows, next_cursor).
+
+    Rows may be entities or labelled tuples exposing `.id`; otherwise pass
+    id_of(row). cursor_fields is merged into the cursor (e.g. to remember
+    which source an endpoint was paging). When the client did not ask for
+    paging, every row is returned ordered by unpaged_order (the endpoint's
+    original ordering; none by default) and next_cursor is None.
+    """
+    query = _keyset_statement(query, id_column, page, descending, unpaged_order)
+    return _keyset_result(query.all(), page, cursor_fields, id_of)
+
+
+async def keyset_page_async(db, statement, id_column, page: PageParams, descending: bool = True,
+                            cursor_fields: dict = None, id_of=None, unpaged_order=(), scalars: bool = False):
+    """
+    keyset_page() for a select() on an AsyncSession.
+
+    Pass scalars=True when the statement selects a single entity to get the
+    entities rather than one-element rows.
+    """
+    statement = _keyset_statement(statement, id_column, page, descending, unpaged_order)
+    result = await db.execute(statement)
+    rows = result.scalars().all() if scalars else result.all()
+    return _keyset_result(rows, page, cursor_fields, id_of)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
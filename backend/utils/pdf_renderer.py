@@ -0,0 +1,294 @@
+# backend/utils/pdf_renderer.py
+"""
+Invoice PDF rendering off the request thread, with a content-addressed cache.
+
+Handlers reduce a billing row to a plain payload dict (invoice_payload) and
+ask for its PDF. The payload's sha256 - together with INVOICE_TEMPLATE_VERSION,
+so layout changes invalidate everything - is both the cache key and the
+ETag, so an unchanged invoice is answered from cache (or with a 304 before
+anything is rendered) and any edit to the billing produces a new entry.
+
+Cache misses are rendered by reportlab in a process pool (PDF_RENDER_WORKERS
+processes, started on first use), so rendering neither holds the GIL of the
+API process nor blocks other requests; concurrent requests for the same
+invoice share one render. Rendered bytes are kept in a per-process LRU
+(PDF_CACHE_MAX_ENTRIES) and, when PDF_CACHE_DIR is set, on disk so they
+survive restarts and are shared between API workers.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from utils.logger import log_error
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", "60"))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "512"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "")
+
+# Bump whenever render_invoice_pdf() output changes for the same payload
+INVOICE_TEMPLATE_VERSION = "1"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_PDF_CACHE = OrderedDict()  # {(tenant, billing_id): (digest, pdf_bytes)}
+_IN_FLIGHT = {}             # {(tenant, billing_id, digest): Future}
+_CACHE_LOCK = threading.Lock()
+
+
+# -------------------------------------------------------
+# PAYLOAD + CONTENT HASH
+# -------------------------------------------------------
+def invoice_payload(billing) -> dict:
+    """Everything the invoice layout prints, as plain (picklable) values."""
+    return {
+        "billing_id": billing.id,
+        "return_id": billing.return_id,
+        "date": billing.created_at.strftime('%d/%m/%Y') if billing.created_at else "",
+        "gross_amount": f"{billing.gross_amount or 0:.2f}",
+        "tax_amount": f"{billing.tax_amount or 0:.2f}",
+        "net_amount": f"{billing.net_amount or 0:.2f}"
+    }
+
+
+def payload_digest(payload: dict) -> str:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{INVOICE_TEMPLATE_VERSION}:{raw}".encode()).hexdigest()
+
+
+def invoice_etag(payload: dict) -> str:
+    return f'"{payload_digest(payload)[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header names etag (weak or strong) or is '*'."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# -------------------------------------------------------
+# RENDERING (RUNS IN A WORKER PROCESS)
+# -------------------------------------------------------
+def render_invoice_pdf(payload: dict) -> bytes:
+    """Draw one invoice with reportlab; must stay a top-level function for pickling."""
+    import io
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    billing_id = payload["billing_id"]
+    return_id = payload["return_id"]
+
+    # Header
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(50, height-50, "INVOICE")
+
+    # Company Info
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, height-80, "Your Company Name")
+    p.setFont("Helvetica", 10)
+    p.drawString(50, height-95, "123 Business Street, City, State 12345")
+    p.drawString(50, height-110, "Phone: (555) 123-4567 | Email: info@company.com")
+
+    # Invoice Details (Right)
+    p.setFont("Helvetica-Bold", 10)
+    p.drawRightString(width-50, height-80, f"Invoice #: INV-{billing_id:04d}")
+    p.drawRightString(width-50, height-95, f"Date: {payload['date']}")
+    p.drawRightString(width-50, height-110, f"Reference: RTN-{return_id}")
+
+    # Line separator
+    p.line(50, height-130, width-50, height-130)
+
+    # Bill To
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, height-160, "Bill To:")
+    p.setFont("Helvetica", 10)
+    p.drawString(50, height-175, "Customer Name")
+    p.drawString(50, height-190, "Customer Address")
+
+    # Items Table Header
+    table_y = height - 240
+    p.setFont("Helvetica-Bold", 10)
+    p.drawString(50, table_y, "Description")
+    p.drawString(300, table_y, "Quantity")
+    p.drawString(400, table_y, "Rate")
+    p.drawString(500, table_y, "Amount")
+
+    p.line(50, table_y-5, width-50, table_y-5)
+
+    # Items
+    p.setFont("Helvetica", 9)
+    item_y = table_y - 25
+    p.drawString(50, item_y, f"Return Processing - RTN-{return_id}")
+    p.drawString(300, item_y, "1")
+    p.drawString(400, item_y, f"₹{payload['gross_amount']}")
+    p.drawString(500, item_y, f"₹{payload['gross_amount']}")
+
+    # Totals
+    total_y = item_y - 50
+    p.line(400, total_y+20, width-50, total_y+20)
+
+    p.setFont("Helvetica", 10)
+    p.drawString(400, total_y, "Subtotal:")
+    p.drawRightString(width-50, total_y, f"₹{payload['gross_amount']}")
+
+    p.drawString(400, total_y-15, "Tax (18%):")
+    p.drawRightString(width-50, total_y-15, f"₹{payload['tax_amount']}")
+
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(400, total_y-35, "Total:")
+    p.drawRightString(width-50, total_y-35, f"₹{payload['net_amount']}")
+
+    # Footer
+    p.setFont("Helvetica", 8)
+    p.drawString(50, 50, "Thank you for your business!")
+
+    p.save()
+    return buffer.getvalue()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process holding DB connections and server threads
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_renderer():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# -------------------------------------------------------
+# CACHE (MEMORY LRU + OPTIONAL DISK)
+# -------------------------------------------------------
+def _disk_path(tenant: str, billing_id: int, digest: str) -> Optional[str]:
+    if not PDF_CACHE_DIR:
+        return None
+    return os.path.join(PDF_CACHE_DIR, tenant, f"invoice-{billing_id}-{digest}.pdf")
+
+
+def _read_cached(tenant: str, billing_id: int, digest: str) -> Optional[bytes]:
+    with _CACHE_LOCK:
+        entry = _PDF_CACHE.get((tenant, billing_id))
+        if entry and entry[0] == digest:
+            _PDF_CACHE.move_to_end((tenant, billing_id))
+            return entry[1]
+
+    path = _disk_path(tenant, billing_id, digest)
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            pdf = f.read()
+        _remember(tenant, billing_id, digest, pdf)
+        return pdf
+    return None
+
+
+def _remember(tenant: str, billing_id: int, digest: str, pdf: bytes):
+    with _CACHE_LOCK:
+        # One entry per invoice: a new digest replaces the stale render
+        _PDF_CACHE[(tenant, billing_id)] = (digest, pdf)
+        _PDF_CACHE.move_to_end((tenant, billing_id))
+        while len(_PDF_CACHE) > PDF_CACHE_MAX_ENTRIES:
+            _PDF_CACHE.popitem(last=False)
+
+
+def _store(tenant: str, billing_id: int, digest: str, pdf: bytes):
+    _remember(tenant, billing_id, digest, pdf)
+
+    path = _disk_path(tenant, billing_id, digest)
+    if not path:
+        return
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        prefix = f"invoice-{billing_id}-"
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name != os.path.basename(path):
+                os.remove(os.path.join(directory, name))
+        # Write then rename so other workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log_error(e, location=f"PDF Cache → invoice {billing_id}")
+
+
+def invalidate_invoice_pdfs(tenant: str = None):
+    """Drop in-memory renders for one tenant (or all); disk entries expire by digest."""
+    with _CACHE_LOCK:
+        for key in [key for key in _PDF_CACHE if tenant is None or key[0] == tenant]:
+            del _PDF_CACHE[key]
+
+
+# -------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------
+def _submit(tenant: str, payload: dict, digest: str):
+    """(cached_bytes, None) on a hit, else (None, future) - one render per digest."""
+    billing_id = payload["billing_id"]
+    cached = _read_cached(tenant, billing_id, digest)
+    if cached is not None:
+        return cached, None
+
+    key = (tenant, billing_id, digest)
+    with _CACHE_LOCK:
+        future = _IN_FLIGHT.get(key)
+        if future is None:
+            future = _get_pool().submit(render_invoice_pdf, payload)
+            _IN_FLIGHT[key] = future
+    return None, future
+
+
+def _collect(tenant: str, payload: dict, digest: str, future) -> bytes:
+    key = (tenant, payload["billing_id"], digest)
+    try:
+        pdf = future.result(timeout=PDF_RENDER_TIMEOUT)
+    finally:
+        with _CACHE_LOCK:
+            if _IN_FLIGHT.get(key) is future and future.done():
+                del _IN_FLIGHT[key]
+    _store(tenant, payload["billing_id"], digest, pdf)
+    return pdf
+
+
+def get_invoice_pdf(tenant: str, payload: dict) -> bytes:
+    """PDF bytes for payload, from cache or rendered in the process pool."""
+    digest = payload_digest(payload)
+    cached, future = _submit(tenant, payload, digest)
+    if cached is not None:
+        return cached
+    return _collect(tenant, payload, digest, future)
+
+
+def render_invoice_pdfs(tenant: str, payloads: list) -> list:
+    """PDF bytes for every payload (same order); all misses render in parallel."""
+    pending = []
+    for payload in payloads:
+        digest = payload_digest(payload)
+        pending.append((payload, digest) + _submit(tenant, payload, digest))
+
+    return [
+        cached if cached is not None else _collect(tenant, payload, digest, future)
+        for payload, digest, cached, future in pending
+    ]
@@ -0,0 +1,158 @@
+# backend/utils/scheduled_jobs.py
+"""
+Periodic per-tenant jobs run by the scheduler (utils/scheduler.py).
+
+Each handler gets a session on one tenant database and returns a small
+summary dict that is stored with the run. Handlers run on a pool thread of
+the leader process only, one tenant at a time per job.
+
+    return_deadline_alerts  daily at RETURN_ALERT_TIME
+    expiry_sweep            daily at EXPIRY_SWEEP_TIME
+    reorder_refresh         every REORDER_REFRESH_INTERVAL seconds
+    stock_checkpoints       every STOCK_CHECKPOINT_INTERVAL seconds
+"""
+
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.tenant_models import Batch, GRN, GRNItem
+from utils.domain_subscribers import STOCK_ALERT_EMAIL
+from utils.logger import log_audit
+from utils.reorder_engine import REORDER_REFRESH_INTERVAL, refresh_reorder_suggestions
+from utils.scheduler import register_job
+from utils.stock_checkpoints import STOCK_CHECKPOINT_INTERVAL, refresh_checkpoints
+
+RETURN_ALERT_TIME = os.getenv("RETURN_ALERT_TIME", "09:00")
+RETURN_ALERT_DAYS = int(os.getenv("RETURN_ALERT_DAYS", "3"))
+EXPIRY_SWEEP_TIME = os.getenv("EXPIRY_SWEEP_TIME", "07:00")
+EXPIRY_ALERT_DAYS = int(os.getenv("EXPIRY_ALERT_DAYS", "30"))
+
+
+# -------------------------------------------------------
+# RETURN DEADLINE ALERTS
+# -------------------------------------------------------
+def upcoming_return_deadlines(db: Session, today: date = None) -> list:
+    """SENT external transfers with items still out, due back within RETURN_ALERT_DAYS (from tomorrow)."""
+    today = today or date.today()
+    rows = db.execute(text("""
+        SELECT et.id, et.transfer_no, et.staff_name, et.staff_email, et.return_deadline, et.location,
+               SUM(eti.quantity - COALESCE(eti.returned_quantity, 0) - COALESCE(eti.damaged_quantity, 0)) as pending_qty
+        FROM external_transfers et
+        JOIN external_transfer_items eti ON et.id = eti.transfer_id
+        WHERE et.return_deadline BETWEEN :tomorrow AND :last_day
+        AND et.status = 'SENT'
+        AND (eti.quantity - COALESCE(eti.returned_quantity, 0) - COALESCE(eti.damaged_quantity, 0)) > 0
+        GROUP BY et.id HAVING pending_qty > 0
+    """), {
+        "tomorrow": (today + timedelta(days=1)).isoformat(),
+        "last_day": (today + timedelta(days=RETURN_ALERT_DAYS)).isoformat()
+    })
+
+    deadlines = []
+    for transfer_id, transfer_no, staff_name, staff_email, return_deadline, location, pending_qty in rows:
+        if isinstance(return_deadline, str):
+            return_deadline = date.fromisoformat(return_deadline[:10])
+        elif hasattr(return_deadline, "date"):
+            return_deadline = return_deadline.date()
+        deadlines.append({
+            "transfer_id": transfer_id,
+            "transfer_no": transfer_no,
+            "staff_name": staff_name,
+            "staff_email": staff_email,
+            "return_deadline": return_deadline,
+            "days_left": (return_deadline - today).days,
+            "pending_qty": int(pending_qty),
+            "location": location
+        })
+    return deadlines
+
+
+def queue_return_deadline_alerts(db: Session, today: date = None) -> int:
+    """Queue one reminder email per upcoming deadline with a staff email; returns how many were queued."""
+    from utils.email_outbox import enqueue_email
+
+    queued = 0
+    for deadline in upcoming_return_deadlines(db, today):
+        if not deadline["staff_email"]:
+            continue
+        transfer_no, days_left, pending_qty = deadline["transfer_no"], deadline["days_left"], deadline["pending_qty"]
+
+        subject = f"Return Reminder: {transfer_no} - Due in {days_left} days"
+        body = f"""
+        <h2>Return Deadline Reminder</h2>
+        <p>Dear {deadline['staff_name']},</p>
+        <p>You have <strong>{pending_qty} items</strong> pending return for transfer <strong>{transfer_no}</strong>.</p>
+        <ul>
+            <li>Transfer: {transfer_no}</li>
+            <li>Location: {deadline['location']}</li>
+            <li>Deadline: {deadline['return_deadline'].strftime('%d-%m-%Y')}</li>
+            <li>Days Left: {days_left}</li>
+            <li>Pending Items: {pending_qty}</li>
+        </ul>
+        <p>Please return all items by the deadline.</p>
+        """
+
+        enqueue_email(deadline["staff_email"], subject, body, is_html=True)
+        queued += 1
+    return queued
+
+
+@register_job("return_deadline_alerts", daily_at=RETURN_ALERT_TIME)
+def send_return_deadline_alerts(db: Session) -> dict:
+    return {"queued": queue_return_deadline_alerts(db)}
+
+
+# -------------------------------------------------------
+# EXPIRY SWEEP
+# -------------------------------------------------------
+@register_job("expiry_sweep", daily_at=EXPIRY_SWEEP_TIME)
+def sweep_expiring_batches(db: Session) -> dict:
+    """Report batches in stock that have expired or expire within EXPIRY_ALERT_DAYS."""
+    today = date.today()
+    rows = db.query(GRNItem.item_name, Batch.batch_no, Batch.expiry_date, Batch.qty, GRN.store).join(
+        GRNItem, GRNItem.id == Batch.grn_item_id
+    ).join(GRN, GRN.id == GRNItem.grn_id).filter(
+        Batch.qty > 0,
+        Batch.expiry_date.isnot(None),
+        Batch.expiry_date <= today + timedelta(days=EXPIRY_ALERT_DAYS)
+    ).order_by(Batch.expiry_date).all()
+
+    expired = [row for row in rows if row.expiry_date < today]
+    expiring = [row for row in rows if row.expiry_date >= today]
+    if not rows:
+        return {"expired": 0, "expiring": 0}
+
+    tenant = db.get_bind().url.database
+    log_audit(f"Expiry sweep → {tenant}: {len(expired)} expired, {len(expiring)} expiring batches")
+    if STOCK_ALERT_EMAIL:
+        from utils.email_outbox import enqueue_email
+
+        lines = "".join(
+            f"<li>{row.item_name} - batch {row.batch_no} ({row.qty:g} in {row.store or 'default store'}): "
+            f"{'expired' if row.expiry_date < today else 'expires'} {row.expiry_date.strftime('%d-%m-%Y')}</li>"
+            for row in rows
+        )
+        enqueue_email(
+            STOCK_ALERT_EMAIL,
+            f"Expiry report: {len(expired)} expired, {len(expiring)} expiring within {EXPIRY_ALERT_DAYS} days",
+            f"<h2>Batch expiry report ({tenant})</h2><ul>{lines}</ul>",
+            is_html=True
+        )
+
+    return {"expired": len(expired), "expiring": len(expiring)}
+
+
+# -------------------------------------------------------
+# REORDER SUGGESTIONS / STOCK CHECKPOINTS
+# -------------------------------------------------------
+@register_job("reorder_refresh", interval=REORDER_REFRESH_INTERVAL)
+def refresh_reorder(db: Session) -> dict:
+    return refresh_reorder_suggestions(db)
+
+
+@register_job("stock_checkpoints", interval=STOCK_CHECKPOINT_INTERVAL)
+def roll_stock_checkpoints(db: Session) -> dict:
+    return refresh_checkpoints(db)
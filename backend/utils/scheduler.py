@@ -0,0 +1,351 @@
+# backend/utils/scheduler.py
+"""
+In-process scheduler for periodic per-tenant jobs.
+
+Jobs register themselves (utils/scheduled_jobs.py) with either a fixed
+interval or a daily wall-clock time:
+
+    @register_job("reorder_refresh", interval=3600)
+    def refresh_reorder(db): ...
+
+    @register_job("return_deadline_alerts", daily_at="09:00")
+    def send_return_deadline_alerts(db): ...
+
+Every app process starts a scheduler thread, but only the leader runs jobs.
+Leadership is a lease row in master_scheduler_lease taken and renewed with
+a conditional UPDATE (WHERE holder = me OR expires_at < now), so exactly
+one process holds it and another takes over within SCHEDULER_LEASE_TTL
+seconds if the leader dies.
+
+On each tick the leader reads the last run of every (job, tenant) from
+master_scheduled_job_runs, works out which are due for the default tenant
+and every tenant in master_tenant, and fans them out over a bounded pool
+of SCHEDULER_WORKERS threads. A pair never runs twice at once. Each run is
+recorded with its status, timing, result summary or error. Because the
+schedule is derived from that history, restarts and leader changes neither
+skip nor repeat a daily job. Failed runs are retried after
+SCHEDULER_RETRY_AFTER seconds.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from models.register_models import ScheduledJobRun, SchedulerLease
+from utils.logger import log_error, log_audit
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK", "30"))
+SCHEDULER_LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "120"))
+SCHEDULER_RETRY_AFTER = int(os.getenv("SCHEDULER_RETRY_AFTER", "900"))
+SCHEDULER_HISTORY_DAYS = int(os.getenv("SCHEDULER_HISTORY_DAYS", "30"))
+# A run still marked "running" this long after it started (its process died) no longer blocks the job
+SCHEDULER_STALE_RUN = int(os.getenv("SCHEDULER_STALE_RUN", "21600"))
+
+LEASE_NAME = "job-scheduler"
+
+Job = namedtuple("Job", ["name", "handler", "interval", "daily_at"])
+
+_JOBS = {}
+_jobs_loaded = False
+_scheduler = None
+
+
+# -------------------------------------------------------
+# JOB REGISTRY
+# -------------------------------------------------------
+def register_job(name: str, interval: int = None, daily_at: str = None):
+    """Register handler(db) -> dict|None to run per tenant every `interval` seconds or daily at "HH:MM"."""
+    if (interval is None) == (daily_at is None):
+        raise ValueError(f"Job {name} needs exactly one of interval / daily_at")
+    if daily_at is not None:
+        datetime.strptime(daily_at, "%H:%M")
+
+    def register(handler):
+        _JOBS[name] = Job(name, handler, interval, daily_at)
+        return handler
+    return register
+
+
+def _load_jobs():
+    global _jobs_loaded
+    if not _jobs_loaded:
+        import utils.scheduled_jobs  # noqa: F401  (registers via @register_job)
+        _jobs_loaded = True
+
+
+def registered_jobs() -> dict:
+    _load_jobs()
+    return dict(_JOBS)
+
+
+def _last_slot(daily_at: str, now: datetime) -> datetime:
+    """The most recent occurrence of HH:MM at or before now."""
+    hour, minute = (int(part) for part in daily_at.split(":"))
+    slot = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return slot if slot <= now else slot - timedelta(days=1)
+
+
+def is_due(job: Job, last_run: Optional[ScheduledJobRun], now: datetime) -> bool:
+    if last_run is None:
+        return True
+    if last_run.status == "running":
+        return now - last_run.started_at >= timedelta(seconds=SCHEDULER_STALE_RUN)
+    if last_run.status == "failed" and now - last_run.started_at >= timedelta(seconds=SCHEDULER_RETRY_AFTER):
+        return True
+    if job.interval is not None:
+        return now - last_run.started_at >= timedelta(seconds=job.interval)
+    return last_run.started_at < _last_slot(job.daily_at, now)
+
+
+# -------------------------------------------------------
+# LEADER LEASE
+# -------------------------------------------------------
+def acquire_lease(db, holder: str, ttl: int = None) -> bool:
+    """Take or renew the scheduler lease; True if `holder` is the leader until now + ttl."""
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=ttl or SCHEDULER_LEASE_TTL)
+
+    renewed = db.query(SchedulerLease).filter(
+        SchedulerLease.name == LEASE_NAME,
+        or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now)
+    ).update({"holder": holder, "expires_at": expires_at}, synchronize_session=False)
+    if renewed:
+        db.commit()
+        return True
+
+    if db.query(SchedulerLease.name).filter(SchedulerLease.name == LEASE_NAME).first():
+        db.rollback()
+        return False
+
+    try:
+        db.add(SchedulerLease(name=LEASE_NAME, holder=holder, acquired_at=now, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        # Another process created the lease row first
+        db.rollback()
+        return False
+
+
+def release_lease(db, holder: str):
+    db.query(SchedulerLease).filter(
+        SchedulerLease.name == LEASE_NAME, SchedulerLease.holder == holder
+    ).update({"expires_at": datetime.now()}, synchronize_session=False)
+    db.commit()
+
+
+# -------------------------------------------------------
+# RUNNING ONE JOB
+# -------------------------------------------------------
+def run_job(job: Job, tenant: str, session_factory, trigger: str = "schedule", holder: str = None,
+            master_sessionmaker=None) -> dict:
+    """Run one job against one tenant and record it in the run history; returns the run as a dict."""
+    master = (master_sessionmaker or _master_sessionmaker())()
+    try:
+        run = ScheduledJobRun(job_name=job.name, tenant=tenant, trigger=trigger, holder=holder,
+                              status="running", started_at=datetime.now())
+        master.add(run)
+        master.commit()
+
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            result = job.handler(db)
+            db.commit()
+            run.status = "success"
+            run.result = json.dumps(result, default=str)[:4000] if result is not None else None
+        except Exception as e:
+            db.rollback()
+            run.status = "failed"
+            run.error = (str(e) or e.__class__.__name__)[:4000]
+            log_error(e, location=f"Scheduled Job {job.name} → {tenant}")
+        finally:
+            db.close()
+
+        run.finished_at = datetime.now()
+        run.duration_ms = int((time.perf_counter() - started) * 1000)
+        master.commit()
+        return run_to_dict(run)
+    finally:
+        master.close()
+
+
+def latest_runs(db) -> dict:
+    """{(job_name, tenant): latest ScheduledJobRun} in one query."""
+    latest = db.query(func.max(ScheduledJobRun.id)).group_by(
+        ScheduledJobRun.job_name, ScheduledJobRun.tenant
+    ).subquery()
+    rows = db.query(ScheduledJobRun).filter(ScheduledJobRun.id.in_(latest.select())).all()
+    return {(row.job_name, row.tenant): row for row in rows}
+
+
+def run_to_dict(run: ScheduledJobRun) -> dict:
+    result = run.result
+    if result:
+        try:
+            result = json.loads(result)
+        except ValueError:
+            pass  # truncated summary
+    return {
+        "id": run.id,
+        "job_name": run.job_name,
+        "tenant": run.tenant,
+        "trigger": run.trigger,
+        "status": run.status,
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "duration_ms": run.duration_ms,
+        "result": result,
+        "error": run.error,
+    }
+
+
+# -------------------------------------------------------
+# SCHEDULER
+# -------------------------------------------------------
+def _master_sessionmaker():
+    from database import SessionLocal
+    return SessionLocal
+
+
+def _tenant_session_factories() -> dict:
+    from database import bootstrap_tenant_db, get_tenant_sessionmaker, list_tenant_databases
+
+    factories = {}
+    for db_name in list_tenant_databases():
+        try:
+            bootstrap_tenant_db(db_name)
+            factories[db_name] = get_tenant_sessionmaker(db_name)
+        except Exception as e:
+            log_error(e, location=f"Scheduler → tenant {db_name}")
+    return factories
+
+
+class JobScheduler(threading.Thread):
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS, tick: float = SCHEDULER_TICK,
+                 master_sessionmaker=None, session_factories=None):
+        super().__init__(name="job-scheduler", daemon=True)
+        self.tick_seconds = tick
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.master_sessionmaker = master_sessionmaker or _master_sessionmaker()
+        # Callable returning {tenant: sessionmaker}; re-read every tick so new tenants are picked up
+        self.session_factories = session_factories or _tenant_session_factories
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduler-job")
+        self.is_leader = False
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_prune = 0.0
+
+    # ---------- history ----------
+    def _prune_history(self, db):
+        if time.monotonic() - self._last_prune < 3600:
+            return
+        self._last_prune = time.monotonic()
+        cutoff = datetime.now() - timedelta(days=SCHEDULER_HISTORY_DAYS)
+        # Keep each pair's latest run so the schedule survives a long gap
+        keep = {run_id for (run_id,) in db.query(func.max(ScheduledJobRun.id)).group_by(
+            ScheduledJobRun.job_name, ScheduledJobRun.tenant
+        ).all()}
+        query = db.query(ScheduledJobRun).filter(ScheduledJobRun.started_at < cutoff)
+        if keep:
+            query = query.filter(ScheduledJobRun.id.notin_(keep))
+        query.delete(synchronize_session=False)
+        db.commit()
+
+    # ---------- running ----------
+    def _run_tracked(self, job: Job, tenant: str, session_factory):
+        try:
+            run_job(job, tenant, session_factory, holder=self.holder, master_sessionmaker=self.master_sessionmaker)
+        except Exception as e:
+            log_error(e, location=f"Scheduler → {job.name} / {tenant}")
+        finally:
+            with self._running_lock:
+                self._running.discard((job.name, tenant))
+
+    def tick(self) -> int:
+        """Renew leadership and submit every due (job, tenant); returns how many were submitted."""
+        master = self.master_sessionmaker()
+        try:
+            self.is_leader = acquire_lease(master, self.holder)
+            if not self.is_leader:
+                return 0
+
+            self._prune_history(master)
+            jobs = registered_jobs()
+            last_runs = latest_runs(master)
+        finally:
+            master.close()
+
+        now = datetime.now()
+        submitted = 0
+        for tenant, session_factory in self.session_factories().items():
+            for job in jobs.values():
+                key = (job.name, tenant)
+                with self._running_lock:
+                    if key in self._running or not is_due(job, last_runs.get(key), now):
+                        continue
+                    self._running.add(key)
+                self.pool.submit(self._run_tracked, job, tenant, session_factory)
+                submitted += 1
+        return submitted
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                log_error(e, location="Job Scheduler")
+            self._stop.wait(self.tick_seconds)
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.is_leader:
+            master = self.master_sessionmaker()
+            try:
+                release_lease(master, self.holder)
+            except Exception as e:
+                log_error(e, location="Job Scheduler → release lease")
+            finally:
+                master.close()
+
+
+# -------------------------------------------------------
+# LIFECYCLE
+# -------------------------------------------------------
+def get_scheduler() -> Optional[JobScheduler]:
+    return _scheduler
+
+
+def start_scheduler(**kwargs):
+    """Start this process's scheduler thread (idempotent); it only runs jobs while it holds the lease."""
+    global _scheduler
+    if not SCHEDULER_ENABLED or (_scheduler and _scheduler.is_alive()):
+        return
+    _load_jobs()
+    _scheduler = JobScheduler(**kwargs)
+    _scheduler.start()
+    log_audit(f"Job scheduler started ({_scheduler.holder}, {len(_JOBS)} jobs)")
+
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler:
+        _scheduler.stop()
+        _scheduler = None
@@ -0,0 +1,212 @@
+# backend/utils/stock_aggregation.py
+"""
+Set-based stock aggregation over approved GRN batches.
+
+Replaces the per-item / per-GRN-item query loops in the stock listing
+endpoints with a fixed number of grouped JOIN queries. Rows are grouped
+and keyed by the integer item_id (see utils/item_refs.py). Rows the item_id
+backfill has not resolved yet fall back to the item master row with the
+same item_name, so their stock is still counted; only rows whose name
+matches no item at all are left out. The statements are plain select()s so
+the async routes run the same queries with await db.execute().
+"""
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.tenant_models import (
+    Item, GRN, GRNItem, Batch, GRNStatus, Stock, StockIssue
+)
+
+DEFAULT_LOCATION = "Main Store"
+
+
+def resolved_item_id(model):
+    """
+    model.item_id, or for rows without one the id of the item named
+    model.item_name (first item wins on duplicate names, as in
+    utils.item_refs.get_item_ids_by_name()).
+    """
+    by_name = select(func.min(Item.id)).where(Item.name == model.item_name).correlate(model).scalar_subquery()
+    return func.coalesce(model.item_id, by_name)
+
+
+def batch_rows_statement(location: Optional[str] = None, positive_only: bool = False):
+    """All batches of approved GRNs with their item id, item name and store."""
+    statement = select(
+        resolved_item_id(GRNItem).label("item_id"),
+        GRNItem.item_name,
+        Batch.id,
+        Batch.batch_no,
+        Batch.qty,
+        Batch.mfg_date,
+        Batch.expiry_date,
+        Batch.warranty_start_date,
+        Batch.warranty_end_date,
+        GRN.store
+    ).select_from(Batch).join(
+        GRNItem, Batch.grn_item_id == GRNItem.id
+    ).join(
+        GRN, GRNItem.grn_id == GRN.id
+    ).where(
+        GRN.status == GRNStatus.approved
+    )
+
+    if location is not None:
+        statement = statement.where(GRN.store == location)
+    if positive_only:
+        statement = statement.where(Batch.qty > 0)
+
+    return statement.order_by(GRNItem.id, Batch.id)
+
+
+def latest_locations_statement():
+    """(item_id, store) of the latest approved GRNs per item id, oldest GRN first."""
+    lines = select(
+        resolved_item_id(GRNItem).label("item_id"),
+        GRN.id.label("grn_id"),
+        GRN.grn_date,
+        GRN.store
+    ).join(
+        GRN, GRNItem.grn_id == GRN.id
+    ).where(
+        GRN.status == GRNStatus.approved
+    ).subquery()
+
+    latest = select(
+        lines.c.item_id,
+        func.max(lines.c.grn_date).label("latest_date")
+    ).where(
+        lines.c.item_id.isnot(None)
+    ).group_by(lines.c.item_id).subquery()
+
+    return select(lines.c.item_id, lines.c.store).join(
+        latest, and_(latest.c.item_id == lines.c.item_id, latest.c.latest_date == lines.c.grn_date)
+    ).order_by(lines.c.grn_id)
+
+
+def active_items_statement():
+    return select(Item).where(Item.is_active == True)
+
+
+def _latest_locations(rows) -> dict:
+    locations = {}
+    for item_id, store in rows:
+        locations.setdefault(item_id, store)
+    return locations
+
+
+def _summarize(batch_rows, latest_locations: dict) -> dict:
+    summary = {}
+    for row in batch_rows:
+        if row.item_id is None:
+            continue  # item_name matches no item master row
+        entry = summary.setdefault(row.item_id, {"total_qty": 0, "batches": [], "location": DEFAULT_LOCATION})
+        entry["batches"].append(row)
+        entry["total_qty"] += row.qty or 0
+
+    for item_id, store in latest_locations.items():
+        entry = summary.setdefault(item_id, {"total_qty": 0, "batches": [], "location": DEFAULT_LOCATION})
+        entry["location"] = store
+
+    return summary
+
+
+def get_batch_rows(db: Session, location: Optional[str] = None, positive_only: bool = False):
+    """All batches of approved GRNs with their item id, item name and store (1 query)."""
+    return db.execute(batch_rows_statement(location, positive_only)).all()
+
+
+def get_latest_locations(db: Session) -> dict:
+    """Store of the latest approved GRN per item id (1 query)."""
+    return _latest_locations(db.execute(latest_locations_statement()).all())
+
+
+def get_item_stock_summary(db: Session, location: Optional[str] = None,
+                           positive_only: bool = False, with_latest_location: bool = True) -> dict:
+    """
+    Per-item on-hand summary from approved GRN batches.
+
+    Returns {item_id: {"total_qty", "batches", "location"}} where batches are
+    the rows from get_batch_rows() and location is the latest receipt's store
+    (DEFAULT_LOCATION when the item has never been received).
+    """
+    batch_rows = get_batch_rows(db, location=location, positive_only=positive_only)
+    latest_locations = get_latest_locations(db) if with_latest_location else {}
+    return _summarize(batch_rows, latest_locations)
+
+
+async def get_item_stock_summary_async(db: AsyncSession, location: Optional[str] = None,
+                                       positive_only: bool = False, with_latest_location: bool = True) -> dict:
+    """get_item_stock_summary() on an AsyncSession."""
+    batch_rows = (await db.execute(batch_rows_statement(location, positive_only))).all()
+    latest_locations = {}
+    if with_latest_location:
+        latest_locations = _latest_locations((await db.execute(latest_locations_statement())).all())
+    return _summarize(batch_rows, latest_locations)
+
+
+def get_received_qty_by_item(db: Session) -> dict:
+    """Sum of received quantity per item id across approved GRNs (1 query)."""
+    lines = select(
+        resolved_item_id(GRNItem).label("item_id"),
+        GRNItem.received_qty
+    ).join(
+        GRN, GRNItem.grn_id == GRN.id
+    ).where(
+        GRN.status == GRNStatus.approved
+    ).subquery()
+
+    rows = db.execute(
+        select(lines.c.item_id, func.sum(lines.c.received_qty)).where(
+            lines.c.item_id.isnot(None)
+        ).group_by(lines.c.item_id)
+    ).all()
+    return {item_id: qty or 0 for item_id, qty in rows}
+
+
+def get_issued_qty_by_item(db: Session) -> dict:
+    """Sum of issued quantity per stock item id (1 query)."""
+    issues = select(
+        resolved_item_id(Stock).label("item_id"),
+        StockIssue.qty
+    ).join(
+        StockIssue, StockIssue.stock_id == Stock.id
+    ).subquery()
+
+    rows = db.execute(
+        select(issues.c.item_id, func.sum(issues.c.qty)).where(
+            issues.c.item_id.isnot(None)
+        ).group_by(issues.c.item_id)
+    ).all()
+    return {item_id: qty or 0 for item_id, qty in rows}
+
+
+def get_expiring_batches(db: Session, start: date, end: date):
+    """Approved-GRN batches expiring between start and end, inclusive (1 query)."""
+    return db.execute(
+        select(
+            resolved_item_id(GRNItem).label("item_id"), GRNItem.item_name,
+            Batch.batch_no, Batch.expiry_date, Batch.qty
+        ).select_from(Batch).join(
+            GRNItem, Batch.grn_item_id == GRNItem.id
+        ).join(
+            GRN, GRNItem.grn_id == GRN.id
+        ).where(
+            GRN.status == GRNStatus.approved,
+            Batch.expiry_date <= end,
+            Batch.expiry_date >= start
+        ).order_by(GRNItem.id, Batch.id)
+    ).all()
+
+
+def get_active_items(db: Session):
+    return db.execute(active_items_statement()).scalars().all()
+
+
+async def get_active_items_async(db: AsyncSession):
+    return (await db.execute(active_items_statement())).scalars().all()
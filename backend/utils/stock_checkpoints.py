@@ -0,0 +1,149 @@
+# backend/utils/stock_checkpoints.py
+"""
+Point-in-time stock balances from stock_ledger checkpoints.
+
+refresh_checkpoints() rolls the latest stored checkpoint forward through
+yesterday: one grouped query sums the ledger tail per day and
+(item_name, batch_no, location), and every day that had movements gets an
+end-of-day snapshot of all non-zero balances. Days without movements need
+no snapshot - the previous one is still exact.
+
+stock_balances_as_of() loads the nearest checkpoint on or before the
+requested date and replays only the ledger rows after it, so an as-of
+report costs one indexed checkpoint read plus at most a day or so of
+ledger rows, however many years of history the ledger holds. Ledger rows
+are only ever appended with created_at = now(), so a stored checkpoint
+never goes stale.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.tenant_models import Stock, StockLedger, StockBalanceCheckpoint
+from utils.stock_aggregation import DEFAULT_LOCATION
+
+STOCK_CHECKPOINT_INTERVAL = int(os.getenv("STOCK_CHECKPOINT_INTERVAL", "3600"))
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+def _as_date(value) -> date:
+    # DATE() comes back as a date on MySQL and as text on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _ledger_deltas(db: Session, after: Optional[date], through: date, item_name: str = None,
+                   location: str = None, by_day: bool = False):
+    """Net qty_in - qty_out per (item, batch, location) for ledger rows in (after, through]."""
+    batch_col = func.coalesce(StockLedger.batch_no, "")
+    location_col = func.coalesce(StockLedger.location, DEFAULT_LOCATION)
+    day_col = func.date(StockLedger.created_at)
+
+    columns = [Stock.item_name, batch_col, location_col]
+    if by_day:
+        columns.insert(0, day_col)
+
+    query = db.query(
+        *columns,
+        func.sum(func.coalesce(StockLedger.qty_in, 0) - func.coalesce(StockLedger.qty_out, 0))
+    ).join(Stock, Stock.id == StockLedger.stock_id).filter(
+        StockLedger.created_at < _midnight(through + timedelta(days=1))
+    )
+    if after is not None:
+        query = query.filter(StockLedger.created_at >= _midnight(after + timedelta(days=1)))
+    if item_name:
+        query = query.filter(Stock.item_name == item_name)
+    if location:
+        query = query.filter(location_col == location)
+
+    query = query.group_by(*columns)
+    if by_day:
+        query = query.order_by(day_col)
+    return query.all()
+
+
+def _checkpoint_balances(db: Session, checkpoint_date: date, item_name: str = None, location: str = None) -> dict:
+    query = db.query(
+        StockBalanceCheckpoint.item_name, StockBalanceCheckpoint.batch_no,
+        StockBalanceCheckpoint.location, StockBalanceCheckpoint.balance
+    ).filter(StockBalanceCheckpoint.checkpoint_date == checkpoint_date)
+    if item_name:
+        query = query.filter(StockBalanceCheckpoint.item_name == item_name)
+    if location:
+        query = query.filter(StockBalanceCheckpoint.location == location)
+    return {(item, batch, loc): balance for item, batch, loc, balance in query}
+
+
+def latest_checkpoint_date(db: Session, on_or_before: date = None) -> Optional[date]:
+    query = db.query(func.max(StockBalanceCheckpoint.checkpoint_date))
+    if on_or_before is not None:
+        query = query.filter(StockBalanceCheckpoint.checkpoint_date <= on_or_before)
+    return query.scalar()
+
+
+# -------------------------------------------------------
+# CHECKPOINT REFRESH
+# -------------------------------------------------------
+def refresh_checkpoints(db: Session, through: date = None) -> dict:
+    """Write end-of-day checkpoints for every day with movements up to through (default yesterday)."""
+    through = through or date.today() - timedelta(days=1)
+    last = latest_checkpoint_date(db)
+    stats = {"days": 0, "rows": 0, "through": through.isoformat()}
+    if last is not None and last >= through:
+        return stats
+
+    balances = _checkpoint_balances(db, last) if last else {}
+
+    by_day = {}
+    for day, item_name, batch_no, location, delta in _ledger_deltas(db, last, through, by_day=True):
+        by_day.setdefault(_as_date(day), []).append(((item_name, batch_no, location), delta or 0))
+
+    try:
+        for day in sorted(by_day):
+            for key, delta in by_day[day]:
+                balances[key] = balances.get(key, 0) + delta
+
+            rows = [
+                {"checkpoint_date": day, "item_name": item, "batch_no": batch, "location": loc, "balance": balance}
+                for (item, batch, loc), balance in balances.items()
+                if abs(balance) > 1e-9
+            ]
+            db.bulk_insert_mappings(StockBalanceCheckpoint, rows)
+            db.commit()
+            stats["days"] += 1
+            stats["rows"] += len(rows)
+    except IntegrityError:
+        # Another worker wrote the same day first; its rows are identical
+        db.rollback()
+
+    return stats
+
+
+# -------------------------------------------------------
+# AS-OF QUERY
+# -------------------------------------------------------
+def stock_balances_as_of(db: Session, as_of: date, item_name: str = None, location: str = None) -> dict:
+    """On-hand balance per item / batch / location at the end of as_of."""
+    checkpoint_date = latest_checkpoint_date(db, as_of)
+    balances = _checkpoint_balances(db, checkpoint_date, item_name, location) if checkpoint_date else {}
+
+    tail = _ledger_deltas(db, checkpoint_date, as_of, item_name, location)
+    for item, batch, loc, delta in tail:
+        balances[(item, batch, loc)] = balances.get((item, batch, loc), 0) + (delta or 0)
+
+    return {
+        "as_of": as_of.isoformat(),
+        "checkpoint_date": checkpoint_date.isoformat() if checkpoint_date else None,
+        "replayed_groups": len(tail),
+        "balances": [
+            {"item_name": item, "batch_no": batch or None, "location": loc, "balance": balance}
+            for (item, batch, loc), balance in sorted(balances.items())
+            if abs(balance) > 1e-9
+        ]
+    }
@@ -0,0 +1,83 @@
+# backend/utils/stock_ledger.py
+"""
+Shared helpers for stock_ledger writers.
+
+Every ledger row carries the store the movement happened at, so the
+point-in-time balances in utils/stock_checkpoints.py split correctly by
+location. A movement that names a batch but no store takes the store of the
+approved GRN that received the batch; DEFAULT_LOCATION is the last resort.
+GRN postings write one receipt row per batch through post_grn_ledger().
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from models.tenant_models import GRN, GRNItem, Batch, GRNStatus, Stock, StockLedger, StockTxnType
+from utils.stock_aggregation import DEFAULT_LOCATION
+
+
+def batch_location(db: Session, item_name: str, batch_no: Optional[str]) -> str:
+    """Store of the approved GRN that received this item batch (1 query)."""
+    if not batch_no:
+        return DEFAULT_LOCATION
+
+    store = db.query(GRN.store).join(GRNItem, GRNItem.grn_id == GRN.id).join(
+        Batch, Batch.grn_item_id == GRNItem.id
+    ).filter(
+        GRNItem.item_name == item_name,
+        Batch.batch_no == batch_no,
+        GRN.status == GRNStatus.approved
+    ).order_by(GRN.grn_date.desc()).limit(1).scalar()
+    return store or DEFAULT_LOCATION
+
+
+def _stock_masters(db: Session, item_names, uoms: dict) -> dict:
+    """{item_name: Stock}, creating the stock master rows that do not exist yet."""
+    stocks = {}
+    for stock in db.query(Stock).filter(Stock.item_name.in_(item_names)).order_by(Stock.id):
+        stocks.setdefault(stock.item_name, stock)
+
+    for item_name in item_names:
+        if item_name not in stocks:
+            stock = Stock(item_name=item_name, uom=uoms.get(item_name) or "PCS",
+                          total_qty=0, available_qty=0, reserved_qty=0, reorder_level=0)
+            db.add(stock)
+            stocks[item_name] = stock
+
+    db.flush()
+    return stocks
+
+
+def post_grn_ledger(db: Session, grn: GRN, rows: Iterable) -> int:
+    """
+    Write receipt rows for a GRN posting (no commit).
+
+    rows are (item_name, batch_no, location, qty, uom) with a signed qty:
+    positive for stock received, negative when an edit of an approved GRN
+    takes some of it back. The item's stock master moves in step so each
+    row's balance holds. Returns ledger rows written.
+    """
+    rows = [row for row in rows if row[0] and row[3]]
+    if not rows:
+        return 0
+
+    stocks = _stock_masters(db, {row[0] for row in rows}, {row[0]: row[4] for row in rows})
+
+    for item_name, batch_no, location, qty, _ in rows:
+        stock = stocks[item_name]
+        stock.total_qty = (stock.total_qty or 0) + qty
+        stock.available_qty = (stock.available_qty or 0) + qty
+        db.add(StockLedger(
+            stock_id=stock.id,
+            batch_no=batch_no,
+            txn_type=StockTxnType.GRN_RECEIPT,
+            qty_in=qty if qty > 0 else 0,
+            qty_out=-qty if qty < 0 else 0,
+            balance=stock.available_qty,
+            ref_no=grn.grn_number,
+            remarks=f"GRN receipt: {grn.vendor_name}" if qty > 0 else f"GRN correction: {grn.vendor_name}",
+            location=location or DEFAULT_LOCATION
+        ))
+
+    return len(rows)
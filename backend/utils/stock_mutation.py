@@ -0,0 +1,189 @@
+# backend/utils/stock_mutation.py
+"""
+Compare-and-swap quantity updates for batches and stock_overview rows.
+
+Handlers used to read a quantity into Python, check it and write back
+qty - n, so two concurrent requests could both pass the check and one
+update would be lost (or the batch oversold). Batch and StockOverview now
+carry a version column; compare_and_swap() writes the new quantity with
+
+    UPDATE ... SET qty = :new, version = version + 1 WHERE id = :id AND version = :seen
+
+and succeeds only if nobody changed the row since it was read. On a lost
+race it re-reads the row and recomputes, up to STOCK_CAS_RETRIES times,
+then gives up with a 409. No table or gap locks are taken; the re-read is
+a single-row locking read because under REPEATABLE READ a plain SELECT
+would keep returning the transaction's stale snapshot.
+
+Plain deductions and additions don't need the read at all:
+decrement_batch_qty() / allocate_batches() issue
+
+    UPDATE batches SET qty = qty - :n WHERE id = :id AND qty >= :n
+
+(one statement for any number of batches, amounts via CASE) and report
+success from the affected row count; release_batches() is the matching
+unconditional increment. A whole transfer or invoice is one round trip.
+"""
+
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import update, delete, case
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models.tenant_models import Batch
+
+STOCK_CAS_RETRIES = int(os.getenv("STOCK_CAS_RETRIES", "5"))
+
+
+def compare_and_swap(db: Session, row, qty_attr: str, compute) -> float:
+    """
+    Set row.<qty_attr> to compute(current_qty) if the row's version is unchanged.
+
+    compute may raise (e.g. HTTPException for insufficient stock) to abort.
+    The in-session object is updated to the written qty/version; returns the
+    new quantity. Does not commit.
+    """
+    model = type(row)
+    qty_column = getattr(model, qty_attr)
+    qty, version = getattr(row, qty_attr), row.version
+
+    for _ in range(STOCK_CAS_RETRIES):
+        new_qty = compute(qty or 0)
+        result = db.execute(
+            update(model)
+            .where(model.id == row.id, model.version == version)
+            .values({qty_attr: new_qty, "version": version + 1})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            set_committed_value(row, qty_attr, new_qty)
+            set_committed_value(row, "version", version + 1)
+            return new_qty
+
+        # Lost the race: read the row as it is now and recompute
+        current = db.query(qty_column, model.version).filter(model.id == row.id).with_for_update().first()
+        if current is None:
+            raise HTTPException(status_code=409, detail=f"{model.__name__} {row.id} was removed concurrently")
+        qty, version = current
+
+    raise HTTPException(
+        status_code=409,
+        detail=f"{model.__name__} {row.id} is being updated concurrently; please retry"
+    )
+
+
+def adjust_batch_qty(db: Session, batch, delta: float, insufficient_detail: str = None) -> float:
+    """Add delta (negative to deduct) to batch.qty; 400 if that would go below zero."""
+    def compute(qty):
+        if qty + delta < 0:
+            raise HTTPException(
+                status_code=400,
+                detail=insufficient_detail or (
+                    f"Insufficient stock in batch {batch.batch_no}. Available: {qty}, Requested: {-delta}"
+                )
+            )
+        return qty + delta
+
+    return compare_and_swap(db, batch, "qty", compute)
+
+
+def adjust_overview_qty(db: Session, row, delta: float) -> int:
+    """Add delta to a stock_overview row's available_qty, clamped at zero."""
+    return compare_and_swap(db, row, "available_qty", lambda qty: max(int(qty + delta), 0))
+
+
+# -------------------------------------------------------
+# ATOMIC CONDITIONAL DECREMENT / INCREMENT
+# -------------------------------------------------------
+def _expire_batches(db: Session, batch_ids):
+    """Loaded Batch objects re-read qty/version on next access."""
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Batch) and obj.id in batch_ids:
+            db.expire(obj, ["qty", "version"])
+
+
+def decrement_batch_qty(db: Session, batch_id: int, qty: float) -> bool:
+    """Deduct qty from one batch only if it has that much; True on success."""
+    result = db.execute(
+        update(Batch)
+        .where(Batch.id == batch_id, Batch.qty >= qty)
+        .values(qty=Batch.qty - qty, version=Batch.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        _expire_batches(db, {batch_id})
+        return True
+    return False
+
+
+def allocate_batches(db: Session, allocations: dict):
+    """
+    Deduct {batch_id: qty} from every batch in one statement, all or nothing.
+
+    Raises 400 naming the first batch that is short; earlier work in the
+    caller's transaction is kept (the statement runs in a savepoint).
+    """
+    allocations = {batch_id: qty for batch_id, qty in allocations.items() if qty}
+    if not allocations:
+        return
+    if len(allocations) == 1:
+        (batch_id, qty), = allocations.items()
+        if not decrement_batch_qty(db, batch_id, qty):
+            _raise_short(db, allocations)
+        return
+
+    amount = case(allocations, value=Batch.id)
+    savepoint = db.begin_nested()
+    result = db.execute(
+        update(Batch)
+        .where(Batch.id.in_(allocations), Batch.qty >= amount)
+        .values(qty=Batch.qty - amount, version=Batch.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == len(allocations):
+        savepoint.commit()
+        _expire_batches(db, allocations)
+        return
+
+    savepoint.rollback()
+    _raise_short(db, allocations)
+
+
+def _raise_short(db: Session, allocations: dict):
+    rows = db.query(Batch.id, Batch.batch_no, Batch.qty).filter(Batch.id.in_(allocations)).order_by(Batch.id).all()
+    for batch_id, batch_no, qty in rows:
+        if (qty or 0) < allocations[batch_id]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock in batch {batch_no}. Available: {qty}, Required: {allocations[batch_id]}"
+            )
+    raise HTTPException(status_code=400, detail="Batch not found or insufficient stock")
+
+
+def release_batches(db: Session, additions: dict):
+    """Add {batch_id: qty} back to every batch in one statement."""
+    additions = {batch_id: qty for batch_id, qty in additions.items() if qty}
+    if not additions:
+        return
+    db.execute(
+        update(Batch)
+        .where(Batch.id.in_(additions))
+        .values(qty=Batch.qty + case(additions, value=Batch.id), version=Batch.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    _expire_batches(db, additions)
+
+
+def delete_batch_if_empty(db: Session, batch_id: int) -> bool:
+    """Remove a batch only if it is (now) at zero, judged by the database, not a loaded copy."""
+    result = db.execute(
+        delete(Batch).where(Batch.id == batch_id, Batch.qty <= 0).execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Batch) and obj.id == batch_id:
+            db.expunge(obj)
+    return True
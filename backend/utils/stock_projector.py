@@ -0,0 +1,373 @@
+# backend/utils/stock_projector.py
+"""
+Incremental stock_overview projection.
+
+Stock-moving handlers describe what happened as StockMovement deltas and
+call apply_movements(), which upserts one stock_overview row per
+(item_name, batch_no, location) inside the caller's transaction. Net stock
+in (GRN postings, returns) goes out as a single multi-row
+INSERT ... ON DUPLICATE KEY UPDATE against ux_stock_overview_key, however
+many batches it covers; deductions keep the compare-and-swap path.
+rebuild_stock_overview() recomputes the projection from approved GRN
+batches chunk by chunk, writing only the rows that differ, so the table is
+never emptied and each chunk commits in its own short transaction.
+"""
+
+from collections import namedtuple
+from typing import Iterable, Optional
+
+from sqlalchemy import func, case, literal_column, text
+from sqlalchemy.orm import Session
+
+from models.tenant_models import GRN, GRNItem, Batch, GRNStatus, StockOverview
+from utils.item_cache import get_items_by_id
+from utils.item_refs import get_item_ids_by_name
+from utils.stock_aggregation import DEFAULT_LOCATION
+from utils.stock_mutation import adjust_overview_qty
+
+StockMovement = namedtuple("StockMovement", ["item_name", "batch_no", "location", "qty", "expiry_date"])
+StockMovement.__new__.__defaults__ = (None,)
+
+REBUILD_CHUNK_SIZE = 500
+
+UPSERT_INDEX = "ux_stock_overview_key"
+_UPSERT_SUPPORT = {}  # {engine url: bool}
+
+
+def movement(item_name: str, batch_no: Optional[str], location: Optional[str], qty, expiry_date=None) -> StockMovement:
+    """A signed quantity change (positive = stock in) for one item batch at one location."""
+    return StockMovement(item_name, batch_no, location or DEFAULT_LOCATION, float(qty or 0), expiry_date)
+
+
+def stock_status(qty, min_stock) -> str:
+    if qty <= 0:
+        return "Out of Stock"
+    if min_stock and qty < min_stock:
+        return "Low Stock"
+    return "Good"
+
+
+def _format_expiry(expiry_date) -> str:
+    if not expiry_date:
+        return "—"
+    return expiry_date.strftime("%d/%m/%Y") if hasattr(expiry_date, "strftime") else str(expiry_date)
+
+
+def _load_rows(db: Session, item_names):
+    """Existing overview rows keyed by (item_name, batch_no, location), plus any duplicate rows."""
+    rows = {}
+    duplicates = []
+    if not item_names:
+        return rows, duplicates
+
+    for row in db.query(StockOverview).filter(
+        StockOverview.item_name.in_(item_names)
+    ).order_by(StockOverview.id).all():
+        key = (row.item_name, row.batch_no, row.location)
+        if key in rows:
+            duplicates.append(row)
+        else:
+            rows[key] = row
+    return rows, duplicates
+
+
+def _item_masters(db: Session, item_names) -> dict:
+    """{item_name: CachedItem} via the item master cache."""
+    ids = get_item_ids_by_name(db, item_names)
+    cached = get_items_by_id(db, ids.values())
+    return {name: cached.get(item_id) for name, item_id in ids.items()}
+
+
+def _new_row_values(item_name, batch_no, location, qty, expiry_date, master) -> dict:
+    min_stock = (master.min_stock if master else 0) or 0
+    return {
+        "item_name": item_name,
+        "item_code": master.item_code if master else f"GRN-{batch_no or item_name[:10]}",
+        "location": location,
+        "available_qty": int(qty),
+        "min_stock": min_stock,
+        "batch_no": batch_no,
+        "expiry_date": _format_expiry(expiry_date),
+        "status": stock_status(qty, min_stock)
+    }
+
+
+def _new_row(item_name, batch_no, location, qty, expiry_date, master) -> StockOverview:
+    return StockOverview(**_new_row_values(item_name, batch_no, location, qty, expiry_date, master))
+
+
+# -------------------------------------------------------
+# BULK UPSERT
+# -------------------------------------------------------
+def _has_upsert_index(engine) -> bool:
+    # Inspector.get_indexes() skips expression indexes, so ask the catalog directly
+    if engine.dialect.name == "mysql":
+        query = text(
+            "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() "
+            "AND table_name = 'stock_overview' AND index_name = :name LIMIT 1"
+        )
+    elif engine.dialect.name == "sqlite":
+        query = text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name")
+    else:
+        return False
+    with engine.connect() as conn:
+        return conn.execute(query, {"name": UPSERT_INDEX}).first() is not None
+
+
+def _upsert_supported(db: Session) -> bool:
+    """True once the tenant DB has the unique key the upsert conflicts on."""
+    engine = db.get_bind().engine
+    key = str(engine.url)
+    if key not in _UPSERT_SUPPORT:
+        _UPSERT_SUPPORT[key] = _has_upsert_index(engine)
+    return _UPSERT_SUPPORT[key]
+
+
+def _upsert_gains(db: Session, gains: dict, expiries: dict) -> int:
+    """Add {(item, batch, location): qty > 0} to stock_overview in one statement."""
+    item_names = {key[0] for key in gains}
+    masters = _item_masters(db, item_names)
+
+    rows = []
+    for (item_name, batch_no, location), qty in gains.items():
+        master = masters.get(item_name)
+        values = _new_row_values(item_name, batch_no, location, qty, expiries.get((item_name, batch_no, location)), master)
+        # Core inserts skip the before_flush hook that fills item_id
+        values.update(item_id=master.id if master else None, warranty="—", version=0)
+        rows.append(values)
+
+    table = StockOverview.__table__
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        incoming = stmt.inserted
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        incoming = stmt.excluded
+
+    new_qty = func.coalesce(table.c.available_qty, 0) + incoming.available_qty
+    # MySQL applies these left to right, so available_qty must come last:
+    # everything before it still sees the pre-update quantity
+    assignments = [
+        ("status", case(
+            (new_qty <= 0, "Out of Stock"),
+            ((table.c.min_stock > 0) & (new_qty < table.c.min_stock), "Low Stock"),
+            else_="Good"
+        )),
+        ("expiry_date", case((incoming.expiry_date == "—", table.c.expiry_date), else_=incoming.expiry_date)),
+        ("version", table.c.version + 1),
+        ("updated_at", func.now()),
+        ("available_qty", new_qty),
+    ]
+    if db.get_bind().dialect.name == "mysql":
+        stmt = stmt.on_duplicate_key_update(assignments)
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.item_name, func.coalesce(table.c.batch_no, literal_column("''")), table.c.location],
+            set_=dict(assignments)
+        )
+    db.execute(stmt)
+
+    # Loaded rows re-read what the statement wrote
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, StockOverview):
+            db.expire(obj)
+    return len(rows)
+
+
+def dedupe_stock_overview(engine):
+    """Fold duplicate (item, batch, location) rows into one so the upsert's unique key can be created"""
+    try:
+        if _has_upsert_index(engine):
+            return
+
+        with engine.begin() as conn:
+            # Same survivor as _load_rows / rebuild_stock_overview: the lowest id, which
+            # takes over the stock of the rows removed below
+            merged = conn.execute(text(
+                "UPDATE stock_overview k JOIN ("
+                "  SELECT MIN(id) AS keep_id, SUM(available_qty) AS total FROM stock_overview"
+                "  GROUP BY item_name, COALESCE(batch_no, ''), location HAVING COUNT(*) > 1"
+                ") d ON k.id = d.keep_id "
+                "SET k.status = CASE WHEN d.total <= 0 THEN 'Out of Stock' "
+                "  WHEN k.min_stock > 0 AND d.total < k.min_stock THEN 'Low Stock' ELSE 'Good' END, "
+                "k.available_qty = d.total"
+            ))
+            if merged.rowcount:
+                print(f"Merged duplicate stock_overview quantities into {merged.rowcount} rows")
+
+            result = conn.execute(text(
+                "DELETE d FROM stock_overview d JOIN stock_overview k "
+                "ON k.item_name = d.item_name AND k.location = d.location "
+                "AND COALESCE(k.batch_no, '') = COALESCE(d.batch_no, '') AND k.id < d.id"
+            ))
+            if result.rowcount:
+                print(f"Removed {result.rowcount} duplicate stock_overview rows")
+
+    except Exception as e:
+        print(f"Error in dedupe_stock_overview: {e}")
+
+
+# -------------------------------------------------------
+# INCREMENTAL APPLY
+# -------------------------------------------------------
+def apply_movements(db: Session, movements: Iterable[StockMovement]) -> int:
+    """
+    Upsert the net effect of movements into stock_overview (no commit).
+
+    Deltas for the same (item, batch, location) are summed first; rows are
+    kept at zero as "Out of Stock" rather than deleted. Returns rows touched.
+    """
+    deltas = {}
+    expiries = {}
+    for m in movements:
+        if not m.item_name or not m.qty:
+            continue
+        key = (m.item_name, m.batch_no, m.location or DEFAULT_LOCATION)
+        deltas[key] = deltas.get(key, 0) + m.qty
+        if m.expiry_date:
+            expiries[key] = m.expiry_date
+
+    if not deltas:
+        return 0
+
+    touched = len(deltas)
+    if _upsert_supported(db):
+        gains = {key: delta for key, delta in deltas.items() if delta > 0}
+        if gains:
+            _upsert_gains(db, gains, expiries)
+        deltas = {key: delta for key, delta in deltas.items() if delta < 0}
+        if not deltas:
+            return touched
+
+    item_names = {key[0] for key in deltas}
+    with db.no_autoflush:
+        existing, _ = _load_rows(db, item_names)
+        masters = None
+
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row:
+                adjust_overview_qty(db, row, delta)
+                row.status = stock_status(row.available_qty, row.min_stock)
+                if key in expiries:
+                    row.expiry_date = _format_expiry(expiries[key])
+            elif delta > 0:
+                if masters is None:
+                    masters = _item_masters(db, item_names)
+                item_name, batch_no, location = key
+                db.add(_new_row(item_name, batch_no, location, delta, expiries.get(key), masters.get(item_name)))
+
+    return touched
+
+
+# -------------------------------------------------------
+# REPLAY / REBUILD
+# -------------------------------------------------------
+def _target_state(db: Session, item_names) -> dict:
+    """On-hand qty per (item, batch, store) from approved GRN batches for the given items."""
+    rows = db.query(
+        GRNItem.item_name,
+        Batch.batch_no,
+        GRN.store,
+        func.sum(Batch.qty),
+        func.max(Batch.expiry_date)
+    ).join(
+        GRNItem, Batch.grn_item_id == GRNItem.id
+    ).join(
+        GRN, GRNItem.grn_id == GRN.id
+    ).filter(
+        GRN.status == GRNStatus.approved,
+        GRNItem.item_name.in_(item_names)
+    ).group_by(GRNItem.item_name, Batch.batch_no, GRN.store).all()
+
+    target = {}
+    for item_name, batch_no, store, qty, expiry_date in rows:
+        key = (item_name, batch_no, store or DEFAULT_LOCATION)
+        qty_total, _ = target.get(key, (0, None))
+        target[key] = (qty_total + (qty or 0), expiry_date)
+    return target
+
+
+def _reconcile_chunk(db: Session, item_names) -> dict:
+    target = _target_state(db, item_names)
+    existing, duplicates = _load_rows(db, item_names)
+    masters = None
+    stats = {"inserted": 0, "updated": 0, "deleted": 0}
+
+    for row in duplicates:
+        db.delete(row)
+        stats["deleted"] += 1
+
+    for key, (qty, expiry_date) in target.items():
+        qty = max(int(qty), 0)
+        row = existing.pop(key, None)
+        if row is None:
+            if masters is None:
+                masters = _item_masters(db, item_names)
+            db.add(_new_row(key[0], key[1], key[2], qty, expiry_date, masters.get(key[0])))
+            stats["inserted"] += 1
+            continue
+
+        expiry = _format_expiry(expiry_date)
+        status = stock_status(qty, row.min_stock)
+        if row.available_qty != qty or row.status != status or (expiry_date and row.expiry_date != expiry):
+            row.available_qty = qty
+            row.status = status
+            if expiry_date:
+                row.expiry_date = expiry
+            stats["updated"] += 1
+
+    # Rows with no backing batch any more
+    for row in existing.values():
+        db.delete(row)
+        stats["deleted"] += 1
+
+    return stats
+
+
+def rebuild_stock_overview(db: Session, item_names: Optional[Iterable[str]] = None,
+                           chunk_size: int = REBUILD_CHUNK_SIZE) -> dict:
+    """
+    Reconcile stock_overview with approved GRN batches.
+
+    Pass item_names to replay only the affected items; otherwise every item
+    with batches or overview rows is walked in name order, chunk_size items
+    per transaction. Only differing rows are written.
+    """
+    totals = {"items": 0, "inserted": 0, "updated": 0, "deleted": 0}
+
+    def run_chunk(names):
+        stats = _reconcile_chunk(db, names)
+        db.commit()
+        totals["items"] += len(names)
+        for key, value in stats.items():
+            totals[key] += value
+
+    if item_names is not None:
+        names = sorted({name for name in item_names if name})
+        for start in range(0, len(names), chunk_size):
+            run_chunk(names[start:start + chunk_size])
+        return totals
+
+    # Keyset walk over every item name that has batches or overview rows
+    last_name = None
+    while True:
+        received = db.query(GRNItem.item_name).filter(GRNItem.item_name.isnot(None))
+        projected = db.query(StockOverview.item_name)
+        if last_name is not None:
+            received = received.filter(GRNItem.item_name > last_name)
+            projected = projected.filter(StockOverview.item_name > last_name)
+
+        names = sorted(
+            {name for (name,) in received.distinct().order_by(GRNItem.item_name).limit(chunk_size)} |
+            {name for (name,) in projected.distinct().order_by(StockOverview.item_name).limit(chunk_size)}
+        )[:chunk_size]
+        if not names:
+            break
+
+        run_chunk(names)
+        last_name = names[-1]
+
+    return totals